@@ -1,74 +1,30 @@
 # -*- coding: UTF-8 -*-
-# pylint: disable=useless-object-inheritance, unused-argument
+# pylint: disable=unused-argument
 from __future__ import absolute_import, print_function
 import os
 from cmake_build import model_builder
+from cmake_build.workspace import Settings, Workspace
 
 
-class MockConfig(object):
+class MockConfig(Settings):
+    """Settings with the defaults of the test steps."""
     defaults = {
         "build_config": os.environ.get("CMAKE_BUILD_CONFIG", "debug"),
         "build_configs": ["debug", "release"],
-        "cmake_install_prefix": None,
+        "cmake_generator": "ninja",
         "cmake_defines": [],
-        "projects": [],
-        "config_file": None,
-        "config_dir": ".",
         # DISABLED: "build_config_aliases": {"default": "debug"},
     }
 
     def __init__(self, data=None, **kwargs):
-        self.data = {}
-        self.data.update(self.defaults)
-        if data:
-            self.data.update(data)
-        self.data.update(**kwargs)
-        self.build_dir_schema = "build.{BUILD_CONFIG}"
-        self.build_config = self.data.get("build_config")
-        self.build_configs_map = {}
-        self.cmake_generator = "ninja"
-        self.cmake_toolchain = None
-        self.cmake_install_prefix = None
-        self.cmake_defines = None
-        self.config_file = None
-        self.config_dir = "."
-        # DISABLED:
-        # self.build_config = self.build_config_aliases.get("default", "debug")
-
-    def get(self, name, default=None):
-        if name == "build_configs_map":
-            return self.build_configs_map
-        return self.data.get(name, default)
-
-    @property
-    def build_configs(self):
-        return self.data["build_configs"]
-
-    @property
-    def projects(self):
-        return self.data["projects"]
-
-    # DISABLED:
-    # @property
-    # def build_config_aliases(self):
-    #     return self.data["build_config_aliases"]
-
-    # XXX-JE-CHECK:
-    @property
-    def build_projects(self):
-        return self.data["projects"]
-
-
-class MockContext(object):
-    def __init__(self, config=None, **kwargs):
-        self.config = MockConfig(config, **kwargs)
-
-    def run(self, args, **kwargs):
-        return NotImplemented
+        settings = dict(self.defaults)
+        settings.update(data or {})
+        super(MockConfig, self).__init__(settings, **kwargs)
 
 
 def make_context_object(workdir=None):
-    return MockContext()
+    """Creates a lightweight context for the CMake model (without invoke)."""
+    return Workspace(MockConfig())
 
 
 def make_build_config(ctx, build_config=None):
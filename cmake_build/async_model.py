@@ -0,0 +1,466 @@
+# -*- coding: UTF-8 -*-
+"""
+asyncio API for the CMake model: Drive many builds from one event loop.
+
+.. code-block:: python
+
+    from cmake_build.async_model import AsyncCMakeProject, AsyncCMakeBuildRunner
+
+    async def build_all(cmake_projects):
+        project = AsyncCMakeProject(cmake_projects[0])
+        await project.build(timeout=600)
+
+        runner = AsyncCMakeBuildRunner(cmake_projects, max_concurrent=4,
+                                       on_line=lambda unit, line: print(unit, line))
+        results = await runner.run_matrix("build", keep_going=True)
+
+The commands (cmake, ctest, cpack) run as asyncio subprocesses
+(:func:`asyncio.create_subprocess_exec`) on the event loop:
+
+* cancellation: A cancelled call terminates its process group
+  (SIGTERM, then SIGKILL after a grace period).
+* timeouts: Each call accepts ``timeout`` (in seconds).
+* concurrency: :meth:`AsyncCMakeBuildRunner.run_matrix()` uses a semaphore.
+* streaming output: ``on_line`` callbacks receive each output line (as text).
+
+The steps of the model (init checks, build dir locks, usage data, ...)
+are the same as for the sync API. They are executed in a worker thread
+that hands over its commands to the event loop
+(see: :func:`cmake_build.process_runner.use_process_runner()`).
+Commands with ``use_sudo`` still use the shell runner.
+The run config is used, too (like: ``run.dry``, ``run.hide``, ``run.warn``).
+
+HINT: Each running project needs one worker thread (for its model steps).
+The worker thread is blocked while its command runs on the event loop.
+Therefore, :class:`AsyncCMakeBuildRunner` uses its own thread pool
+with ``max_concurrent`` threads (not the default executor of the loop).
+
+HINT: Requires Python >= 3.7 (this module is only imported on demand).
+"""
+
+from __future__ import absolute_import, print_function
+import asyncio
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+import os
+import signal
+import sys
+import time
+from invoke.exceptions import UnexpectedExit
+from invoke.runners import Result, normalize_hide
+from .build_log import BuildLog
+from .cmake_util import cmake_cmdline_join
+from .exceptions import UnitCancelled, UnitTimedOut
+from .process_runner import CHUNK_SIZE, ECHO_FORMAT, GRACE_PERIOD, \
+    USE_PROCESS_GROUPS, make_output_writer, make_run_options, \
+    signal_process_group, use_process_runner
+from .scheduler import UnitResult
+
+
+# ---------------------------------------------------------------------------
+# ASYNC PROCESS RUNNER:
+# ---------------------------------------------------------------------------
+class AsyncProcessRunner(object):
+    """Runs a command (as argv list) as asyncio subprocess (without shell).
+
+    .. code-block:: python
+
+        runner = AsyncProcessRunner(on_line=print)
+        await runner.run(["cmake", "--build", "."], cwd="build.debug", timeout=60)
+
+    :param echo:    If true, print the command before it is executed.
+    :param stream:  Output stream to use (default: sys.stdout).
+    :param on_line: Callback for each output line (as text; optional).
+    :param show_output: If false, output is only passed to ``on_line``.
+    :param grace_period: Time between SIGTERM and SIGKILL (in seconds).
+    :param dry:     If true, only print the command (like: ``run.dry``).
+    :param hide:    Hides the output, like: ``run.hide`` (out, both, True).
+    :param warn:    If true, failed commands do not raise an exception.
+    """
+    # pylint: disable=too-many-instance-attributes
+    echo_format = ECHO_FORMAT
+
+    def __init__(self, echo=True, stream=None, on_line=None, show_output=True,
+                 env=None, grace_period=GRACE_PERIOD, dry=False, hide=None,
+                 warn=False):
+        # pylint: disable=too-many-arguments
+        self.echo = echo
+        self.stream = stream
+        self.on_line = on_line
+        self.env = env
+        self.grace_period = grace_period
+        self.dry = dry
+        self.hide = normalize_hide(hide)
+        self.show_output = show_output and "stdout" not in self.hide
+        self.warn = warn
+
+    def _make_line_callback(self, build_log):
+        on_line = self.on_line
+        previous = build_log.on_line if build_log is not None else None
+
+        def on_line_text(line):
+            if previous is not None:
+                previous(line)
+            on_line(line.decode("UTF-8", "replace"))
+        return on_line_text
+
+    async def run(self, argv, cwd=None, warn=None, env=None, build_log=None,
+                  timeout=None):
+        """Runs the command and forwards its output (stdout and stderr).
+
+        :param timeout: Timeout in seconds (optional).
+        :return: Result object (stdout: last lines of the build log, if any).
+        :raises invoke.exceptions.UnexpectedExit: If the command fails.
+        :raises asyncio.TimeoutError: If the command times out (is terminated).
+        :raises asyncio.CancelledError: If the call is cancelled (is terminated).
+        """
+        # pylint: disable=too-many-arguments
+        argv = [str(arg) for arg in argv]
+        command = cmake_cmdline_join(argv)
+        stream = self.stream or sys.stdout
+        if self.echo or self.dry:
+            print(self.echo_format.format(command=command), file=stream)
+            stream.flush()
+        if self.dry:
+            # -- DRY-RUN: Show the command only (like: ctx.run()).
+            if build_log is not None:
+                build_log.close()
+            return Result(command=command, exited=0, pty=False, hide=self.hide)
+
+        if warn is None:
+            warn = self.warn
+        if env:
+            env = dict(self.env or os.environ, **env)
+        if self.on_line is None and build_log is None and not self.show_output:
+            # -- HINT: Hidden output is captured (like: ctx.run()).
+            build_log = BuildLog(console="none", stream=stream)
+        if self.on_line is not None:
+            if build_log is None:
+                build_log = BuildLog(console="all" if self.show_output else "none",
+                                     stream=stream)
+            build_log.on_line = self._make_line_callback(build_log)
+        cwd = str(cwd) if cwd is not None else None
+        write = make_output_writer(stream) if self.show_output else None
+        if build_log is not None:
+            build_log.write_command(command, cwd=cwd)
+            write = build_log.write
+
+        if build_log is not None and not self.show_output:
+            build_log.console = "none"
+        process = await self._start_process(argv, cwd, env or self.env)
+        try:
+            exit_code = await asyncio.wait_for(self._forward(process, write),
+                                               timeout)
+        except BaseException:
+            # -- CASE: Cancelled, timeout, CTRL-C, ...
+            await self.terminate(process)
+            raise
+        finally:
+            if build_log is not None:
+                build_log.close()
+
+        stdout = build_log.tail_text if build_log is not None else ""
+        result = Result(stdout=stdout, command=command, exited=exit_code,
+                        pty=False, hide=self.hide)
+        if exit_code != 0 and not warn:
+            if build_log is not None:
+                build_log.report_failure()
+            raise UnexpectedExit(result)
+        return result
+
+    async def _start_process(self, argv, cwd, env):
+        starting = asyncio.ensure_future(asyncio.create_subprocess_exec(
+            *argv, cwd=cwd, env=env,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+            start_new_session=USE_PROCESS_GROUPS))
+        try:
+            return await asyncio.shield(starting)
+        except asyncio.CancelledError:
+            # -- CASE: Cancelled while starting: Process exists (maybe).
+            try:
+                process = await starting
+            except Exception:   # pylint: disable=broad-except
+                raise asyncio.CancelledError()
+            await self.terminate(process)
+            raise
+
+    @staticmethod
+    async def _forward(process, write):
+        while True:
+            data = await process.stdout.read(CHUNK_SIZE)
+            if not data:
+                break
+            if write is not None:
+                write(data)
+        return await process.wait()
+
+    async def terminate(self, process):
+        """Terminates the process group: SIGTERM first, SIGKILL after grace period."""
+        if process.returncode is None:
+            signal_process_group(process, signal.SIGTERM)
+            try:
+                await asyncio.wait_for(process.wait(), self.grace_period)
+            except asyncio.TimeoutError:
+                pass
+        if USE_PROCESS_GROUPS or process.returncode is None:
+            # -- HINT: Children in the process group may still be running.
+            signal_process_group(process, getattr(signal, "SIGKILL", signal.SIGTERM))
+        await process.wait()
+
+
+class ThreadToLoopRunner(object):
+    """Process runner for a worker thread: Runs the commands on the event loop
+    (with an :class:`AsyncProcessRunner`) and waits for them.
+    """
+
+    def __init__(self, async_runner, loop):
+        self.async_runner = async_runner
+        self.loop = loop
+        self.cancelled = False
+        self._future = None
+
+    def run(self, argv, cwd=None, warn=None, env=None, build_log=None,
+            watchdog=None):
+        """Runs the command on the event loop (and waits for it).
+        Only the total timeout of a watchdog is used (no idle timeout).
+        """
+        # pylint: disable=too-many-arguments
+        command = cmake_cmdline_join([str(arg) for arg in argv])
+        if self.cancelled:
+            raise UnitCancelled(reason="{0} (not started)".format(command))
+        timeout = watchdog.remaining_total() if watchdog is not None else None
+        self._future = asyncio.run_coroutine_threadsafe(
+            self.async_runner.run(argv, cwd=cwd, warn=warn, env=env,
+                                  build_log=build_log, timeout=timeout), self.loop)
+        if self.cancelled:
+            self._future.cancel()   # -- CASE: Cancelled while starting (race).
+        try:
+            return self._future.result()
+        except concurrent.futures.CancelledError:
+            raise UnitCancelled(reason="{0} (terminated)".format(command))
+        except asyncio.TimeoutError:
+            raise UnitTimedOut(reason="{0} (TIMEOUT after {1} seconds)".format(
+                command, timeout))
+        finally:
+            self._future = None
+
+    def cancel(self):
+        """Cancels the running command (and the following commands)."""
+        self.cancelled = True
+        future = self._future
+        if future is not None:
+            future.cancel()
+
+
+# ---------------------------------------------------------------------------
+# ASYNC CMAKE PROJECT:
+# ---------------------------------------------------------------------------
+def _make_async_method(name):
+    async def method(self, timeout=None, **kwargs):
+        return await self.call(name, timeout=timeout, **kwargs)
+    method.__name__ = name
+    method.__doc__ = "Async version of :meth:`CMakeProject.{0}()`.".format(name)
+    return method
+
+
+class AsyncCMakeProject(object):
+    """asyncio facade of a :class:`cmake_build.model.CMakeProject`.
+
+    :param cmake_project:   CMake project to use.
+    :param on_line: Callback for each output line (as text; optional).
+    :param show_output: If false, output is only passed to ``on_line``.
+    :param executor:    Executor for the model steps (default: loop executor).
+    """
+
+    def __init__(self, cmake_project, on_line=None, show_output=True,
+                 echo=True, executor=None):
+        # pylint: disable=too-many-arguments
+        self.cmake_project = cmake_project
+        self.on_line = on_line
+        self.show_output = show_output
+        self.echo = echo
+        self.executor = executor
+
+    @property
+    def unit_name(self):
+        return self.cmake_project.unit_name
+
+    def make_process_runner(self):
+        ctx = getattr(self.cmake_project, "ctx", None)
+        config = getattr(ctx, "config", None) or {}
+        options = make_run_options(config)
+        options["echo"] = self.echo and options["echo"]
+        return AsyncProcessRunner(on_line=self.on_line,
+                                  show_output=self.show_output, **options)
+
+    async def call(self, name, timeout=None, **kwargs):
+        """Calls a method of the CMake project (like: build).
+        Its commands run on the event loop.
+
+        :param name:    Method name, like: init, build, test, install, pack.
+        :param timeout: Timeout in seconds (optional).
+        :raises asyncio.TimeoutError: If the call times out.
+        """
+        if timeout is None:
+            return await self._call(name, **kwargs)
+        return await asyncio.wait_for(self._call(name, **kwargs), timeout)
+
+    async def _call(self, name, **kwargs):
+        loop = asyncio.get_running_loop()
+        runner = ThreadToLoopRunner(self.make_process_runner(), loop)
+        function = getattr(self.cmake_project, name)
+
+        def call_in_thread():
+            with use_process_runner(runner):
+                return function(**kwargs)
+
+        future = loop.run_in_executor(self.executor, call_in_thread)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # -- CANCEL: Running command and wait until the thread is done.
+            runner.cancel()
+            try:
+                await future
+            except Exception:   # pylint: disable=broad-except
+                pass
+            raise
+
+    init = _make_async_method("init")
+    build = _make_async_method("build")
+    test = _make_async_method("test")
+    install = _make_async_method("install")
+    pack = _make_async_method("pack")
+    reinit = _make_async_method("reinit")
+    rebuild = _make_async_method("rebuild")
+    clean = _make_async_method("clean")
+
+
+# ---------------------------------------------------------------------------
+# ASYNC BUILD RUNNER:
+# ---------------------------------------------------------------------------
+class AsyncCMakeBuildRunner(object):
+    """asyncio facade of :class:`cmake_build.model.CMakeBuildRunner`:
+    Runs a target of many CMake projects concurrently.
+
+    :param cmake_projects:  CMake projects to use.
+    :param max_concurrent:  Number of projects at once (semaphore).
+    :param on_line: Callback with unit name and output line (optional).
+    :param executor:    Executor for the model steps (default: own thread
+                        pool with ``max_concurrent`` threads per run).
+    """
+
+    def __init__(self, cmake_projects=None, max_concurrent=4, on_line=None,
+                 show_output=True, echo=True, executor=None):
+        # pylint: disable=too-many-arguments
+        self.cmake_projects = list(cmake_projects or [])
+        self.max_concurrent = max(int(max_concurrent), 1)
+        self.on_line = on_line
+        self.show_output = show_output
+        self.echo = echo
+        self.executor = executor
+
+    def make_async_project(self, cmake_project, executor=None):
+        on_line = None
+        if self.on_line is not None:
+            unit_name = cmake_project.unit_name
+            on_line = lambda line: self.on_line(unit_name, line)
+        return AsyncCMakeProject(cmake_project, on_line=on_line,
+                                 show_output=self.show_output, echo=self.echo,
+                                 executor=executor or self.executor)
+
+    async def run_matrix(self, target="build", keep_going=False, timeout=None,
+                         **kwargs):
+        """Runs a target for each CMake project (with bounded concurrency).
+        Without ``keep_going``, the first failure cancels the other projects.
+
+        :param target:  Method name, like: init, build, test, install, pack.
+        :param timeout: Timeout per project (in seconds; optional).
+        :return: List of :class:`cmake_build.scheduler.UnitResult` objects
+                 (in order of the CMake projects).
+        """
+        if self.executor is not None:
+            return await self._run_matrix(target, keep_going, timeout,
+                                          self.executor, **kwargs)
+
+        # -- HINT: One thread per running project (blocked by its command).
+        # The default executor of the loop may have fewer threads.
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrent,
+                                      thread_name_prefix="cmake_build.async")
+        try:
+            return await self._run_matrix(target, keep_going, timeout,
+                                          executor, **kwargs)
+        finally:
+            executor.shutdown(wait=False)
+
+    async def _run_matrix(self, target, keep_going, timeout, executor, **kwargs):
+        # pylint: disable=too-many-arguments
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        failed = asyncio.Event()
+
+        async def run_project(cmake_project):
+            project = self.make_async_project(cmake_project, executor)
+            async with semaphore:
+                if failed.is_set() and not keep_going:
+                    return UnitResult(project.unit_name, "skipped")
+                start_time = time.time()
+                try:
+                    await project.call(target, timeout=timeout, **kwargs)
+                    result = UnitResult(project.unit_name, "passed")
+                except asyncio.CancelledError as e:
+                    result = UnitResult(project.unit_name, "cancelled", error=e)
+                except (asyncio.TimeoutError, UnitTimedOut) as e:
+                    result = UnitResult(project.unit_name, "timeout", error=e)
+                except UnitCancelled as e:
+                    result = UnitResult(project.unit_name, "cancelled", error=e)
+                except Exception as e:  # pylint: disable=broad-except
+                    result = UnitResult(project.unit_name, "failed", error=e)
+                result.duration = time.time() - start_time
+                if result.failed and not keep_going:
+                    failed.set()    # -- BEFORE: Next project takes the slot.
+                return result
+
+        tasks = [asyncio.ensure_future(run_project(cmake_project))
+                 for cmake_project in self.cmake_projects]
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                if not keep_going and any(task.result().failed for task in done):
+                    failed.set()
+                    await self._cancel_tasks(pending)
+                    pending = set()
+        except asyncio.CancelledError:
+            await self._cancel_tasks(pending)
+            raise
+        return [self._task_result(task, cmake_project)
+                for task, cmake_project in zip(tasks, self.cmake_projects)]
+
+    @staticmethod
+    async def _cancel_tasks(tasks):
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _task_result(task, cmake_project):
+        if task.cancelled():
+            # -- CASE: Cancelled while waiting for the semaphore.
+            return UnitResult(cmake_project.unit_name, "skipped")
+        return task.result()
+
+    async def init(self, **kwargs):
+        return await self.run_matrix("init", **kwargs)
+
+    async def build(self, **kwargs):
+        return await self.run_matrix("build", **kwargs)
+
+    async def test(self, **kwargs):
+        return await self.run_matrix("test", **kwargs)
+
+    async def install(self, **kwargs):
+        return await self.run_matrix("install", **kwargs)
+
+    async def pack(self, **kwargs):
+        return await self.run_matrix("pack", **kwargs)
@@ -0,0 +1,245 @@
+# -*- coding: UTF-8 -*-
+"""
+Build logs: The output of the commands of one unit (project and build_config)
+is streamed into a log file (optionally compressed).
+
+Only a bounded tail of the output is kept in memory (for error reports).
+The console shows all output, a filtered view (errors, warnings) or nothing.
+The memory usage is independent of the output volume of a build.
+
+.. code-block:: yaml
+
+    # -- FILE: cmake_build.yaml
+    build_log: true             # Log file: {build_dir}/cmake_build.log
+    # build_log: build.logs     # Log file: build.logs/{project}.{build_config}.log
+    build_log_compress: false   # Use gzip compression (*.log.gz)
+    build_log_console: all      # all, errors, none
+    build_log_tail: 100         # Number of last lines kept (for error reports)
+
+A log file is rewritten by the first command (of a cmake-build run) and
+extended by the following commands (of the same run).
+
+HINT: Build logs use the direct process runner (see: :mod:`cmake_build.process_runner`).
+The progress dashboard enables build logs without console output
+(see: :mod:`cmake_build.progress`).
+"""
+
+from __future__ import absolute_import, print_function
+from collections import deque
+import gzip
+import os
+import re
+import sys
+import threading
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+BUILD_LOG_BASENAME = "cmake_build.log"
+CONSOLE_MODES = ("all", "errors", "none")
+TAIL_LINES = 100
+MAX_LINE_SIZE = 64 * 1024   # -- LIMIT: Partial line buffer (without newline).
+TRUE_VALUES = ("y", "yes", "true", "on", "1")
+FALSE_VALUES = ("n", "no", "false", "off", "0")
+ERROR_LINE_PATTERN = re.compile(
+    br"(error|warning|failed|fatal|undefined reference|\*\*\*)", re.IGNORECASE)
+
+
+# ---------------------------------------------------------------------------
+# BUILD LOG:
+# ---------------------------------------------------------------------------
+class BuildLog(object):
+    """Captures the output of commands (as bytes) with bounded memory.
+
+    .. code-block:: python
+
+        build_log = BuildLog("build.debug/cmake_build.log", console="errors")
+        build_log.write(b"[ 50%] Building CXX object hello.o\\n")
+        build_log.close()
+        print(build_log.tail_text)
+
+    :param filename:    Log filename (or None: no log file).
+    :param compress:    If true, the log file is gzip-compressed.
+    :param console:     Console mode: all, errors, none.
+    :param tail_lines:  Number of last lines that are kept in memory.
+    :param stream:      Console stream (default: sys.stdout).
+    :param append:      If true, the log file is extended (otherwise: rewritten).
+    :param on_line:     Callback for each output line (as bytes; optional).
+    """
+
+    def __init__(self, filename=None, compress=False, console="all",
+                 tail_lines=TAIL_LINES, stream=None, append=False, on_line=None):
+        # pylint: disable=too-many-arguments
+        assert console in CONSOLE_MODES, "console=%s" % console
+        self.filename = filename and str(filename)
+        self.compress = compress
+        self.console = console
+        self.stream = stream
+        self.append = append
+        self.on_line = on_line
+        self.tail = deque(maxlen=tail_lines)
+        self.size = 0
+        self._file = None
+        self._pending = b""
+        self._write_console = None
+
+    def open(self):
+        if self._file is not None or not self.filename:
+            return
+        directory = os.path.dirname(self.filename)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        mode = "ab" if self.append else "wb"
+        if self.compress:
+            # -- HINT: Appended gzip members form one valid gzip file.
+            self._file = gzip.open(self.filename, mode, compresslevel=6)
+        else:
+            self._file = open(self.filename, mode)
+
+    def _console_writer(self):
+        if self._write_console is None:
+            # pylint: disable=import-outside-toplevel
+            from .process_runner import make_output_writer
+            self._write_console = make_output_writer(self.stream or sys.stdout)
+        return self._write_console
+
+    def write_command(self, command, cwd=None):
+        """Writes the command-line into the log file (only)."""
+        self.open()
+        if self._file is not None:
+            where = " (in: {0})".format(cwd) if cwd else ""
+            self._file.write("$ {0}{1}\n".format(command, where).encode("UTF-8"))
+
+    def write(self, data):
+        """Writes an output chunk (as bytes)."""
+        self.open()
+        if self._file is not None:
+            self._file.write(data)
+        self.size += len(data)
+        if self.console == "all":
+            self._console_writer()(data)
+
+        pending = self._pending + data
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        if len(pending) > MAX_LINE_SIZE:
+            # -- CASE: Very long line (without newline): Keep memory bounded.
+            lines.append(pending)
+            pending = b""
+        self._pending = pending
+        for line in lines:
+            self._add_line(line)
+
+    def _add_line(self, line):
+        line = line.rstrip(b"\r")
+        self.tail.append(line)
+        if self.on_line is not None:
+            self.on_line(line)
+        if self.console == "errors" and ERROR_LINE_PATTERN.search(line):
+            self._console_writer()(line + b"\n")
+
+    def close(self):
+        if self._pending:
+            self._add_line(self._pending)
+            self._pending = b""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def tail_text(self):
+        lines = list(self.tail)
+        if self._pending:
+            lines.append(self._pending)
+        return b"\n".join(lines).decode("UTF-8", "replace")
+
+    def report_failure(self):
+        """Shows the last lines of the output (if not shown on the console)."""
+        if self.console == "all" or not self.tail:
+            return
+        stream = self.stream or sys.stdout
+        where = ""
+        if self.filename:
+            where = " (see: {0})".format(os.path.relpath(self.filename))
+        print("CMAKE-BUILD: Last {0} lines of output{1}".format(
+            len(self.tail), where), file=stream)
+        print(self.tail_text, file=stream)
+        stream.flush()
+
+
+# ---------------------------------------------------------------------------
+# BUILD LOG FACTORY:
+# ---------------------------------------------------------------------------
+_rewritten_filenames = set()
+_rewritten_filenames_lock = threading.Lock()
+
+
+def is_true(value):
+    return value is True or str(value).strip().lower() in TRUE_VALUES
+
+
+def build_log_enabled(config):
+    value = config.get("build_log")
+    if value is True:
+        return True
+    elif not value or not isinstance(value, str):
+        return False
+    return value.strip().lower() not in FALSE_VALUES
+
+
+def make_build_log_filename(config, project_dir, build_dir, build_config=None):
+    """Log filename for a unit (project and build_config) or None (if disabled).
+
+    :param config:  Config object with the ``build_log`` param.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .progress import progress_dashboard_enabled
+    value = config.get("build_log")
+    if not build_log_enabled(config):
+        if not progress_dashboard_enabled(config):
+            return None
+        value = True    # -- IMPLIED BY: progress_dashboard
+    suffix = ".gz" if is_true(config.get("build_log_compress")) else ""
+    if is_true(value):
+        return os.path.join(str(build_dir), BUILD_LOG_BASENAME + suffix)
+
+    # -- CASE: Log directory (relative to config_dir).
+    log_dir = os.path.join(config.get("config_dir") or ".", str(value))
+    project_name = os.path.relpath(str(project_dir),
+                                   config.get("config_dir") or ".")
+    project_name = project_name.replace(os.sep, "_").replace("/", "_")
+    if project_name == ".":
+        project_name = os.path.basename(os.path.abspath(str(project_dir)))
+    build_config = build_config or os.path.basename(str(build_dir))
+    return os.path.join(log_dir, "{0}.{1}.log{2}".format(
+        project_name, build_config, suffix))
+
+
+def make_build_log(config, project_dir, build_dir, build_config=None,
+                   on_line=None):
+    """Creates the :class:`BuildLog` for a command of a unit
+    (or None, if build logs are disabled).
+    """
+    # pylint: disable=import-outside-toplevel
+    from .progress import progress_dashboard_enabled
+    filename = make_build_log_filename(config, project_dir, build_dir,
+                                       build_config=build_config)
+    if filename is None:
+        return None
+
+    filename = os.path.abspath(filename)
+    with _rewritten_filenames_lock:
+        # -- HINT: First command of this run rewrites the log file.
+        append = filename in _rewritten_filenames
+        _rewritten_filenames.add(filename)
+
+    console = str(config.get("build_log_console") or "all").lower()
+    if console not in CONSOLE_MODES:
+        console = "all"
+    if progress_dashboard_enabled(config):
+        console = "none"    # -- HINT: Output would garble the dashboard.
+    tail_lines = int(config.get("build_log_tail") or TAIL_LINES)
+    return BuildLog(filename, compress=is_true(config.get("build_log_compress")),
+                    console=console, tail_lines=tail_lines, append=append,
+                    on_line=on_line)
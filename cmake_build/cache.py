@@ -0,0 +1,87 @@
+# -*- coding: UTF-8 -*-
+"""
+Provides the (user-specific) cache directory and helpers for small,
+JSON-based cache files that ``cmake-build`` keeps between its runs.
+
+ENVIRONMENT VARIABLES:
+
+* ``CMAKE_BUILD_CACHE=no``:      Disable the use of cache files.
+* ``CMAKE_BUILD_CACHE_DIR=...``: Override the cache directory.
+
+HINT: Only uses the python standard library (keep startup time small).
+"""
+
+from __future__ import absolute_import
+import json
+import os
+import sys
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+CACHE_DIRNAME = "cmake_build"
+FALSE_VALUES = ("n", "no", "false", "off", "0")
+
+
+# ---------------------------------------------------------------------------
+# CACHE UTILITY FUNCTIONS:
+# ---------------------------------------------------------------------------
+def cache_enabled():
+    """Indicates if cache files should be used (default: yes)."""
+    value = os.environ.get("CMAKE_BUILD_CACHE", "yes").strip().lower()
+    return value not in FALSE_VALUES
+
+
+def user_cache_dir():
+    """Directory for the cache files of the current user.
+
+    :return: Cache directory path (as string).
+    """
+    cache_dir = os.environ.get("CMAKE_BUILD_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+
+    if sys.platform.startswith("win"):
+        base_dir = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base_dir = os.environ.get("XDG_CACHE_HOME") or \
+                   os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base_dir, CACHE_DIRNAME)
+
+
+def load_json_file(filename):
+    """Load the data of a JSON cache file.
+
+    :param filename:  Cache file to use (as string).
+    :return: Stored data or None (if missing or broken).
+    """
+    try:
+        with open(filename, "r") as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def save_json_file(filename, data, indent=None):
+    """Store data in a JSON cache file.
+    The file is replaced atomically (no half-written files on abort).
+
+    :param filename:  Cache file to use (as string).
+    :param data:      Data to store (JSON serializable).
+    :return: True, if the file was written.
+    """
+    filename = str(filename)
+    directory = os.path.dirname(filename) or "."
+    tmp_filename = "{0}.tmp{1}".format(filename, os.getpid())
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(tmp_filename, "w") as f:
+            json.dump(data, f, indent=indent, sort_keys=True)
+        os.replace(tmp_filename, filename)
+        return True
+    except (IOError, OSError, TypeError, ValueError):
+        # -- HINT: TypeError/ValueError if data is not JSON serializable.
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        return False
@@ -7,6 +7,9 @@ This module contains utility functions to simplify usage of `CMake`_.
 
 from __future__ import absolute_import, print_function
 import os
+import re
+import shlex
+import sys
 from collections import OrderedDict
 from path import Path
 import six
@@ -169,6 +172,13 @@ def cmake_cmdline_generator_option(generator):
     return generator_option
 
 
+def cmake_cmdline_generator_argv(generator):
+    """CMake generator option (as argv list, without quoting)."""
+    if not generator:
+        return []
+    return ["-G", CMAKE_GENERATOR_ALIAS_MAP.get(generator) or generator]
+
+
 def cmake_cmdline_toolchain_option(toolchain):
     if not toolchain:
         return ""
@@ -252,7 +262,20 @@ def cmake_cmdline_define_options(defines, toolchain=None, build_type=None,
     :param build_type:  CMAKE_BUILD_TYPE to use (if any).
     :param install_prefex:  CMAKE_INSTALL_PREFIX to use (if any).
     :param named_defines:   Additional CMake defines (name=value, ...).
-    :return: CMake define options (as string; BAD SHOULD BE: list).
+    :return: CMake define options (as string).
+    """
+    return " ".join(cmake_cmdline_define_argv(defines, toolchain=toolchain,
+                                              build_type=build_type,
+                                              install_prefix=install_prefix,
+                                              **kwargs))
+
+
+def cmake_cmdline_define_argv(defines, toolchain=None, build_type=None,
+                              install_prefix=None, **kwargs):
+    """Builds CMake define options (as argv list),
+    like: ``["-DCMAKE_TOOLCHAIN_FILE=toolchain.cmake"]``
+
+    SEE: :func:`cmake_cmdline_define_options()` for the params.
     """
     # print("XXX defines= %r" % defines)
     cmake_defines0 = OrderedDict(cmake_normalize_defines(defines or []))
@@ -283,9 +306,6 @@ def cmake_cmdline_define_options(defines, toolchain=None, build_type=None,
     # -- STEP: Add remaining cmake_defines
     cmake_defines.update(cmake_defines0)
     cmake_defines.update(kwargs)
-    if not cmake_defines:
-        return ""
-
     define_options = []
     for name, value in cmake_defines.items():
         if value is not None:
@@ -295,8 +315,9 @@ def cmake_cmdline_define_options(defines, toolchain=None, build_type=None,
             item = "-D{0}={1}".format(name, value)
         else:
             item = "-D{0}=ON".format(name)
-        define_options.append(item)
-    return " ".join(define_options)
+        define_options.append(CMakeShellArg.make(
+            item, cmake_cmdline_quote_expandable(item)))
+    return define_options
 
 
 def cmake_cmdline_options(args=None, defines=None, generator=None,
@@ -367,3 +388,116 @@ def cmake_cmdline(args=None, defines=None, generator=None,
                             install_prefix=install_prefix, **named_defines)
     cmdline = " ".join(cmake_options)
     return cmdline.strip()
+
+
+# -----------------------------------------------------------------------------
+# CMAKE ARGV UTILS: Commands as argv list (no shell needed)
+# -----------------------------------------------------------------------------
+UNSAFE_CMDLINE_CHARS = re.compile(r"[^\w@%+=:,./-]")
+SHELL_SPECIAL_CHARS = re.compile(r'["$`\\]')
+EXPANDABLE_SPECIAL_CHARS = re.compile(r'["`\\]')
+SHELL_WORD = re.compile(r"""(?:[^\s'"\\]|\\.|'[^']*'|"(?:[^"\\]|\\.)*")+""")
+if sys.platform.startswith("win"):
+    # -- HINT: Backslash is the path separator (not special for cmd).
+    SHELL_SPECIAL_CHARS = re.compile(r'["]')
+    EXPANDABLE_SPECIAL_CHARS = SHELL_SPECIAL_CHARS
+    SHELL_WORD = None
+
+
+class CMakeShellArg(str):
+    """Argument of an argv list that keeps its shell text (as ``cmdline``).
+    The shell text is used (unquoted) on the shell command-line,
+    like: ``$VAR`` in user args and defines is expanded by the shell.
+
+    HINT: The direct process runner uses the value (without shell).
+    Therefore, environment variables are NOT expanded there.
+    """
+    cmdline = None
+
+    @classmethod
+    def make(cls, value, cmdline):
+        arg = cls(value)
+        arg.cmdline = cmdline
+        return arg
+
+
+def cmake_cmdline_quote(arg):
+    """Quotes one argument for a shell command-line (if needed).
+    The shell text of a :class:`CMakeShellArg` is used as is.
+    """
+    cmdline = getattr(arg, "cmdline", None)
+    if cmdline is not None:
+        return cmdline
+    arg = str(arg)
+    if arg and not UNSAFE_CMDLINE_CHARS.search(arg):
+        return arg
+    elif not SHELL_SPECIAL_CHARS.search(arg):
+        # -- HINT: Double-quotes work with POSIX shells and Windows cmd.
+        return '"{0}"'.format(arg)
+    return shlex.quote(arg)
+
+
+def cmake_cmdline_quote_expandable(arg):
+    """Quotes one argument for a shell command-line (if needed),
+    but environment variables (``$VAR``) are still expanded by the shell.
+    """
+    arg = str(arg)
+    if arg and not UNSAFE_CMDLINE_CHARS.search(arg):
+        return arg
+    elif not EXPANDABLE_SPECIAL_CHARS.search(arg):
+        return '"{0}"'.format(arg)
+    return cmake_cmdline_quote(arg)
+
+
+def cmake_cmdline_join(argv):
+    """Builds a shell command-line from an argv list."""
+    return " ".join(cmake_cmdline_quote(arg) for arg in argv)
+
+
+def cmake_cmdline_split(args):
+    """Splits args (as string or list of strings) into an argv list.
+    Each string is split like a shell would do it.
+    Each part keeps its shell text (see: :class:`CMakeShellArg`).
+    """
+    if not args:
+        return []
+    elif isinstance(args, six.string_types):
+        values = shlex.split(args, posix=SHELL_WORD is not None)
+        if SHELL_WORD is None:
+            return values
+        words = SHELL_WORD.findall(args)
+        if len(words) != len(values):
+            return values   # -- CASE: Unusual shell syntax (use values only).
+        return [CMakeShellArg.make(value, word)
+                for value, word in zip(values, words)]
+
+    argv = []
+    for arg in args:
+        argv.extend(cmake_cmdline_split(str(arg)))
+    return argv
+
+
+def cmake_cmdline_argv(args=None, defines=None, generator=None,
+                       toolchain=None, build_type=None, config=None,
+                       install_prefix=None):
+    """Build CMake command-line options (as argv list) from the parts.
+
+    SEE: :func:`cmake_cmdline_options()` for the params.
+    :return: CMake command-line options (as argv list).
+    """
+    if defines is None:
+        defines = []
+    elif isinstance(defines, (dict, OrderedDict)):
+        defines = defines.items()
+
+    build_type = config or build_type
+    argv = cmake_cmdline_generator_argv(generator)
+    if config:
+        # -- SUPPORT MULTI-CONFIGURATION GENERATORS:
+        argv.extend(["--config", config])
+    if defines or toolchain or build_type or install_prefix:
+        argv.extend(cmake_cmdline_define_argv(defines, toolchain=toolchain,
+                                              build_type=build_type,
+                                              install_prefix=install_prefix))
+    argv.extend(cmake_cmdline_split(args))
+    return argv
@@ -3,9 +3,11 @@
 
 from __future__ import absolute_import
 from collections import OrderedDict
+from types import MappingProxyType
+import hashlib
+import json
 from cmake_build.cmake_util import CMakeDefine, map_build_config_to_cmake_build_type
 from cmake_build.persist import PersistentData
-from copy import deepcopy
 
 
 # ---------------------------------------------------------------------------
@@ -111,13 +113,95 @@ class CMakeDefineProtocol(object):
 
 
 def unordered_dict_equals(data1, data2):
-    if isinstance(data1, OrderedDict):
+    if isinstance(data1, (OrderedDict, MappingProxyType)):
         data1 = dict(data1)
-    if isinstance(data2, OrderedDict):
+    if isinstance(data2, (OrderedDict, MappingProxyType)):
         data2 = dict(data2)
     return data1 == data2
 
 
+def config_data_equals(data1, data2, excluded=None):
+    """Compares config data structurally (without serializing it).
+    The ordering of dict items is ignored (like: cmake_defines),
+    lists and tuples (of frozen config data) are treated as same.
+
+    :param data1:       Config data (as dict-like).
+    :param data2:       Other config data (as dict-like).
+    :param excluded:    Parameter names to ignore (optional, top-level only).
+    :return: True, if both are equal.
+    """
+    if isinstance(data1, (dict, MappingProxyType)):
+        if not isinstance(data2, (dict, MappingProxyType)):
+            return False
+        excluded = excluded or ()
+        names1 = set(name for name in data1.keys() if name not in excluded)
+        names2 = set(name for name in data2.keys() if name not in excluded)
+        if names1 != names2:
+            return False
+        return all(config_data_equals(data1[name], data2[name])
+                   for name in names1)
+    elif isinstance(data1, (list, tuple)):
+        if not isinstance(data2, (list, tuple)) or len(data1) != len(data2):
+            return False
+        return all(config_data_equals(value1, value2)
+                   for value1, value2 in zip(data1, data2))
+    return data1 == data2
+
+
+def copy_config_data(data):
+    """Copies config data (faster than :func:`copy.deepcopy()`).
+    Only containers (dict, list) are copied, other values are shared.
+    """
+    if isinstance(data, dict):
+        return data.__class__((name, copy_config_data(value))
+                              for name, value in data.items())
+    elif isinstance(data, list):
+        return [copy_config_data(value) for value in data]
+    return data
+
+
+def freeze_config_data(data):
+    """Converts config data into a read-only representation."""
+    if isinstance(data, dict):
+        return MappingProxyType(data.__class__(
+            (name, freeze_config_data(value)) for name, value in data.items()))
+    elif isinstance(data, list):
+        return tuple(freeze_config_data(value) for value in data)
+    return data
+
+
+def thaw_config_data(data):
+    """Converts frozen config data back into a mutable representation."""
+    if isinstance(data, MappingProxyType):
+        return OrderedDict((name, thaw_config_data(value))
+                           for name, value in data.items())
+    elif isinstance(data, tuple):
+        return [thaw_config_data(value) for value in data]
+    return data
+
+
+def _json_default(value):
+    if isinstance(value, MappingProxyType):
+        return dict(value)
+    return str(value)
+
+
+def make_config_hash(data, excluded=None):
+    """Makes a stable content hash of config data.
+    The ordering of dict items is ignored (like: cmake_defines).
+
+    :param data:        Config data (as dict).
+    :param excluded:    Parameter names to ignore (optional).
+    :return: Content hash (as hex-string).
+    """
+    if excluded:
+        data = dict((name, value) for name, value in data.items()
+                    if name not in excluded)
+    text = json.dumps(data, sort_keys=True, separators=(",", ":"),
+                      default=_json_default)
+    return hashlib.sha1(text.encode("UTF-8")).hexdigest()
+
+
 class CMakeProjectConfig(object):
     DEFAULT_NAME = "default"
     CMAKE_DEFINE_ALIASES = CMakeDefineProtocol.CMAKE_DEFINE_ALIASES
@@ -125,7 +209,7 @@ class CMakeProjectConfig(object):
     def __init__(self, data=None, use_defaults=True, **kwargs):
         data_defaults = {}
         if use_defaults:
-            data_defaults = deepcopy(CMAKE_CONFIG_DEFAULTS)
+            data_defaults = copy_config_data(CMAKE_CONFIG_DEFAULTS)
             # data_defaults["cmake_defines"].clear()
 
         self.name = kwargs.pop("name", self.DEFAULT_NAME)
@@ -156,11 +240,22 @@ class CMakeProjectConfig(object):
         if isinstance(data, self.__class__):
             data = data.data
 
-        the_data = deepcopy(CMAKE_CONFIG_DEFAULTS)
+        the_data = copy_config_data(CMAKE_CONFIG_DEFAULTS)
         the_data.update(data)
         self.data = the_data
         self.normalize_data()
 
+    def freeze(self):
+        """Makes an immutable, hashable snapshot of this config."""
+        return FrozenCMakeProjectConfig(self.data, name=self.name)
+
+    @property
+    def content_hash(self):
+        return make_config_hash(self.data)
+
+    def make_content_hash(self, excluded=None):
+        return make_config_hash(self.data, excluded)
+
     # -- DICT-LIKE API:
     def clear(self):
         self.data.clear()
@@ -190,7 +285,7 @@ class CMakeProjectConfig(object):
         self.normalize_data()
 
     def copy(self):
-        return self.__class__(data=deepcopy(self.data))
+        return self.__class__(data=copy_config_data(self.data))
 
     def __len__(self):
         return len(self.data)
@@ -227,6 +322,12 @@ class CMakeProjectConfig(object):
 
     def same_as(self, other, excluded=None):
         """Compare if this config is the same as the other."""
+        if isinstance(other, (CMakeProjectConfig, FrozenCMakeProjectConfig)):
+            # -- HINT: Data of this config may change at any time.
+            # Therefore, it is compared structurally (w/o hashing it).
+            # Only two frozen configs compare their precomputed hashes.
+            return config_data_equals(self.data, other.data, excluded)
+
         # -- OPTIMIZATION: Only applicable w/o excluded parts.
         excluded = set(excluded or [])
         diff = set(self.data.keys()).symmetric_difference(other.keys())
@@ -364,11 +465,160 @@ class CMakeProjectConfig(object):
             self.cmake_defines[name] = value
 
 
+class FrozenCMakeProjectConfig(object):
+    """Immutable, hashable snapshot of a :class:`CMakeProjectConfig`.
+    Provides the read-only part of its dict-like API.
+
+    The content hash is computed once (when the snapshot is created).
+    Therefore, comparing two snapshots is cheap.
+    """
+    __slots__ = ("name", "_data", "_content_hash", "_excluded_hashes")
+    DEFAULT_NAME = CMakeProjectConfig.DEFAULT_NAME
+    CMAKE_DEFINE_ALIASES = CMakeDefineProtocol.CMAKE_DEFINE_ALIASES
+
+    def __init__(self, data=None, name=None):
+        data = data or {}
+        object.__setattr__(self, "name", name or self.DEFAULT_NAME)
+        object.__setattr__(self, "_data", freeze_config_data(dict(data)))
+        object.__setattr__(self, "_content_hash", make_config_hash(data))
+        object.__setattr__(self, "_excluded_hashes", {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{0} is immutable (attribute: {1})".format(
+            self.__class__.__name__, name))
+
+    def __delattr__(self, name):
+        raise AttributeError("{0} is immutable (attribute: {1})".format(
+            self.__class__.__name__, name))
+
+    @property
+    def data(self):
+        """Read-only view of the config data."""
+        return self._data
+
+    @property
+    def content_hash(self):
+        return self._content_hash
+
+    def make_content_hash(self, excluded=None):
+        if not excluded:
+            return self._content_hash
+
+        key = frozenset(excluded)
+        content_hash = self._excluded_hashes.get(key)
+        if content_hash is None:
+            content_hash = make_config_hash(self._data, excluded)
+            self._excluded_hashes[key] = content_hash
+        return content_hash
+
+    def thaw(self, config_class=CMakeProjectConfig):
+        """Makes a mutable copy of this config.
+
+        :param config_class: Config class to use (CMakeProjectConfig, ...).
+        """
+        return config_class(data=thaw_config_data(self._data), name=self.name)
+
+    # -- DICT-LIKE API (read-only):
+    def get(self, name, default=None):
+        define_name = self.CMAKE_DEFINE_ALIASES.get(name, None)
+        if define_name:
+            return self.cmake_defines.get(define_name, default)
+        return self._data.get(name, default)
+
+    def keys(self):
+        return self._data.keys()
+
+    def values(self):
+        return self._data.values()
+
+    def items(self):
+        return self._data.items()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __contains__(self, param_name):
+        define_name = self.CMAKE_DEFINE_ALIASES.get(param_name, None)
+        if define_name:
+            return define_name in self.cmake_defines
+        return param_name in self._data
+
+    def __getitem__(self, param_name):
+        define_name = self.CMAKE_DEFINE_ALIASES.get(param_name, None)
+        if define_name:
+            return self.cmake_defines.get(define_name, None)
+        return self._data[param_name]
+
+    def __hash__(self):
+        return hash(self._content_hash)
+
+    def __eq__(self, other):
+        # -- HINT: Ignore self.name
+        if isinstance(other, FrozenCMakeProjectConfig):
+            return self._content_hash == other.content_hash
+        elif isinstance(other, CMakeProjectConfig):
+            return other.same_as(self)
+        return self.thaw().same_as(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def same_as(self, other, excluded=None):
+        """Compare if this config is the same as the other."""
+        if isinstance(other, FrozenCMakeProjectConfig):
+            return (self.make_content_hash(excluded) ==
+                    other.make_content_hash(excluded))
+        elif isinstance(other, CMakeProjectConfig):
+            return other.same_as(self, excluded=excluded)
+        return self.thaw().same_as(other, excluded=excluded)
+
+    @property
+    def cmake_generator(self):
+        return self.get("cmake_generator", None)
+
+    @property
+    def cmake_parallel(self):
+        return self.get("cmake_parallel", 0)
+
+    @property
+    def cmake_toolchain(self):
+        return self.cmake_defines.get("CMAKE_TOOLCHAIN_FILE", None)
+
+    @property
+    def cmake_build_type(self):
+        return self.cmake_defines.get("CMAKE_BUILD_TYPE", None)
+
+    @property
+    def cmake_install_prefix(self):
+        return self.cmake_defines.get("CMAKE_INSTALL_PREFIX", None)
+
+    @property
+    def cmake_defines(self):
+        return self._data.get("cmake_defines") or MappingProxyType({})
+
+    @property
+    def cmake_init_args(self):
+        return self.get("cmake_args", ())
+
+    @property
+    def cmake_build_args(self):
+        return self.get("cmake_build_args", ())
+
+    @property
+    def cmake_test_args(self):
+        return self.get("cmake_test_args", ())
+
+
 class CMakeProjectPersistConfig(CMakeProjectConfig, PersistentData):
     """Persistent data class for CMake project (build_dir) config data.
     This data represents one build-configuration of this project.
     """
     FILE_BASENAME = ".cmake_build.build_config.json"
+    # -- HINT: Written by older cmake-build versions (no longer used).
+    CONFIG_HASH_NAME = "config_hash"
 
     def __init__(self, filename=None, data=None, cmake_generator=None,
                  cmake_toolchain=None, **kwargs):
@@ -378,6 +628,7 @@ class CMakeProjectPersistConfig(CMakeProjectConfig, PersistentData):
         # -- SETUP/INIT: BASE-CLASSES
         CMakeProjectConfig.__init__(self, data=data, **kwargs)
         PersistentData.__init__(self, filename, data=self.data)
+        self.data.pop(self.CONFIG_HASH_NAME, None)
         if cmake_generator:
             self.cmake_generator = cmake_generator
         if cmake_toolchain:
@@ -403,8 +654,9 @@ class CMakeProjectPersistConfig(CMakeProjectConfig, PersistentData):
         #     "cmake_install_prefix": None,
         #     "cmake_toolchain": None,
         # }
-        data = deepcopy(CMAKE_CONFIG_DEFAULTS)
+        data = copy_config_data(CMAKE_CONFIG_DEFAULTS)
         data.update(the_data)
+        data.pop(self.CONFIG_HASH_NAME, None)
         self.data = data
         self.normalize_data()
 
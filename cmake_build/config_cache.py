@@ -0,0 +1,134 @@
+# -*- coding: UTF-8 -*-
+"""
+Caches the parsed data of config-files (like: "cmake_build.yaml")
+as compact JSON snapshots to avoid parsing YAML in every run.
+
+A snapshot is reused until one of its inputs changes:
+
+* config-file path, modification time (mtime) and size
+* environment variables with prefix ``CMAKE_BUILD_``
+* cmake-build version
+
+Only data that survives the JSON round-trip unchanged is stored
+(no int keys, tuples, dates, ...). Otherwise, the config-file is parsed
+in each run (cached and uncached loads provide the same data).
+"""
+
+from __future__ import absolute_import
+import hashlib
+import json
+import os
+from cmake_build.cache import (
+    cache_enabled, user_cache_dir, load_json_file, save_json_file
+)
+from cmake_build.version import VERSION
+
+
+# ---------------------------------------------------------------------------
+# UTILITY FUNCTIONS:
+# ---------------------------------------------------------------------------
+def is_json_lossless(data):
+    """Indicates if data is unchanged by a JSON round-trip
+    (JSON has only str keys and lists; no tuples, dates, ...).
+    """
+    try:
+        return json.loads(json.dumps(data)) == data
+    except (TypeError, ValueError):
+        return False
+
+
+# ---------------------------------------------------------------------------
+# CONFIG-FILE CACHE:
+# ---------------------------------------------------------------------------
+class ConfigFileSnapshot(object):
+    """Parsed data of a config-file."""
+
+    def __init__(self, filename, key, data):
+        self.filename = filename
+        self.key = key
+        self.data = data
+
+    def as_dict(self):
+        return dict(key=self.key, data=self.data)
+
+    @classmethod
+    def from_dict(cls, filename, data):
+        return cls(filename, data.get("key"), data.get("data"))
+
+
+class ConfigFileCache(object):
+    """Provides the config-file snapshots (in-process and persistent ones)."""
+    SNAPSHOT_DIRNAME = "config_snapshots"
+    ENV_PREFIX = "CMAKE_BUILD_"
+
+    def __init__(self, cache_dir=None, use_cache=None):
+        if use_cache is None:
+            use_cache = cache_enabled()
+        if use_cache and not cache_dir:
+            cache_dir = os.path.join(user_cache_dir(), self.SNAPSHOT_DIRNAME)
+        self.cache_dir = cache_dir if use_cache else None
+        self.snapshots = {}
+
+    def make_key(self, filename):
+        """Make the snapshot key for a config-file.
+
+        :raises OSError: If the config-file does not exist.
+        """
+        filename = os.path.abspath(str(filename))
+        file_stat = os.stat(filename)
+        environment = [[name, value]
+                       for name, value in sorted(os.environ.items())
+                       if name.startswith(self.ENV_PREFIX)]
+        return dict(filename=filename, mtime_ns=file_stat.st_mtime_ns,
+                    size=file_stat.st_size, env=environment, version=VERSION)
+
+    def make_snapshot_filename(self, filename):
+        digest = hashlib.sha1(filename.encode("UTF-8")).hexdigest()
+        return os.path.join(self.cache_dir, "{0}.json".format(digest))
+
+    def load(self, filename, parse_func):
+        """Load the data of a config-file (from its snapshot, if possible).
+
+        :param filename:    Config-file to load.
+        :param parse_func:  Parses the config-file (if no snapshot is usable).
+        :return: Config-file data.
+        :raises IOError:    If the config-file does not exist.
+        """
+        key = self.make_key(filename)
+        abs_filename = key["filename"]
+        snapshot = self.snapshots.get(abs_filename)
+        if snapshot is not None and snapshot.key == key:
+            return snapshot.data
+
+        snapshot = None
+        if self.cache_dir:
+            stored_data = load_json_file(self.make_snapshot_filename(abs_filename))
+            if isinstance(stored_data, dict) and stored_data.get("key") == key:
+                snapshot = ConfigFileSnapshot.from_dict(abs_filename, stored_data)
+
+        if snapshot is None:
+            data = parse_func(filename)
+            snapshot = ConfigFileSnapshot(abs_filename, key, data)
+            self.save(snapshot)
+        self.snapshots[abs_filename] = snapshot
+        return snapshot.data
+
+    def save(self, snapshot):
+        """Store the snapshot persistently (if the cache is enabled and
+        the data is unchanged by the JSON round-trip).
+        """
+        if not self.cache_dir or not is_json_lossless(snapshot.data):
+            return False
+        snapshot_filename = self.make_snapshot_filename(snapshot.filename)
+        return save_json_file(snapshot_filename, snapshot.as_dict())
+
+
+_config_file_cache = None
+
+
+def get_config_file_cache():
+    """Provides the shared :class:`ConfigFileCache` object (singleton)."""
+    global _config_file_cache   # pylint: disable=global-statement
+    if _config_file_cache is None:
+        _config_file_cache = ConfigFileCache()
+    return _config_file_cache
@@ -0,0 +1,14 @@
+# -*- coding: UTF-8 -*-
+"""
+Constants that are shared by the task layer and the model layer
+(without importing the model layer).
+"""
+
+from __future__ import absolute_import
+import os
+
+
+# -----------------------------------------------------------------------------
+# CONSTANTS:
+# -----------------------------------------------------------------------------
+BUILD_CONFIG_DEFAULT = os.environ.get("CMAKE_BUILD_CONFIG", "debug")
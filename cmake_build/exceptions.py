@@ -53,3 +53,23 @@ class NiceFailure(UnexpectedExit):
     def __repr__(self):
         return "<%s: reason=%s, result=%s>" % \
                (self.__class__.__name__, self.reason, self.result)
+
+
+class BuildDirLocked(NiceFailure):
+    """Build directory is locked by another process (see: :mod:`cmake_build.locking`)."""
+    TEMPLATE = "LOCKED: {reason}"
+
+
+class UnitCancelled(NiceFailure):
+    """Command of a unit was cancelled (see: :mod:`cmake_build.scheduler`)."""
+    TEMPLATE = "CANCELLED: {reason}"
+
+
+class UnitTimedOut(NiceFailure):
+    """Command of a unit exceeded its phase timeout (see: :mod:`cmake_build.watchdog`)."""
+    TEMPLATE = "TIMEOUT: {reason}"
+
+
+class UnitsFailed(NiceFailure):
+    """Several units failed (see: :mod:`cmake_build.scheduler`)."""
+    TEMPLATE = "FAILED: {reason}"
@@ -0,0 +1,92 @@
+# -*- coding: UTF-8 -*-
+"""
+Fingerprints of the source files of a CMake project.
+
+The fingerprint is computed from the file metadata (path, mtime, size)
+of all files in the project directory (without reading the files).
+Build directories and hidden directories (like: ".git") are not traversed.
+The data-files of cmake-build itself (like: ".cmake_build.journal.json")
+are ignored.
+
+It is stored when a build is performed and used to detect whether the
+sources have changed since the last build (without running cmake).
+Computing it walks the project directory. Therefore, builds only record it
+if it is enabled:
+
+.. code-block:: yaml
+
+    # -- FILE: cmake_build.yaml
+    sources_fingerprint: true   # Record it per build (used by: status task)
+
+HINT: Use ``CMAKE_BUILD_SOURCES_FINGERPRINT=yes`` to enable it.
+"""
+
+from __future__ import absolute_import
+import hashlib
+import os
+from .cmake_util import BUILD_DIR_SCHEMA
+from .quota import make_build_dir_pattern
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+CMAKE_BUILD_DATA_PREFIX = ".cmake_build"
+TRUE_VALUES = ("y", "yes", "true", "on", "1")
+
+
+def sources_fingerprint_enabled(config):
+    """Indicates if builds record the sources fingerprint
+    (config-param: ``sources_fingerprint``).
+    """
+    value = config.get("sources_fingerprint")
+    return value is True or str(value).strip().lower() in TRUE_VALUES
+
+
+def make_sources_fingerprint(project_dir, build_dir_pattern=None):
+    """Computes the fingerprint of the source files of a project.
+
+    :param project_dir:         Project directory to use.
+    :param build_dir_pattern:   Regexp for build directory names (to skip).
+    :return: Fingerprint (as hex string).
+    """
+    digest = hashlib.sha1()
+    pending = [(str(project_dir), "")]
+    while pending:
+        directory, reldir = pending.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            if name.startswith(CMAKE_BUILD_DATA_PREFIX):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if name.startswith(".") or \
+                            (build_dir_pattern and build_dir_pattern.match(name)):
+                        continue
+                    subdirs.append((entry.path, reldir + name + "/"))
+                    continue
+                file_stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            digest.update("{0}{1}\0{2}\0{3}\n".format(
+                reldir, name, file_stat.st_mtime_ns, file_stat.st_size
+            ).encode("UTF-8", "surrogateescape"))
+        # -- HINT: Traverse subdirectories in sorted order (stable fingerprint).
+        pending.extend(reversed(subdirs))
+    return digest.hexdigest()
+
+
+def make_sources_fingerprint4config(project_dir, config):
+    """Computes the sources fingerprint (build directories are skipped).
+
+    :param config:  Config object with the ``build_dir_schema``.
+    """
+    build_dir_schema = config.get("build_dir_schema") or BUILD_DIR_SCHEMA
+    return make_sources_fingerprint(project_dir,
+                                    make_build_dir_pattern(build_dir_schema))
@@ -4,8 +4,16 @@ Host platforrm specific parts.
 """
 
 from __future__ import absolute_import
+import os
 import platform
+import shutil
+import subprocess
 import sys
+import time
+from string import Formatter
+from cmake_build.cache import (
+    cache_enabled, user_cache_dir, load_json_file, save_json_file
+)
 
 
 # ---------------------------------------------------------------------------
@@ -13,6 +21,8 @@ import sys
 # ---------------------------------------------------------------------------
 BUILD_CONFIG_SCHEMA = "{SYSTEM}_{CPU}_{BUILD_TYPE}"
 BUILD_TYPE = "debug"
+CACHE_TTL = 24 * 3600   # in seconds (if the host has no boot_id).
+COMPILER_FACTS = ("TRIPLET",)
 
 
 # ---------------------------------------------------------------------------
@@ -50,6 +60,155 @@ def cmake_machine():
     return cmake_cpu()
 
 
+def cmake_libc():
+    """Host C library name and version, like: glibc2.35 (or empty string)."""
+    libc_name, libc_version = platform.libc_ver()
+    return "{0}{1}".format(libc_name, libc_version)
+
+
+def host_compiler():
+    """Host C compiler (from the ``CC`` environment variable)."""
+    return os.environ.get("CC") or "cc"
+
+
+def cmake_compiler_triplet():
+    """Target triplet of the host C compiler, like: x86_64-linux-gnu.
+    Uses the ``CC`` environment variable to select the compiler.
+    """
+    compiler = host_compiler()
+    try:
+        output = subprocess.check_output([compiler, "-dumpmachine"],
+                                         stderr=subprocess.STDOUT,
+                                         universal_newlines=True, timeout=10)
+        return output.strip()
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return ""
+
+
+def host_identity():
+    """Identifies the host (and its current boot) for cached host facts.
+
+    :return: Host identity (as string): "{hostname}:{boot_id}"
+    """
+    boot_id = ""
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            boot_id = f.read().strip()
+    except (IOError, OSError):
+        pass
+    return "{0}:{1}".format(platform.node(), boot_id)
+
+
+def compiler_identity():
+    """Identifies the host C compiler for cached compiler facts (like: TRIPLET).
+
+    :return: Compiler identity (as string): "{CC}:{path}:{mtime}"
+    """
+    compiler = host_compiler()
+    path = shutil.which(compiler) or ""
+    mtime = ""
+    if path:
+        try:
+            mtime = int(os.stat(os.path.realpath(path)).st_mtime)
+        except OSError:
+            pass
+    return "{0}:{1}:{2}".format(compiler, path, mtime)
+
+
+# ---------------------------------------------------------------------------
+# HOST PLATFORM FACTS:
+# ---------------------------------------------------------------------------
+class HostPlatform(object):
+    """Provides the host platform facts, like SYSTEM, CPU, ...
+
+    Each fact is only resolved when it is needed (some require a subprocess).
+    Resolved facts are stored in a small cache file that is valid
+    for the same host and boot (see: :func:`host_identity()`).
+    Without a boot_id (non-Linux hosts), the cache file expires after
+    ``CACHE_TTL``. Compiler facts (like: TRIPLET) are only valid
+    for the same compiler (see: :func:`compiler_identity()`).
+    """
+    CACHE_BASENAME = "host_platform.json"
+    FACT_RESOLVERS = {
+        "SYSTEM": cmake_system,
+        "CPU": cmake_cpu,
+        "PROCESSOR": cmake_processor,
+        "LIBC": cmake_libc,
+        "TRIPLET": cmake_compiler_triplet,
+    }
+
+    def __init__(self, cache_file=None, use_cache=None):
+        if use_cache is None:
+            use_cache = cache_enabled()
+        if use_cache and not cache_file:
+            cache_file = os.path.join(user_cache_dir(), self.CACHE_BASENAME)
+        self.cache_file = cache_file if use_cache else None
+        self.facts = {}
+        self._cache_loaded = False
+        self._created = None
+
+    def clear(self):
+        self.facts = {}
+        self._cache_loaded = False
+        self._created = None
+
+    def load_cache(self):
+        self._cache_loaded = True
+        if not self.cache_file:
+            return
+        data = load_json_file(self.cache_file)
+        host = host_identity()
+        if not isinstance(data, dict) or data.get("host") != host:
+            return
+        created = data.get("created") or 0
+        if host.endswith(":") and time.time() - created >= CACHE_TTL:
+            return      # -- CASE: Without boot_id, cache file is expired.
+        facts = dict(data.get("facts") or {})
+        if data.get("compiler") != compiler_identity():
+            for name in COMPILER_FACTS:
+                facts.pop(name, None)
+        self._created = created
+        self.facts.update(facts)
+
+    def save_cache(self):
+        if not self.cache_file:
+            return
+        if self._created is None:
+            self._created = time.time()
+        data = dict(host=host_identity(), compiler=compiler_identity(),
+                    created=self._created, facts=self.facts)
+        save_json_file(self.cache_file, data)
+
+    def get(self, name):
+        """Get a host platform fact (and resolve it, if needed).
+
+        :param name:  Name of the fact, like: SYSTEM, CPU, ...
+        :return: Fact value (as string).
+        :raises KeyError: If the fact is unknown.
+        """
+        if name not in self.facts and not self._cache_loaded:
+            self.load_cache()
+        if name not in self.facts:
+            resolve_func = self.FACT_RESOLVERS[name]
+            self.facts[name] = resolve_func()
+            self.save_cache()
+        return self.facts[name]
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+
+_host_platform = None
+
+
+def get_host_platform():
+    """Provides the shared :class:`HostPlatform` object (singleton)."""
+    global _host_platform   # pylint: disable=global-statement
+    if _host_platform is None:
+        _host_platform = HostPlatform()
+    return _host_platform
+
+
 def make_build_config_name(build_type=None, schema=None, **kwargs):
     """Build the BUILD_CONFIG name for the current host platform
     (with a discoverable schema).
@@ -59,6 +218,10 @@ def make_build_config_name(build_type=None, schema=None, **kwargs):
     * SYSTEM: Operating system name, like Linux, Windows, Darwin, ...
     * PROCESSOR:  processor type (uname --processor)
     * CPU:        processor machine, architecture (uname --machine)
+    * LIBC:       C library name and version, like: glibc2.35
+    * TRIPLET:    Target triplet of host C compiler, like: x86_64-linux-gnu
+
+    Only the placeholders that are used in the schema are discovered.
 
     :param build_type:  CMAKE_BUILD_TYPE name to use (like: Debug, ...)
     :param schema:      Name schema to use (format-style placeholders).
@@ -67,13 +230,15 @@ def make_build_config_name(build_type=None, schema=None, **kwargs):
     """
     build_type = build_type or BUILD_TYPE
     schema = schema or BUILD_CONFIG_SCHEMA
-    os_name = kwargs.pop("SYSTEM", None) or cmake_system()
-    processor = kwargs.pop("PROCESSOR", None) or cmake_processor()
-    if "CPU" not in kwargs:
-        # -- ALIAS FOR: PROCESSOR
-        kwargs["CPU"] = cmake_cpu()
-    build_config_name = schema.format(SYSTEM=os_name,
-                                      PROCESSOR=processor,
-                                      BUILD_TYPE=build_type,
-                                      **kwargs)
+    host_platform = get_host_platform()
+    placeholders = dict(BUILD_TYPE=build_type)
+    for name, value in kwargs.items():
+        if value:
+            placeholders[name] = value
+
+    for _, name, _, _ in Formatter().parse(schema):
+        if name and name not in placeholders and \
+                name in HostPlatform.FACT_RESOLVERS:
+            placeholders[name] = host_platform.get(name)
+    build_config_name = schema.format(**placeholders)
     return build_config_name
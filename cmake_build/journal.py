@@ -0,0 +1,252 @@
+# -*- coding: UTF-8 -*-
+"""
+Run journal: Records each completed unit and phase of a cmake-build run,
+like: ``(p1, debug, build)``, with the fingerprint of its inputs
+(sources, project config, task params).
+
+If a run is aborted (or a unit fails), the next run with ``--resume`` skips
+the units/phases that already passed with unchanged inputs.
+Only the failed and pending units/phases are executed again
+(without their init checks).
+
+.. code-block:: sh
+
+    $ cmake-build build -b all test     # -- ABORTED: Somewhere in between.
+    $ cmake-build build -b all --resume test
+
+A run without ``--resume`` starts a new journal.
+The run journal is optional (opt-in): It computes a fingerprint of the
+sources per unit (before the unit is run).
+
+.. code-block:: yaml
+
+    # -- FILE: cmake_build.yaml
+    run_journal: true           # false (default), true or journal filename
+"""
+
+from __future__ import absolute_import, print_function
+import hashlib
+import os
+import threading
+import time
+import uuid
+from .config import make_config_hash
+from .fingerprint import make_sources_fingerprint4config
+from .persist import PersistentData
+from .scheduler import ProjectUnit
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+JOURNAL_BASENAME = ".cmake_build.journal.json"
+TRUE_VALUES = ("y", "yes", "true", "on", "1")
+FALSE_VALUES = ("n", "no", "false", "off", "0")
+VOLATILE_CONFIG_PARAMS = ("cmake_parallel",)   # -- REMEMBERED: By last build.
+
+
+# ---------------------------------------------------------------------------
+# RUN JOURNAL:
+# ---------------------------------------------------------------------------
+class RunJournal(PersistentData):
+    """Journal of a cmake-build run (one entry per unit and phase).
+
+    Data-file contents:
+
+    * run_id:   Identifies the run (kept by resumed runs).
+    * started:  Start time of the run.
+    * entries:  Map "{unit}:{phase}" to (status, fingerprint, finished, duration).
+    * durations: Map "{unit}:{phase}" to the last passed duration
+      (history of all runs, used to schedule the units).
+    """
+    FILE_BASENAME = JOURNAL_BASENAME
+
+    def __init__(self, filename=None, data=None, resume=False, **kwargs):
+        super(RunJournal, self).__init__(filename, data=data, **kwargs)
+        self.resume = resume
+        self._lock = threading.Lock()
+
+    @property
+    def run_id(self):
+        return self.data.get("run_id")
+
+    @property
+    def entries(self):
+        return self.data.setdefault("entries", {})
+
+    @property
+    def durations(self):
+        return self.data.setdefault("durations", {})
+
+    def start_run(self, now=None):
+        """Starts a new run (previous entries are discarded, durations are kept)."""
+        self.data = dict(run_id=uuid.uuid4().hex, started=now or time.time(),
+                         entries={}, durations=self.data.get("durations") or {})
+
+    @staticmethod
+    def make_key(unit_name, phase):
+        return "{0}:{1}".format(unit_name, phase)
+
+    def get_entry(self, unit_name, phase):
+        return self.entries.get(self.make_key(unit_name, phase))
+
+    def get_duration(self, unit_name, phase):
+        """Last passed duration of a unit/phase (or None)."""
+        return self.durations.get(self.make_key(unit_name, phase))
+
+    def is_done(self, unit_name, phase, fingerprint):
+        """Checks if the unit/phase passed (in this run) with the same inputs."""
+        entry = self.get_entry(unit_name, phase)
+        return bool(entry and entry.get("status") == "passed" and
+                    entry.get("fingerprint") == fingerprint)
+
+    def record(self, unit_name, phase, status, fingerprint, duration=None):
+        """Records the result of a unit/phase (and saves the journal)."""
+        # pylint: disable=too-many-arguments
+        with self._lock:
+            if not self.run_id:
+                self.start_run()
+            key = self.make_key(unit_name, phase)
+            self.entries[key] = dict(status=status, fingerprint=fingerprint,
+                                     finished=time.time(), duration=duration)
+            if status == "passed" and duration is not None:
+                self.durations[key] = duration
+            # -- HINT: Saved after each unit (the run may be aborted anytime).
+            self.save()
+
+
+# ---------------------------------------------------------------------------
+# JOURNALED UNIT:
+# ---------------------------------------------------------------------------
+class JournaledUnit(ProjectUnit):
+    """Unit (one phase of a CMake project) that is recorded in the run journal.
+
+    :param journal:         Run journal to use.
+    :param cmake_project:   CMake project of this unit.
+    :param phase:           Phase name, like: build (normally: task name).
+    :param function:        Function with the cmake project as param.
+    :param inputs:          Task params that affect the result (as dict).
+    """
+
+    def __init__(self, journal, cmake_project, phase, function, inputs=None,
+                 sources_fingerprints=None):
+        # pylint: disable=too-many-arguments
+        super(JournaledUnit, self).__init__(cmake_project, phase, function)
+        self.journal = journal
+        self.inputs = inputs or {}
+        self.sources_fingerprints = sources_fingerprints
+        self._fingerprint = None
+
+    def make_sources_fingerprint(self):
+        project_dir = str(self.cmake_project.project_dir)
+        cache = self.sources_fingerprints
+        if cache is not None and project_dir in cache:
+            return cache[project_dir]
+        config = getattr(self.cmake_project.ctx, "config", None) or {}
+        fingerprint = make_sources_fingerprint4config(project_dir, config)
+        if cache is not None:
+            cache[project_dir] = fingerprint
+        return fingerprint
+
+    @property
+    def fingerprint(self):
+        """Fingerprint of the inputs (computed before the unit is run)."""
+        if self._fingerprint is None:
+            config = self.cmake_project.config
+            digest = hashlib.sha1()
+            for part in (self.phase,
+                         self.make_sources_fingerprint(),
+                         str(config.name),
+                         config.make_content_hash(VOLATILE_CONFIG_PARAMS),
+                         make_config_hash(self.inputs)):
+                digest.update(part.encode("UTF-8"))
+                digest.update(b"\0")
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def is_done(self):
+        if not self.journal.resume or getattr(self.cmake_project, "syndrome", None):
+            self.fingerprint  # pylint: disable=pointless-statement
+            return False
+        build_dir = self.cmake_project.project_build_dir
+        return (os.path.isdir(str(build_dir)) and
+                self.journal.is_done(self.name, self.phase, self.fingerprint))
+
+    def finished(self, result):
+        if result.status in ("passed", "failed", "timeout", "cancelled"):
+            self.journal.record(self.name, self.phase, result.status,
+                                self.fingerprint, duration=result.duration)
+
+
+# ---------------------------------------------------------------------------
+# SHARED RUN JOURNAL:
+# ---------------------------------------------------------------------------
+_run_journal = None
+_sources_fingerprints = {}
+
+
+def make_run_journal_filename(config):
+    """Journal filename from config-param ``run_journal`` (or None, if disabled)."""
+    value = config.get("run_journal", False)
+    if (value is None or value is False or not str(value).strip() or
+            str(value).strip().lower() in FALSE_VALUES):
+        return None
+    elif not isinstance(value, str) or value.strip().lower() in TRUE_VALUES:
+        value = JOURNAL_BASENAME
+    config_dir = config.get("config_dir")
+    if not isinstance(config_dir, str):
+        config_dir = "."
+    return os.path.join(config_dir, value)
+
+
+def get_run_journal(config, resume=False):
+    """Provides the run journal of this cmake-build run (or None, if disabled).
+
+    The first task decides if the previous run is resumed (or a new run
+    is started). Later tasks of this run use the same journal.
+    """
+    global _run_journal     # pylint: disable=global-statement
+    filename = make_run_journal_filename(config)
+    resume = resume or str(config.get("resume")).strip().lower() in TRUE_VALUES
+    if filename is None:
+        if resume:
+            print("CMAKE-BUILD: --resume needs the run journal "
+                  "(config-param: run_journal)")
+        return None
+    if _run_journal is None or _run_journal.filename != filename:
+        # -- NEW RUN (in this process): Sources may have changed since.
+        _sources_fingerprints.clear()
+        try:
+            _run_journal = RunJournal.load(filename)
+        except ValueError:
+            _run_journal = RunJournal(filename)
+        if not resume:
+            _run_journal.start_run()
+    if resume:
+        _run_journal.resume = True
+    return _run_journal
+
+
+def reset_run_journal():
+    """Forgets the run journal of this run (and the cached fingerprints).
+    HINT: Needed if the program is run more than once (in-process).
+    """
+    global _run_journal     # pylint: disable=global-statement
+    _run_journal = None
+    _sources_fingerprints.clear()
+
+
+def make_journaled_units(config, cmake_projects, phase, function,
+                         inputs=None, resume=False):
+    """Creates the units of a task phase (recorded in the run journal).
+
+    :return: List of :class:`cmake_build.scheduler.Unit` objects.
+    """
+    # pylint: disable=too-many-arguments
+    journal = get_run_journal(config, resume=resume)
+    if journal is None:
+        return [ProjectUnit(cmake_project, phase, function)
+                for cmake_project in cmake_projects]
+    return [JournaledUnit(journal, cmake_project, phase, function, inputs,
+                          sources_fingerprints=_sources_fingerprints)
+            for cmake_project in cmake_projects]
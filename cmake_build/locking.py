@@ -0,0 +1,367 @@
+# -*- coding: UTF-8 -*-
+"""
+Advisory locks for build directories (safe concurrent cmake-build runs).
+
+Several cmake-build processes (like: CI jobs, IDE and terminal) may use the
+same build directory at once. A lock file per build directory is used
+to serialize them:
+
+* exclusive lock: init, configure, build, clean, cleanup, install, pack, ...
+* shared lock:    read-only queries, like: ctest (many readers at once)
+
+The lock files are stored next to the build directories
+(in the hidden directory ``.cmake_build.locks``), so they survive
+the removal of a build directory.
+
+POSIX platforms use ``flock()``: Locks of a dead process are released
+by the operating system. Otherwise (or if the filesystem does not support it),
+an exclusive lock file is created. A stale lock file of a dead process
+(on the same host) is detected and broken.
+
+.. code-block:: yaml
+
+    # -- FILE: cmake_build.yaml
+    build_dir_lock: wait        # no (default), wait, fail
+    build_dir_lock_timeout: 600 # in seconds (default: wait forever)
+
+HINT: Use ``CMAKE_BUILD_BUILD_DIR_LOCK=wait`` to enable it
+(or ``CMAKE_BUILD_BUILD_DIR_LOCK=fail`` to fail if a lock is taken).
+"""
+
+from __future__ import absolute_import, print_function
+from contextlib import contextmanager
+import errno
+import json
+import os
+import socket
+import threading
+import time
+from .exceptions import BuildDirLocked
+from .trash import process_exists
+try:
+    import fcntl
+except ImportError:     # pragma: no cover
+    fcntl = None        # -- PLATFORM: Windows
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+LOCKS_DIRNAME = ".cmake_build.locks"
+LOCK_MODES = ("wait", "fail")
+LOCK_MODE_ALIASES = {"yes": "wait", "on": "wait", "true": "wait"}
+POLL_INTERVAL = 0.2     # in seconds.
+STALE_UNREADABLE_AGE = 10.0     # in seconds (lock file without holder info).
+FLOCK_UNSUPPORTED_ERRNOS = (errno.ENOLCK, errno.EOPNOTSUPP, errno.ENOSYS)
+
+
+# ---------------------------------------------------------------------------
+# UTILITY FUNCTIONS:
+# ---------------------------------------------------------------------------
+def make_lock_filename(build_dir):
+    """Lock filename for a build directory (next to it)."""
+    build_dir = os.path.abspath(str(build_dir))
+    return os.path.join(os.path.dirname(build_dir), LOCKS_DIRNAME,
+                        "{0}.lock".format(os.path.basename(build_dir)))
+
+
+def build_dir_lock_mode(config):
+    """Lock mode from the config-param ``build_dir_lock``.
+
+    :param config:  Config object (normally: ctx.config).
+    :return: Lock mode (as string) or None (if disabled).
+    """
+    mode = config.get("build_dir_lock")
+    if mode is True:
+        return "wait"
+    elif not mode:
+        return None
+    mode = str(mode).strip().lower()
+    mode = LOCK_MODE_ALIASES.get(mode, mode)
+    if mode not in LOCK_MODES:
+        return None
+    return mode
+
+
+def make_holder_info(exclusive=True):
+    return dict(pid=os.getpid(), host=socket.gethostname(),
+                exclusive=exclusive, since=time.time())
+
+
+def describe_holder(holder):
+    if not holder:
+        return "unknown holder"
+    since = time.strftime("%H:%M:%S", time.localtime(holder.get("since") or 0))
+    return "pid={0} on {1}, since {2}".format(holder.get("pid"),
+                                              holder.get("host"), since)
+
+
+# ---------------------------------------------------------------------------
+# FILE LOCK:
+# ---------------------------------------------------------------------------
+class FileLock(object):
+    """Advisory file lock (shared or exclusive) of this process.
+    Acquiring it never blocks (see: :class:`BuildDirLock` for waiting).
+    """
+
+    def __init__(self, filename, use_flock=None):
+        self.filename = str(filename)
+        self.use_flock = (fcntl is not None) if use_flock is None else use_flock
+        self.exclusive = None
+        self._fd = None
+
+    @property
+    def locked(self):
+        return self.exclusive is not None
+
+    def read_holder(self):
+        """Holder info of the lock file (or None)."""
+        try:
+            with open(self.filename) as f:
+                return json.loads(f.read() or "null")
+        except (OSError, ValueError):
+            return None
+
+    def _write_holder(self, fd, exclusive):
+        os.ftruncate(fd, 0)
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, json.dumps(make_holder_info(exclusive)).encode("UTF-8"))
+
+    def try_acquire(self, exclusive=True):
+        """Tries to acquire the lock (or to upgrade a shared lock).
+
+        :return: True, if the lock is acquired.
+        """
+        directory = os.path.dirname(self.filename)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        if self.use_flock:
+            try:
+                return self._try_flock(exclusive)
+            except OSError as e:
+                if e.errno not in FLOCK_UNSUPPORTED_ERRNOS:
+                    raise
+                # -- CASE: Filesystem without flock() support (like: NFS).
+                self.release()
+                self.use_flock = False
+        return self._try_create_lock_file(exclusive)
+
+    def _try_flock(self, exclusive):
+        if self._fd is None:
+            # -- HINT: File descriptor is not inherited by cmake/build tools.
+            self._fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o644)
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        try:
+            fcntl.flock(self._fd, operation | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if self.locked:
+                # -- CASE: Upgrade failed. flock() may drop the shared lock
+                # before the upgrade fails (not atomic): Restore it.
+                # HINT: Never block here (other process may wait for an upgrade).
+                try:
+                    fcntl.flock(self._fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                    return False
+                except BlockingIOError:
+                    # -- LOST: The caller acquires it again (with its timeout).
+                    self.exclusive = None
+            os.close(self._fd)
+            self._fd = None
+            return False
+
+        self.exclusive = exclusive
+        if exclusive:
+            self._write_holder(self._fd, exclusive)
+        return True
+
+    def _try_create_lock_file(self, exclusive):
+        # -- HINT: Lock file mode supports exclusive locks only.
+        if self.locked:
+            return True
+        for _ in range(2):
+            try:
+                fd = os.open(self.filename,
+                             os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                if not self.break_stale_lock():
+                    return False
+                continue
+            self._write_holder(fd, exclusive=True)
+            self._fd = fd
+            self.exclusive = True
+            return True
+        return False
+
+    def is_stale(self, holder=None):
+        """Checks if the lock file is left by a dead process (on this host)."""
+        holder = holder or self.read_holder()
+        if not holder:
+            try:
+                age = time.time() - os.path.getmtime(self.filename)
+            except OSError:
+                return True     # -- CASE: Removed in the meantime.
+            return age > STALE_UNREADABLE_AGE
+        if holder.get("host") != socket.gethostname():
+            return False    # -- CANNOT CHECK: Process on other host.
+        return not process_exists(holder.get("pid"))
+
+    def break_stale_lock(self):
+        """Removes the lock file if it is stale.
+
+        :return: True, if the lock file was removed (or is already gone).
+        """
+        holder = self.read_holder()
+        if not self.is_stale(holder):
+            return False
+        print("CMAKE-BUILD: Break stale lock {0} ({1})".format(
+            self.filename, describe_holder(holder)))
+        try:
+            os.remove(self.filename)
+        except FileNotFoundError:
+            pass
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if self.use_flock:
+            if self.exclusive:
+                os.ftruncate(self._fd, 0)
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        else:
+            os.close(self._fd)
+            try:
+                os.remove(self.filename)
+            except FileNotFoundError:
+                pass
+        self._fd = None
+        self.exclusive = None
+
+
+# ---------------------------------------------------------------------------
+# BUILD DIRECTORY LOCK:
+# ---------------------------------------------------------------------------
+class BuildDirLock(object):
+    """Lock of a build directory (shared by all threads of this process).
+
+    The lock is reentrant: Nested steps (like: build -> init -> cleanup)
+    use the lock that is already held (a shared lock is upgraded if needed).
+    Other threads of this process wait until it is released.
+
+    .. code-block:: python
+
+        build_dir_lock = BuildDirLock("build.debug", mode="wait", timeout=60)
+        with build_dir_lock.locked(exclusive=True):
+            ...     # -- Use the build directory.
+    """
+
+    def __init__(self, build_dir, mode="wait", timeout=None,
+                 poll_interval=POLL_INTERVAL):
+        assert mode in LOCK_MODES, "mode=%s" % mode
+        self.build_dir = str(build_dir)
+        self.mode = mode
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.file_lock = FileLock(make_lock_filename(build_dir))
+        self._thread_lock = threading.RLock()
+        self._count = 0
+
+    def describe(self):
+        return "{0} is locked ({1})".format(
+            os.path.relpath(self.build_dir), describe_holder(self.file_lock.read_holder()))
+
+    def _acquire_file_lock(self, exclusive):
+        start_time = time.time()
+        waiting = False
+        while not self.file_lock.try_acquire(exclusive):
+            if self.mode == "fail":
+                raise BuildDirLocked(reason=self.describe())
+            elif (self.timeout is not None and
+                  time.time() - start_time >= self.timeout):
+                raise BuildDirLocked(reason="{0}: timeout after {1}s".format(
+                    self.describe(), self.timeout))
+            if not waiting:
+                print("CMAKE-BUILD: Waiting for lock, {0}".format(self.describe()))
+                waiting = True
+            time.sleep(self.poll_interval)
+
+    def acquire(self, exclusive=True):
+        self._thread_lock.acquire()
+        try:
+            file_lock = self.file_lock
+            if not file_lock.locked or (exclusive and not file_lock.exclusive):
+                self._acquire_file_lock(exclusive)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._count += 1
+
+    def try_acquire(self, exclusive=True):
+        """Acquires the lock without waiting.
+
+        :return: True, if the lock is acquired.
+        """
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        file_lock = self.file_lock
+        if file_lock.locked and (file_lock.exclusive or not exclusive):
+            acquired = True
+        else:
+            acquired = file_lock.try_acquire(exclusive)
+        if not acquired:
+            self._thread_lock.release()
+            return False
+        self._count += 1
+        return True
+
+    def release(self):
+        self._count -= 1
+        if self._count == 0:
+            self.file_lock.release()
+        self._thread_lock.release()
+
+    @contextmanager
+    def locked(self, exclusive=True):
+        self.acquire(exclusive)
+        try:
+            yield self
+        finally:
+            self.release()
+
+
+# ---------------------------------------------------------------------------
+# SHARED BUILD DIRECTORY LOCKS:
+# ---------------------------------------------------------------------------
+_build_dir_locks = {}
+_build_dir_locks_lock = threading.Lock()
+
+
+def get_build_dir_lock(build_dir, config):
+    """Provides the :class:`BuildDirLock` of a build directory
+    (or None, if build directory locks are disabled).
+    """
+    mode = build_dir_lock_mode(config)
+    if mode is None:
+        return None
+
+    build_dir = os.path.abspath(str(build_dir))
+    with _build_dir_locks_lock:
+        build_dir_lock = _build_dir_locks.get(build_dir)
+        if build_dir_lock is None:
+            build_dir_lock = BuildDirLock(build_dir, mode=mode)
+            _build_dir_locks[build_dir] = build_dir_lock
+    build_dir_lock.mode = mode
+    timeout = config.get("build_dir_lock_timeout")
+    build_dir_lock.timeout = float(timeout) if timeout not in (None, "") else None
+    return build_dir_lock
+
+
+@contextmanager
+def locked_build_dir(build_dir, config, exclusive=True):
+    """Uses the build directory lock (if enabled) in a with-statement."""
+    build_dir_lock = get_build_dir_lock(build_dir, config)
+    if build_dir_lock is None:
+        yield None
+        return
+    with build_dir_lock.locked(exclusive=exclusive):
+        yield build_dir_lock
@@ -13,15 +13,32 @@ from __future__ import absolute_import, print_function
 # -----------------------------------------------------------------------------
 # IMPORTS:
 # -----------------------------------------------------------------------------
+from contextlib import contextmanager
+import functools
 import os
+import threading
+import time
 import six
 from invoke.util import cd
 from path import Path
-from cmake_build.config import CMakeProjectPersistConfig, BuildConfig
+from cmake_build.config import CMakeProjectPersistConfig, BuildConfig, \
+    copy_config_data
+from .build_log import make_build_log
 from .cmake_util import CMAKE_DEFAULT_GENERATOR, CPACK_GENERATOR, \
-    make_build_dir_from_schema, cmake_cmdline, cmake_cmdline_define_options
-from .exceptions import NiceFailure
+    make_build_dir_from_schema, cmake_cmdline_argv, cmake_cmdline_define_argv, \
+    cmake_cmdline_join, cmake_cmdline_split
+from .exceptions import NiceFailure, UnitTimedOut
+from .fingerprint import make_sources_fingerprint4config, \
+    sources_fingerprint_enabled
+from .locking import locked_build_dir
 from .pathutil import posixpath_normpath
+from .process_runner import make_process_runner
+from .progress import get_progress_dashboard
+from .quota import BuildDirUsage
+from .thread_output import thread_output_streams
+from .trash import remove_tree
+from .watchdog import make_watchdog
+from .workspace_store import get_workspace_store, make_file_stamp
 
 
 # -----------------------------------------------------------------------------
@@ -43,6 +60,20 @@ def make_args_string(args):
     return args_text.strip()
 
 
+def with_build_dir_lock(exclusive=True):
+    """Decorator for CMakeProject methods that use the build directory.
+    The method is executed while the build directory lock is held
+    (see: :mod:`cmake_build.locking`).
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.build_dir_lock(exclusive=exclusive):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
 # -----------------------------------------------------------------------------
 # CMAKE PROJECT CLASSES:
 # -----------------------------------------------------------------------------
@@ -75,6 +106,8 @@ class CMakeProject(object):
         Stored configuration data of this CMake project (in cmake_project.build_dir).
         It describes the configuration that was last used to (re-)init/update
         this CMake project for building it.
+        It is an immutable snapshot (:class:`FrozenCMakeProjectConfig`)
+        with a precomputed content hash (for cheap dirty checks).
 
     .. attribute:: _build_config
 
@@ -87,9 +120,10 @@ class CMakeProject(object):
     CMAKE_BUILD_TYPE_DEFAULT = "Debug"
     CMAKE_CONFIG_OVERRIDES_CMAKE_BUILD_TYPE = False
     REBUILD_USE_DEEP_CLEANUP = False
+    SIZE_KEEPING_STEPS = ("test", "install")   # -- HINT: Keep the build_dir size.
 
     def __init__(self, ctx, project_dir=None, project_build_dir=None,
-                 build_config=None, cmake_generator=None):
+                 build_config=None, cmake_generator=None, stored_config=None):
         if build_config is None:
             cmake_build_type = self.CMAKE_BUILD_TYPE_DEFAULT
             build_config = BuildConfig("default", cmake_build_type=cmake_build_type)
@@ -97,8 +131,8 @@ class CMakeProject(object):
         project_dir = Path(project_dir or ".")
         project_dir = project_dir.abspath()
         if not project_build_dir:
-            build_dir = make_build_dir_from_schema(ctx.config, build_config.name)
-            project_build_dir = project_dir/build_dir
+            project_build_dir = self.make_project_build_dir(ctx, project_dir,
+                                                            build_config.name)
 
         config_name = build_config.name
         cmake_generator_default = build_config.cmake_generator
@@ -113,7 +147,8 @@ class CMakeProject(object):
         self._stored_cmake_generator = None
         self._dirty = True
         self._placeholder_map = {}
-        self.load_config()
+        self._verified_init_stamp = None
+        self.load_config(stored_config)
         self.update_from_initial_config(build_config)
         self.config.name = config_name
         if not cmake_generator:
@@ -130,6 +165,18 @@ class CMakeProject(object):
         # self.cmake_defines = self.replace_placeholders(self.cmake_defines)
         self._dirty = True
 
+    @staticmethod
+    def make_project_build_dir(ctx, project_dir, build_config_name):
+        """Build the project_build_dir (as absolute path) from the schema."""
+        build_dir = make_build_dir_from_schema(ctx.config, build_config_name)
+        return (Path(project_dir)/build_dir).abspath()
+
+    @classmethod
+    def make_stored_config_filename(cls, ctx, project_dir, build_config_name):
+        project_build_dir = cls.make_project_build_dir(ctx, project_dir,
+                                                       build_config_name)
+        return project_build_dir/cls.CMAKE_BUILD_DATA_FILENAME
+
     def _make_placeholder_dict(self):
         username = None
         for envname in ("USER", "LOGNAME", "USERNAME"):
@@ -153,6 +200,33 @@ class CMakeProject(object):
     def reset_dirty(self):
         self._dirty = False
 
+    # -- VERIFIED INIT-STATE: Reused by the next tasks (in the same session).
+    def _make_init_stamp(self):
+        try:
+            file_stat = os.stat(self.stored_config_filename)
+        except OSError:
+            return None
+        return (file_stat.st_mtime_ns, file_stat.st_size)
+
+    def mark_init_verified(self):
+        """Remember that this CMake project is initialized and up-to-date."""
+        self._verified_init_stamp = self._make_init_stamp()
+
+    def reset_init_verified(self):
+        self._verified_init_stamp = None
+
+    @property
+    def init_verified(self):
+        """Indicates if the initialized, up-to-date state is already known
+        (because ensure_init() was performed before, like: in a preceding task).
+
+        Only the stored_config file is checked (by one stat call).
+        """
+        if self._verified_init_stamp is None:
+            return False
+        return (self._make_init_stamp() == self._verified_init_stamp and
+                self.config == self._stored_config)
+
     def reset_config(self, cmake_generator=None):
         """Reset the CMake project configuration."""
         if not cmake_generator:
@@ -168,8 +242,10 @@ class CMakeProject(object):
             self.config.cmake_generator = cmake_generator
         if self._stored_cmake_generator and not self._stored_config.cmake_generator:
             # -- RESTORE: stored_cmake_generator info
-            self._stored_config.cmake_generator = self._stored_cmake_generator
-            self._stored_config.save(self.stored_config_filename)
+            stored_config = self._stored_config.thaw(CMakeProjectPersistConfig)
+            stored_config.cmake_generator = self._stored_cmake_generator
+            self.save_stored_config(stored_config)
+            self._stored_config = stored_config.freeze()
 
     def exists(self):
         return self.project_dir.isdir()
@@ -260,35 +336,75 @@ class CMakeProject(object):
         for name, value in build_config.items():
             current_value = self.config.get(name)
             if not current_value and value:
+                if isinstance(value, (dict, list)):
+                    # -- HINT: build_config is shared with other CMake projects.
+                    value = copy_config_data(value)
                 self.config[name] = value
         # XXX print("XXX config: %r" % self.config.data)
         # XXX print("XXX build_config: %r" % build_config.data)
         self.config.normalize_data()
         # print("XXX cmake_project.config= %r" % self.config.data)
 
-    def load_config(self):
+    def load_config(self, stored_config=None):
         """Load the CMake project build configuration from the persistent file
         in the ``cmake_project.project_build_dir``.
+
+        :param stored_config: Preloaded stored_config to use (optional).
         """
         stored_config_filename = self.stored_config_filename
         file_exists = stored_config_filename.exists()
-        try:
-            stored_config = CMakeProjectPersistConfig.load(stored_config_filename)
-        except ValueError:
-            print('OOPS: ParseError in "{0}" (IGNORED)'.format(
-                stored_config_filename.relpath()))
-            stored_config = CMakeProjectPersistConfig()
+        self.reset_init_verified()
+        if stored_config is None:
+            # -- HINT: Not preloaded (in a batch with other CMake projects).
+            try:
+                stored_config = CMakeProjectPersistConfig.load(stored_config_filename)
+            except ValueError:
+                print('OOPS: ParseError in "{0}" (IGNORED)'.format(
+                    stored_config_filename.relpath()))
+                stored_config = CMakeProjectPersistConfig()
 
         self._on_config_loaded(stored_config)
-        self._stored_config = stored_config
+        # -- HINT: Stored config is kept as immutable snapshot (with content hash).
+        # The loaded object is used as current config (no copy needed).
+        self._stored_config = stored_config.freeze()
         if stored_config.cmake_generator:
             self._stored_cmake_generator = self._stored_config.cmake_generator
-        self.config = stored_config.copy()
+        self.config = stored_config
         self.reset_dirty()
         if not file_exists:
             # -- ENFORCE: Persistent config-file will be written.
             self.dirty = True
 
+    def build_dir_lock(self, exclusive=True):
+        """Lock of the project build directory (as context manager).
+
+        :param exclusive: If true, use an exclusive lock (otherwise: shared).
+        """
+        config = getattr(self.ctx, "config", None) or {}
+        return locked_build_dir(self.project_build_dir, config,
+                                exclusive=exclusive)
+
+    @property
+    def workspace_store(self):
+        """Workspace store to use (or None, if disabled)."""
+        config = getattr(self.ctx, "config", None)
+        if config is None:
+            return None
+        return get_workspace_store(config)
+
+    def save_stored_config(self, stored_config):
+        """Save the stored_config in the persistent file
+        (and in the workspace store, if it is used).
+        """
+        stored_config_filename = self.stored_config_filename
+        stored_config.save(stored_config_filename)
+        workspace_store = self.workspace_store
+        if workspace_store is not None:
+            workspace_store.put_stored_config(self.project_build_dir, stored_config,
+                                              build_config=self.config.name,
+                                              project_dir=self.project_dir,
+                                              file_stamp=make_file_stamp(stored_config_filename))
+
     def store_config(self):
         """Store the current CMake project configuration to the persistent file
         in the ``cmake_project.project_build_dir``.
@@ -297,39 +413,133 @@ class CMakeProject(object):
         if (not stored_config_filename.exists() or
                 self.config != self._stored_config):
             # -- STORE CONFIG-DATA (persistently):
-            self.config.save(self.stored_config_filename)
-            self._stored_config = self.config.copy()
+            self.save_stored_config(self.config)
+            self._stored_config = self.config.freeze()
+            if self._verified_init_stamp is not None:
+                self.mark_init_verified()
         self.dirty = False
 
-    def make_cmake_init_options(self, cmake_generator=None, config=None):
+    def make_cmake_init_argv(self, cmake_generator=None, config=None):
+        """CMake init options (as argv list)."""
         if cmake_generator is None:
             cmake_generator = self.config.cmake_generator
         cmake_toolchain = self.config.cmake_toolchain
         cmake_install_prefix = self.replace_placeholders(
             self.config.cmake_install_prefix)
         cmake_defines = self.replace_placeholders(self.config.cmake_defines)
-        cmdline = cmake_cmdline(args=self.config.cmake_init_args,
-                                defines=cmake_defines,
-                                generator=cmake_generator,
-                                toolchain=cmake_toolchain,
-                                build_type=self.config.cmake_build_type,
-                                config=config,
-                                install_prefix=cmake_install_prefix)
-        return cmdline
+        return cmake_cmdline_argv(args=self.config.cmake_init_args,
+                                  defines=cmake_defines,
+                                  generator=cmake_generator,
+                                  toolchain=cmake_toolchain,
+                                  build_type=self.config.cmake_build_type,
+                                  config=config,
+                                  install_prefix=cmake_install_prefix)
 
-    def make_cmake_configure_options(self, **more_defines):
+    def make_cmake_init_options(self, cmake_generator=None, config=None):
+        return cmake_cmdline_join(self.make_cmake_init_argv(cmake_generator,
+                                                            config=config))
+
+    def make_cmake_configure_argv(self, **more_defines):
+        """CMake configure options (as argv list)."""
         # pylint: disable=line-too-long
         cmake_toolchain = self.config.cmake_toolchain
         cmake_install_prefix = self.replace_placeholders(
             self.config.cmake_install_prefix)
         cmake_defines = self.replace_placeholders(self.config.cmake_defines)
         # print("XXX cmake_defines: %r" % self.config.cmake_defines)
-        cmdline = cmake_cmdline_define_options(defines=cmake_defines,
-                                               toolchain=cmake_toolchain,
-                                               build_type=self.config.cmake_build_type,
-                                               install_prefix=cmake_install_prefix,
-                                               **more_defines)
-        return cmdline
+        return cmake_cmdline_define_argv(defines=cmake_defines,
+                                         toolchain=cmake_toolchain,
+                                         build_type=self.config.cmake_build_type,
+                                         install_prefix=cmake_install_prefix,
+                                         **more_defines)
+
+    def make_cmake_configure_options(self, **more_defines):
+        return cmake_cmdline_join(self.make_cmake_configure_argv(**more_defines))
+
+    @property
+    def relpath_from_build_dir_to_project_dir(self):
+        relpath_to_project_dir = self.project_build_dir.relpathto(self.project_dir)
+        return posixpath_normpath(relpath_to_project_dir)
+
+    def run_command(self, argv, cwd=None, use_sudo=False, phase=None):
+        """Runs a command (as argv list) in a working directory.
+
+        Uses the direct process runner (without shell), if it is enabled
+        (see: :mod:`cmake_build.process_runner`). Otherwise, ``ctx.run()``
+        is used with the command-line (and ``cd`` into the working directory).
+
+        :param argv:    Command to run (as argv list).
+        :param cwd:     Working directory to use (default: current directory).
+        :param use_sudo: If true, run the command with sudo (via ``ctx.sudo()``).
+        :param phase:   Phase name for the progress dashboard
+                        (and the phase timeouts), like: build.
+        """
+        # pylint: disable=too-many-arguments
+        config = getattr(self.ctx, "config", None) or {}
+        process_runner = make_process_runner(config)
+        if process_runner is not None and not use_sudo:
+            watchdog = make_watchdog(config, phase, self.config.name,
+                                     self.project_build_dir, name=self.unit_name)
+            progress_dashboard = get_progress_dashboard(config)
+            if progress_dashboard is None:
+                build_log = make_build_log(config, self.project_dir,
+                                           self.project_build_dir, self.config.name)
+                return process_runner.run(argv, cwd=cwd, build_log=build_log,
+                                          watchdog=watchdog)
+
+            # -- CASE: Show progress of this unit (instead of its output).
+            phase = phase or os.path.basename(str(argv[0]))
+            unit_name = self.unit_name
+            on_line = progress_dashboard.start_unit(
+                unit_name, phase, self.expected_duration(phase))
+            build_log = make_build_log(config, self.project_dir,
+                                       self.project_build_dir, self.config.name,
+                                       on_line=on_line)
+            status = "failed"
+            try:
+                result = process_runner.run(argv, cwd=cwd, build_log=build_log,
+                                            watchdog=watchdog)
+                status = "passed"
+                return result
+            except UnitTimedOut:
+                status = "timeout"
+                raise
+            finally:
+                progress_dashboard.finish_unit(unit_name, status)
+
+        run = self.ctx.sudo if use_sudo else self.ctx.run
+        cmdline = cmake_cmdline_join(argv)
+        # -- HINT: Output of a worker thread is captured (if it is used).
+        streams = thread_output_streams()
+        if cwd is None:
+            return run(cmdline, **streams)
+        elif threading.current_thread() is not threading.main_thread():
+            # -- NEVER: Change the process-wide working directory in a worker.
+            with self.ctx.cd(str(cwd)):
+                return run(cmdline, **streams)
+        with cd(cwd):
+            return run(cmdline, **streams)
+
+    @property
+    def unit_name(self):
+        """Unit name (project and build_config), like: "p1/debug"."""
+        return "{0}/{1}".format(posixpath_normpath(self.project_dir.relpath()),
+                                self.config.name)
+
+    def expected_duration(self, step):
+        """Duration of the last passed step (or None), used as estimate.
+        Each step (init, configure, build, install, pack, test) records the
+        duration of its command with the same phase name
+        (see: :meth:`recorded_step()`).
+        """
+        usage_filename = BuildDirUsage.make_filename(self.project_build_dir)
+        try:
+            result = BuildDirUsage.load(usage_filename).get_result(step)
+        except (ValueError, OSError):
+            return None
+        if not result or result.get("status") != "passed":
+            return None
+        return result.get("duration")
 
     def has_stored_config_file(self):
         return self.stored_config_filename.exists()
@@ -376,9 +586,17 @@ class CMakeProject(object):
         return any([Path(self.project_dir/conanfile).exists()
                     for conanfile in ("conanfile.py", "conanfile.txt")])
 
+    @with_build_dir_lock()
     def ensure_init(self, args=None, cmake_generator=None, config=None):  # @simplify
         # pylint: disable=line-too-long, disable=no-else-return
         project_build_dir = posixpath_normpath(self.project_build_dir.relpath())
+        if (self.init_verified and
+                not (config and self.cmake_config_overrides_cmake_build_type)):
+            # -- CASE: ALREADY DONE (and verified by a preceding task).
+            print("CMAKE-INIT:  {0} (SKIPPED: Initialized with cmake.generator={1})." \
+                  .format(project_build_dir, self.config.cmake_generator))
+            return False
+
         if self.initialized:
             # -- CASE: cmake_project.build_dir exists and stored_config file exists
             if config and self.cmake_config_overrides_cmake_build_type:
@@ -389,11 +607,13 @@ class CMakeProject(object):
                 # -- CASE: ALREADY DONE w/ same cmake_generator.
                 print("CMAKE-INIT:  {0} (SKIPPED: Initialized with cmake.generator={1})." \
                       .format(project_build_dir, self.config.cmake_generator))
+                self.mark_init_verified()
                 return False
             elif needs_update and not needs_reinit:
                 print("CMAKE-INIT:  {0} (NEEDS-UPDATE, using cmake.generator={1})"\
                       .format(project_build_dir, self.config.cmake_generator))
                 self.configure()
+                self.mark_init_verified()
                 return True
 
         # -- CASE: NOT INITIALIZED or NEEDS REINIT
@@ -402,36 +622,33 @@ class CMakeProject(object):
             self.cleanup()
 
         cmake_generator = cmake_generator or self.config.cmake_generator
-        ctx = self.ctx
         self.project_build_dir.makedirs_p()
-        cmake_init_options = self.make_cmake_init_options(cmake_generator,
-                                                          config=config)
-        with cd(self.project_build_dir):
-            # pylint: disable=line-too-long
-            print("CMAKE-INIT:  {0} (using cmake.generator={1})".format(
-                project_build_dir, cmake_generator))
-
-            if args:
-                cmake_init_options += " {0}".format(make_args_string(args))
-            relpath_to_project_dir = self.project_build_dir.relpathto(self.project_dir)
-            relpath_to_project_dir = posixpath_normpath(relpath_to_project_dir)
-            if self.needs_conan():
-                conan_build_type = config or self.config.cmake_build_type
-                ctx.run("conan install {relpath} -s build_type={build_type}".format(
-                        relpath=relpath_to_project_dir,
-                        build_type=conan_build_type))
-            ctx.run("cmake {options} {relpath}".format(
-                    options=cmake_init_options,
-                    relpath=relpath_to_project_dir))
-            print()
-
-            # -- FINALLY: If cmake-init worked, store used cmake_generator.
-            self.config.cmake_generator = cmake_generator
-            self.store_config()
-            self._stored_cmake_generator = cmake_generator
+        cmake_init_argv = self.make_cmake_init_argv(cmake_generator,
+                                                    config=config)
+        print("CMAKE-INIT:  {0} (using cmake.generator={1})".format(
+            project_build_dir, cmake_generator))
+
+        cmake_init_argv.extend(cmake_cmdline_split(args))
+        relpath_to_project_dir = self.relpath_from_build_dir_to_project_dir
+        if self.needs_conan():
+            conan_build_type = config or self.config.cmake_build_type
+            self.run_command(["conan", "install", relpath_to_project_dir,
+                              "-s", "build_type={0}".format(conan_build_type)],
+                             cwd=self.project_build_dir, phase="conan")
+        with self.recorded_step("init", size_changed=True):
+            self.run_command(["cmake"] + cmake_init_argv + [relpath_to_project_dir],
+                             cwd=self.project_build_dir, phase="init")
+        print()
+
+        # -- FINALLY: If cmake-init worked, store used cmake_generator.
+        self.config.cmake_generator = cmake_generator
+        self.store_config()
+        self._stored_cmake_generator = cmake_generator
+        self.mark_init_verified()
         return True
 
     # -- PROJECT-COMMAND API:
+    @with_build_dir_lock()
     def cleanup(self):
         """Remove cmake_project.project_build_dir"""
         verbose = False
@@ -440,26 +657,93 @@ class CMakeProject(object):
             if verbose:
                 # pragma: nocover
                 print("CMAKE-CLEANUP: {0}".format(project_build_dir))
-            self.project_build_dir.rmtree_p()
+            remove_tree(self.project_build_dir)
             self._stored_cmake_generator = None
+            self.forget_workspace_state()
+        self.reset_init_verified()
+
+    @contextmanager
+    def recorded_step(self, step, sources_fingerprint=None, size_changed=False):
+        """Records the result and duration of a step (like: init, build, test)
+        in the usage data-file of the build directory (see: :meth:`mark_used()`).
+        """
+        start_time = time.time()
+        try:
+            yield
+        except Exception:
+            self.mark_used(step, "failed", time.time() - start_time)
+            raise
+        self.mark_used(step, "passed", time.time() - start_time,
+                       sources_fingerprint=sources_fingerprint,
+                       size_changed=size_changed)
+
+    def mark_used(self, step=None, status=None, duration=None,
+                  sources_fingerprint=None, size_changed=False):
+        """Remember the last use of the project build directory
+        (needed for the build directory quota, see: :mod:`cmake_build.quota`)
+        and the result of a step, like: build (needed by the status task).
+
+        The remembered size of the build directory is only discarded
+        if this use changed it (like: init, a build with other sources).
+        Nothing is written in dry-run mode.
+        """
+        # pylint: disable=too-many-arguments
+        config = getattr(self.ctx, "config", None) or {}
+        if (config.get("run") or {}).get("dry"):
+            return
+
+        usage_filename = BuildDirUsage.make_filename(self.project_build_dir)
+        try:
+            usage = BuildDirUsage.load(usage_filename)
+        except ValueError:
+            usage = BuildDirUsage(usage_filename)
+        if step:
+            if step not in self.SIZE_KEEPING_STEPS and \
+                    not usage.is_same_result(step, status, sources_fingerprint):
+                size_changed = True
+            usage.set_result(step, status, duration=duration,
+                             sources_fingerprint=sources_fingerprint)
+        usage.mark_used(self.config.name, size_changed=size_changed)
+
+        workspace_store = self.workspace_store
+        if workspace_store is not None:
+            workspace_store.mark_used(self.project_build_dir, self.config.name,
+                                      size_changed=size_changed)
+            if step:
+                workspace_store.record_result(self.project_build_dir, step,
+                                              status, duration=duration)
+            if sources_fingerprint:
+                workspace_store.put_fingerprint(self.project_build_dir,
+                                                "sources", sources_fingerprint)
+
+    def forget_workspace_state(self):
+        workspace_store = self.workspace_store
+        if workspace_store is not None:
+            workspace_store.forget(self.project_build_dir)
 
     def remove_stored_config(self):
         """Remove the persistent data-file for the stored_config (if exists)."""
         stored_config_filename = self.stored_config_filename
+        self.reset_init_verified()
         if stored_config_filename.exists():
             stored_config_filename.remove()
             self._stored_cmake_generator = self._stored_config.cmake_generator
+            self.forget_workspace_state()
 
+    @with_build_dir_lock()
     def init(self, args=None, cmake_generator=None, config=None):
         """Perform CMake init of the project build directory for this
         build_config.
         """
         if not args:
             args = self.config.cmake_init_args
-        return self.ensure_init(args=args, cmake_generator=cmake_generator,
-                                config=config)
+        initialized = self.ensure_init(args=args, cmake_generator=cmake_generator,
+                                       config=config)
+        self.mark_used(size_changed=initialized)
+        return initialized
 
     # -- PRELIMINARY PROTOTYPE:
+    @with_build_dir_lock()
     def configure(self, **data):
         """Update CMake project build directory configuration"""
         project_build_dir = posixpath_normpath(self.project_build_dir.relpath())
@@ -479,19 +763,20 @@ class CMakeProject(object):
         # cmake_options = cmake_cmdline_define_options([], **data)
         # print("XXX cmake_defines: %r" % self.config.cmake_defines)
         # pylint: disable=line-too-long
-        cmake_options = self.make_cmake_configure_options(**data)
-        with cd(self.project_build_dir):
-            relpath_to_project_dir = self.project_build_dir.relpathto(self.project_dir)
-            relpath_to_project_dir = posixpath_normpath(relpath_to_project_dir)
-            self.ctx.run("cmake {0} {1}".format(cmake_options, relpath_to_project_dir))
+        cmake_configure_argv = self.make_cmake_configure_argv(**data)
+        with self.recorded_step("configure", size_changed=True):
+            self.run_command(["cmake"] + cmake_configure_argv +
+                             [self.relpath_from_build_dir_to_project_dir],
+                             cwd=self.project_build_dir, phase="configure")
 
-            # -- FINALLY: If cmake-init worked, store used cmake_generator.
-            self.store_config()
+        # -- FINALLY: If cmake-init worked, store used cmake_generator.
+        self.store_config()
 
     # -- BACKWARD-COMPATIBLE:
     # def update(self, **data):
     #     self.configure(**data)
 
+    @with_build_dir_lock()
     def build(self, args=None, options=None, init_args=None,
               cmake_generator=None, config=None, ensure_init=True,
               target=None, parallel=CMAKE_PARALLEL_UNSET,
@@ -510,8 +795,6 @@ class CMakeProject(object):
         :param verbose: Use verbose build mode or not (optional).
         """
         needs_store_config = False
-        cmake_build_args = ""
-        cmake_build_options = ""
         options = options or []
         assert isinstance(options, list)
         if config:
@@ -534,26 +817,36 @@ class CMakeProject(object):
         if verbose:
             options.append("--verbose")
 
-        if options:
-            cmake_build_options = " ".join(options or [])
+        cmake_build_argv = ["cmake", "--build", "."] + cmake_cmdline_split(options)
         if args:
-            cmake_build_args = "-- {0}".format(make_args_string(args))
+            cmake_build_argv += ["--"] + cmake_cmdline_split(args)
 
         project_build_dir = posixpath_normpath(self.project_build_dir.relpath())
+        # -- HINT: An up-to-date build (same sources) keeps the build_dir size.
+        size_changed = bool(clean_first or target)
         if ensure_init:
-            self.ensure_init(args=init_args, cmake_generator=cmake_generator,
-                             config=config)
+            initialized = self.ensure_init(args=init_args,
+                                           cmake_generator=cmake_generator,
+                                           config=config)
+            size_changed = size_changed or initialized
         if needs_store_config:
             # -- ENSURE: Initial stored_config is kept after INIT-STEP.
             self.store_config()
 
+        sources_fingerprint = None
+        if sources_fingerprint_enabled(self.ctx.config):
+            # -- HINT: Sources at build start (changes during the build are detected).
+            sources_fingerprint = make_sources_fingerprint4config(self.project_dir,
+                                                                  self.ctx.config)
         self.project_build_dir.makedirs_p()
-        with cd(self.project_build_dir):
-            print("CMAKE-BUILD: {0}".format(project_build_dir))
-            self.ctx.run("cmake --build . {0} {1}".format(
-                cmake_build_options, cmake_build_args).strip())
-            print()
-
+        print("CMAKE-BUILD: {0}".format(project_build_dir))
+        with self.recorded_step("build", sources_fingerprint=sources_fingerprint,
+                                size_changed=size_changed):
+            self.run_command(cmake_build_argv, cwd=self.project_build_dir,
+                             phase="build")
+        print()
+
+    @with_build_dir_lock()
     def install(self, prefix=None, cmake_generator=None, config=None,
                 use_sudo=False):
         # pylint: disable=line-too-long
@@ -564,34 +857,33 @@ class CMakeProject(object):
             prefix = self.replace_placeholders(prefix)
             # DISABLED: self.cmake_install_prefix = prefix
 
-        cmake_config = ""
+        cmake_config = []
         if config:
-            cmake_config = "--config {0}".format(config)
+            cmake_config = ["--config", config]
 
         self.ensure_init(cmake_generator=cmake_generator, config=config)
 
         project_build_dir = posixpath_normpath(self.project_build_dir.relpath())
-        with cd(self.project_build_dir):
-            print("CMAKE-INSTALL: {0}".format(project_build_dir))
-            if prefix and prefix != self.cmake_install_prefix:
-                # -- PREPARE: cmake configuration w/ new CMAKE_INSTALL_PREFIX
-                print("CMAKE-INSTALL: Use CMAKE_INSTALL_PREFIX={0}".format(prefix))
-                cmake_configure_command = "cmake -DCMAKE_INSTALL_PREFIX={0} {1}".format(
-                    prefix, posixpath_normpath(self.project_dir.relpath()))
-                self.ctx.run(cmake_configure_command)
-                self.cmake_install_prefix = prefix
-                # DISABLED: self.store_config()
-
-            # print("CMAKE-INSTALL: {0} (using: CMAKE_INSTALL_PREFIX={1})".format(
-            #    project_build_dir, self.cmake_install_prefix))
-            cmake_install = "cmake --build . {0} --target install".format(cmake_config)
-            # cmake_install_command = "cmake --build . {0} -- install".format(cmake_config)
-            if use_sudo:
-                self.ctx.sudo(cmake_install)
-            else:
-                self.ctx.run(cmake_install)
-            print()
-
+        print("CMAKE-INSTALL: {0}".format(project_build_dir))
+        if prefix and prefix != self.cmake_install_prefix:
+            # -- PREPARE: cmake configuration w/ new CMAKE_INSTALL_PREFIX
+            print("CMAKE-INSTALL: Use CMAKE_INSTALL_PREFIX={0}".format(prefix))
+            self.run_command(["cmake", "-DCMAKE_INSTALL_PREFIX={0}".format(prefix),
+                              self.relpath_from_build_dir_to_project_dir],
+                             cwd=self.project_build_dir, phase="configure")
+            self.cmake_install_prefix = prefix
+            # DISABLED: self.store_config()
+
+        # print("CMAKE-INSTALL: {0} (using: CMAKE_INSTALL_PREFIX={1})".format(
+        #    project_build_dir, self.cmake_install_prefix))
+        cmake_install_argv = ["cmake", "--build", "."] + cmake_config + \
+                             ["--target", "install"]
+        with self.recorded_step("install"):
+            self.run_command(cmake_install_argv, cwd=self.project_build_dir,
+                             use_sudo=use_sudo, phase="install")
+        print()
+
+    @with_build_dir_lock()
     def pack(self, format=None, package_dir=None, cpack_config=None,
              source_bundle=False, vendor=None, config=None, verbose=False):
         # pylint: disable=unused-argument   # RELATED-TO: config (PREPARED)
@@ -618,13 +910,12 @@ class CMakeProject(object):
             package_dir = Path(package_dir)
             if not package_dir.isabs():
                 package_dir = Path(self.project_build_dir / package_dir).abspath()
-            options.append("-B {0}".format(package_dir))
+            options.extend(["-B", str(package_dir)])
         if vendor:
             # -- OVERRIDE: CPACK_PACKAGE_VENDOR
-            options.append("--vendor '{0}'".format(vendor))
+            options.extend(["--vendor", vendor])
         if verbose:
             options.append("--verbose")
-        cpack_options = " ".join(options)
 
         # -- CPACK-CONFIG OPTION: --config <CPACK_CONFIG_FILE>
         cpack_config = cpack_config or "CPackConfig.cmake"
@@ -633,13 +924,14 @@ class CMakeProject(object):
 
         self.ensure_init()
         project_build_dir = posixpath_normpath(self.project_build_dir.relpath())
-        with cd(self.project_build_dir):
-            print("CMAKE-PACK: {0} (using cpack.generator={1})".format(
-                project_build_dir, format))
-            self.ctx.run("cpack -G {0} --config {1} {2}".format(
-                format, cpack_config, cpack_options).strip())
+        print("CMAKE-PACK: {0} (using cpack.generator={1})".format(
+            project_build_dir, format))
+        with self.recorded_step("pack", size_changed=True):
+            self.run_command(["cpack", "-G", format, "--config", cpack_config] + options,
+                             cwd=self.project_build_dir, phase="pack")
 
 
+    @with_build_dir_lock()
     def clean(self, args=None, options=None, init_args=None, config=None):
         """Clean the build artifacts (but: preserve CMake init)"""
         project_build_dir = posixpath_normpath(self.project_build_dir.relpath())
@@ -651,25 +943,22 @@ class CMakeProject(object):
         # -- ALTERNATIVE: self.build(args="clean", ensure_init=False)
         self.ensure_init(args=init_args)
         print("CMAKE-CLEAN: {0}".format(project_build_dir))
-        cmake_clean_args = "clean"
-        if args:
-            clean_args = make_args_string(args)
-            cmake_clean_args = "clean {0}".format(clean_args)
-
-        options = options or []
+        cmake_clean_args = ["clean"] + cmake_cmdline_split(args)
+        cmake_options = cmake_cmdline_split(options)
         if config:
-            options.append("--config {0}".format(config))
-        cmake_options = " ".join(options)
+            cmake_options.extend(["--config", config])
 
-        # pylint: disable=line-too-long
-        with cd(self.project_build_dir):
-            self.ctx.run("cmake --build . {0} -- {1}".format(cmake_options, cmake_clean_args))
+        self.run_command(["cmake", "--build", "."] + cmake_options +
+                         ["--"] + cmake_clean_args, cwd=self.project_build_dir,
+                         phase="clean")
 
+    @with_build_dir_lock()
     def reinit(self, args=None, config=None):
         self.cleanup()
         self.reset_config()
         self.init(args=args, config=config)
 
+    @with_build_dir_lock()
     def rebuild(self, args=None, options=None, init_args=None, config=None,
                 parallel=CMAKE_PARALLEL_UNSET, **kwargs):
         cleanup_build_dir = kwargs.pop("cleanup", False)
@@ -680,6 +969,7 @@ class CMakeProject(object):
         self.build(args=args, options=options, ensure_init=True,
                    config=config, parallel=parallel)
 
+    @with_build_dir_lock()
     def redo(self, args=None, options=None, init_args=None, config=None, **kwargs):
         self.reinit(args=init_args, config=config)
         self.rebuild(args=args, options=options, config=config, **kwargs)
@@ -690,20 +980,21 @@ class CMakeProject(object):
         :param args: CTest args to use (as string)
         :param verbose: If true, run tests in verbose mode.
         """
-        ctest_args = ""
-        args = args or []
-        if config:
-            args.append("-C {0}".format(config))
+        ctest_argv = ["ctest"]
         if verbose:
-            args.insert(0, "--verbose")
-        ctest_args = make_args_string(args)
+            ctest_argv.append("--verbose")
+        ctest_argv.extend(cmake_cmdline_split(args))
+        if config:
+            ctest_argv.extend(["-C", config])
 
         project_build_dir = posixpath_normpath(self.project_build_dir.relpath())
         self.ensure_init(args=init_args)
         self.project_build_dir.makedirs_p()
-        with cd(self.project_build_dir):
+        with self.build_dir_lock(exclusive=False):
             print("CMAKE-TEST:  {0}".format(project_build_dir))
-            self.ctx.run("ctest {0}".format(ctest_args).strip())
+            with self.recorded_step("test"):
+                self.run_command(ctest_argv, cwd=self.project_build_dir,
+                                 phase="test")
             print()
 
     def test(self, args=None, init_args=None, config=None, verbose=False):
@@ -737,6 +1028,12 @@ class CMakeProjectWithSyndrome(object):
     def relpath_to_project_dir(self, start="."):
         return posixpath_normpath(self.project_dir.relpath(start))
 
+    @property
+    def unit_name(self):
+        if not self.config.name:
+            return self.relpath_to_project_dir()
+        return "{0}/{1}".format(self.relpath_to_project_dir(), self.config.name)
+
     def fail(self, reason):
         raise NiceFailure(reason=reason,
                           template=self.FAILURE_TEMPLATE)
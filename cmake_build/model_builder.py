@@ -6,7 +6,6 @@ Workhorse to build the CMake project model elements from parts.
 from __future__ import absolute_import, print_function
 from path import Path
 from collections import OrderedDict
-import os
 import six
 from invoke import Exit
 from cmake_build.host_platform import make_build_config_name
@@ -14,22 +13,25 @@ from cmake_build.model import (
     CMakeProject, CMakeProjectWithoutProjectDirectory,
     CMakeProjectWithoutCMakeListsFile
 )
-from cmake_build.config import CMakeProjectConfig, BuildConfig
+from cmake_build.config import (
+    CMakeProjectConfig, CMakeProjectPersistConfig, BuildConfig
+)
+from cmake_build.constants import BUILD_CONFIG_DEFAULT
 from cmake_build.pathutil import posixpath_normpath
+from cmake_build.workspace_store import get_workspace_store, make_file_stamp
 
 
 # -----------------------------------------------------------------------------
 # CONSTANTS:
 # -----------------------------------------------------------------------------
 # pylint: disable=bad-whitespace
-HOST_BUILD_CONFIG_DEBUG   = make_build_config_name(build_type="debug")
-HOST_BUILD_CONFIG_RELEASE = make_build_config_name(build_type="release")
-BUILD_CONFIG_DEFAULT = os.environ.get("CMAKE_BUILD_CONFIG", "debug")
 BUILD_CONFIG_DEFAULT_MAP = dict(debug={}, release={})
 BUILD_CONFIG_DEFAULT_MAP[BUILD_CONFIG_DEFAULT] = {}
-BUILD_CONFIG_HOST_MAP = {
-    HOST_BUILD_CONFIG_DEBUG: {},
-    HOST_BUILD_CONFIG_RELEASE: {},
+HOST_BUILD_CONFIG_ALIAS_MAP = {
+    # -- HOST BUILD_CONFIG ALIAS: build_type (name from host platform)
+    "auto": "debug",
+    "host_debug": "debug",
+    "host_release": "release",
 }
 
 BUILD_CONFIGS_DEFAULT = [
@@ -49,6 +51,43 @@ BUILD_CONFIG_ALIAS_MAP = {
 
 
 # pylint: enable=bad-whitespace
+# -----------------------------------------------------------------------------
+# HOST BUILD CONFIG RELATED:
+# -----------------------------------------------------------------------------
+def make_host_build_config_name(build_type):
+    """Build config name for the host platform, like: Linux_x86_64_debug.
+    HINT: Host platform is only probed if a host build_config is used.
+    """
+    return make_build_config_name(build_type=build_type)
+
+
+def is_host_build_config_name(name):
+    """Indicates if a name may be a host build_config, like: Linux_x86_64_debug
+    (without probing the host platform).
+    """
+    return any(str(name).endswith("_" + build_type)
+               for build_type in HOST_BUILD_CONFIG_ALIAS_MAP.values())
+
+
+def make_build_config_host_map():
+    return {
+        make_host_build_config_name("debug"): {},
+        make_host_build_config_name("release"): {},
+    }
+
+
+def normalize_build_config_name(name):
+    """Resolve host build_config aliases, like: host_debug, auto, ...
+
+    :param name:  Build config name (or host alias).
+    :return: Build config name (host aliases are resolved).
+    """
+    build_type = HOST_BUILD_CONFIG_ALIAS_MAP.get(name)
+    if build_type:
+        return make_host_build_config_name(build_type)
+    return name
+
+
 # -----------------------------------------------------------------------------
 # BUILD CONFIG RELATED:
 # -----------------------------------------------------------------------------
@@ -90,14 +129,11 @@ def make_build_config_defaults(config):
     return build_config_defaults
 
 
-def make_build_config(ctx, name=None):
-    if name == "host_debug" or name == "auto":
-        name = HOST_BUILD_CONFIG_DEBUG
-    elif name == "host_release":
-        name = HOST_BUILD_CONFIG_RELEASE
-
+def make_build_config(ctx, name=None, build_config_defaults=None):
+    name = normalize_build_config_name(name)
     name = name or ctx.config.build_config or "default"
-    build_config_defaults = make_build_config_defaults(ctx.config)
+    if build_config_defaults is None:
+        build_config_defaults = make_build_config_defaults(ctx.config)
     build_config_data = {}
     build_config_data.update(build_config_defaults)
     build_config_data2 = ctx.config.build_configs_map.get(name) or {}
@@ -115,7 +151,8 @@ def make_build_config(ctx, name=None):
             build_config_data["cmake_toolchain"] = cmake_toolchain
 
     # -- STEP: build_config.cmake_defines inherits common.cmake_defines
-    cmake_defines = build_config_defaults["cmake_defines"]
+    # HINT: Copy it, build_config_defaults may be shared (see: BuildConfigResolver).
+    cmake_defines = build_config_defaults["cmake_defines"].copy()
     cmake_defines_items = cmake_defines_normalize(
         build_config_data2.get("cmake_defines", []))
     if cmake_defines_items:
@@ -126,13 +163,51 @@ def make_build_config(ctx, name=None):
         else:
             # -- MERGE-AND-OVERRIDE:
             # New items are added, existing items replaced/overwritten.
-            cmake_defines = cmake_defines.copy()
             cmake_defines.update(OrderedDict(cmake_defines_items))
 
     build_config_data["cmake_defines"] = cmake_defines
     return BuildConfig(name, build_config_data)
 
 
+class BuildConfigResolver(object):
+    """Resolves build_config names into :class:`BuildConfig` objects.
+    The results are memoized (for one invocation), because many CMake projects
+    use the same build_config.
+
+    .. note::
+
+        A BuildConfig object is shared by many CMake projects (read-only).
+    """
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self._build_config_defaults = None
+        self._build_configs = {}
+
+    @property
+    def build_config_defaults(self):
+        if self._build_config_defaults is None:
+            self._build_config_defaults = make_build_config_defaults(self.ctx.config)
+        return self._build_config_defaults
+
+    def clear(self):
+        self._build_config_defaults = None
+        self._build_configs = {}
+
+    def resolve(self, name=None):
+        """Resolve a build_config name into a :class:`BuildConfig` object.
+
+        :param name:  Build config name (or host alias, like: host_debug).
+        :return: BuildConfig object.
+        """
+        build_config = self._build_configs.get(name)
+        if build_config is None:
+            build_config = make_build_config(self.ctx, name,
+                            build_config_defaults=self.build_config_defaults)
+            self._build_configs[name] = build_config
+        return build_config
+
+
 def make_build_configs_map(build_configs):
     # build_configs_map = dict(BUILD_CONFIG_DEFAULT=dict())
     build_configs_map = BUILD_CONFIG_DEFAULT_MAP.copy()
@@ -151,24 +226,29 @@ def make_build_configs_map(build_configs):
     return build_configs_map
 
 
+def make_build_configs_map4config(config):
+    """Make the build_configs_map for the config.
+
+    :param config:  Config object to use (normally: ctx.config).
+    :return: build_configs_map
+    """
+    return make_build_configs_map(config.build_configs or [])
+
+
 def require_build_config_is_valid(ctx, build_config, strict=True):
     if not build_config:
         build_config = ctx.config.build_config or BUILD_CONFIG_DEFAULT
 
-    if build_config == "host_debug" or build_config == "auto":
-        build_config = HOST_BUILD_CONFIG_DEBUG
-    elif build_config == "host_release":
-        build_config = HOST_BUILD_CONFIG_RELEASE
-
-    build_configs = ctx.config.build_configs or []
+    build_config = normalize_build_config_name(build_config)
     build_configs_map = ctx.config.get("build_configs_map", None)
     if not build_configs_map or build_configs_map == BUILD_CONFIG_DEFAULT_MAP:
-        build_configs_map = make_build_configs_map(build_configs)
+        build_configs_map = make_build_configs_map4config(ctx.config)
         ctx.config.build_configs_map = build_configs_map
 
     build_config_data = build_configs_map.get(build_config)
-    if build_config_data is None:
-        build_config_data = BUILD_CONFIG_HOST_MAP.get(build_config)
+    if build_config_data is None and is_host_build_config_name(build_config):
+        # -- HINT: Only probe host platform for names that may match.
+        build_config_data = make_build_config_host_map().get(build_config)
     if build_config_data is not None:
         return True
 
@@ -291,10 +371,23 @@ def cmake_select_build_configs(ctx, build_config):
     return build_configs
 
 
-def make_cmake_project(ctx, project_dir, build_config=None, strict=False, **kwargs):
+def make_cmake_project(ctx, project_dir, build_config=None, strict=False,
+                       build_config_resolver=None, stored_configs=None,
+                       cache=None, **kwargs):
+    """Create a CMake project for a project_dir and build_config.
+
+    :param ctx: Context to use (invoke Context or :class:`cmake_build.workspace.Workspace`)
+    :param project_dir:     CMake project directory (as path).
+    :param build_config:    Build config name to use.
+    :param strict:          Indicates if an unknown build_config fails.
+    :param build_config_resolver: Resolver to use (shared, optional).
+    :param stored_configs:  Preloaded stored configs (optional).
+    :param cache:   Session cache to reuse CMake projects from (optional).
+    :return: CMake project object.
+    """
     if not ctx.config.build_configs_map:
         # -- LAZY-INIT: Build build_configs_map once from build_configs list.
-        build_configs_map = make_build_configs_map(ctx.config.build_configs)
+        build_configs_map = make_build_configs_map4config(ctx.config)
         ctx.config.build_configs_map = build_configs_map
         # MAYBE-MORE:
         # CMakeBuildConfigNormalizer.normalize(ctx.config)
@@ -303,6 +396,15 @@ def make_cmake_project(ctx, project_dir, build_config=None, strict=False, **kwar
     build_config_default = ctx.config.build_config or BUILD_CONFIG_DEFAULT
     build_config = build_config or build_config_default
     require_build_config_is_valid_or_none(ctx, build_config, strict=strict)
+    if cache is not None:
+        cmake_project = cache.get(project_dir, build_config, cmake_generator,
+                                  **kwargs)
+        if cmake_project is not None:
+            # -- REUSE: CMake project from a preceding task (in this session).
+            if isinstance(cmake_project, CMakeProject):
+                cmake_project.ctx = ctx
+                show_cmake_project_ignored_args(kwargs)
+            return cmake_project
 
     # -- CREATE CMAKE PROJECT:
     # HINT: Detect SPECIAL CASES with FAULT SYNDROMES first.
@@ -314,15 +416,27 @@ def make_cmake_project(ctx, project_dir, build_config=None, strict=False, **kwar
         cmake_project = CMakeProjectWithoutCMakeListsFile(project_dir)
     else:
         # -- NORMAL CASE:
-        build_config_obj = make_build_config(ctx, build_config)
+        if build_config_resolver is None:
+            build_config_resolver = BuildConfigResolver(ctx)
+        build_config_obj = build_config_resolver.resolve(build_config)
+        stored_config = None
+        if stored_configs:
+            stored_config_filename = CMakeProject.make_stored_config_filename(
+                ctx, project_dir, build_config_obj.name)
+            stored_config = stored_configs.get(stored_config_filename)
         cmake_project = CMakeProject(ctx, project_dir,
                                      build_config=build_config_obj,
-                                     cmake_generator=cmake_generator)
+                                     cmake_generator=cmake_generator,
+                                     stored_config=stored_config)
         show_cmake_project_ignored_args(kwargs)
+    if cache is not None:
+        cache.add(cmake_project, project_dir, build_config, cmake_generator,
+                  **kwargs)
     return cmake_project
 
 
-def make_cmake_projects(ctx, projects, build_config=None, strict=None, **kwargs):
+def make_cmake_projects(ctx, projects, build_config=None, strict=None,
+                        cache=None, **kwargs):
     """Create CMake projects from project and build_config combinations.
 
     .. hint::
@@ -330,26 +444,144 @@ def make_cmake_projects(ctx, projects, build_config=None, strict=None, **kwargs)
         A build_config may represent a list of build_configs.
         EXAMPLE: "all", "host_all"
 
-    :param ctx: Invoke task context to use
+    :param ctx: Context to use (invoke Context or :class:`cmake_build.workspace.Workspace`)
     :param projects:     List of CMake projects to use.
     :param build_config: Build config or build_config alias to use.
     :param strict:
+    :param cache:   Session cache to reuse CMake projects from (optional).
     :return: List of CMake project objects.
     """
     if strict is None:
         strict = True
     project_dirs = list(cmake_select_project_dirs(ctx, projects, strict=strict))
     build_configs = cmake_select_build_configs(ctx, build_config)
+    build_config_resolver = BuildConfigResolver(ctx)
+    stored_configs = None
+    other_kwargs = dict(kwargs)
+    cmake_generator = other_kwargs.pop("generator", None)
+    if cache is None or not cache.contains_all(ctx, project_dirs, build_configs,
+                                               cmake_generator, **other_kwargs):
+        stored_configs = load_stored_configs4projects(ctx, project_dirs,
+                                                      build_configs,
+                                                      build_config_resolver)
 
     cmake_projects = []
     for _build_config in build_configs:
         for project_dir in project_dirs:
             cmake_project = make_cmake_project(ctx, project_dir, _build_config,
-                                               strict=strict, **kwargs)
+                                    strict=strict,
+                                    build_config_resolver=build_config_resolver,
+                                    stored_configs=stored_configs,
+                                    cache=cache, **kwargs)
             cmake_projects.append(cmake_project)
     return cmake_projects
 
 
+def load_stored_configs4projects(ctx, project_dirs, build_configs,
+                                 build_config_resolver=None):
+    """Load the stored configs of many CMake projects in one batch
+    (concurrently, file I/O bound).
+
+    :return: Stored configs (as dict: stored_config_filename -> stored_config)
+    """
+    if build_config_resolver is None:
+        build_config_resolver = BuildConfigResolver(ctx)
+
+    filenames = []
+    for build_config in build_configs:
+        build_config = build_config or ctx.config.build_config or BUILD_CONFIG_DEFAULT
+        build_config_name = build_config_resolver.resolve(build_config).name
+        for project_dir in project_dirs:
+            filenames.append(CMakeProject.make_stored_config_filename(
+                ctx, project_dir, build_config_name))
+
+    workspace_store = get_workspace_store(ctx.config)
+    if workspace_store is None:
+        return CMakeProjectPersistConfig.load_many(filenames)
+    return load_stored_configs_from_workspace_store(workspace_store, filenames)
+
+
+def load_stored_configs_from_workspace_store(workspace_store, filenames):
+    """Load stored configs from the workspace store (in one query).
+    A stored config is only used if its JSON export file is unchanged.
+    Otherwise, the JSON file is loaded (and copied into the workspace store).
+
+    :return: Stored configs (as dict: stored_config_filename -> stored_config)
+    """
+    filenames = [Path(filename) for filename in filenames]
+    rows = workspace_store.get_stored_configs([f.dirname() for f in filenames])
+    stored_configs = {}
+    missing_filenames = []
+    for filename in filenames:
+        data, file_stamp = rows.get(filename.dirname().abspath(), (None, None))
+        if data is not None and file_stamp == make_file_stamp(filename):
+            stored_config = CMakeProjectPersistConfig(filename)
+            stored_config.clear()
+            stored_config.assign(data)
+            stored_configs[filename] = stored_config
+        else:
+            missing_filenames.append(filename)
+
+    loaded_configs = CMakeProjectPersistConfig.load_many(missing_filenames)
+    for filename, stored_config in loaded_configs.items():
+        file_stamp = make_file_stamp(filename)
+        if file_stamp is not None:
+            # -- BACKFILL: JSON file was written without the workspace store.
+            workspace_store.put_stored_config(filename.dirname(), stored_config,
+                                              file_stamp=file_stamp)
+    stored_configs.update(loaded_configs)
+    return stored_configs
+
+
+class CMakeProjectCache(object):
+    """Session cache for CMake projects (for one cmake-build invocation).
+
+    Chained tasks (like: ``cmake-build init build test``) reuse the same
+    CMakeProject objects (and their verified init-state) instead of
+    recreating them (and reloading their stored configs) in each task.
+    The key is: (project_dir, build_config, cmake_generator, other_kwargs).
+    """
+
+    def __init__(self):
+        self.cmake_projects = {}
+
+    @staticmethod
+    def make_key(project_dir, build_config, cmake_generator=None, **kwargs):
+        # -- HINT: Other make_cmake_project() kwargs are part of the key, too.
+        # Values may be unhashable (like: list), therefore repr() is used.
+        other_kwargs = tuple(sorted((name, repr(value))
+                                    for name, value in kwargs.items()
+                                    if value is not None))
+        return (str(Path(project_dir).abspath()), build_config,
+                cmake_generator, other_kwargs)
+
+    def get(self, project_dir, build_config, cmake_generator=None, **kwargs):
+        key = self.make_key(project_dir, build_config, cmake_generator, **kwargs)
+        return self.cmake_projects.get(key)
+
+    def add(self, cmake_project, project_dir, build_config,
+            cmake_generator=None, **kwargs):
+        key = self.make_key(project_dir, build_config, cmake_generator, **kwargs)
+        self.cmake_projects[key] = cmake_project
+
+    def contains_all(self, ctx, project_dirs, build_configs,
+                     cmake_generator=None, **kwargs):
+        build_config_default = ctx.config.build_config or BUILD_CONFIG_DEFAULT
+        for build_config in build_configs:
+            build_config = build_config or build_config_default
+            for project_dir in project_dirs:
+                if self.get(project_dir, build_config, cmake_generator,
+                            **kwargs) is None:
+                    return False
+        return True
+
+    def clear(self):
+        self.cmake_projects = {}
+
+    def __len__(self):
+        return len(self.cmake_projects)
+
+
 def show_cmake_project_ignored_args(cmake_project_kwargs):
     if not cmake_project_kwargs:
         return
@@ -4,6 +4,7 @@ Provides some utility functions for path.
 """
 
 from __future__ import absolute_import
+import os
 import os.path
 from path import Path
 
@@ -26,3 +27,34 @@ def posixpath_normpath(pathname):
     if backslash in pathname2:
         pathname2 = pathname2.replace(backslash, "/")
     return Path(pathname2)
+
+
+def format_size(size):
+    """Formats a size (in bytes) for humans, like: "1.5 GiB"."""
+    for unit in ("bytes", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            break
+        size /= 1024.0
+    if unit == "bytes":
+        return "%d %s" % (size, unit)
+    return "%.1f %s" % (size, unit)
+
+
+def directory_size(directory):
+    """Computes the size of a directory tree (without following symlinks)."""
+    size = 0
+    pending = [str(directory)]
+    while pending:
+        try:
+            entries = list(os.scandir(pending.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                else:
+                    size += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                pass
+    return size
@@ -5,7 +5,9 @@ This module contains utility class to load and store persistent data.
 
 from __future__ import absolute_import
 import json
+import os
 from codecs import open     # pylint: disable=redefined-builtin
+from concurrent.futures import ThreadPoolExecutor
 from path import Path
 
 
@@ -80,13 +82,22 @@ class PersistentData(object):
         return json.dumps(data, **extra_args)
 
     def save(self, filename=None):
+        """Save the data in the persistent file.
+        The file is replaced atomically (no half-written files on abort).
+        """
         filename = Path(filename or self.filename)
         dirname = filename.dirname()
         dirname.makedirs_p()    # pylint: disable=no-value-for-parameter
-        with open(filename, "wb", encoding="UTF-8") as f:
-            text_data = self.dump()
-            f.write(text_data)
-            f.write("\n")
+        tmp_filename = "{0}.tmp{1}".format(filename, os.getpid())
+        try:
+            with open(tmp_filename, "wb", encoding="UTF-8") as f:
+                text_data = self.dump()
+                f.write(text_data)
+                f.write("\n")
+            os.replace(tmp_filename, filename)
+        finally:
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
         return self
 
     @classmethod
@@ -109,3 +120,30 @@ class PersistentData(object):
             persistent_object.clear()
             persistent_object.assign(stored_data)
         return persistent_object
+
+    @classmethod
+    def load_many(cls, filenames, max_workers=None):
+        """Load many persistent data files in one batch.
+        The files are read concurrently (by a thread pool).
+        Files that cannot be parsed are left out.
+
+        :param filenames:   Persistent data files to load.
+        :param max_workers: Maximum number of threads to use (optional).
+        :return: Loaded objects (as dict: filename -> persistent object)
+        """
+        def load_or_none(filename):
+            try:
+                return cls.load(filename)
+            except ValueError:
+                return None
+
+        filenames = [Path(filename) for filename in filenames]
+        if len(filenames) <= 1:
+            loaded_objects = [load_or_none(filename) for filename in filenames]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                loaded_objects = list(executor.map(load_or_none, filenames))
+
+        return dict((filename, loaded_object)
+                    for filename, loaded_object in zip(filenames, loaded_objects)
+                    if loaded_object is not None)
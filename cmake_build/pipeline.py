@@ -0,0 +1,248 @@
+# -*- coding: UTF-8 -*-
+"""
+Stage pipelining: Each unit (project and build_config) moves through its
+stages (init, build, test, install, pack) on its own, instead of all units
+doing one phase after the other. The configure step of project B overlaps
+the build of project A, the tests of A overlap the build of B, ...
+
+Each stage has its own concurrency limit (number of units in this stage
+at once). A failing stage skips the remaining stages of its unit.
+The failure policy (fail-fast, keep-going) is used as for other tasks.
+
+.. code-block:: sh
+
+    $ cmake-build pipeline -b all --stage=init --stage=build --stage=test
+
+.. code-block:: yaml
+
+    # -- FILE: cmake_build.yaml
+    pipeline_stages: [init, build, test]     # Default stages
+    pipeline_stage_limits:
+      init: 2
+      build: 1      # HINT: Each build uses cmake_parallel jobs.
+      test: 2
+
+The number of units in flight is ``concurrent_units`` (if greater than 1),
+otherwise the sum of the stage limits.
+"""
+
+from __future__ import absolute_import, print_function
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import threading
+from .placement import make_placement_pool
+from .planner import estimate_unit_duration
+from .process_runner import GRACE_PERIOD, running_processes
+from .progress import format_duration, progress_dashboard_enabled
+from .scheduler import UnitResult, UnitScheduler, concurrent_units, \
+    keep_going_enabled
+from .thread_output import routed_thread_output
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+PIPELINE_STAGES = ("init", "build", "test", "install", "pack")
+PIPELINE_STAGES_DEFAULT = ("init", "build", "test")
+STAGE_LIMITS_DEFAULT = dict(init=2, build=1, test=2, install=1, pack=1)
+POLL_INTERVAL = 0.1
+
+
+# ---------------------------------------------------------------------------
+# UTILITY FUNCTIONS:
+# ---------------------------------------------------------------------------
+def parse_stages(stages):
+    """Parses the pipeline stages (as list or comma-separated string).
+
+    :return: List of stage names (in pipeline order).
+    :raises ValueError: If an unknown stage is used.
+    """
+    if isinstance(stages, str):
+        stages = stages.split(",")
+    names = []
+    for stage in stages or PIPELINE_STAGES_DEFAULT:
+        for name in str(stage).split(","):
+            name = name.strip().lower()
+            if not name:
+                continue
+            if name not in PIPELINE_STAGES:
+                raise ValueError("UNKNOWN-STAGE: {0} (expected: {1})".format(
+                    name, ", ".join(PIPELINE_STAGES)))
+            if name not in names:
+                names.append(name)
+    return sorted(names, key=PIPELINE_STAGES.index)
+
+
+def make_stage_limits(config, stages=None):
+    """Concurrency limit of each stage (from config-param
+    ``pipeline_stage_limits``).
+    """
+    data = config.get("pipeline_stage_limits")
+    if not hasattr(data, "get"):
+        data = {}
+    limits = {}
+    for stage in stages or PIPELINE_STAGES:
+        try:
+            limit = int(data.get(stage) or STAGE_LIMITS_DEFAULT.get(stage, 1))
+        except (TypeError, ValueError):
+            limit = STAGE_LIMITS_DEFAULT.get(stage, 1)
+        limits[stage] = max(limit, 1)
+    return limits
+
+
+# ---------------------------------------------------------------------------
+# PIPELINE SCHEDULER:
+# ---------------------------------------------------------------------------
+class PipelineScheduler(UnitScheduler):
+    """Runs a pipeline of stage units per CMake project (and build_config).
+
+    .. code-block:: python
+
+        scheduler = PipelineScheduler(max_workers=4,
+                                      stage_limits=dict(build=1, test=2))
+        results = scheduler.run_pipelines([[init_p1, build_p1, test_p1], ...])
+        scheduler.raise_failures(sum(results, []))
+
+    :param max_workers:     Number of units in flight (in any stage).
+    :param stage_limits:    Number of units per stage at once (as dict).
+    """
+
+    def __init__(self, max_workers=1, stage_limits=None, **kwargs):
+        super(PipelineScheduler, self).__init__(max_workers, **kwargs)
+        self.stage_limits = dict(stage_limits or {})
+        self._stage_semaphores = {}
+
+    def make_stage_semaphores(self, pipelines):
+        stages = set(getattr(unit, "phase", None)
+                     for units in pipelines for unit in units)
+        self._stage_semaphores = dict(
+            (stage, threading.BoundedSemaphore(
+                max(int(self.stage_limits.get(stage) or 1), 1)))
+            for stage in stages)
+
+    def run_pipelines(self, pipelines):
+        """Runs the pipelines (stage units of each project, in stage order).
+
+        :return: List of results (per pipeline: list of :class:`UnitResult`).
+        """
+        pipelines = [list(units) for units in pipelines]
+        self.cancelled.clear()
+        self.make_stage_semaphores(pipelines)
+        try:
+            if not self.concurrent or len(pipelines) <= 1:
+                return [self.run_pipeline(units) for units in pipelines]
+            elif not self.capture_output:
+                return self._run_pipelines_concurrently(pipelines)
+            with routed_thread_output():
+                return self._run_pipelines_concurrently(pipelines)
+        finally:
+            running_processes.reset()
+
+    def _run_pipelines_concurrently(self, pipelines):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.run_pipeline, pipelines))
+
+    def run_pipeline(self, units):
+        """Runs the stage units of one project (stops on the first failure)."""
+        results = []
+        for unit in units:
+            stage = getattr(unit, "phase", None)
+            if results and results[-1].status not in ("passed", "resumed"):
+                result = UnitResult(unit.name, "skipped")
+            elif not self._acquire_stage(stage):
+                result = UnitResult(unit.name, "skipped")
+            else:
+                try:
+                    result = self.run_unit(unit)
+                finally:
+                    self._stage_semaphores[stage].release()
+            result.name = "{0} ({1})".format(unit.name, stage)
+            results.append(result)
+        return results
+
+    def _acquire_stage(self, stage):
+        # -- HINT: Waits for a free slot of this stage (until cancelled).
+        semaphore = self._stage_semaphores[stage]
+        while not self.cancelled.is_set():
+            if semaphore.acquire(timeout=POLL_INTERVAL):
+                return True
+        return False
+
+
+# ---------------------------------------------------------------------------
+# PIPELINE FACTORY:
+# ---------------------------------------------------------------------------
+def make_pipeline_scheduler(config, stages, keep_going=None):
+    """Creates the :class:`PipelineScheduler` for a task (from config)."""
+    if keep_going is None:
+        keep_going = keep_going_enabled(config)
+    grace_period = config.get("cancel_grace_period")
+    if grace_period in (None, ""):
+        grace_period = GRACE_PERIOD
+    stage_limits = make_stage_limits(config, stages)
+    max_workers = concurrent_units(config)
+    if max_workers <= 1:
+        max_workers = sum(stage_limits.values())
+    return PipelineScheduler(max_workers, stage_limits=stage_limits,
+                             keep_going=keep_going,
+                             grace_period=float(grace_period),
+                             capture_output=not progress_dashboard_enabled(config),
+                             placement_pool=make_placement_pool(config, max_workers))
+
+
+def estimate_pipeline_duration(units, config=None):
+    return sum(estimate_unit_duration(unit, config).duration for unit in units)
+
+
+def print_pipeline_plan(scheduler, pipelines, config=None, stream=None):
+    stream = stream or sys.stdout
+    stages = sorted(scheduler.stage_limits, key=PIPELINE_STAGES.index)
+    print("CMAKE-BUILD: Pipeline for {0} units on {1} workers "
+          "(stage limits: {2})".format(
+              len(pipelines), scheduler.max_workers,
+              ", ".join("{0}={1}".format(stage, scheduler.stage_limits[stage])
+                        for stage in stages)), file=stream)
+    for units in pipelines:
+        if not units:
+            continue
+        print("  {0}: {1}".format(units[0].name, " -> ".join(
+            "{0} ({1})".format(unit.phase, format_duration(
+                estimate_unit_duration(unit, config).duration))
+            for unit in units)), file=stream)
+    stream.flush()
+
+
+def run_pipelines(config, pipelines, keep_going=None, dry_run=False,
+                  on_results=None):
+    """Runs the pipelines of a task and raises the failure(s), if any.
+    Pipelines are started longest-first (by their estimated duration).
+
+    :param pipelines:   Stage units per project (as list of lists).
+    :param dry_run:     If true, the pipelines are shown (but not run).
+    :param on_results:  Callback with units and results (before failures
+                        are raised, optional).
+    :return: List of :class:`UnitResult` objects (in pipeline/stage order).
+    """
+    pipelines = [list(units) for units in pipelines]
+    stages = parse_stages([unit.phase for units in pipelines for unit in units])
+    scheduler = make_pipeline_scheduler(config, stages, keep_going=keep_going)
+    ordered = pipelines
+    if scheduler.concurrent:
+        # -- HINT: Stable sort keeps the order of pipelines with same estimate.
+        durations = [estimate_pipeline_duration(units, config)
+                     for units in pipelines]
+        order = sorted(range(len(pipelines)), key=lambda index: -durations[index])
+        ordered = [pipelines[index] for index in order]
+    if dry_run:
+        print_pipeline_plan(scheduler, ordered, config)
+        return []
+
+    ordered_results = scheduler.run_pipelines(ordered)
+    positions = dict((id(units), index) for index, units in enumerate(ordered))
+    results = []
+    for units in pipelines:
+        results.extend(ordered_results[positions[id(units)]])
+    if on_results is not None:
+        on_results([unit for units in pipelines for unit in units], results)
+    scheduler.raise_failures(results)
+    return results
@@ -0,0 +1,398 @@
+# -*- coding: UTF-8 -*-
+"""
+CPU placement and priority of units (project and build_config):
+The processes of a unit (cmake, make/ninja, compilers, ctest, ...)
+are bound to a CPU set and run with a scheduling priority.
+
+* partition: The CPUs are split among the concurrent units (one CPU set
+  per worker slot), so concurrent builds do not compete for the same cores.
+* numa: Like partition, but each CPU set stays within one NUMA node
+  (worker slots are distributed over the NUMA nodes).
+* priority: nice value and I/O scheduling class (``ionice``), like for
+  background or speculative builds (interactive work stays responsive).
+
+.. code-block:: yaml
+
+    # -- FILE: cmake_build.yaml
+    cpu_placement: partition    # none (default), partition, numa
+    cpu_set: 0-15,32-47         # CPUs to use (default: all available CPUs)
+    unit_priority: background   # normal (default), background, idle
+    unit_nice: null             # nice value (override of unit_priority)
+    unit_ionice: null           # idle, best-effort, best-effort:7 (override)
+
+The placement is shown for each unit (when its first command is started).
+It is used for the units of scheduled tasks (like: build, test).
+The command is prefixed with ``taskset``, ``nice`` and ``ionice`` (util-linux,
+coreutils), so the placement is applied before the command is executed and
+all its descendants inherit it. No ``preexec_fn`` is used (not safe with the
+worker threads). Without these commands, the CPU set and nice value are
+applied after the start (``os.sched_setaffinity()``, ``os.setpriority()``),
+reported as best-effort. Otherwise, they are reported as unavailable.
+
+HINT: Uses the direct process runner (see: :mod:`cmake_build.process_runner`).
+"""
+
+from __future__ import absolute_import, print_function
+import glob
+import os
+import re
+import shutil
+import sys
+import threading
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+CPU_PLACEMENT_MODES = ("none", "partition", "numa")
+NUMA_NODE_CPULIST_PATTERN = "/sys/devices/system/node/node*/cpulist"
+PRIORITY_CLASSES = {
+    # -- PRIORITY: (nice, ionice)
+    "normal": (None, None),
+    "background": (10, "best-effort:7"),
+    "idle": (19, "idle"),
+}
+IONICE_CLASSES = {"idle": "3", "best-effort": "2"}
+
+
+# ---------------------------------------------------------------------------
+# UTILITY FUNCTIONS:
+# ---------------------------------------------------------------------------
+def parse_cpu_list(text):
+    """Parses a CPU list, like: "0-3,8,10-11" (as used by Linux).
+
+    :return: Sorted list of CPU numbers.
+    :raises ValueError: If the CPU list is invalid.
+    """
+    cpus = set()
+    for part in str(text).replace(" ", "").split(","):
+        if not part:
+            continue
+        match = re.match(r"^(\d+)(-(\d+))?$", part)
+        if not match:
+            raise ValueError("BAD-CPU-LIST: {0} (expected, like: 0-3,8)".format(text))
+        first = int(match.group(1))
+        last = int(match.group(3) or first)
+        cpus.update(range(first, last + 1))
+    return sorted(cpus)
+
+
+def format_cpu_list(cpus):
+    """Formats CPU numbers as CPU list, like: [0, 1, 2, 3, 8] -> "0-3,8"."""
+    parts = []
+    for cpu in sorted(set(cpus)):
+        if parts and parts[-1][1] == cpu - 1:
+            parts[-1][1] = cpu
+        else:
+            parts.append([cpu, cpu])
+    return ",".join(str(first) if first == last else "{0}-{1}".format(first, last)
+                    for first, last in parts)
+
+
+def available_cpus():
+    """CPUs that this process may use (sorted)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def numa_nodes():
+    """NUMA nodes of this host (from sysfs; Linux only).
+
+    :return: Map NUMA node number to its CPUs (or empty dict, if unknown).
+    """
+    nodes = {}
+    for filename in glob.glob(NUMA_NODE_CPULIST_PATTERN):
+        node = os.path.basename(os.path.dirname(filename))[len("node"):]
+        try:
+            with open(filename) as f:
+                nodes[int(node)] = parse_cpu_list(f.read().strip())
+        except (IOError, OSError, ValueError):
+            continue
+    return nodes
+
+
+def current_nice():
+    """nice value of this process (or 0, if unknown)."""
+    try:
+        return os.getpriority(os.PRIO_PROCESS, 0)
+    except (AttributeError, OSError):
+        return 0
+
+
+def parse_ionice(value):
+    """Parses an I/O scheduling class, like: idle, best-effort, best-effort:7.
+
+    :return: ionice options (as argv list) or None (if value is empty).
+    :raises ValueError: If the I/O class is unknown.
+    """
+    if value is None or not str(value).strip():
+        return None
+    name, _, level = str(value).strip().lower().partition(":")
+    if name not in IONICE_CLASSES or (level and not level.isdigit()):
+        raise ValueError("BAD-IONICE: {0} (expected: {1})".format(
+            value, ", ".join(["idle", "best-effort", "best-effort:LEVEL"])))
+    argv = ["-c", IONICE_CLASSES[name]]
+    if level:
+        argv.extend(["-n", level])
+    return argv
+
+
+def partition_cpus(cpus, slots, nodes=None):
+    """Partitions the CPUs among worker slots.
+    With NUMA nodes, each CPU set stays within one NUMA node and
+    the slots are distributed over the nodes (round-robin).
+
+    :param cpus:    CPUs to use.
+    :param slots:   Number of worker slots.
+    :param nodes:   NUMA nodes (map: node -> cpus; optional).
+    :return: List of (cpus, node) tuples (one per slot).
+    """
+    cpus = sorted(set(cpus))
+    groups = []
+    for node in sorted(nodes or {}):
+        node_cpus = [cpu for cpu in nodes[node] if cpu in cpus]
+        if node_cpus:
+            groups.append((node, node_cpus))
+    if not groups:
+        groups = [(None, cpus)]
+
+    partitions = [None] * slots
+    for index, (node, group_cpus) in enumerate(groups):
+        group_slots = list(range(index, slots, len(groups)))
+        count = len(group_slots)
+        for position, slot in enumerate(group_slots):
+            if count > len(group_cpus):
+                # -- CASE: More slots than CPUs (CPUs are shared).
+                slot_cpus = [group_cpus[position % len(group_cpus)]]
+            else:
+                slot_cpus = group_cpus[position * len(group_cpus) // count:
+                                       (position + 1) * len(group_cpus) // count]
+            partitions[slot] = (slot_cpus, node)
+    return partitions
+
+
+# ---------------------------------------------------------------------------
+# PLACEMENT:
+# ---------------------------------------------------------------------------
+class Placement(object):
+    """CPU set and priority for the processes of a unit.
+
+    :param cpus:    CPUs to use (or None: unchanged).
+    :param node:    NUMA node of the CPUs (for the report; optional).
+    :param nice:    nice value (or None: unchanged).
+    :param ionice:  I/O scheduling class, like: idle (or None: unchanged).
+    """
+
+    def __init__(self, cpus=None, node=None, nice=None, ionice=None):
+        self.cpus = cpus
+        self.node = node
+        self.nice = nice
+        self.ionice = ionice
+        self.name = None
+        self.slot = None
+        self.reported = False
+
+    def find_commands(self):
+        """Commands that apply the placement before exec (if installed):
+        ``taskset`` (CPU set), ``nice`` (nice value), ``ionice`` (I/O class).
+
+        :return: Dict with the path of each needed command (or None).
+        """
+        commands = {}
+        if self.cpus:
+            commands["cpus"] = shutil.which("taskset")
+        if self.nice is not None:
+            commands["nice"] = shutil.which("nice")
+        if self.ionice:
+            commands["ionice"] = shutil.which("ionice")
+        return commands
+
+    def make_argv(self, argv):
+        """Prefixes the command with the placement commands, like:
+        ``taskset -c 0-3 nice -n 10 ionice -t -c 3 <command>``.
+        Each of them executes the next one (same process), so the command
+        and all its descendants inherit the placement.
+
+        HINT: No ``preexec_fn`` is used (not safe with threads).
+        A CPU set or nice value without command is applied after the start
+        (see: :meth:`apply()`).
+        """
+        commands = self.find_commands()
+        prefix = []
+        if commands.get("cpus"):
+            prefix.extend([commands["cpus"], "-c", format_cpu_list(self.cpus)])
+        if commands.get("nice"):
+            increment = int(self.nice) - current_nice()
+            if increment:
+                # -- HINT: nice -n uses an increment (not an absolute value).
+                prefix.extend([commands["nice"], "-n", str(increment)])
+        if commands.get("ionice"):
+            # -- HINT: Tolerant mode (-t): Command is executed anyway.
+            prefix.extend([commands["ionice"], "-t"] + parse_ionice(self.ionice))
+        return prefix + list(argv)
+
+    def apply(self, pid):
+        """Applies the parts of the placement without command to a started
+        process (best-effort: processes that it started already escape).
+
+        :return: Tuple (applied, problems) with the names of the applied
+            parts and the problems (as text).
+        """
+        commands = self.find_commands()
+        applied = []
+        problems = []
+        if self.cpus and not commands.get("cpus"):
+            if not hasattr(os, "sched_setaffinity"):
+                problems.append("cpus: not supported on this platform")
+            else:
+                try:
+                    os.sched_setaffinity(pid, self.cpus)
+                    applied.append("cpus")
+                except OSError as e:
+                    problems.append("cpus: {0}".format(e.strerror))
+        if self.nice is not None and not commands.get("nice"):
+            try:
+                os.setpriority(os.PRIO_PROCESS, pid, int(self.nice))
+                applied.append("nice")
+            except (AttributeError, OSError) as e:
+                problems.append("nice: {0}".format(getattr(e, "strerror", e)))
+        if self.ionice and not commands.get("ionice"):
+            problems.append("ionice: not installed")
+        return applied, problems
+
+    def describe(self):
+        """Describes the placement, like: "cpus=0-3 (NUMA node 0), nice=10"."""
+        parts = []
+        if self.cpus:
+            parts.append("cpus={0}".format(format_cpu_list(self.cpus)))
+            if self.node is not None:
+                parts[-1] += " (NUMA node {0})".format(self.node)
+        if self.nice is not None:
+            parts.append("nice={0}".format(self.nice))
+        if self.ionice:
+            parts.append("ionice={0}".format(self.ionice))
+        return ", ".join(parts)
+
+    def place(self, pid, stream=None):
+        """Applies the placement parts without command to a started process
+        and shows the placement of the unit (for its first process).
+        """
+        applied, problems = self.apply(pid)
+        if self.reported:
+            return
+        self.reported = True
+        text = self.describe()
+        if applied:
+            text += " -- BEST-EFFORT: {0} applied after start".format(
+                ", ".join(applied))
+        if problems:
+            text += " -- UNAVAILABLE: {0}".format("; ".join(problems))
+        stream = stream or sys.stdout
+        print("CMAKE-BUILD: Placement of {0}: {1}".format(
+            self.name or "unit", text), file=stream)
+        stream.flush()
+
+
+class PlacementPool(object):
+    """Provides the placement of each worker slot (one unit per slot).
+
+    .. code-block:: python
+
+        pool = PlacementPool(partition_cpus(available_cpus(), 4), nice=10)
+        placement = pool.acquire("p1/debug")
+        ...
+        pool.release(placement)
+
+    :param partitions:  CPU set (and NUMA node) per slot (as list).
+    :param nice:        nice value (optional).
+    :param ionice:      I/O scheduling class (optional).
+    """
+
+    def __init__(self, partitions=None, nice=None, ionice=None):
+        self.partitions = list(partitions or [(None, None)])
+        self.nice = nice
+        self.ionice = ionice
+        self._free_slots = list(range(len(self.partitions)))
+        self._lock = threading.Lock()
+
+    def acquire(self, name=None):
+        """Provides the placement of a free slot (lowest slot first)."""
+        with self._lock:
+            slot = min(self._free_slots) if self._free_slots else 0
+            if slot in self._free_slots:
+                self._free_slots.remove(slot)
+        cpus, node = self.partitions[slot]
+        placement = Placement(cpus, node=node, nice=self.nice, ionice=self.ionice)
+        placement.name = name
+        placement.slot = slot
+        return placement
+
+    def release(self, placement):
+        with self._lock:
+            if placement.slot not in self._free_slots:
+                self._free_slots.append(placement.slot)
+
+
+# ---------------------------------------------------------------------------
+# PLACEMENT FACTORY:
+# ---------------------------------------------------------------------------
+def cpu_placement_mode(config):
+    """CPU placement mode from config-param ``cpu_placement``.
+
+    :return: "none", "partition" or "numa"
+    """
+    mode = str(config.get("cpu_placement") or "none").strip().lower()
+    if mode not in CPU_PLACEMENT_MODES:
+        return "none"
+    return mode
+
+
+def make_unit_priority(config):
+    """nice value and I/O class from config-params ``unit_priority``,
+    ``unit_nice`` and ``unit_ionice``.
+
+    :return: Tuple (nice, ionice).
+    :raises ValueError: If a priority param is invalid.
+    """
+    priority = config.get("unit_priority")
+    if not isinstance(priority, str) or not priority.strip():
+        priority = "normal"
+    priority = priority.strip().lower()
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError("BAD-PRIORITY: {0} (expected: {1})".format(
+            priority, ", ".join(sorted(PRIORITY_CLASSES))))
+    nice, ionice = PRIORITY_CLASSES[priority]
+    value = config.get("unit_nice")
+    if isinstance(value, (int, str)) and str(value).strip():
+        nice = int(value)
+    value = config.get("unit_ionice")
+    if isinstance(value, str) and value.strip():
+        ionice = value.strip()
+    parse_ionice(ionice)
+    return (nice, ionice)
+
+
+def placement_enabled(config):
+    nice, ionice = make_unit_priority(config)
+    return (cpu_placement_mode(config) != "none" or
+            nice is not None or ionice is not None)
+
+
+def make_placement_pool(config, max_workers=1):
+    """Creates the :class:`PlacementPool` for the worker slots of a task
+    (or None, if placement is not used).
+    """
+    if not placement_enabled(config):
+        return None
+    nice, ionice = make_unit_priority(config)
+    mode = cpu_placement_mode(config)
+    partitions = None
+    if mode != "none":
+        cpus = available_cpus()
+        cpu_set = config.get("cpu_set")
+        if cpu_set not in (None, ""):
+            cpus = [cpu for cpu in parse_cpu_list(cpu_set) if cpu in cpus] or cpus
+        nodes = numa_nodes() if mode == "numa" else None
+        partitions = partition_cpus(cpus, max(int(max_workers), 1), nodes)
+    return PlacementPool(partitions, nice=nice, ionice=ionice)
@@ -0,0 +1,217 @@
+# -*- coding: UTF-8 -*-
+"""
+Plans the order of concurrent units: longest-processing-time-first (LPT).
+
+The duration of each unit (project, build_config and phase) is estimated:
+
+1. history:     Last passed duration of this unit/phase (from the run journal)
+2. last run:    Last passed durations of the steps of this phase
+                (from the build directory usage file)
+3. heuristics:  Number of ninja edges (``build.ninja`` in the build directory),
+                only for build phases, or number of source files
+                (in the project directory)
+
+The units are ordered by estimated duration (longest first).
+A free worker always takes the next unit, so that the longest units
+do not start last (and dominate the wall time).
+
+.. code-block:: sh
+
+    # -- SHOW PLAN (without running it):
+    $ cmake-build build -b all --dry-run
+"""
+
+from __future__ import absolute_import, print_function
+import heapq
+import os
+import sys
+from .cmake_util import BUILD_DIR_SCHEMA
+from .progress import format_duration
+from .quota import BuildDirUsage, make_build_dir_pattern
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+# -- HEURISTICS: Rough costs (in seconds) if a unit has no history.
+SECONDS_PER_NINJA_EDGE = 0.5
+SECONDS_PER_SOURCE_FILE = 1.0
+SOURCE_FILE_SUFFIXES = (".c", ".cc", ".cpp", ".cxx", ".c++", ".m", ".mm",
+                        ".cu", ".f", ".f90", ".s", ".asm")
+BUILD_STEPS = ("build", "redo", "pack", "install")
+# -- STEPS: Recorded in the build directory usage file (per phase).
+PHASE_STEPS = {"redo": ("init", "build")}
+
+
+# ---------------------------------------------------------------------------
+# HEURISTICS:
+# ---------------------------------------------------------------------------
+def count_ninja_edges(build_dir):
+    """Counts the build edges in ``build.ninja`` (or None, if missing)."""
+    filename = os.path.join(str(build_dir), "build.ninja")
+    try:
+        with open(filename, "rb") as f:
+            return sum(1 for line in f if line.startswith(b"build "))
+    except OSError:
+        return None
+
+
+def count_source_files(project_dir, build_dir_pattern=None):
+    """Counts the source files in a project directory
+    (without hidden directories and build directories).
+    """
+    count = 0
+    pending = [str(project_dir)]
+    while pending:
+        try:
+            entries = list(os.scandir(pending.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            name = entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not name.startswith(".") and not \
+                            (build_dir_pattern and build_dir_pattern.match(name)):
+                        pending.append(entry.path)
+                elif os.path.splitext(name)[1].lower() in SOURCE_FILE_SUFFIXES:
+                    count += 1
+            except OSError:
+                continue
+    return count
+
+
+# ---------------------------------------------------------------------------
+# ESTIMATES:
+# ---------------------------------------------------------------------------
+class UnitEstimate(object):
+    """Estimated duration of a unit (with the basis of the estimate)."""
+
+    def __init__(self, unit, duration, basis):
+        self.unit = unit
+        self.duration = duration
+        self.basis = basis
+        self.worker = None
+        self.start = None
+
+
+def estimate_duration_from_usage(build_dir, phase):
+    """Estimates the duration of a phase from the last passed durations
+    of its steps (in the build directory usage file).
+
+    :return: Duration (in seconds) or None (if a step has no passed result).
+    """
+    try:
+        usage = BuildDirUsage.load(BuildDirUsage.make_filename(build_dir))
+    except (OSError, ValueError):
+        return None
+
+    duration = 0
+    for step in PHASE_STEPS.get(phase, (phase,)):
+        result = usage.get_result(step)
+        if not result or result.get("status") != "passed" or \
+                result.get("duration") is None:
+            return None
+        duration += result["duration"]
+    return duration
+
+
+def estimate_unit_duration(unit, config=None):
+    """Estimates the duration of a unit (in seconds).
+
+    :param unit:    Unit with ``cmake_project`` and ``phase`` attributes.
+    :return: :class:`UnitEstimate` object.
+    """
+    cmake_project = getattr(unit, "cmake_project", None)
+    phase = getattr(unit, "phase", None)
+    if cmake_project is None or getattr(cmake_project, "syndrome", None):
+        return UnitEstimate(unit, 0, "unknown")
+
+    journal = getattr(unit, "journal", None)
+    if journal is not None:
+        duration = journal.get_duration(unit.name, phase)
+        if duration is not None:
+            return UnitEstimate(unit, duration, "history")
+
+    build_dir = str(cmake_project.project_build_dir)
+    duration = estimate_duration_from_usage(build_dir, phase)
+    if duration is not None:
+        return UnitEstimate(unit, duration, "last run")
+
+    edges = phase in BUILD_STEPS and count_ninja_edges(build_dir)
+    if edges:
+        return UnitEstimate(unit, edges * SECONDS_PER_NINJA_EDGE, "ninja edges")
+    config = config or getattr(cmake_project.ctx, "config", None) or {}
+    build_dir_schema = config.get("build_dir_schema")
+    if not isinstance(build_dir_schema, str):
+        build_dir_schema = BUILD_DIR_SCHEMA
+    files = count_source_files(cmake_project.project_dir,
+                               make_build_dir_pattern(build_dir_schema))
+    return UnitEstimate(unit, files * SECONDS_PER_SOURCE_FILE, "source files")
+
+
+# ---------------------------------------------------------------------------
+# PLAN:
+# ---------------------------------------------------------------------------
+class UnitPlan(object):
+    """Plan for units on a number of workers (LPT order).
+
+    :param estimates:   Unit estimates (in execution order).
+    :param max_workers: Number of workers (units that run at once).
+    """
+
+    def __init__(self, estimates, max_workers=1):
+        self.estimates = estimates
+        self.max_workers = max_workers
+
+    @property
+    def units(self):
+        return [estimate.unit for estimate in self.estimates]
+
+    @property
+    def wall_time(self):
+        """Estimated wall time (finish time of the last unit)."""
+        return max([estimate.start + estimate.duration
+                    for estimate in self.estimates] or [0])
+
+    def print_plan(self, stream=None):
+        stream = stream or sys.stdout
+        print("CMAKE-BUILD: Plan for {0} units on {1} workers "
+              "(estimated wall time: {2})".format(
+                  len(self.estimates), self.max_workers,
+                  format_duration(self.wall_time)), file=stream)
+        rows = [("WORKER", "UNIT", "PHASE", "START", "ESTIMATE", "BASIS")]
+        for estimate in self.estimates:
+            rows.append((str(estimate.worker + 1), estimate.unit.name,
+                         str(getattr(estimate.unit, "phase", None) or "-"),
+                         format_duration(estimate.start),
+                         format_duration(estimate.duration), estimate.basis))
+        widths = [max(len(row[index]) for row in rows)
+                  for index in range(len(rows[0]))]
+        for row in rows:
+            print("  " + "  ".join(cell.ljust(width)
+                                   for cell, width in zip(row, widths)).rstrip(),
+                  file=stream)
+        stream.flush()
+
+
+def make_unit_plan(units, max_workers=1, config=None):
+    """Orders the units longest-first and assigns them to workers
+    (a free worker takes the next unit, like the scheduler does).
+
+    :return: :class:`UnitPlan` object.
+    """
+    max_workers = max(int(max_workers), 1)
+    estimates = [estimate_unit_duration(unit, config) for unit in units]
+    if max_workers > 1:
+        # -- HINT: Stable sort keeps the order of units with the same estimate.
+        estimates.sort(key=lambda estimate: -estimate.duration)
+
+    # -- WORKER QUEUE: (finish time, number of units, worker index)
+    workers = [(0, 0, index) for index in range(max_workers)]
+    for estimate in estimates:
+        start, count, worker = heapq.heappop(workers)
+        estimate.worker = worker
+        estimate.start = start
+        heapq.heappush(workers, (start + estimate.duration, count + 1, worker))
+    return UnitPlan(estimates, max_workers)
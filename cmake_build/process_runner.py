@@ -0,0 +1,449 @@
+# -*- coding: UTF-8 -*-
+"""
+Runs commands (as argv list) directly: without a shell and without ``cd``.
+
+The default runner of cmake-build uses ``ctx.run(cmdline)`` (from `invoke`_).
+This uses a shell (and a pseudo-terminal on POSIX platforms) per command.
+The :class:`ProcessRunner` executes the command directly instead:
+
+* no shell process and no quoting problems (like: paths with spaces)
+* the working directory is passed to the process (no process-wide ``cd``)
+* output is forwarded in large chunks (from a pipe or pseudo-terminal)
+* each command runs in its own process group (can be cancelled as a whole)
+* commands can be watched for timeouts (see: :mod:`cmake_build.watchdog`)
+* processes of a unit can be placed on CPUs (see: :mod:`cmake_build.placement`)
+
+The run config of `invoke`_ is used, too: ``run.dry``, ``run.echo``,
+``run.hide``, ``run.warn`` and ``run.env``. Environment variables in args
+(like: ``$VAR``) are NOT expanded (there is no shell).
+
+.. code-block:: yaml
+
+    # -- FILE: cmake_build.yaml
+    process_runner: direct      # shell (default), direct
+    process_runner_pty: false   # Use pseudo-terminal (default: pipe)
+
+HINT: Use ``CMAKE_BUILD_PROCESS_RUNNER=direct`` to enable it.
+
+.. _invoke: https://pyinvoke.org/
+"""
+
+from __future__ import absolute_import, print_function
+from contextlib import contextmanager
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from invoke.exceptions import UnexpectedExit
+from invoke.runners import Result, normalize_hide
+from .cmake_util import cmake_cmdline_join
+from .exceptions import UnitCancelled, UnitTimedOut
+try:
+    import pty
+except ImportError:     # pragma: no cover
+    pty = None          # -- PLATFORM: Windows
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+PROCESS_RUNNER_MODES = ("shell", "direct")
+CHUNK_SIZE = 64 * 1024
+ECHO_FORMAT = "\033[1;37m{command}\033[0m"
+TRUE_VALUES = ("y", "yes", "true", "on", "1")
+GRACE_PERIOD = 5.0      # in seconds (between SIGTERM and SIGKILL).
+USE_PROCESS_GROUPS = (os.name == "posix")
+
+
+# ---------------------------------------------------------------------------
+# UTILITY FUNCTIONS:
+# ---------------------------------------------------------------------------
+def make_output_writer(stream=None):
+    """Provides a function that writes output chunks (as bytes) to a stream."""
+    stream = stream or sys.stdout
+    binary_stream = getattr(stream, "buffer", None)
+    if binary_stream is not None:
+        def write_binary(data):
+            binary_stream.write(data)
+            binary_stream.flush()
+        return write_binary
+
+    encoding = getattr(stream, "encoding", None) or "UTF-8"
+
+    def write_text(data):
+        stream.write(data.decode(encoding, "replace"))
+        stream.flush()
+    return write_text
+
+
+def forward_output(fd, write):
+    """Forwards the output of a file descriptor (until EOF) in chunks."""
+    while True:
+        try:
+            data = os.read(fd, CHUNK_SIZE)
+        except OSError:
+            # -- CASE: Pseudo-terminal is closed (EIO when process ends).
+            break
+        if not data:
+            break
+        write(data)
+
+
+def signal_process_group(process, signum):
+    """Sends a signal to the process group of a process (or the process)."""
+    try:
+        if USE_PROCESS_GROUPS:
+            os.killpg(process.pid, signum)
+        elif signum == getattr(signal, "SIGKILL", None):
+            process.kill()
+        else:
+            process.terminate()
+    except OSError:
+        pass    # -- CASE: Process is already finished.
+
+
+def terminate_process_group(process, grace_period=GRACE_PERIOD):
+    """Terminates the process group of a process:
+    SIGTERM first, SIGKILL after the grace period.
+    """
+    signal_process_group(process, signal.SIGTERM)
+    try:
+        process.wait(timeout=grace_period)
+    except subprocess.TimeoutExpired:
+        pass
+    if USE_PROCESS_GROUPS or process.poll() is None:
+        # -- HINT: Children in the process group may still be running.
+        signal_process_group(process, getattr(signal, "SIGKILL", signal.SIGTERM))
+
+
+# ---------------------------------------------------------------------------
+# RUNNING PROCESSES:
+# ---------------------------------------------------------------------------
+class RunningProcesses(object):
+    """Registry of the running processes (of all threads).
+    Used to cancel all in-flight commands at once (like: fail-fast).
+    After :meth:`cancel()`, no new process is started until :meth:`reset()`.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._processes = set()
+        self._lock = threading.Lock()
+
+    def add(self, process):
+        with self._lock:
+            if self.cancelled:
+                # -- CASE: Started while cancelling (race).
+                signal_process_group(process, signal.SIGTERM)
+            self._processes.add(process)
+
+    def discard(self, process):
+        with self._lock:
+            self._processes.discard(process)
+
+    def check_cancelled(self, command=None):
+        if self.cancelled:
+            raise UnitCancelled(reason="{0} (not started)".format(command))
+
+    def cancel(self, grace_period=GRACE_PERIOD):
+        """Terminates all running processes (and their process groups).
+        Sends SIGTERM first, SIGKILL after the grace period.
+        """
+        with self._lock:
+            self.cancelled = True
+            processes = list(self._processes)
+        for process in processes:
+            signal_process_group(process, signal.SIGTERM)
+        deadline = time.time() + grace_period
+        for process in processes:
+            try:
+                process.wait(timeout=max(0, deadline - time.time()))
+            except subprocess.TimeoutExpired:
+                pass
+        sigkill = getattr(signal, "SIGKILL", signal.SIGTERM)
+        for process in processes:
+            if USE_PROCESS_GROUPS or process.poll() is None:
+                signal_process_group(process, sigkill)
+        return len(processes)
+
+    def reset(self):
+        with self._lock:
+            self.cancelled = False
+
+
+running_processes = RunningProcesses()
+
+
+# ---------------------------------------------------------------------------
+# PROCESS RUNNER:
+# ---------------------------------------------------------------------------
+class ProcessRunner(object):
+    """Runs a command (as argv list) without shell.
+
+    .. code-block:: python
+
+        runner = ProcessRunner(use_pty=False)
+        runner.run(["cmake", "--build", "."], cwd="build.debug")
+
+    :param use_pty: If true, use a pseudo-terminal (otherwise: pipe).
+    :param echo:    If true, print the command before it is executed.
+    :param stream:  Output stream to use (default: sys.stdout).
+    :param env:     Environment of the processes (default: inherited).
+    :param dry:     If true, only print the command (like: ``run.dry``).
+    :param hide:    Hides the output, like: ``run.hide`` (out, both, True).
+    :param warn:    If true, failed commands do not raise an exception.
+    """
+    # pylint: disable=too-many-instance-attributes
+    echo_format = ECHO_FORMAT
+
+    def __init__(self, use_pty=False, echo=True, stream=None, env=None,
+                 dry=False, hide=None, warn=False):
+        # pylint: disable=too-many-arguments
+        # -- HINT: Pseudo-terminals are not supported on Windows (use: pipe).
+        self.pty = bool(use_pty) and pty is not None
+        self.echo = echo
+        self.stream = stream
+        self.env = env
+        self.dry = dry
+        self.hide = normalize_hide(hide)
+        self.warn = warn
+
+    def run(self, argv, cwd=None, warn=None, env=None, build_log=None,
+            watchdog=None):
+        """Runs the command and forwards its output (stdout and stderr).
+
+        :param argv:    Command to run (as argv list).
+        :param cwd:     Working directory of the process (optional).
+        :param warn:    If true, a failed command does not raise an exception
+                        (default: warn of this runner).
+        :param env:     Additional environment variables (optional).
+        :param build_log: Captures the output (as BuildLog; optional).
+        :param watchdog:  Watches the phase timeouts (as Watchdog; optional).
+        :return: Result object (stdout: last lines of the build log, if any).
+        :raises invoke.exceptions.UnexpectedExit: If the command fails.
+        :raises cmake_build.exceptions.UnitCancelled: If commands are cancelled.
+        :raises cmake_build.exceptions.UnitTimedOut: If a timeout expired.
+        """
+        # pylint: disable=too-many-arguments
+        argv = [str(arg) for arg in argv]
+        command = cmake_cmdline_join(argv)
+        running_processes.check_cancelled(command)
+        stream = self.stream or sys.stdout
+        if self.echo or self.dry:
+            print(self.echo_format.format(command=command), file=stream)
+        stream.flush()
+        if self.dry:
+            # -- DRY-RUN: Show the command only (like: ctx.run()).
+            if build_log is not None:
+                build_log.close()
+            return Result(command=command, exited=0, pty=self.pty,
+                          hide=self.hide)
+
+        if warn is None:
+            warn = self.warn
+        if env:
+            env = dict(self.env or os.environ, **env)
+        else:
+            env = self.env
+        cwd = str(cwd) if cwd is not None else None
+        hidden_output = None
+        if "stdout" in self.hide:
+            # -- HINT: Hidden output is captured (like: ctx.run()).
+            hidden_output = bytearray()
+            write = hidden_output.extend
+        else:
+            write = make_output_writer(stream)
+        if build_log is not None:
+            build_log.write_command(command, cwd=cwd)
+            if hidden_output is not None:
+                build_log.console = "none"  # -- HINT: Log file only.
+            write = build_log.write
+        if watchdog is not None:
+            write = watchdog.wrap_writer(write)
+        try:
+            if self.pty:
+                exit_code = self._run_with_pty(argv, cwd, env, write, watchdog)
+            else:
+                exit_code = self._run_with_pipe(argv, cwd, env, write, watchdog)
+        finally:
+            if build_log is not None:
+                build_log.close()
+
+        stdout = ""
+        if build_log is not None:
+            stdout = build_log.tail_text
+        elif hidden_output is not None:
+            stdout = hidden_output.decode("UTF-8", "replace")
+        result = Result(stdout=stdout, command=command, exited=exit_code,
+                        pty=self.pty, hide=self.hide)
+        if watchdog is not None and watchdog.timed_out:
+            watchdog.report(stream)
+            raise UnitTimedOut(result, reason="{0} ({1})".format(
+                command, watchdog.reason))
+        if exit_code != 0 and running_processes.cancelled:
+            raise UnitCancelled(result, reason="{0} (terminated)".format(command))
+        if exit_code != 0 and not warn:
+            if build_log is not None:
+                build_log.report_failure()
+            raise UnexpectedExit(result)
+        return result
+
+    @staticmethod
+    def _wait_for(process, forward, watchdog=None):
+        """Forwards the output until the process ends.
+        The process group is terminated if this is interrupted (like: CTRL-C).
+        """
+        running_processes.add(process)
+        placement = getattr(_thread_state, "placement", None)
+        if placement is not None:
+            placement.place(process.pid)
+        if watchdog is not None:
+            watchdog.start(process)
+        try:
+            forward()
+        except BaseException:
+            terminate_process_group(process)
+            raise
+        finally:
+            exit_code = process.wait()
+            if watchdog is not None:
+                watchdog.stop()
+            running_processes.discard(process)
+        return exit_code
+
+    @staticmethod
+    def _placement_argv(argv):
+        """Command with the placement of this thread (if any).
+        HINT: Applied before exec, so all descendants inherit the placement.
+        """
+        placement = getattr(_thread_state, "placement", None)
+        if placement is None:
+            return argv
+        return placement.make_argv(argv)
+
+    def _run_with_pipe(self, argv, cwd, env, write, watchdog=None):
+        process = subprocess.Popen(self._placement_argv(argv), cwd=cwd, env=env,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT,
+                                   bufsize=0,
+                                   start_new_session=USE_PROCESS_GROUPS)
+        try:
+            return self._wait_for(process, lambda: forward_output(
+                process.stdout.fileno(), write), watchdog)
+        finally:
+            process.stdout.close()
+
+    def _run_with_pty(self, argv, cwd, env, write, watchdog=None):
+        master_fd, slave_fd = pty.openpty()
+        try:
+            process = subprocess.Popen(self._placement_argv(argv), cwd=cwd,
+                                       env=env, stdout=slave_fd, stderr=slave_fd,
+                                       start_new_session=True)
+        finally:
+            os.close(slave_fd)
+        try:
+            return self._wait_for(process, lambda: forward_output(master_fd, write),
+                                  watchdog)
+        finally:
+            os.close(master_fd)
+
+
+# ---------------------------------------------------------------------------
+# PROCESS RUNNER FACTORY:
+# ---------------------------------------------------------------------------
+_thread_state = threading.local()
+
+
+@contextmanager
+def use_process_runner(runner):
+    """Uses this process runner for the commands of the current thread
+    (instead of the configured one), like: the bridge of the asyncio API.
+    """
+    previous = getattr(_thread_state, "runner", None)
+    _thread_state.runner = runner
+    try:
+        yield runner
+    finally:
+        _thread_state.runner = previous
+
+
+@contextmanager
+def use_placement(placement):
+    """Uses this placement (CPU set, priority) for the processes that are
+    started by the current thread (see: :mod:`cmake_build.placement`).
+    """
+    previous = getattr(_thread_state, "placement", None)
+    _thread_state.placement = placement
+    try:
+        yield placement
+    finally:
+        _thread_state.placement = previous
+
+
+def process_runner_mode(config):
+    """Process runner mode from config-param ``process_runner``.
+
+    :return: "shell" or "direct"
+    """
+    mode = str(config.get("process_runner") or "shell").strip().lower()
+    if mode not in PROCESS_RUNNER_MODES:
+        return "shell"
+    return mode
+
+
+def make_run_options(config):
+    """Options of a process runner from the run config (like: ``ctx.run()``).
+
+    :param config:  Config object (normally: ctx.config).
+    :return: Dict with echo, env, dry, hide and warn.
+    """
+    run_config = config.get("run") or {}
+    env = None
+    if run_config.get("env"):
+        # -- HINT: Like ctx.run(), the environment is extended (or replaced).
+        env = dict(run_config.get("env"))
+        if not run_config.get("replace_env"):
+            env = dict(os.environ, **env)
+    return dict(echo=run_config.get("echo", True), env=env,
+                dry=bool(run_config.get("dry")),
+                hide=run_config.get("hide"),
+                warn=bool(run_config.get("warn")))
+
+
+def make_process_runner(config):
+    """Creates a :class:`ProcessRunner` if the config enables it.
+
+    :param config:  Config object (normally: ctx.config).
+    :return: ProcessRunner object or None (if the shell runner is used).
+    """
+    # pylint: disable=import-outside-toplevel
+    from .build_log import build_log_enabled
+    from .placement import placement_enabled
+    from .progress import progress_dashboard_enabled
+    from .scheduler import concurrent_units
+    from .watchdog import phase_timeouts_enabled
+    runner = getattr(_thread_state, "runner", None)
+    if runner is not None:
+        return runner
+    if (process_runner_mode(config) != "direct" and
+            not build_log_enabled(config) and
+            not progress_dashboard_enabled(config) and
+            not phase_timeouts_enabled(config) and
+            not placement_enabled(config) and
+            concurrent_units(config) <= 1 and
+            threading.current_thread() is threading.main_thread()):
+        # -- HINT: Build logs need the direct process runner (bounded memory).
+        # Phase timeouts and placements need it (no shell in between).
+        # Concurrent units need it, too (no "cd", can be cancelled),
+        # like: commands from worker threads (of a pipeline).
+        return None
+
+    use_pty = str(config.get("process_runner_pty") or "no").lower() in TRUE_VALUES
+    run_config = config.get("run") or {}
+    runner = ProcessRunner(use_pty=use_pty, **make_run_options(config))
+    echo_format = run_config.get("echo_format")
+    if echo_format:
+        runner.echo_format = echo_format
+    return runner
@@ -16,6 +16,9 @@ import sys
 from pathlib import Path
 from invoke import Program, Collection
 from invoke.config import Config, merge_dicts
+from invoke.parser import ParserContext
+from cmake_build.config_cache import get_config_file_cache
+from cmake_build.version import VERSION
 
 
 # ---------------------------------------------------------------------------
@@ -42,22 +45,30 @@ def parse_bool(text):
 # ---------------------------------------------------------------------------
 # CMAKE-BUILD TASKS:
 # ---------------------------------------------------------------------------
-from cmake_build import tasks as cmake_build_tasks
-from cmake_build.tasklet import cleanup
-from cmake_build.version import VERSION
+def make_namespace():
+    """Build the task namespace of cmake-build.
+
+    HINT: The task modules (and the CMake model layer that they use)
+    are only imported when the namespace is needed.
+    Core options, like ``--version``, can be processed without them.
+    """
+    # pylint: disable=import-outside-toplevel
+    from cmake_build import tasks as cmake_build_tasks
+    from cmake_build.tasklet import cleanup
 
-namespace = Collection.from_module(cmake_build_tasks)
-namespace.add_collection(Collection.from_module(cleanup))
-namespace.configure(cleanup.namespace.configuration())
-if USE_PYTHON_CLEANUP:
-    # -- OPTIONAL PART:
-    cleanup.cleanup_tasks.add_task(cleanup.clean_python)
+    namespace = Collection.from_module(cmake_build_tasks)
+    namespace.add_collection(Collection.from_module(cleanup))
+    namespace.configure(cleanup.namespace.configuration())
+    if USE_PYTHON_CLEANUP:
+        # -- OPTIONAL PART:
+        cleanup.cleanup_tasks.add_task(cleanup.clean_python)
 
-if sys.platform.startswith("win"):
-    # -- OVERRIDE SETTINGS: For platform=win32, ... (Windows)
-    namespace.configure({"run": dict(echo=True, pty=False)})
-else:
-    namespace.configure({"run": dict(echo=True, pty=True)})
+    if sys.platform.startswith("win"):
+        # -- OVERRIDE SETTINGS: For platform=win32, ... (Windows)
+        namespace.configure({"run": dict(echo=True, pty=False)})
+    else:
+        namespace.configure({"run": dict(echo=True, pty=True)})
+    return namespace
 
 
 # ---------------------------------------------------------------------------
@@ -80,6 +91,7 @@ class CMakeBuildProgramConfig(Config):
     prefix = "cmake_build"
     file_prefix = "cmake_build"
     # env_prefix = "CMAKE_BUILD"
+    located_config_files = {}   # -- CACHE: (cwd, inherits) => config_file
 
     def __init__(self, **kwargs):
         # -- ENSURE: Can use config="cmake_build.yaml" (via: system_prefix)
@@ -106,16 +118,26 @@ class CMakeBuildProgramConfig(Config):
 
     @classmethod
     def locate_config_file(cls):
-        """Hunt for config-file in current working directory (cwd) and upword."""
+        """Hunt for config-file in current working directory (cwd) and upword.
+        The result is remembered (walk the directory tree only once).
+        """
         cwd = Path.cwd()
+        inherits_config_file = parse_bool(
+            os.environ.get("CMAKE_BUILD_INHERIT_CONFIG_FILE", "yes"))
+        cache_key = (str(cwd), inherits_config_file)
+        if cache_key not in cls.located_config_files:
+            config_file = cls._locate_config_file(cwd, inherits_config_file)
+            cls.located_config_files[cache_key] = config_file
+        return cls.located_config_files[cache_key]
+
+    @classmethod
+    def _locate_config_file(cls, cwd, inherits_config_file=True):
         config_filename = Path("{0}.yaml".format(cls.file_prefix))
         config_file = cwd/config_filename
         if config_file.exists():
             return config_file
 
         # -- MAYBE: INHERIT CONFIG-FILE FROM BASE DIRECTORY (walk towards root-dir)
-        inherits_config_file = parse_bool(
-            os.environ.get("CMAKE_BUILD_INHERIT_CONFIG_FILE", "yes"))
         if inherits_config_file and not config_file.exists():
             for base_dir in cwd.parents:
                 config_file = base_dir/config_filename
@@ -144,6 +166,11 @@ class CMakeBuildProgramConfig(Config):
         # print("SELECT-CONFIG-FILE: system_prefix={0}".format(system_prefix))
         return system_prefix
 
+    def _load_yaml(self, path):
+        # -- OPTIMIZATION: Reuse snapshot of unchanged config-file (no YAML parsing).
+        parse_func = super(CMakeBuildProgramConfig, self)._load_yaml
+        return get_config_file_cache().load(path, parse_func)
+
     @staticmethod
     def global_defaults():
         their_defaults = Config.global_defaults()
@@ -156,28 +183,78 @@ class CMakeBuildProgramConfig(Config):
         return merge_dicts(their_defaults, my_defaults)
 
 
-# class CMakeBuildProgram(Program):
-#     """cmake-build, a thin wrapper around CMake to simplify using CMake.
-#     Makes CMake to a build system that retrieves its configuration from
-#     a configuration file ("cmake-build.yaml").
-#     """
-#     name = "cmake-build"
-#     version = "0.1.0"
-#
-#     def __init__(self, **kwargs):
-#         cmake_build_namespace = kwargs.pop("namespace", namespace)
-#         super(CMakeBuildProgram, self).__init__(version=self.version,
-#                         name=self.name,
-#                         namespace=cmake_build_namespace,
-#                         config_class=CMakeBuildProgramConfig,
-#                         **kwargs)
-
-
-# program = CMakeBuildProgram()
+class CMakeBuildProgram(Program):
+    """cmake-build, a thin wrapper around CMake to simplify using CMake.
+    Makes CMake to a build system that retrieves its configuration from
+    a configuration file ("cmake_build.yaml").
+
+    The task namespace is created on first use (by :attr:`namespace_factory`)
+    to keep the startup time small.
+    """
+
+    def __init__(self, namespace_factory=None, **kwargs):
+        self._namespace = None
+        self.namespace_factory = namespace_factory or make_namespace
+        super(CMakeBuildProgram, self).__init__(**kwargs)
+
+    @property
+    def namespace(self):
+        if self._namespace is None and self.namespace_factory:
+            # -- LAZY-LOAD: Task modules and their collaborators.
+            self._namespace = self.namespace_factory()
+        return self._namespace
+
+    @namespace.setter
+    def namespace(self, value):
+        self._namespace = value
+
+    @property
+    def namespace_loaded(self):
+        return self._namespace is not None
+
+    @property
+    def initial_context(self):
+        # -- BUNDLED NAMESPACE MODE: Without task_args().
+        # HINT: Avoid loading the namespace only to parse the core options.
+        return ParserContext(args=self.core_args())
+
+    def execute(self):
+        # -- DELETE TRASH: Left behind by aborted runs (if trash is used).
+        from cmake_build.trash import recover_trash_orphans
+        config = getattr(self, "config", None)
+        root_dir = None
+        if config is not None:
+            root_dir = config.get("config_dir")
+        recover_trash_orphans(root_dir)
+        try:
+            super(CMakeBuildProgram, self).execute()
+        finally:
+            # -- DELETE TRASH: Removed build directories (if trash is used).
+            from cmake_build.trash import flush_trash
+            flush_trash()
+            progress = sys.modules.get("cmake_build.progress")
+            if progress is not None:
+                # -- SHOW: Final state of the progress dashboard (if used).
+                progress.close_progress_dashboard()
+            workspace_store = sys.modules.get("cmake_build.workspace_store")
+            if workspace_store is not None:
+                # -- WRITE: Changes of this run in one transaction (batched).
+                workspace_store.commit_workspace_stores()
+            journal = sys.modules.get("cmake_build.journal")
+            if journal is not None:
+                # -- FORGET: Run journal of this run (and its fingerprints).
+                journal.reset_run_journal()
+            tasks = sys.modules.get("cmake_build.tasks")
+            if tasks is not None:
+                # -- FORGET: Remembered settings and cached CMake projects.
+                # HINT: Needed if the program is run more than once (in-process).
+                tasks.CMakeBuildTask.task_settings.clear()
+
+
 setup_environment_aliases4cmake_build()
-program = Program(version=VERSION, namespace=namespace,
-                  name="cmake-build", binary="cmake-build",
-                  config_class=CMakeBuildProgramConfig)
+program = CMakeBuildProgram(version=VERSION,
+                            name="cmake-build", binary="cmake-build",
+                            config_class=CMakeBuildProgramConfig)
 
 
 # ---------------------------------------------------------------------------
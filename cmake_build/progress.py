@@ -0,0 +1,346 @@
+# -*- coding: UTF-8 -*-
+"""
+Progress dashboard: Shows one row per unit (project and build_config)
+with its phase, the build progress (parsed from the output), the elapsed time
+and an ETA (based on the last duration of this step of the unit).
+
+* TTY: The rows are redrawn at the bottom of the terminal (rate-limited).
+  Other output is written above the rows.
+* Otherwise: A one-line summary is printed periodically
+  (also without output, see: ``SUMMARY_INTERVAL``).
+
+The output of the commands is not shown on the console (use build logs,
+see: :mod:`cmake_build.build_log`). Output lines are only parsed for progress:
+
+* ninja: ``[12/345] Building CXX object ...``
+* make:  ``[ 42%] Building CXX object ...``
+
+.. code-block:: yaml
+
+    # -- FILE: cmake_build.yaml
+    progress_dashboard: true    # OR: CMAKE_BUILD_PROGRESS_DASHBOARD=yes
+"""
+
+from __future__ import absolute_import, print_function
+import re
+import sys
+import threading
+import time
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+NINJA_PROGRESS_PATTERN = re.compile(br"^\[(\d+)/(\d+)\]")
+MAKE_PROGRESS_PATTERN = re.compile(br"^\[\s*(\d+)%\]")
+TTY_RENDER_INTERVAL = 0.25      # in seconds.
+TTY_TICK_INTERVAL = 1.0         # in seconds (updates elapsed time/ETA).
+SUMMARY_INTERVAL = 10.0         # in seconds (when stdout is not a TTY).
+TRUE_VALUES = ("y", "yes", "true", "on", "1")
+CURSOR_UP_AND_CLEAR = "\033[{0}F\033[J"
+
+
+# ---------------------------------------------------------------------------
+# UTILITY FUNCTIONS:
+# ---------------------------------------------------------------------------
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    seconds = int(max(0, seconds))
+    if seconds >= 3600:
+        return "%d:%02d:%02d" % (seconds // 3600, (seconds % 3600) // 60, seconds % 60)
+    return "%d:%02d" % (seconds // 60, seconds % 60)
+
+
+def parse_progress(line):
+    """Parses the build progress from an output line.
+
+    :return: Tuple (done, total) or None.
+    """
+    if not line.startswith(b"["):
+        return None
+    matched = NINJA_PROGRESS_PATTERN.match(line)
+    if matched:
+        return (int(matched.group(1)), int(matched.group(2)))
+    matched = MAKE_PROGRESS_PATTERN.match(line)
+    if matched:
+        return (int(matched.group(1)), 100)
+    return None
+
+
+def progress_dashboard_enabled(config):
+    value = config.get("progress_dashboard")
+    return value is True or str(value).strip().lower() in TRUE_VALUES
+
+
+# ---------------------------------------------------------------------------
+# PROGRESS MODEL:
+# ---------------------------------------------------------------------------
+class UnitProgress(object):
+    """Progress of one unit (project and build_config)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.phase = None
+        self.status = "queued"
+        self.done = None
+        self.total = None
+        self.started = None
+        self.finished = None
+        self.expected_duration = None
+
+    @property
+    def running(self):
+        return self.status == "running"
+
+    def start(self, phase, expected_duration=None, now=None):
+        self.phase = phase
+        self.status = "running"
+        self.done = self.total = None
+        self.started = now or time.time()
+        self.finished = None
+        self.expected_duration = expected_duration
+
+    def finish(self, status, now=None):
+        self.status = status
+        self.finished = now or time.time()
+
+    def elapsed(self, now=None):
+        if self.started is None:
+            return None
+        return (self.finished or now or time.time()) - self.started
+
+    def eta(self, now=None):
+        """Estimated remaining time (or None, if unknown)."""
+        if not self.running:
+            return None
+        elapsed = self.elapsed(now)
+        if self.expected_duration:
+            return max(0, self.expected_duration - elapsed)
+        elif self.done and self.total:
+            return elapsed * (self.total - self.done) / float(self.done)
+        return None
+
+    def format_progress(self):
+        if self.done is None or not self.total:
+            return ""
+        if self.total == 100:
+            return "[%3d%%]" % self.done
+        return "[%d/%d]" % (self.done, self.total)
+
+    def as_row(self, now=None):
+        eta = self.eta(now)
+        return (self.name, self.phase or "-", self.status,
+                self.format_progress(),
+                format_duration(self.elapsed(now)),
+                "ETA %s" % format_duration(eta) if eta is not None else "")
+
+
+class UnitOutputParser(object):
+    """Line observer for a build log: Updates the progress of a unit."""
+
+    def __init__(self, dashboard, unit):
+        self.dashboard = dashboard
+        self.unit = unit
+
+    def __call__(self, line):
+        progress = parse_progress(line)
+        if progress is not None:
+            self.unit.done, self.unit.total = progress
+            self.dashboard.render()
+
+
+# ---------------------------------------------------------------------------
+# PROGRESS DASHBOARD:
+# ---------------------------------------------------------------------------
+class DashboardStream(object):
+    """Replaces sys.stdout while the dashboard is shown (TTY mode):
+    Other output is written above the dashboard rows
+    (the rows are redrawn after each complete line).
+    """
+
+    def __init__(self, dashboard, stream):
+        self.dashboard = dashboard
+        self.stream = stream
+
+    def write(self, text):
+        if not text:
+            return 0
+        with self.dashboard.lock:
+            self.dashboard.erase()
+            count = self.stream.write(text)
+            # -- HINT: Rows are not drawn after a partial line (until newline).
+            self.dashboard.partial_line = not text.endswith("\n")
+            self.dashboard.draw_rows()
+            return count
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class ProgressDashboard(object):
+    """Shows the progress of many units (rate-limited).
+
+    :param stream:      Output stream (default: sys.stdout).
+    :param tty:         TTY mode (default: if stream is a TTY).
+    :param interval:    Minimal time between two updates (in seconds).
+    """
+
+    def __init__(self, stream=None, tty=None, interval=None):
+        self.stream = stream or sys.stdout
+        if tty is None:
+            isatty = getattr(self.stream, "isatty", None)
+            tty = bool(isatty and isatty())
+        self.tty = tty
+        if interval is None:
+            interval = TTY_RENDER_INTERVAL if tty else SUMMARY_INTERVAL
+        self.interval = interval
+        self.units = []
+        self.lock = threading.RLock()
+        self._units_map = {}
+        self._last_render = 0
+        self._drawn_lines = 0
+        self._last_summary = None
+        self._saved_stdout = None
+        self._ticker = None
+        self._stopped = threading.Event()
+        self.partial_line = False
+
+    def get_unit(self, name):
+        with self.lock:
+            unit = self._units_map.get(name)
+            if unit is None:
+                unit = UnitProgress(name)
+                self._units_map[name] = unit
+                self.units.append(unit)
+            return unit
+
+    def start_unit(self, name, phase, expected_duration=None):
+        """Marks the start of a phase of a unit.
+
+        :return: Line observer that parses the output (for a BuildLog).
+        """
+        unit = self.get_unit(name)
+        unit.start(phase, expected_duration=expected_duration)
+        self.install()
+        self.render(force=True)
+        return UnitOutputParser(self, unit)
+
+    def finish_unit(self, name, status):
+        self.get_unit(name).finish(status)
+        self.render(force=True)
+
+    # -- RENDERING:
+    def install(self):
+        """Redirects sys.stdout (in TTY mode) to keep the rows at the bottom.
+        Starts the ticker that updates the dashboard (also without output).
+        """
+        if self.tty and self._saved_stdout is None:
+            self._saved_stdout = sys.stdout
+            sys.stdout = DashboardStream(self, self.stream)
+        if self._ticker is None:
+            self._stopped.clear()
+            self._ticker = threading.Thread(target=self._tick,
+                                            name="progress-dashboard")
+            self._ticker.daemon = True
+            self._ticker.start()
+
+    def _tick(self):
+        interval = max(self.interval, TTY_TICK_INTERVAL) if self.tty \
+            else self.interval
+        while not self._stopped.wait(interval):
+            if any(unit.running for unit in self.units):
+                self.render(force=True)
+
+    def draw_rows(self, now=None):
+        """Draws the rows (in TTY mode; after erasing the previous rows)."""
+        if self.partial_line:
+            return
+        rows = self.make_rows(now)
+        for row in rows:
+            self.stream.write(row + "\n")
+        self._drawn_lines = len(rows)
+
+    def erase(self):
+        if self._drawn_lines:
+            self.stream.write(CURSOR_UP_AND_CLEAR.format(self._drawn_lines))
+            self._drawn_lines = 0
+
+    def make_rows(self, now=None):
+        now = now or time.time()
+        rows = [unit.as_row(now) for unit in self.units]
+        if not rows:
+            return []
+        widths = [max(len(row[index]) for row in rows)
+                  for index in range(len(rows[0]))]
+        return ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+                for row in rows]
+
+    def make_summary(self, now=None):
+        now = now or time.time()
+        finished = [unit for unit in self.units if unit.finished]
+        running = [unit for unit in self.units if unit.running]
+        parts = ["%d/%d units finished" % (len(finished), len(self.units))]
+        for unit in running:
+            parts.append(" ".join(cell for cell in unit.as_row(now) if cell))
+        return "PROGRESS: " + " | ".join(parts)
+
+    def render(self, force=False):
+        now = time.time()
+        if not force and now - self._last_render < self.interval:
+            return
+        with self.lock:
+            self._last_render = now
+            if self.tty:
+                self.erase()
+                self.draw_rows(now)
+            elif self.units:
+                summary = self.make_summary(now)
+                if summary == self._last_summary:
+                    return      # -- UNCHANGED: Avoid repeated lines.
+                self._last_summary = summary
+                self.stream.write(summary + "\n")
+            self.stream.flush()
+
+    def close(self):
+        """Shows the final state (and restores sys.stdout)."""
+        self._stopped.set()
+        if self._ticker is not None:
+            self._ticker.join()
+            self._ticker = None
+        with self.lock:
+            if self._saved_stdout is not None:
+                sys.stdout = self._saved_stdout
+                self._saved_stdout = None
+            if self.tty:
+                self.erase()
+                if self.partial_line:
+                    self.stream.write("\n")
+                    self.partial_line = False
+                if self.units:
+                    for row in self.make_rows():
+                        self.stream.write(row + "\n")
+                    self.stream.flush()
+            elif self.units:
+                self.render(force=True)
+
+
+# ---------------------------------------------------------------------------
+# SHARED PROGRESS DASHBOARD:
+# ---------------------------------------------------------------------------
+_progress_dashboard = None
+
+
+def get_progress_dashboard(config):
+    """Provides the shared :class:`ProgressDashboard` (or None, if disabled)."""
+    global _progress_dashboard  # pylint: disable=global-statement
+    if _progress_dashboard is None and progress_dashboard_enabled(config):
+        _progress_dashboard = ProgressDashboard()
+    return _progress_dashboard
+
+
+def close_progress_dashboard():
+    global _progress_dashboard  # pylint: disable=global-statement
+    if _progress_dashboard is not None:
+        _progress_dashboard.close()
+        _progress_dashboard = None
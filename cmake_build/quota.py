@@ -0,0 +1,416 @@
+# -*- coding: UTF-8 -*-
+"""
+Keeps the disk space that is used by the build directories of a workspace
+below a quota (config-param: ``build_dir_quota``, like: "20G").
+
+Each build directory has a small usage data-file with its owning
+build_config, the time of its last use and its size (if known).
+If the quota is exceeded, build directories are evicted in this order:
+
+1. Stale build directories: Their build_config is no longer configured.
+2. Least recently used (LRU) build directories.
+
+Build directories of pinned build_configs (like: the current build_config)
+are never evicted.
+
+.. code-block:: yaml
+
+    # -- FILE: cmake_build.yaml
+    build_dir_quota: 20G    # OR: 500M, 1024K, ... (as bytes: 2000000)
+
+HINT: Use ``CMAKE_BUILD_BUILD_DIR_QUOTA=20G`` to override it.
+"""
+
+from __future__ import absolute_import, print_function
+import os
+import re
+import time
+from path import Path
+from .cmake_util import make_build_dir_from_schema
+from .config import CMakeProjectPersistConfig
+from .persist import PersistentData
+from .pathutil import directory_size, format_size, posixpath_normpath
+from .trash import remove_tree
+from .workspace_store import get_workspace_store
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+BUILD_CONFIG_PLACEHOLDER = "{BUILD_CONFIG}"
+
+
+# ---------------------------------------------------------------------------
+# UTILITY FUNCTIONS:
+# ---------------------------------------------------------------------------
+def parse_size(text):
+    """Parses a size, like "20G", "500M", "1024K" or "2000" (bytes).
+
+    :param text: Size as string or number (or None).
+    :return: Size in bytes (as int) or None (for: no size).
+    :raises ValueError: If the size is invalid.
+    """
+    if text is None or text == "":
+        return None
+    elif isinstance(text, int):
+        return text
+
+    matched = re.match(r"^\s*(\d+(?:\.\d+)?)\s*([BKMGT]?)(?:i?B)?\s*$",
+                       str(text), re.IGNORECASE)
+    if not matched:
+        raise ValueError("INVALID SIZE: %s (expected: 20G, 500M, ...)" % text)
+    number, unit = matched.groups()
+    return int(float(number) * SIZE_UNITS[unit.upper()])
+
+
+def make_build_dir_pattern(build_dir_schema):
+    """Make a regexp to match build directory names (with build_config name).
+
+    :return: Regular expression object or None (if not supported).
+    """
+    if BUILD_CONFIG_PLACEHOLDER not in os.path.basename(build_dir_schema):
+        return None
+    prefix, suffix = os.path.basename(build_dir_schema).split(
+        BUILD_CONFIG_PLACEHOLDER, 1)
+    return re.compile("^{0}(?P<build_config>.+){1}$".format(
+        re.escape(prefix), re.escape(suffix)))
+
+
+# ---------------------------------------------------------------------------
+# BUILD DIRECTORY USAGE:
+# ---------------------------------------------------------------------------
+class BuildDirUsage(PersistentData):
+    """Usage data of a build directory (kept in the build directory).
+
+    * build_config: Name of the owning build_config.
+    * last_used:    Time of its last use (as seconds since epoch).
+    * size:         Size of the build directory (None: unknown).
+    * results:      Last result per step (status, finished, duration).
+    * sources_fingerprint: Fingerprint of the sources of the last build.
+    """
+    FILE_BASENAME = ".cmake_build.usage.json"
+
+    @classmethod
+    def make_filename(cls, build_dir):
+        return Path(build_dir)/cls.FILE_BASENAME
+
+    @property
+    def build_config(self):
+        return self.data.get("build_config")
+
+    @property
+    def last_used(self):
+        return self.data.get("last_used") or 0
+
+    @property
+    def size(self):
+        return self.data.get("size")
+
+    def mark_used(self, build_config, now=None, size_changed=False):
+        """Marks the build directory as used (now).
+        Its last size is kept, unless this use changed it.
+
+        :param size_changed: If true, the size becomes unknown (changed).
+        """
+        self.data["build_config"] = build_config
+        self.data["last_used"] = now or time.time()
+        if size_changed:
+            self.data["size"] = None
+        return self.save()
+
+    @property
+    def sources_fingerprint(self):
+        return self.data.get("sources_fingerprint")
+
+    def get_result(self, step):
+        """Last result of a step (as dict: status, finished, duration) or None."""
+        return (self.data.get("results") or {}).get(step)
+
+    def is_same_result(self, step, status, sources_fingerprint=None):
+        """Indicates if a step passed before with the same sources.
+        Then, this step did not change the build directory (like: up-to-date build).
+        """
+        result = self.get_result(step)
+        return bool(result and status == "passed" and
+                    result.get("status") == status and sources_fingerprint and
+                    sources_fingerprint == self.sources_fingerprint)
+
+    def set_result(self, step, status, duration=None, now=None,
+                   sources_fingerprint=None):
+        # pylint: disable=too-many-arguments
+        results = self.data.setdefault("results", {})
+        results[step] = dict(status=status, finished=now or time.time(),
+                             duration=duration)
+        if sources_fingerprint:
+            self.data["sources_fingerprint"] = sources_fingerprint
+
+    def update_size(self, size):
+        self.data["size"] = size
+        return self.save()
+
+
+class BuildDirInfo(object):
+    """Information about a build directory (used by the quota checks)."""
+
+    def __init__(self, build_dir, build_config=None, last_used=0,
+                 size=None, usage=None, workspace_store=None):
+        # pylint: disable=too-many-arguments
+        self.build_dir = Path(build_dir)
+        self.build_config = build_config
+        self.last_used = last_used
+        self._size = size
+        self.usage = usage
+        self.workspace_store = workspace_store
+        self.stale = False
+        self.pinned = False
+
+    @property
+    def size(self):
+        """Size of the build directory (computed on first use, if unknown)."""
+        if self._size is None:
+            self._size = directory_size(self.build_dir)
+            # -- REMEMBER: Size until the next use of the build directory.
+            if self.usage is not None:
+                self.usage.update_size(self._size)
+            if self.workspace_store is not None:
+                self.workspace_store.update_size(self.build_dir, self._size,
+                                                 build_config=self.build_config,
+                                                 last_used=self.last_used or None)
+        return self._size
+
+    @property
+    def relpath(self):
+        return posixpath_normpath(self.build_dir.relpath())
+
+
+def discover_build_dirs(ctx, project_dirs):
+    """Discover the build directories of the projects.
+    A build directory is detected by its stored config or its usage data-file.
+    The usage data is read from the workspace store (if it is used and
+    knows the build directory) instead of the usage data-files.
+
+    :param ctx:             Context object to use.
+    :param project_dirs:    Project directories to use.
+    :return: List of :class:`BuildDirInfo` objects.
+    """
+    stored_config_basename = CMakeProjectPersistConfig.FILE_BASENAME
+    build_dir_schema = make_build_dir_from_schema(ctx.config,
+                                                  BUILD_CONFIG_PLACEHOLDER)
+    build_dir_pattern = make_build_dir_pattern(build_dir_schema)
+    if build_dir_pattern is None:
+        print("BUILD-DIR-QUOTA: Unsupported build_dir_schema=%s (SKIPPED)" %
+              build_dir_schema)
+        return []
+
+    candidates = []
+    for project_dir in project_dirs:
+        parent_dir = Path(project_dir)/os.path.dirname(build_dir_schema)
+        try:
+            entries = sorted(os.scandir(str(parent_dir)), key=lambda e: e.name)
+        except OSError:
+            continue
+
+        for entry in entries:
+            matched = build_dir_pattern.match(entry.name)
+            if matched and entry.is_dir(follow_symlinks=False):
+                candidates.append((entry, matched))
+
+    workspace_store = get_workspace_store(ctx.config)
+    stored_usages = {}
+    if workspace_store is not None:
+        stored_usages = workspace_store.get_usage(
+            [entry.path for entry, _ in candidates])
+
+    build_dirs = []
+    for entry, matched in candidates:
+        stored_usage = stored_usages.get(os.path.abspath(entry.path))
+        if stored_usage is not None:
+            # -- CASE: Usage data from the workspace store (no file is read).
+            last_used = stored_usage.get("last_used")
+            if not last_used:
+                last_used = entry.stat(follow_symlinks=False).st_mtime
+            build_config = (stored_usage.get("build_config") or
+                            matched.group("build_config"))
+            build_dirs.append(BuildDirInfo(entry.path, build_config,
+                                           last_used=last_used,
+                                           size=stored_usage.get("size"),
+                                           workspace_store=workspace_store))
+            continue
+
+        usage_filename = BuildDirUsage.make_filename(entry.path)
+        has_usage = usage_filename.exists()
+        if not (has_usage or
+                os.path.exists(os.path.join(entry.path, stored_config_basename))):
+            continue    # -- NOT A BUILD DIRECTORY OF cmake-build.
+
+        try:
+            usage = BuildDirUsage.load(usage_filename)
+        except ValueError:
+            usage = BuildDirUsage(usage_filename)
+        last_used = usage.last_used
+        if not last_used:
+            last_used = entry.stat(follow_symlinks=False).st_mtime
+        build_config = usage.build_config or matched.group("build_config")
+        build_dirs.append(BuildDirInfo(entry.path, build_config,
+                                       last_used=last_used,
+                                       size=usage.size, usage=usage,
+                                       workspace_store=workspace_store))
+    return build_dirs
+
+
+# ---------------------------------------------------------------------------
+# BUILD DIRECTORY QUOTA:
+# ---------------------------------------------------------------------------
+def select_evictions(build_dirs, quota=None, remove_stale=False):
+    """Select the build directories to evict (stale ones first, then LRU).
+    Pinned build directories are never selected.
+
+    :param build_dirs:  Build directories (as list of BuildDirInfo).
+    :param quota:       Quota in bytes (or None: no quota).
+    :param remove_stale: If true, stale build directories are always selected.
+    :return: List of (build_dir_info, reason) tuples.
+    """
+    evictions = []
+    candidates = [b for b in build_dirs if not b.pinned]
+    stale_build_dirs = [b for b in candidates if b.stale]
+    lru_build_dirs = sorted([b for b in candidates if not b.stale],
+                            key=lambda b: b.last_used)
+
+    used_size = None
+    if quota is not None:
+        used_size = sum(b.size for b in build_dirs)
+
+    for build_dir in stale_build_dirs + lru_build_dirs:
+        over_quota = used_size is not None and used_size > quota
+        if build_dir.stale and (remove_stale or over_quota):
+            reason = "STALE: build_config=%s" % build_dir.build_config
+        elif over_quota:
+            reason = "LRU: quota=%s" % format_size(quota)
+        else:
+            continue
+
+        evictions.append((build_dir, reason))
+        if used_size is not None:
+            used_size -= build_dir.size
+    return evictions
+
+
+def collect_garbage(ctx, project_dirs, known_build_configs,
+                    pinned_build_configs=None, quota=None,
+                    remove_stale=True, dry_run=False):
+    """Evict build directories (stale ones, and LRU ones if over quota).
+
+    :param project_dirs:        Project directories to use.
+    :param known_build_configs: Configured build_config names (as set).
+    :param pinned_build_configs: Build_config names that are never evicted.
+    :param quota:               Quota in bytes (or None: no quota).
+    :param remove_stale:        If true, stale build directories are evicted.
+    :param dry_run:             Dry-run mode indicator (as bool).
+    :return: Evicted build directories (as list of BuildDirInfo).
+    """
+    # pylint: disable=import-outside-toplevel, too-many-arguments
+    from .locking import get_build_dir_lock
+    pinned_build_configs = set(pinned_build_configs or [])
+    build_dirs = discover_build_dirs(ctx, project_dirs)
+    for build_dir in build_dirs:
+        build_dir.stale = build_dir.build_config not in known_build_configs
+        build_dir.pinned = build_dir.build_config in pinned_build_configs
+        if dry_run:
+            # -- HINT: Dry-run mode writes no usage data (files, store).
+            build_dir.usage = None
+            build_dir.workspace_store = None
+
+    evictions = select_evictions(build_dirs, quota=quota,
+                                 remove_stale=remove_stale)
+    reclaimed_size = 0
+    removed = []
+    for build_dir, reason in evictions:
+        size = build_dir.size
+        if dry_run:
+            print("BUILD-DIR-GC: %s (%s; dry-run: %s would be reclaimed)" % (
+                build_dir.relpath, reason, format_size(size)))
+            reclaimed_size += size
+            removed.append(build_dir)
+            continue
+
+        # -- HINT: Build directories in use (by other processes) are skipped.
+        build_dir_lock = get_build_dir_lock(build_dir.build_dir, ctx.config)
+        if build_dir_lock is not None and not build_dir_lock.try_acquire():
+            print("BUILD-DIR-GC: %s (SKIPPED: locked)" % build_dir.relpath)
+            continue
+        try:
+            print("BUILD-DIR-GC: %s (%s; %s reclaimed)" % (
+                build_dir.relpath, reason, format_size(size)))
+            remove_tree(build_dir.build_dir)
+            if build_dir.workspace_store is not None:
+                build_dir.workspace_store.forget(build_dir.build_dir)
+        finally:
+            if build_dir_lock is not None:
+                build_dir_lock.release()
+        reclaimed_size += size
+        removed.append(build_dir)
+
+    if removed:
+        reclaimed = "%s reclaimed" % format_size(reclaimed_size)
+        if dry_run:
+            reclaimed = "dry-run: %s would be reclaimed" % format_size(reclaimed_size)
+        print("BUILD-DIR-GC: %d build directories (%s)" % (len(removed), reclaimed))
+    return removed
+
+
+def gc_build_dirs(ctx, projects="all", build_config=None, quota=None,
+                  remove_stale=True, dry_run=False):
+    """Evict the build directories of the projects (if needed).
+    The current build_config (and the selected ones) are pinned.
+
+    :param ctx:             Context object to use.
+    :param projects:        Projects to use (default: "all").
+    :param build_config:    Selected build_config (or alias) to pin.
+    :param quota:           Quota in bytes (or None: no quota).
+    :param remove_stale:    If true, stale build directories are evicted.
+    :param dry_run:         Dry-run mode indicator (as bool).
+    :return: Evicted build directories (as list of BuildDirInfo).
+    """
+    # pylint: disable=import-outside-toplevel, too-many-arguments
+    from .model_builder import BUILD_CONFIG_DEFAULT, \
+        cmake_select_project_dirs, cmake_select_build_configs, \
+        make_build_configs_map4config, make_build_config_host_map, \
+        normalize_build_config_name
+
+    build_configs_map = make_build_configs_map4config(ctx.config)
+    known_build_configs = set(normalize_build_config_name(name)
+                              for name in build_configs_map)
+    known_build_configs.update(make_build_config_host_map())
+
+    current_build_config = ctx.config.build_config or BUILD_CONFIG_DEFAULT
+    pinned_build_configs = set([current_build_config])
+    pinned_build_configs.update(cmake_select_build_configs(
+        ctx, build_config or current_build_config))
+    pinned_build_configs = set(normalize_build_config_name(name)
+                               for name in pinned_build_configs)
+
+    project_dirs = list(cmake_select_project_dirs(ctx, projects, strict=False))
+    return collect_garbage(ctx, project_dirs, known_build_configs,
+                           pinned_build_configs=pinned_build_configs,
+                           quota=quota, remove_stale=remove_stale,
+                           dry_run=dry_run)
+
+
+def enforce_build_dir_quota(ctx, projects="all", build_config=None):
+    """Pre-build check: Evicts build directories if the quota is exceeded.
+    Does nothing if no ``build_dir_quota`` is configured.
+
+    :raises invoke.exceptions.Exit: If the build_dir_quota is invalid.
+    """
+    # pylint: disable=import-outside-toplevel
+    from invoke.exceptions import Exit
+    try:
+        quota = parse_size(ctx.config.get("build_dir_quota"))
+    except ValueError as e:
+        raise Exit(str(e))
+    if quota is None:
+        return []
+    dry_run = ctx.config.run.dry or False
+    return gc_build_dirs(ctx, projects, build_config=build_config, quota=quota,
+                         remove_stale=False, dry_run=dry_run)
@@ -0,0 +1,338 @@
+# -*- coding: UTF-8 -*-
+"""
+Runs units (one CMake project with one build_config) of a task,
+sequentially or concurrently (with a bounded number of workers).
+
+Failure policies:
+
+* fail-fast (default): The first failing unit cancels the run.
+  In-flight commands of other units are terminated (SIGTERM to their
+  process groups, SIGKILL after a grace period). Queued units are skipped.
+* keep-going: All units are run. The failures are reported at the end.
+
+A unit that exceeds its phase timeout has the status "timeout"
+(see: :mod:`cmake_build.watchdog`) and counts as failed unit.
+
+.. code-block:: yaml
+
+    # -- FILE: cmake_build.yaml
+    concurrent_units: 4         # Number of units that run at once (default: 1)
+    keep_going: false           # OR: Use task option --keep-going
+    cancel_grace_period: 5      # in seconds (between SIGTERM and SIGKILL)
+
+Concurrent units are started longest-first (see: :mod:`cmake_build.planner`).
+Each worker slot can have its own CPU set (see: :mod:`cmake_build.placement`).
+
+HINT: Concurrent units use the direct process runner
+(see: :mod:`cmake_build.process_runner`).
+The output of a unit is shown when it is finished (or use build logs).
+"""
+
+from __future__ import absolute_import, print_function
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+import sys
+import threading
+import time
+from .exceptions import UnitCancelled, UnitTimedOut, UnitsFailed
+from .planner import make_unit_plan
+from .placement import make_placement_pool
+from .process_runner import GRACE_PERIOD, running_processes, use_placement
+from .progress import progress_dashboard_enabled
+from .thread_output import ThreadOutputRouter, routed_thread_output
+from .watchdog import use_phase_timer
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+UNIT_STATUSES = ("passed", "failed", "timeout", "cancelled", "skipped", "resumed")
+FAILED_STATUSES = ("failed", "timeout")
+TRUE_VALUES = ("y", "yes", "true", "on", "1")
+
+
+# ---------------------------------------------------------------------------
+# UTILITY FUNCTIONS:
+# ---------------------------------------------------------------------------
+def concurrent_units(config):
+    """Number of units that run at once (from config-param ``concurrent_units``)."""
+    try:
+        return max(int(config.get("concurrent_units") or 1), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def keep_going_enabled(config):
+    value = config.get("keep_going")
+    return value is True or str(value).strip().lower() in TRUE_VALUES
+
+
+def describe_error(error):
+    reason = getattr(error, "reason", None)
+    if reason:
+        return str(reason)
+    command = getattr(getattr(error, "result", None), "command", None)
+    if command:
+        return "{0} (exit code: {1})".format(command, error.result.exited)
+    return str(error).strip() or error.__class__.__name__
+
+
+# ---------------------------------------------------------------------------
+# SCHEDULER MODEL:
+# ---------------------------------------------------------------------------
+class Unit(object):
+    """Work item of a task: a function for one CMake project (and build_config).
+
+    :param name:        Unit name, like: "p1/debug".
+    :param function:    Function to call (without params).
+    """
+
+    def __init__(self, name, function):
+        self.name = name
+        self.function = function
+
+    def is_done(self):
+        """Indicates if the unit is already done (like: in a resumed run)."""
+        return False
+
+    def finished(self, result):
+        """Called with the :class:`UnitResult` after the unit was run."""
+
+
+class ProjectUnit(Unit):
+    """Unit for one phase of a CMake project (and build_config).
+
+    :param cmake_project:   CMake project of this unit.
+    :param phase:           Phase name, like: build (normally: task name).
+    :param function:        Function with the cmake project as param.
+    """
+
+    def __init__(self, cmake_project, phase, function):
+        super(ProjectUnit, self).__init__(cmake_project.unit_name,
+                                          lambda: function(cmake_project))
+        self.cmake_project = cmake_project
+        self.phase = phase
+
+
+class UnitResult(object):
+    """Result of a unit (status: passed, failed, timeout, cancelled, skipped,
+    resumed).
+    """
+
+    def __init__(self, name, status, error=None, duration=None, output=""):
+        # pylint: disable=too-many-arguments
+        assert status in UNIT_STATUSES, "status=%s" % status
+        self.name = name
+        self.status = status
+        self.error = error
+        self.duration = duration
+        self.output = output
+
+    @property
+    def failed(self):
+        return self.status in FAILED_STATUSES
+
+    def describe(self):
+        text = "{0}: {1}".format(self.name, self.status.upper())
+        if self.error is not None and self.status != "skipped":
+            text += " -- {0}".format(describe_error(self.error))
+        elif self.status == "resumed":
+            text += " -- already done (with unchanged inputs)"
+        return text
+
+
+# ---------------------------------------------------------------------------
+# UNIT SCHEDULER:
+# ---------------------------------------------------------------------------
+class UnitScheduler(object):
+    """Runs the units of a task with a failure policy (fail-fast, keep-going).
+
+    .. code-block:: python
+
+        scheduler = UnitScheduler(max_workers=4, keep_going=False)
+        results = scheduler.run([Unit("p1/debug", build_p1), ...])
+        scheduler.raise_failures(results)
+
+    :param max_workers:     Number of units that run at once.
+    :param keep_going:      If true, failures do not cancel other units.
+    :param grace_period:    Time between SIGTERM and SIGKILL (in seconds).
+    :param capture_output:  If true, output of concurrent units is shown
+                            when the unit is finished (default: true).
+    :param placement_pool:  CPU set/priority per worker slot (optional).
+    """
+
+    def __init__(self, max_workers=1, keep_going=False,
+                 grace_period=GRACE_PERIOD, capture_output=True,
+                 placement_pool=None):
+        # pylint: disable=too-many-arguments
+        self.max_workers = max(int(max_workers), 1)
+        self.keep_going = keep_going
+        self.grace_period = grace_period
+        self.capture_output = capture_output
+        self.placement_pool = placement_pool
+        self.cancelled = threading.Event()
+        self._output_lock = threading.Lock()
+
+    @property
+    def concurrent(self):
+        return self.max_workers > 1
+
+    def run(self, units):
+        """Runs the units (and cancels the run on the first failure,
+        if fail-fast is used).
+
+        :return: List of :class:`UnitResult` objects (in order of units).
+        """
+        units = list(units)
+        self.cancelled.clear()
+        try:
+            if not self.concurrent or len(units) <= 1:
+                return [self.run_unit(unit) for unit in units]
+            elif not self.capture_output:
+                return self._run_concurrently(units)
+            with routed_thread_output():
+                return self._run_concurrently(units)
+        finally:
+            running_processes.reset()
+
+    def _run_concurrently(self, units):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.run_unit, units))
+
+    def run_unit(self, unit):
+        if self.cancelled.is_set():
+            return UnitResult(unit.name, "skipped")
+        elif unit.is_done():
+            print("CMAKE-BUILD: {0} (SKIPPED: already done, resumed)".format(unit.name))
+            return UnitResult(unit.name, "resumed")
+
+        buffer = None
+        if self.capture_output and isinstance(sys.stdout, ThreadOutputRouter):
+            buffer = StringIO()
+            ThreadOutputRouter.capture(buffer)
+        placement = None
+        if self.placement_pool is not None:
+            placement = self.placement_pool.acquire(unit.name)
+        start_time = time.time()
+        try:
+            # -- HINT: Total timeouts are per phase of the unit (not per command).
+            with use_placement(placement), use_phase_timer():
+                unit.function()
+            result = UnitResult(unit.name, "passed")
+        except UnitTimedOut as e:
+            result = UnitResult(unit.name, "timeout", error=e)
+        except UnitCancelled as e:
+            result = UnitResult(unit.name, "cancelled", error=e)
+        except Exception as e:  # pylint: disable=broad-except
+            result = UnitResult(unit.name, "failed", error=e)
+        finally:
+            if buffer is not None:
+                ThreadOutputRouter.release()
+            if placement is not None:
+                self.placement_pool.release(placement)
+        result.duration = time.time() - start_time
+        unit.finished(result)
+
+        if buffer is not None:
+            result.output = buffer.getvalue()
+            with self._output_lock:
+                sys.stdout.write(result.output)
+                sys.stdout.flush()
+        if result.failed and not self.keep_going:
+            self.cancel()
+        return result
+
+    def cancel(self):
+        """Cancels the run: Skips queued units and terminates running commands."""
+        if self.cancelled.is_set():
+            return
+        self.cancelled.set()
+        if self.concurrent:
+            running_processes.cancel(self.grace_period)
+
+    @staticmethod
+    def print_report(results, stream=None):
+        """Prints the aggregated failure report."""
+        stream = stream or sys.stdout
+        counts = dict((status, 0) for status in UNIT_STATUSES)
+        for result in results:
+            counts[result.status] += 1
+        print("CMAKE-BUILD: {0} units: {1}".format(len(results), ", ".join(
+            "{0} {1}".format(counts[status], status)
+            for status in UNIT_STATUSES if counts[status])), file=stream)
+        for result in results:
+            if result.status != "passed":
+                print("  {0}".format(result.describe()), file=stream)
+        stream.flush()
+
+    def raise_failures(self, results):
+        """Reports the failures (if any) and raises the failure.
+
+        :raises Exception: Error of the failed unit (if only one unit failed).
+        :raises cmake_build.exceptions.UnitsFailed: If many units failed.
+        """
+        failures = [result for result in results if result.failed]
+        if not failures:
+            return
+        if len(results) > 1:
+            self.print_report(results)
+        if len(failures) == 1:
+            raise failures[0].error
+        raise UnitsFailed(reason="{0} of {1} units ({2})".format(
+            len(failures), len(results),
+            ", ".join(result.name for result in failures)))
+
+
+# ---------------------------------------------------------------------------
+# SCHEDULER FACTORY:
+# ---------------------------------------------------------------------------
+def make_unit_scheduler(config, keep_going=None):
+    """Creates the :class:`UnitScheduler` for a task (from config).
+
+    :param config:      Config object (normally: ctx.config).
+    :param keep_going:  Failure policy override (from task options, optional).
+    """
+    if keep_going is None:
+        keep_going = keep_going_enabled(config)
+    grace_period = config.get("cancel_grace_period")
+    if grace_period in (None, ""):
+        grace_period = GRACE_PERIOD
+    # -- HINT: Progress dashboard shows the units (output is in build logs).
+    capture_output = not progress_dashboard_enabled(config)
+    max_workers = concurrent_units(config)
+    return UnitScheduler(max_workers, keep_going=keep_going,
+                         grace_period=float(grace_period),
+                         capture_output=capture_output,
+                         placement_pool=make_placement_pool(config, max_workers))
+
+
+def run_units(config, units, keep_going=None, dry_run=False, on_results=None):
+    """Runs the units of a task and raises the failure(s), if any.
+    Concurrent units are started in longest-first order.
+
+    :param dry_run: If true, the plan is shown (but the units are not run).
+    :param on_results:  Callback with units and results (before failures
+                        are raised, optional).
+    :return: List of :class:`UnitResult` objects (in order of units).
+    """
+    units = list(units)
+    scheduler = make_unit_scheduler(config, keep_going=keep_going)
+    ordered_units = units
+    if scheduler.concurrent or dry_run:
+        plan = make_unit_plan(units, scheduler.max_workers, config)
+        if dry_run:
+            plan.print_plan()
+            return []
+        ordered_units = plan.units
+
+    results = scheduler.run(ordered_units)
+    if ordered_units is not units:
+        positions = dict((id(unit), index) for index, unit in enumerate(units))
+        ordered_results = [None] * len(units)
+        for unit, result in zip(ordered_units, results):
+            ordered_results[positions[id(unit)]] = result
+        results = ordered_results
+    if on_results is not None:
+        on_results(units, results)
+    scheduler.raise_failures(results)
+    return results
@@ -0,0 +1,418 @@
+# -*- coding: UTF-8 -*-
+"""
+Deterministic CI sharding: Splits the units (project and build_config)
+of a task across N machines. Each machine runs its shard ``K/N``.
+
+The partition only depends on the unit names and the shard timings file
+(a merged results file of an earlier run), so each machine computes the
+same partition. A unit is partitioned by its name: All phases of a unit
+(build, test, ...) land on the same shard. Its weight is the sum of its
+durations (over all phases). The heaviest units are assigned first
+(to the lightest shard), so shards finish at about the same time.
+Units without timings weigh the average of the known units.
+Without timings, all units weigh the same.
+
+Each shard records its unit results in a shard results file.
+The ``merge-results`` task combines the shard results (and JUnit test reports)
+into one report.
+
+.. code-block:: sh
+
+    # -- ON CI MACHINE K (of 4):
+    $ cmake-build build -b all --shard=K/4 test --shard=K/4
+    $ cmake-build pipeline -b all --shard=K/4
+
+    # -- AFTERWARDS: Collect the shard results files (CI artifacts).
+    $ cmake-build merge-results --junit="*/ctest-junit.xml"
+
+.. code-block:: yaml
+
+    # -- FILE: cmake_build.yaml
+    shard: null                 # Shard to run, like: 1/4 (or: --shard option)
+    shard_results: .cmake_build.shard-{SHARD}-of-{SHARDS}.json
+    shard_timings: null     # Merged results file, like: .cmake_build.results.json
+
+HINT: The shard timings file must be the same on each machine
+(like: a CI artifact). Therefore, it is not used by default.
+"""
+
+from __future__ import absolute_import, print_function
+import glob
+import os
+import sys
+import time
+from xml.etree import ElementTree
+from .persist import PersistentData
+from .progress import format_duration
+from .scheduler import FAILED_STATUSES, UnitResult, UnitScheduler, \
+    describe_error
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+SHARD_RESULTS_SCHEMA = ".cmake_build.shard-{SHARD}-of-{SHARDS}.json"
+MERGED_RESULTS_BASENAME = ".cmake_build.results.json"
+
+
+# ---------------------------------------------------------------------------
+# UTILITY FUNCTIONS:
+# ---------------------------------------------------------------------------
+def parse_shard(value):
+    """Parses a shard description, like: "2/4" (shard 2 of 4 shards).
+
+    :return: Tuple (shard, shards) or None (if value is empty).
+    :raises ValueError: If the shard description is invalid.
+    """
+    if value is None or value is False or not str(value).strip():
+        return None
+    text = str(value).strip()
+    try:
+        shard, shards = [int(part) for part in text.split("/")]
+    except ValueError:
+        raise ValueError("BAD-SHARD: {0} (expected: K/N, like: 1/4)".format(text))
+    if not 1 <= shard <= shards:
+        raise ValueError("BAD-SHARD: {0} (expected: 1 <= K <= N)".format(text))
+    return (shard, shards)
+
+
+def make_key(unit_name, phase):
+    return "{0}:{1}".format(unit_name, phase)
+
+
+def _config_filename(config, name, default=None):
+    value = config.get(name, default)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    config_dir = config.get("config_dir")
+    if not isinstance(config_dir, str):
+        config_dir = "."
+    return os.path.join(config_dir, value)
+
+
+def load_shard_timings(config):
+    """Loads the unit timings (from config-param ``shard_timings``).
+
+    :return: Timings as dict: "{unit}:{phase}" -> duration (in seconds).
+    """
+    filename = _config_filename(config, "shard_timings")
+    if not filename or not os.path.isfile(filename):
+        return {}
+    try:
+        return dict(MergedResults.load(filename).durations)
+    except ValueError:
+        return {}
+
+
+# ---------------------------------------------------------------------------
+# PARTITION:
+# ---------------------------------------------------------------------------
+def make_unit_weights(names, timings=None):
+    """Weight of each unit name: Sum of its durations over all phases
+    (otherwise: average of the units with timings).
+
+    :return: Weights as dict: unit name -> weight.
+    """
+    totals = {}
+    for key, duration in (timings or {}).items():
+        name = key.rpartition(":")[0]
+        totals[name] = totals.get(name, 0.0) + float(duration)
+
+    known = [totals[name] for name in names if name in totals]
+    average = sum(known) / len(known) if known else 1.0
+    return dict((name, totals.get(name, average)) for name in names)
+
+
+def partition_units(units, shards, timings=None):
+    """Partitions the units into shards by unit name (deterministic).
+    Units with the same name (other phases) are in the same shard.
+
+    :param units:   Units with ``name`` (and ``phase``) attribute.
+    :param shards:  Number of shards.
+    :param timings: Unit timings (as dict: "{unit}:{phase}" -> duration).
+    :return: List of shards (each shard is a list of units in original order).
+    """
+    units = list(units)
+    names = sorted(set(unit.name for unit in units))
+    weights = make_unit_weights(names, timings)
+    # -- HINT: Heaviest first, ties are broken by unit name (not by order).
+    loads = [(0.0, 0, shard) for shard in range(shards)]
+    assigned = {}
+    for name in sorted(names, key=lambda name: (-weights[name], name)):
+        load, count, shard = min(loads)
+        assigned[name] = shard
+        loads[shard] = (load + weights[name], count + 1, shard)
+    return [[unit for unit in units if assigned[unit.name] == index]
+            for index in range(shards)]
+
+
+def select_shard_units(config, units, shard):
+    """Selects the units of this shard (and shows the selection).
+
+    :param shard:   Shard as tuple (shard, shards), like: (2, 4).
+    :return: Units of this shard (in original order).
+    """
+    units = list(units)
+    shard_index, shards = shard
+    timings = load_shard_timings(config)
+    selected = partition_units(units, shards, timings)[shard_index - 1]
+    print("CMAKE-BUILD: Shard {0}/{1}: {2} of {3} units{4}".format(
+        shard_index, shards, len(selected), len(units),
+        "" if timings else " (without shard timings)"))
+    return selected
+
+
+def select_shard_pipelines(config, pipelines, shard):
+    """Selects the pipelines of this shard (by the unit name of a pipeline).
+    Uses the same partition as :func:`select_shard_units()`.
+
+    :param pipelines:   Stage units per unit name (as list of lists).
+    :param shard:       Shard as tuple (shard, shards), like: (2, 4).
+    :return: Pipelines of this shard (in original order).
+    """
+    pipelines = [list(units) for units in pipelines if units]
+    selected = select_shard_units(config, [units[0] for units in pipelines],
+                                  shard)
+    names = set(unit.name for unit in selected)
+    return [units for units in pipelines if units[0].name in names]
+
+
+# ---------------------------------------------------------------------------
+# SHARD RESULTS:
+# ---------------------------------------------------------------------------
+class ShardResults(PersistentData):
+    """Results of the units of one shard (of one cmake-build run).
+
+    Data-file contents:
+
+    * shard:    Shard description, like: "2/4".
+    * started:  Start time of the shard run.
+    * finished: Time when the last unit was finished.
+    * units:    List of (name, phase, status, duration, error).
+    """
+    FILE_BASENAME = SHARD_RESULTS_SCHEMA
+
+    @property
+    def units(self):
+        return self.data.setdefault("units", [])
+
+    def record(self, units, results):
+        """Records the results of a task phase (and saves the file)."""
+        for unit, result in zip(units, results):
+            error = None
+            if result.error is not None and result.status != "skipped":
+                error = describe_error(result.error)
+            self.units.append(dict(name=unit.name,
+                                   phase=getattr(unit, "phase", None),
+                                   status=result.status,
+                                   duration=result.duration,
+                                   error=error))
+        self.data["finished"] = time.time()
+        self.save()
+
+
+_shard_results = None
+
+
+def make_shard_results_filename(config, shard):
+    shard_index, shards = shard
+    filename = _config_filename(config, "shard_results", SHARD_RESULTS_SCHEMA)
+    if filename is None:
+        return None
+    return filename.format(SHARD=shard_index, SHARDS=shards)
+
+
+def get_shard_results(config, shard):
+    """Provides the shard results of this cmake-build run (or None).
+    The first task starts a new shard results file (later tasks append).
+    """
+    global _shard_results   # pylint: disable=global-statement
+    filename = make_shard_results_filename(config, shard)
+    if filename is None:
+        return None
+    if _shard_results is None or _shard_results.filename != filename:
+        _shard_results = ShardResults(filename, data=dict(
+            shard="{0}/{1}".format(*shard), started=time.time(), units=[]))
+    return _shard_results
+
+
+# ---------------------------------------------------------------------------
+# MERGE RESULTS:
+# ---------------------------------------------------------------------------
+class MergedResults(PersistentData):
+    """Merged results of all shards (of one run).
+
+    Data-file contents:
+
+    * shards:   Map shard ("K/N") to (units, duration).
+    * units:    List of unit results (name, phase, status, duration, error, shard).
+    * durations: Map "{unit}:{phase}" to the duration of passed units
+      (use it as ``shard_timings`` of the next runs).
+    """
+    FILE_BASENAME = MERGED_RESULTS_BASENAME
+
+    @property
+    def units(self):
+        return self.data.setdefault("units", [])
+
+    @property
+    def durations(self):
+        return self.data.setdefault("durations", {})
+
+    @property
+    def problems(self):
+        return self.data.setdefault("problems", [])
+
+    def add_shard(self, shard_results):
+        shard = shard_results.data.get("shard") or str(shard_results.filename)
+        shards = self.data.setdefault("shards", {})
+        if shard in shards:
+            self.problems.append("DUPLICATED-SHARD: {0}".format(shard))
+            return
+        started = shard_results.data.get("started")
+        finished = shard_results.data.get("finished")
+        duration = None
+        if started is not None and finished is not None:
+            duration = finished - started
+        shards[shard] = dict(units=len(shard_results.units), duration=duration)
+        for entry in shard_results.units:
+            entry = dict(entry, shard=shard)
+            self.units.append(entry)
+            if entry.get("status") == "passed" and entry.get("duration") is not None:
+                key = make_key(entry.get("name"), entry.get("phase"))
+                self.durations[key] = entry["duration"]
+
+    def check_shards(self):
+        """Checks that all shards (1..N) are provided."""
+        shards = self.data.get("shards") or {}
+        counts = set()
+        for shard in shards:
+            try:
+                counts.add(parse_shard(shard)[1])
+            except (ValueError, TypeError):
+                continue
+        for count in sorted(counts):
+            for index in range(1, count + 1):
+                shard = "{0}/{1}".format(index, count)
+                if shard not in shards:
+                    self.problems.append("MISSING-SHARD: {0}".format(shard))
+        if len(counts) > 1:
+            self.problems.append("MIXED-SHARD-COUNTS: {0}".format(
+                ", ".join(str(count) for count in sorted(counts))))
+
+    def make_unit_results(self):
+        results = []
+        for entry in self.units:
+            name = "{0} ({1})".format(entry.get("name"), entry.get("phase"))
+            error = entry.get("error")
+            result = UnitResult(name, entry.get("status", "failed"),
+                                error=error and MergedError(error),
+                                duration=entry.get("duration"))
+            results.append(result)
+        return results
+
+    @property
+    def failed(self):
+        return bool(self.problems) or any(entry.get("status") in FAILED_STATUSES
+                                          for entry in self.units)
+
+    def print_report(self, stream=None):
+        stream = stream or sys.stdout
+        shards = self.data.get("shards") or {}
+        for shard in sorted(shards, key=_shard_sort_key):
+            info = shards[shard]
+            duration = info.get("duration")
+            print("CMAKE-BUILD: Shard {0}: {1} units (duration: {2})".format(
+                shard, info.get("units"),
+                format_duration(duration) if duration is not None else "-"),
+                  file=stream)
+        UnitScheduler.print_report(self.make_unit_results(), stream=stream)
+        for problem in self.problems:
+            print("  {0}".format(problem), file=stream)
+        stream.flush()
+
+
+class MergedError(object):
+    """Error description of a unit (as stored in a shard results file)."""
+
+    def __init__(self, reason):
+        self.reason = reason
+
+    def __str__(self):
+        return self.reason
+
+
+def _shard_sort_key(shard):
+    try:
+        return (0, parse_shard(shard))
+    except (ValueError, TypeError):
+        return (1, shard)
+
+
+def expand_filenames(patterns):
+    """Expands filename patterns (sorted and without duplicates)."""
+    filenames = []
+    for pattern in patterns:
+        if any(char in pattern for char in "*?["):
+            matched = sorted(glob.glob(pattern))
+        else:
+            matched = [pattern]
+        for filename in matched:
+            if filename not in filenames:
+                filenames.append(filename)
+    return filenames
+
+
+def merge_shard_results(filenames):
+    """Merges the shard results files.
+
+    :return: :class:`MergedResults` object.
+    """
+    merged = MergedResults()
+    for filename in filenames:
+        if not os.path.isfile(filename):
+            merged.problems.append("MISSING-FILE: {0}".format(filename))
+            continue
+        try:
+            merged.add_shard(ShardResults.load(filename))
+        except ValueError:
+            merged.problems.append("BAD-FILE: {0}".format(filename))
+    merged.check_shards()
+    return merged
+
+
+def merge_junit_reports(filenames, output, problems=None):
+    """Merges JUnit XML test reports (like: ctest --output-junit)
+    into one ``<testsuites>`` report.
+    Missing or malformed reports are skipped (and reported as problems).
+
+    :param problems: List of problems to extend (optional).
+    :return: Number of merged test suites.
+    """
+    if problems is None:
+        problems = []
+    root = ElementTree.Element("testsuites")
+    totals = dict(tests=0, failures=0, errors=0, skipped=0)
+    for filename in filenames:
+        if not os.path.isfile(filename):
+            problems.append("MISSING-FILE: {0}".format(filename))
+            continue
+        try:
+            report = ElementTree.parse(filename).getroot()
+        except (OSError, ElementTree.ParseError):
+            problems.append("BAD-FILE: {0}".format(filename))
+            continue
+        testsuites = [report] if report.tag == "testsuite" else \
+            list(report.iter("testsuite"))
+        for testsuite in testsuites:
+            for name in totals:
+                try:
+                    totals[name] += int(testsuite.get(name) or 0)
+                except ValueError:
+                    pass
+            root.append(testsuite)
+    for name, value in totals.items():
+        root.set(name, str(value))
+    ElementTree.ElementTree(root).write(output, encoding="UTF-8",
+                                        xml_declaration=True)
+    return len(root)
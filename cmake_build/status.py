@@ -0,0 +1,182 @@
+# -*- coding: UTF-8 -*-
+"""
+Status of CMake projects (for each project and build_config).
+
+The status is collected without running cmake or the build system.
+Only the stored configs and the usage data-files of the build directories
+are used (and the metadata of the source files, for the sources fingerprint).
+If the workspace store is used, the usage data, results and fingerprints
+of all build directories are read from it (with a few queries).
+"""
+
+from __future__ import absolute_import, print_function
+import os
+import time
+from .fingerprint import make_sources_fingerprint4config
+from .pathutil import format_size, posixpath_normpath
+from .quota import BuildDirInfo, BuildDirUsage
+from .workspace_store import get_workspace_store
+
+
+# ---------------------------------------------------------------------------
+# STATUS MODEL:
+# ---------------------------------------------------------------------------
+class CMakeProjectStatus(object):
+    """Status of one CMake project (for one build_config)."""
+    COLUMNS = ("PROJECT", "BUILD_CONFIG", "INIT", "GENERATOR", "CONFIG",
+               "LAST_BUILD", "SIZE", "SOURCES")
+
+    def __init__(self, project_dir, build_config, initialized=False,
+                 cmake_generator=None, config_state=None, last_build=None,
+                 size=None, sources_changed=None):
+        # pylint: disable=too-many-arguments
+        self.project_dir = project_dir
+        self.build_config = build_config
+        self.initialized = initialized
+        self.cmake_generator = cmake_generator
+        self.config_state = config_state
+        self.last_build = last_build
+        self.size = size
+        self.sources_changed = sources_changed
+
+    @staticmethod
+    def format_last_build(last_build):
+        if not last_build:
+            return "-"
+        finished = time.strftime("%Y-%m-%d %H:%M",
+                                 time.localtime(last_build.get("finished") or 0))
+        duration = last_build.get("duration")
+        if duration is None:
+            return "{0} {1}".format(last_build.get("status"), finished)
+        return "{0} {1} ({2:.1f}s)".format(last_build.get("status"),
+                                           finished, duration)
+
+    def as_row(self):
+        sources = "-"
+        if self.sources_changed is not None:
+            sources = "changed" if self.sources_changed else "unchanged"
+        return (
+            posixpath_normpath(self.project_dir),
+            self.build_config,
+            "yes" if self.initialized else "no",
+            self.cmake_generator or "-",
+            self.config_state or "-",
+            self.format_last_build(self.last_build),
+            "-" if self.size is None else format_size(self.size),
+            sources,
+        )
+
+
+def make_config_state(cmake_project):
+    """Describes if the stored config needs a reinit/update (or is ok)."""
+    if cmake_project.needs_reinit():
+        return "reinit"
+    elif cmake_project.needs_update():
+        return "update"
+    return "ok"
+
+
+class StoredBuildDirState(object):
+    """State of a build directory from the workspace store
+    (provides the same attributes as :class:`BuildDirUsage`).
+    """
+
+    def __init__(self, usage, results=None, fingerprints=None):
+        self.size = usage.get("size")
+        self.results = results or {}
+        self.sources_fingerprint = (fingerprints or {}).get("sources")
+
+    def get_result(self, step):
+        result = self.results.get(step)
+        if result is None:
+            return None
+        status, finished, duration = result
+        return dict(status=status, finished=finished, duration=duration)
+
+
+def load_stored_build_dir_states(workspace_store, build_dirs):
+    """Loads the state of many build directories from the workspace store.
+
+    :return: Dict: build_dir (as absolute path) -> StoredBuildDirState
+    """
+    usages = workspace_store.get_usage(build_dirs)
+    results = workspace_store.get_results(list(usages.keys()))
+    fingerprints = workspace_store.get_fingerprints(list(usages.keys()))
+    return dict((build_dir, StoredBuildDirState(usage, results.get(build_dir),
+                                                fingerprints.get(build_dir)))
+                for build_dir, usage in usages.items())
+
+
+def collect_status(ctx, cmake_projects, with_size=False):
+    """Collect the status of CMake projects (without running cmake).
+
+    :param ctx:             Context object to use.
+    :param cmake_projects:  CMake projects to use (as list).
+    :param with_size:       If true, unknown build directory sizes are computed.
+    :return: List of :class:`CMakeProjectStatus` objects.
+    """
+    sources_fingerprints = {}
+
+    def get_sources_fingerprint(project_dir):
+        # -- HINT: Computed once per project (shared by its build_configs).
+        fingerprint = sources_fingerprints.get(project_dir)
+        if fingerprint is None:
+            fingerprint = make_sources_fingerprint4config(project_dir, ctx.config)
+            sources_fingerprints[project_dir] = fingerprint
+        return fingerprint
+
+    workspace_store = get_workspace_store(ctx.config)
+    stored_states = {}
+    if workspace_store is not None:
+        stored_states = load_stored_build_dir_states(workspace_store, [
+            cmake_project.project_build_dir for cmake_project in cmake_projects
+            if not getattr(cmake_project, "syndrome", None)])
+
+    statuses = []
+    for cmake_project in cmake_projects:
+        project_dir = cmake_project.project_dir.relpath()
+        syndrome = getattr(cmake_project, "syndrome", None)
+        if syndrome:
+            statuses.append(CMakeProjectStatus(project_dir,
+                                               cmake_project.config.name or "-",
+                                               config_state=syndrome))
+            continue
+
+        status = CMakeProjectStatus(project_dir, cmake_project.config.name)
+        statuses.append(status)
+        if not cmake_project.initialized:
+            continue
+
+        status.initialized = True
+        status.cmake_generator = cmake_project.config.cmake_generator
+        status.config_state = make_config_state(cmake_project)
+        build_dir = os.path.abspath(str(cmake_project.project_build_dir))
+        usage = stored_states.get(build_dir)
+        if usage is None:
+            try:
+                usage = BuildDirUsage.load(
+                    BuildDirUsage.make_filename(cmake_project.project_build_dir))
+            except ValueError:
+                usage = BuildDirUsage()
+        status.last_build = usage.get_result("build")
+        status.size = usage.size
+        if status.size is None and with_size:
+            build_dir_info = BuildDirInfo(
+                cmake_project.project_build_dir, workspace_store=workspace_store,
+                usage=usage if isinstance(usage, BuildDirUsage) else None)
+            status.size = build_dir_info.size
+        if usage.sources_fingerprint:
+            fingerprint = get_sources_fingerprint(str(cmake_project.project_dir))
+            status.sources_changed = (fingerprint != usage.sources_fingerprint)
+    return statuses
+
+
+def print_status_table(statuses):
+    """Print the status of CMake projects as table."""
+    rows = [CMakeProjectStatus.COLUMNS]
+    rows.extend(status.as_row() for status in statuses)
+    widths = [max(len(row[index]) for row in rows)
+              for index in range(len(CMakeProjectStatus.COLUMNS))]
+    for row in rows:
+        print("  ".join(cell.ljust(width)
+                        for cell, width in zip(row, widths)).rstrip())
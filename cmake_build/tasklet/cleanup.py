@@ -61,12 +61,15 @@ EXAMPLE::
 
 from __future__ import absolute_import, print_function
 import os
+import re
 import sys
 from invoke import task, Collection
 from invoke.executor import Executor
 from invoke.exceptions import Exit, Failure, UnexpectedExit
 from invoke.util import cd
 from path import Path
+from ..pathutil import directory_size, format_size
+from ..thread_output import execute_concurrently, make_thread_output_config
 
 # -- PYTHON BACKWARD COMPATIBILITY:
 python_version = sys.version_info[:2]
@@ -80,35 +83,87 @@ else:
 # -----------------------------------------------------------------------------
 # CONSTANTS:
 # -----------------------------------------------------------------------------
-VERSION = "0.3.6"
+VERSION = "0.4.0"
 
 
 # -----------------------------------------------------------------------------
 # CLEANUP UTILITIES:
 # -----------------------------------------------------------------------------
-def execute_cleanup_tasks(ctx, cleanup_tasks, workdir=".", verbose=False):
+def execute_cleanup_tasks(ctx, cleanup_tasks, workdir=".", verbose=False,
+                          max_workers=None):
     """Execute several cleanup tasks as part of the cleanup.
+    The cleanup tasks are executed concurrently if ``max_workers > 1``
+    (default: ``cleanup.max_workers`` from the config).
+    The output of each cleanup task is shown after it is finished.
 
     :param ctx:             Context object for the tasks.
     :param cleanup_tasks:   Collection of cleanup tasks (as Collection).
+    :param max_workers:     Maximum number of concurrent cleanup tasks.
     """
     # pylint: disable=redefined-outer-name
-    executor = Executor(cleanup_tasks, ctx.config)
+    if max_workers is None:
+        max_workers = cleanup_max_workers(ctx.config)
+
     failure_count = 0
     with cd(workdir) as cwd:
-        for cleanup_task in cleanup_tasks.tasks:
-            try:
-                print("CLEANUP TASK: %s" % cleanup_task)
-                executor.execute(cleanup_task)
-            except (Exit, Failure, UnexpectedExit) as e:
-                print(e)
-                print("FAILURE in CLEANUP TASK: %s (GRACEFULLY-IGNORED)" % cleanup_task)
-                failure_count += 1
+        if max_workers > 1 and len(cleanup_tasks.tasks) > 1:
+            failure_count = _execute_cleanup_tasks_concurrently(
+                ctx, cleanup_tasks, max_workers)
+        else:
+            executor = Executor(cleanup_tasks, ctx.config)
+            for cleanup_task in cleanup_tasks.tasks:
+                try:
+                    print("CLEANUP TASK: %s" % cleanup_task)
+                    executor.execute(cleanup_task)
+                except (Exit, Failure, UnexpectedExit) as e:
+                    print(e)
+                    print("FAILURE in CLEANUP TASK: %s (GRACEFULLY-IGNORED)" % cleanup_task)
+                    failure_count += 1
 
     if failure_count:
         print("CLEANUP TASKS: %d failure(s) occured" % failure_count)
 
 
+def _execute_cleanup_tasks_concurrently(ctx, cleanup_tasks, max_workers):
+    # pylint: disable=redefined-outer-name
+    def make_cleanup_function(cleanup_task):
+        def execute_cleanup_task():
+            # -- HINT: Use own executor per thread (executor has state).
+            # HINT: ctx.run() output is captured per thread, too.
+            config = make_thread_output_config(ctx.config)
+            executor = Executor(cleanup_tasks, config)
+            executor.execute(cleanup_task)
+        return execute_cleanup_task
+
+    cleanup_task_names = list(cleanup_tasks.tasks)
+    functions = [make_cleanup_function(name) for name in cleanup_task_names]
+    failure_count = 0
+    results = execute_concurrently(functions, max_workers=max_workers)
+    for cleanup_task, (output, error) in zip(cleanup_task_names, results):
+        print("CLEANUP TASK: %s" % cleanup_task)
+        sys.stdout.write(output)
+        if isinstance(error, (Exit, Failure, UnexpectedExit)):
+            print(error)
+            print("FAILURE in CLEANUP TASK: %s (GRACEFULLY-IGNORED)" % cleanup_task)
+            failure_count += 1
+        elif error is not None:
+            raise error
+    return failure_count
+
+
+def cleanup_max_workers(config):
+    """Maximum number of concurrent cleanup workers (from config).
+
+    :param config:  Config object with ``cleanup.max_workers`` (optional).
+    :return: Number of workers (as int; default=1).
+    """
+    cleanup_config = config.get("cleanup") or {}
+    try:
+        return max(int(cleanup_config.get("max_workers") or 1), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
 def make_excluded(excluded, config_dir=None, workdir=None):
     workdir = workdir or Path.getcwd()
     config_dir = config_dir or workdir
@@ -150,45 +205,9 @@ def cleanup_dirs(patterns, workdir=".", excluded=None,
     :param workdir:     Current work directory (default=".")
     :param dry_run:     Dry-run mode indicator (as bool).
     """
-    excluded = excluded or []
-    excluded = set([Path(p) for p in excluded])
-    show_skipped = show_skipped or verbose
-    current_dir = Path(workdir)
-    python_basedir = Path(Path(sys.executable).dirname()).joinpath("..").abspath()
-    warn2_counter = 0
-    for dir_pattern in patterns:
-        for directory in path_glob(dir_pattern, current_dir):
-            if is_directory_excluded(directory, excluded):
-                print("SKIP-DIR: %s (excluded)" % directory)
-                continue
-            directory2 = directory.abspath()
-            if sys.executable.startswith(directory2):
-                # -- PROTECT VIRTUAL ENVIRONMENT (currently in use):
-                # pylint: disable=line-too-long
-                print("SKIP-SUICIDE: '%s' contains current python executable" % directory)
-                continue
-            elif directory2.startswith(python_basedir):
-                # -- PROTECT VIRTUAL ENVIRONMENT (currently in use):
-                # HINT: Limit noise in DIAGNOSTIC OUTPUT to X messages.
-                if warn2_counter <= 4:  # noqa
-                    print("SKIP-SUICIDE: '%s'" % directory)
-                warn2_counter += 1
-                continue
-
-            if not directory.isdir():
-                if show_skipped:
-                    print("RMTREE: %s (SKIPPED: Not a directory)" % directory)
-                continue
-
-            if dry_run:
-                print("RMTREE: %s (dry-run)" % directory)
-            else:
-                try:
-                    # -- MAYBE: directory.rmtree(ignore_errors=True)
-                    print("RMTREE: %s" % directory)
-                    directory.rmtree_p()
-                except OSError as e:
-                    print("RMTREE-FAILED: %s (for: %s)" % (e, directory))
+    return cleanup_paths(directories=patterns, workdir=workdir,
+                         excluded=excluded, dry_run=dry_run, verbose=verbose,
+                         show_skipped=show_skipped)
 
 
 def cleanup_files(patterns, workdir=".", dry_run=False, verbose=False, show_skipped=False):
@@ -199,37 +218,259 @@ def cleanup_files(patterns, workdir=".", dry_run=False, verbose=False, show_skip
     :param workdir:     Current work directory (default=".")
     :param dry_run:     Dry-run mode indicator (as bool).
     """
+    return cleanup_paths(files=patterns, workdir=workdir,
+                         dry_run=dry_run, verbose=verbose,
+                         show_skipped=show_skipped)
+
+
+def cleanup_paths(directories=None, files=None, workdir=".", excluded=None,
+                  dry_run=False, verbose=False, show_skipped=False):
+    """Remove directories and files that are selected by patterns.
+    The directory tree is traversed only once (for all patterns).
+
+    :param directories: Directory name patterns, like "**/tmp*" (as list).
+    :param files:       File patterns, like "**/*.pyc" (as list).
+    :param workdir:     Current work directory (default=".")
+    :param excluded:    Directories to exclude (and not to traverse).
+    :param dry_run:     Dry-run mode indicator (as bool).
+    :return: Selected directories and files (as CleanupSelection).
+    """
+    # pylint: disable=too-many-arguments
     show_skipped = show_skipped or verbose
-    current_dir = Path(workdir)
-    python_basedir = Path(Path(sys.executable).dirname()).joinpath("..").abspath()
-    error_message = None
-    error_count = 0
-    for file_pattern in patterns:
-        for file_ in path_glob(file_pattern, current_dir):
-            if file_.abspath().startswith(python_basedir):
+    selection = select_cleanup_paths(directories, files, workdir=workdir,
+                                     excluded=excluded,
+                                     with_size=(dry_run or verbose))
+    for directory in selection.directories:
+        if dry_run:
+            print("RMTREE: %s (dry-run)" % directory)
+            continue
+
+        try:
+            # -- MAYBE: directory.rmtree(ignore_errors=True)
+            print("RMTREE: %s" % directory)
+            if _directory_remover is not None:
+                _directory_remover(directory)
+            else:
+                directory.rmtree_p()
+        except OSError as e:
+            print("RMTREE-FAILED: %s (for: %s)" % (e, directory))
+
+    for file_ in selection.files:
+        if not os.path.isfile(file_):
+            # -- CASE: Symlink to a directory, ...
+            if show_skipped:
+                print("REMOVE: %s (SKIPPED: Not a file)" % file_)
+            continue
+
+        if dry_run:
+            print("REMOVE: %s (dry-run)" % file_)
+        else:
+            print("REMOVE: %s" % file_)
+            try:
+                file_.remove_p()
+            except os.error as e:
+                print("%s: %s" % (e.__class__.__name__, e))
+
+    if selection.size is not None and (selection.directories or selection.files):
+        reclaimed = "%s reclaimed" % format_size(selection.size)
+        if dry_run:
+            reclaimed = "dry-run: %s would be reclaimed" % format_size(selection.size)
+        print("CLEANUP: %d directories, %d files (%s)" % (
+            len(selection.directories), len(selection.files), reclaimed))
+    return selection
+
+
+# -----------------------------------------------------------------------------
+# CLEANUP WALKER: Select directories and files in one directory traversal.
+# -----------------------------------------------------------------------------
+def translate_glob_pattern(pattern):
+    """Translates an ant-like glob pattern, like "**/*.log", into a regexp.
+    The regexp is used on relative paths with "/" as path separator.
+    """
+    parts = [part for part in pattern.strip("/").split("/")
+             if part and part != "."]
+    regex_parts = []
+    for index, part in enumerate(parts):
+        if part == "**":
+            if index == len(parts) - 1:
+                regex_parts.append(".*")
+            else:
+                regex_parts.append("(?:[^/]+/)*")
+            continue
+
+        regex = ""
+        pos = 0
+        while pos < len(part):
+            char = part[pos]
+            pos += 1
+            if char == "*":
+                regex += "[^/]*"
+            elif char == "?":
+                regex += "[^/]"
+            elif char == "[":
+                end_pos = part.find("]", pos + 1)
+                if end_pos < 0:
+                    regex += re.escape(char)
+                    continue
+                char_class = part[pos:end_pos]
+                if char_class.startswith("!"):
+                    char_class = "^" + char_class[1:]
+                regex += "[%s]" % char_class.replace("\\", "\\\\")
+                pos = end_pos + 1
+            else:
+                regex += re.escape(char)
+        if index < len(parts) - 1:
+            regex += "/"
+        regex_parts.append(regex)
+    return "".join(regex_parts)
+
+
+class CleanupPathMatcher(object):
+    """Matches relative paths against many glob patterns at once
+    (compiled into one regular expression).
+    """
+
+    def __init__(self, patterns=None):
+        self.patterns = list(patterns or [])
+        self.regex = None
+        if self.patterns:
+            flags = re.IGNORECASE if os.name == "nt" else 0
+            regex = "|".join("(?:%s)" % translate_glob_pattern(p)
+                             for p in self.patterns)
+            self.regex = re.compile(r"\A(?:%s)\Z" % regex, flags)
+
+    def __bool__(self):
+        return self.regex is not None
+    __nonzero__ = __bool__  # -- PYTHON2
+
+    def match(self, relpath):
+        return bool(self.regex and self.regex.match(relpath))
+
+
+class CleanupSelection(object):
+    """Directories and files that are selected for cleanup."""
+
+    def __init__(self):
+        self.directories = []
+        self.files = []
+        self.size = None
+
+    def add_size(self, size):
+        if size is not None:
+            self.size = (self.size or 0) + size
+
+
+def _is_subpath(path, directory):
+    return path == directory or path.startswith(directory + os.sep)
+
+
+def select_cleanup_paths(directories=None, files=None, workdir=".",
+                         excluded=None, with_size=False):
+    """Select directories and files by patterns in one directory traversal.
+
+    * Excluded directories are not traversed.
+    * Selected directories are not traversed (they are removed completely).
+    * Python (virtual) environment in use is protected (not traversed).
+
+    :param directories: Directory name patterns, like "**/tmp*" (as list).
+    :param files:       File patterns, like "**/*.pyc" (as list).
+    :param workdir:     Directory to start from (default=".")
+    :param excluded:    Directories to exclude (relative to CWD or absolute).
+    :param with_size:   If true, computes the size of the selected paths.
+    :return: CleanupSelection object.
+    """
+    # pylint: disable=too-many-locals, too-many-branches
+    selection = CleanupSelection()
+    if with_size:
+        selection.size = 0
+
+    # -- SPECIAL CASE: Absolute directory patterns (no traversal needed).
+    directory_patterns = []
+    for pattern in directories or []:
+        if os.path.isabs(pattern):
+            if os.path.isdir(pattern):
+                selection.directories.append(Path(pattern))
+                if with_size:
+                    selection.add_size(directory_size(pattern))
+        else:
+            directory_patterns.append(pattern)
+
+    directory_matcher = CleanupPathMatcher(directory_patterns)
+    file_matcher = CleanupPathMatcher([p for p in files or []
+                                       if not os.path.isabs(p)])
+    if not (directory_matcher or file_matcher):
+        return selection
+
+    workdir = str(workdir or ".")
+    workdir_abs = os.path.abspath(workdir)
+    use_workdir_prefix = os.path.normpath(workdir) != "."
+    excluded_abs = set(os.path.abspath(str(p)) for p in excluded or [])
+    python_basedir = os.path.abspath(os.path.join(
+        os.path.dirname(sys.executable), ".."))
+    warn2_counter = 0
+
+    pending = [(workdir_abs, "")]
+    while pending:
+        directory_abs, directory_relpath = pending.pop()
+        try:
+            entries = sorted(os.scandir(directory_abs), key=lambda e: e.name)
+        except OSError:
+            # -- CASE: Directory is not accessible, ...
+            continue
+
+        subdirectories = []
+        for entry in entries:
+            relpath = entry.name
+            if directory_relpath:
+                relpath = directory_relpath + "/" + entry.name
+            display_path = relpath
+            if use_workdir_prefix:
+                display_path = os.path.join(workdir, relpath)
+
+            try:
+                is_directory = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+
+            if not is_directory:
+                if file_matcher.match(relpath):
+                    selection.files.append(Path(display_path))
+                    if with_size:
+                        try:
+                            selection.add_size(entry.stat(follow_symlinks=False).st_size)
+                        except OSError:
+                            pass
+                continue
+
+            # -- CASE: Directory
+            path_abs = os.path.join(directory_abs, entry.name)
+            selected = directory_matcher.match(relpath)
+            if path_abs in excluded_abs:
+                if selected:
+                    print("SKIP-DIR: %s (excluded)" % display_path)
+                continue
+            elif _is_subpath(path_abs, python_basedir):
                 # -- PROTECT VIRTUAL ENVIRONMENT (currently in use):
+                # HINT: Limit noise in DIAGNOSTIC OUTPUT to X messages.
+                if selected:
+                    if warn2_counter <= 4:  # noqa
+                        print("SKIP-SUICIDE: '%s'" % display_path)
+                    warn2_counter += 1
                 continue
-            if not file_.isfile():
-                if show_skipped:
-                    print("REMOVE: %s (SKIPPED: Not a file)" % file_)
+            elif selected and _is_subpath(sys.executable, path_abs):
+                # -- PROTECT VIRTUAL ENVIRONMENT (currently in use):
+                # pylint: disable=line-too-long
+                print("SKIP-SUICIDE: '%s' contains current python executable" % display_path)
+            elif selected:
+                selection.directories.append(Path(display_path))
+                if with_size:
+                    selection.add_size(directory_size(path_abs))
                 continue
+            subdirectories.append((path_abs, relpath))
 
-            if dry_run:
-                print("REMOVE: %s (dry-run)" % file_)
-            else:
-                print("REMOVE: %s" % file_)
-                try:
-                    file_.remove_p()
-                except os.error as e:
-                    message = "%s: %s" % (e.__class__.__name__, e)
-                    print(message + " basedir: "+ python_basedir)
-                    error_count += 1
-                    if not error_message:
-                        error_message = message
-    if False and error_message: # noqa
-        class CleanupError(RuntimeError):
-            pass
-        raise CleanupError(error_message)
+        # -- DEPTH-FIRST: In sorted order.
+        pending.extend(reversed(subdirectories))
+    return selection
 
 
 def path_glob(pattern, current_dir=None):
@@ -286,9 +527,9 @@ def clean(ctx, workdir=".", verbose=False):
 
     # -- PERFORM CLEANUP:
     execute_cleanup_tasks(ctx, cleanup_tasks)
-    cleanup_dirs(directories, workdir=workdir, excluded=excluded_directories,
-                 dry_run=dry_run, verbose=verbose)
-    cleanup_files(files, workdir=workdir, dry_run=dry_run, verbose=verbose)
+    cleanup_paths(directories, files, workdir=workdir,
+                  excluded=excluded_directories,
+                  dry_run=dry_run, verbose=verbose)
 
     # -- CONFIGURABLE EXTENSION-POINT:
     # use_cleanup_python = ctx.config.cleanup.use_cleanup_python or False
@@ -318,9 +559,9 @@ def clean_all(ctx, workdir=".", verbose=False):
 
     # -- PERFORM CLEANUP:
     # HINT: Remove now directories, files first before cleanup-tasks.
-    cleanup_dirs(directories, workdir=workdir, excluded=excluded_directories,
-                 dry_run=dry_run, verbose=verbose)
-    cleanup_files(files, workdir=workdir, dry_run=dry_run, verbose=verbose)
+    cleanup_paths(directories, files, workdir=workdir,
+                  excluded=excluded_directories,
+                  dry_run=dry_run, verbose=verbose)
     execute_cleanup_tasks(ctx, cleanup_all_tasks)
     clean(ctx, workdir=workdir, verbose=verbose)
 
@@ -336,11 +577,10 @@ def clean_python(ctx, workdir=".", verbose=False):
     """Cleanup python related files/dirs: *.pyc, *.pyo, ..."""
     dry_run = ctx.config.run.dry or False
     # MAYBE NOT: "**/__pycache__"
-    cleanup_dirs(["build", "dist", "*.egg-info", "**/__pycache__"],
-                 workdir=workdir, dry_run=dry_run, verbose=verbose)
     if not dry_run:
         ctx.run("py.cleanup")
-    cleanup_files(["**/*.pyc", "**/*.pyo", "**/*$py.class"],
+    cleanup_paths(["build", "dist", "*.egg-info", "**/__pycache__"],
+                  ["**/*.pyc", "**/*.pyo", "**/*$py.class"],
                   workdir=workdir, dry_run=dry_run, verbose=verbose)
 
 
@@ -378,6 +618,8 @@ def git_clean(ctx, path=None, interactive=False, force=False,
 # -----------------------------------------------------------------------------
 # TASK CONFIGURATION:
 # -----------------------------------------------------------------------------
+_directory_remover = None   # -- EXTENSION-POINT: config_use_directory_remover()
+
 CLEANUP_EMPTY_CONFIG = {
     "directories": [],
     "files": [],
@@ -386,6 +628,7 @@ CLEANUP_EMPTY_CONFIG = {
     "excluded_directories": [],
     "excluded_files": [],
     "use_cleanup_python": False,
+    "max_workers": 1,
 }
 def make_cleanup_config(**kwargs):
     config_data = CLEANUP_EMPTY_CONFIG.copy()
@@ -445,3 +688,12 @@ def config_add_cleanup_all_files(files):
     # pylint: disable=protected-access
     the_cleanup_files = namespace._configuration["cleanup_all"]["files"]
     the_cleanup_files.extend(files)
+
+def config_use_directory_remover(remover):
+    """Use another function to remove the cleanup directories
+    (like: move them to a trash directory and delete them later).
+
+    :param remover: Callable with directory as param (or None, for default).
+    """
+    global _directory_remover   # pylint: disable=global-statement
+    _directory_remover = remover
@@ -3,6 +3,7 @@
 # pylint: disable=unused-argument, redefined-builtin
 # pylint: disable=redefined-outer-name  # RELATED-TO: config
 # pylint: disable=super-with-arguments, useless-object-inheritance  # RELATED-TO: Python3
+# pylint: disable=import-outside-toplevel  # RELATED-TO: LAZY-IMPORT
 """
 Invoke tasks for building C/C++ projects w/ CMake.
 
@@ -22,8 +23,9 @@ Invoke tasks for building C/C++ projects w/ CMake.
 """
 
 from __future__ import absolute_import, print_function
+import os
+import sys
 from collections import OrderedDict
-from pprint import pprint
 from path import Path
 
 
@@ -35,12 +37,80 @@ from invoke import task, Collection, Context, Task
 from invoke.exceptions import Exit
 
 # -- TASK-LIBRARY:
-from .tasklet.cleanup import cleanup_tasks, config_add_cleanup_dirs
-from .model_builder import (
-    make_cmake_projects, make_build_configs_map, BUILD_CONFIG_DEFAULT
-)
-from .model import CMakeBuildRunner
-from .cmake_util import CPACK_GENERATOR
+from .tasklet.cleanup import cleanup_tasks, config_add_cleanup_dirs, \
+    config_use_directory_remover, cleanup_max_workers
+from .thread_output import execute_concurrently
+from ._path import monkeypatch_path_if_needed
+from .constants import BUILD_CONFIG_DEFAULT
+from .trash import remove_tree
+
+# -- HINT: Needed by the cleanup tasklet, too (model layer is loaded lazily).
+monkeypatch_path_if_needed()
+
+
+# -----------------------------------------------------------------------------
+# LAZY-IMPORT: CMake model layer (only needed when a task is executed)
+# -----------------------------------------------------------------------------
+def make_cmake_projects(ctx, projects, build_config=None, strict=None, **kwargs):
+    """Delegates to :func:`cmake_build.model_builder.make_cmake_projects()`.
+    CMake projects are reused by the next task(s) in this session.
+    """
+    from .model_builder import make_cmake_projects as _make_cmake_projects
+    cache = CMakeBuildTask.task_settings.cmake_projects_cache
+    return _make_cmake_projects(ctx, projects, build_config=build_config,
+                                strict=strict, cache=cache, **kwargs)
+
+
+def make_build_configs_map4config(config):
+    """Delegates to :func:`cmake_build.model_builder.make_build_configs_map4config()`."""
+    from .model_builder import make_build_configs_map4config as _make_map
+    return _make_map(config)
+
+
+def make_cmake_build_runner(cmake_projects):
+    from .model import CMakeBuildRunner
+    return CMakeBuildRunner(cmake_projects)
+
+
+def run_cmake_project_units(ctx, cmake_projects, function, phase, inputs=None,
+                            fail_fast=False, keep_going=False, resume=False,
+                            dry_run=False, shard=None):
+    """Runs a function for each cmake project (as unit of a task phase).
+    Delegates to :func:`cmake_build.scheduler.run_units()`.
+    Each unit is recorded in the run journal (see: :mod:`cmake_build.journal`).
+
+    :param function:    Function with a cmake project as param.
+    :param phase:       Phase name (normally: task name).
+    :param inputs:      Task params that affect the result (as dict).
+    :param fail_fast:   If true, the first failure cancels the other units.
+    :param keep_going:  If true, all units are run (failures are reported).
+    :param resume:      If true, units that are already done are skipped.
+    :param dry_run:     If true, only the plan of the units is shown.
+    :param shard:       Shard to run, like: "2/4" (see: :mod:`cmake_build.shard`).
+    """
+    # pylint: disable=too-many-arguments
+    from .journal import make_journaled_units
+    from .scheduler import run_units
+    from .shard import parse_shard, select_shard_units, get_shard_results
+    if keep_going or fail_fast:
+        policy = bool(keep_going)
+    else:
+        policy = None   # -- USE: config-param keep_going
+    try:
+        shard = parse_shard(shard or ctx.config.get("shard"))
+    except ValueError as e:
+        raise Exit(str(e))
+
+    units = make_journaled_units(ctx.config, cmake_projects, phase, function,
+                                 inputs=inputs, resume=resume)
+    on_results = None
+    if shard:
+        units = select_shard_units(ctx.config, units, shard)
+        shard_results = get_shard_results(ctx.config, shard)
+        if shard_results is not None and not dry_run:
+            on_results = shard_results.record
+    return run_units(ctx.config, units, keep_going=policy, dry_run=dry_run,
+                     on_results=on_results)
 
 
 # -----------------------------------------------------------------------------
@@ -83,6 +153,7 @@ class CMakeBuildTaskSettings(object):
         self.build_config = None
         self.config = None
         self._initialized = False
+        self._cmake_projects_cache = None
         for name, value in kwargs.items():
             setattr(self, name, value)
 
@@ -90,11 +161,20 @@ class CMakeBuildTaskSettings(object):
         self.build_config = None
         self.config = None
         self._initialized = False
+        self._cmake_projects_cache = None
 
     @property
     def initialized(self):
         return self._initialized
 
+    @property
+    def cmake_projects_cache(self):
+        """Session cache for CMake projects (shared by the tasks)."""
+        if self._cmake_projects_cache is None:
+            from .model_builder import CMakeProjectCache
+            self._cmake_projects_cache = CMakeProjectCache()
+        return self._cmake_projects_cache
+
     def init_with_context_config(self, ctx_config):
         if not self.initialized:
             self.build_config = getattr(ctx_config, "build_config", None)
@@ -248,6 +328,11 @@ TASK_HELP4PARAM_CMAKE_BUILD_ARG = "CMake build arg to use (many)"
 TASK_HELP4PARAM_CMAKE_BUILD_OPTION = "CMake build option to use (many)"
 TASK_HELP4PARAM_CMAKE_OPTION = "CMake option to use (many)"
 TASK_HELP4PARAM_CTEST_ARG = "CMake test arg (many)"
+TASK_HELP4PARAM_FAIL_FAST = "Cancel other projects on first failure (default)"
+TASK_HELP4PARAM_KEEP_GOING = "Run all projects and report failures at the end"
+TASK_HELP4PARAM_RESUME = "Skip projects already done in last run (unchanged inputs)"
+TASK_HELP4PARAM_DRY_RUN = "Show the plan of the projects (without running it)"
+TASK_HELP4PARAM_SHARD = "Run only shard K of N of the projects, like: 2/4"
 
 SPECIAL_OPTION_NAMES = {
     # MAYBE: "config": ("config", "c"),
@@ -269,9 +354,16 @@ SPECIAL_OPTION_NAMES = {
         "arg": TASK_HELP4PARAM_CMAKE_INIT_ARG,
         "define": TASK_HELP4PARAM_CMAKE_DEFINE,
         "clean-config": "Remove stored_config before init (optional)",
+        "fail-fast": TASK_HELP4PARAM_FAIL_FAST,
+        "keep-going": TASK_HELP4PARAM_KEEP_GOING,
+        "resume": TASK_HELP4PARAM_RESUME,
+        "dry-run": TASK_HELP4PARAM_DRY_RUN,
+        "shard": TASK_HELP4PARAM_SHARD,
 })
 def init(ctx, project="all", build_config=None, generator=None,
-         define=None, config=None, clean_config=False, arg=None):
+         define=None, config=None, clean_config=False, arg=None,
+         fail_fast=False, keep_going=False, resume=False,
+         dry_run=False, shard=None):
     """Initialize cmake project(s) (generate: build-scripts).
 
     POSTCONDITION:
@@ -284,7 +376,7 @@ def init(ctx, project="all", build_config=None, generator=None,
     cmake_projects = make_cmake_projects(ctx, project,
                                          build_config=build_config,
                                          generator=generator)
-    for cmake_project in cmake_projects:
+    def init_cmake_project(cmake_project):
         if clean_config:
             # -- ENSURE:
             # Use clean cmake_project.config based on build_config data.
@@ -295,6 +387,12 @@ def init(ctx, project="all", build_config=None, generator=None,
             cmake_project.config.add_cmake_defines(cmake_defines)
         cmake_project.init(args=cmake_init_args, config=config)
 
+    run_cmake_project_units(ctx, cmake_projects, init_cmake_project, "init",
+                            inputs=dict(args=cmake_init_args, defines=cmake_defines,
+                                        config=config, clean_config=clean_config),
+                            fail_fast=fail_fast, keep_going=keep_going,
+                            resume=resume, dry_run=dry_run, shard=shard)
+
 
 @task(iterable=["arg", "option", "init_arg", "define"],
       klass=CMakeBuildTask, option_names=SPECIAL_OPTION_NAMES,
@@ -311,10 +409,17 @@ def init(ctx, project="all", build_config=None, generator=None,
         "jobs": "CMAKE_PARALLEL value (as int)",
         "clean-first": "Use clean-first before build (optional)",
         "verbose": "Use CMake build verbose mode (optional)",
+        "fail-fast": TASK_HELP4PARAM_FAIL_FAST,
+        "keep-going": TASK_HELP4PARAM_KEEP_GOING,
+        "resume": TASK_HELP4PARAM_RESUME,
+        "dry-run": TASK_HELP4PARAM_DRY_RUN,
+        "shard": TASK_HELP4PARAM_SHARD,
 })
 def build(ctx, project="all", build_config=None, generator=None, config=None,
           arg=None, option=None, init_arg=None, define=None,
-          target=None, jobs=-1, clean_first=False, verbose=False):
+          target=None, jobs=-1, clean_first=False, verbose=False,
+          fail_fast=False, keep_going=False, resume=False,
+          dry_run=False, shard=None):
     # pylint: disable=too-many-arguments, too-many-locals
     """Build cmake project(s)."""
     # -- HINT: Invoke default tasks needs default values for iterable params.
@@ -323,13 +428,18 @@ def build(ctx, project="all", build_config=None, generator=None, config=None,
     cmake_init_args = init_arg or []
     cmake_defines = define or []
 
+    if ctx.config.get("build_dir_quota") and not dry_run:
+        # -- PRE-BUILD CHECK: Ensure that build_dir_quota is not exceeded.
+        from .quota import enforce_build_dir_quota
+        enforce_build_dir_quota(ctx, project, build_config=build_config)
+
     cmake_projects = make_cmake_projects(ctx, project, build_config=build_config,
                                          generator=generator)
-    for cmake_project in cmake_projects:
+    def build_cmake_project(cmake_project):
         if cmake_defines:
             cmake_project.config.add_cmake_defines(cmake_defines)
         cmake_project.build(args=cmake_build_args,
-                            options=cmake_build_options,
+                            options=list(cmake_build_options),
                             init_args=cmake_init_args,
                             config=config,
                             target=target,
@@ -337,6 +447,16 @@ def build(ctx, project="all", build_config=None, generator=None, config=None,
                             clean_first=clean_first,
                             verbose=verbose)
 
+    run_cmake_project_units(ctx, cmake_projects, build_cmake_project, "build",
+                            inputs=dict(args=cmake_build_args,
+                                        options=cmake_build_options,
+                                        init_args=cmake_init_args,
+                                        defines=cmake_defines, config=config,
+                                        target=target, jobs=jobs,
+                                        clean_first=clean_first),
+                            fail_fast=fail_fast, keep_going=keep_going,
+                            resume=resume, dry_run=dry_run, shard=shard)
+
 
 @task(aliases=["ctest"], iterable=["arg", "init_arg"],
       klass=CMakeBuildTask, # DISABLED: option_names=SPECIAL_OPTION_NAMES,
@@ -356,12 +476,19 @@ def build(ctx, project="all", build_config=None, generator=None, config=None,
         "stop-on-failure":   "Stop test-run when failure(s) occur.",
         "progress": "Show progress.",
         "jobs": "Number of jobs (as int, CMAKE_PARALLEL).",
+        "fail-fast": TASK_HELP4PARAM_FAIL_FAST,
+        "keep-going": TASK_HELP4PARAM_KEEP_GOING,
+        "resume": TASK_HELP4PARAM_RESUME,
+        "dry-run": TASK_HELP4PARAM_DRY_RUN,
+        "shard": TASK_HELP4PARAM_SHARD,
 })
 def test(ctx, project="all", build_config=None, config=None, generator=None,
          arg=None, init_arg=None, verbose=False,
          # -- CTEST SPECIFIC:
          repeat=None, rerun_failed=False, output_log=None,
-         output_on_failure=False, stop_on_failure=False, jobs=0, progress=False):
+         output_on_failure=False, stop_on_failure=False, jobs=0, progress=False,
+         fail_fast=False, keep_going=False, resume=False,
+         dry_run=False, shard=None):
     # pylint: disable=too-many-arguments, too-many-locals
     """Test cmake projects (performs: ctest)."""
     ctest_args = arg or []
@@ -387,12 +514,18 @@ def test(ctx, project="all", build_config=None, config=None, generator=None,
     cmake_projects = make_cmake_projects(ctx, project,
                                          build_config=build_config,
                                          generator=generator)
-    for cmake_project in cmake_projects:
+    def test_cmake_project(cmake_project):
         cmake_project.test(args=ctest_args,
                            init_args=cmake_init_args,
                            config=config,
                            verbose=verbose)
 
+    run_cmake_project_units(ctx, cmake_projects, test_cmake_project, "test",
+                            inputs=dict(args=ctest_args, init_args=cmake_init_args,
+                                        config=config),
+                            fail_fast=fail_fast, keep_going=keep_going,
+                            resume=resume, dry_run=dry_run, shard=shard)
+
 
 @task(klass=CMakeBuildTask,  # DISABLED: option_names=SPECIAL_OPTION_NAMES,
     help={
@@ -403,16 +536,28 @@ def test(ctx, project="all", build_config=None, config=None, generator=None,
         # -- INSTALL TASK SPECIFIC:
         "prefix": "CMAKE_INSTALL_PREFIX to use (or use preconfigured)",
         "use_sudo": "Use sudo for install command",
+        "fail-fast": TASK_HELP4PARAM_FAIL_FAST,
+        "keep-going": TASK_HELP4PARAM_KEEP_GOING,
+        "resume": TASK_HELP4PARAM_RESUME,
+        "dry-run": TASK_HELP4PARAM_DRY_RUN,
+        "shard": TASK_HELP4PARAM_SHARD,
 })
 def install(ctx, project="all", build_config=None, config=None, generator=None,
-            prefix=None, use_sudo=False):
+            prefix=None, use_sudo=False, fail_fast=False, keep_going=False,
+            resume=False, dry_run=False, shard=None):
     """Install the build artifacts of cmake project(s)."""
     cmake_projects = make_cmake_projects(ctx, project,
                                          build_config=build_config,
                                          generator=generator)
-    for cmake_project in cmake_projects:
+    def install_cmake_project(cmake_project):
         cmake_project.install(prefix=prefix, use_sudo=use_sudo, config=config)
 
+    run_cmake_project_units(ctx, cmake_projects, install_cmake_project, "install",
+                            inputs=dict(prefix=prefix, use_sudo=use_sudo,
+                                        config=config),
+                            fail_fast=fail_fast, keep_going=keep_going,
+                            resume=resume, dry_run=dry_run, shard=shard)
+
 
 @task(klass=CMakeBuildTask,  # DISABLED: option_names=SPECIAL_OPTION_NAMES,
     help={
@@ -430,24 +575,32 @@ def install(ctx, project="all", build_config=None, config=None, generator=None,
         "verbose":      "Run cpack in verbose mode (optional)",
         # -- OPTIONAL: Check if needed.
         "target": "CMake build target before cpack is used (optional)",
+        "fail-fast": TASK_HELP4PARAM_FAIL_FAST,
+        "keep-going": TASK_HELP4PARAM_KEEP_GOING,
+        "resume": TASK_HELP4PARAM_RESUME,
+        "dry-run": TASK_HELP4PARAM_DRY_RUN,
+        "shard": TASK_HELP4PARAM_SHARD,
 })
 def pack(ctx, format=None,
          project="all", build_config=None, config=None, generator=None,
          target=None,
          package_dir=None, cpack_config=None,
-         source=False, source_bundle=False, vendor=None, verbose=False):
-    # pylint: disable=too-many-arguments
+         source=False, source_bundle=False, vendor=None, verbose=False,
+         fail_fast=False, keep_going=False, resume=False,
+         dry_run=False, shard=None):
+    # pylint: disable=too-many-arguments, too-many-locals
     """Pack a source-code archive or a binary bundle/archive for cmake project(s)."""
     # TODO: config => cmake_project.build(...), cmake_project.pack(...)
 
     # MAYBE: cpack_defines
     source_bundle = source_bundle or source
     if not format:
+        from .cmake_util import CPACK_GENERATOR
         format = CPACK_GENERATOR
 
     cmake_projects = make_cmake_projects(ctx, project, build_config=build_config,
                                          generator=generator)
-    for cmake_project in cmake_projects:
+    def pack_cmake_project(cmake_project):
         if target:
             cmake_project.build(target=target)
         cmake_project.pack(format=format, package_dir=package_dir,
@@ -456,6 +609,14 @@ def pack(ctx, format=None,
                            vendor=vendor, verbose=verbose)
         print()
 
+    run_cmake_project_units(ctx, cmake_projects, pack_cmake_project, "pack",
+                            inputs=dict(format=format, package_dir=package_dir,
+                                        cpack_config=cpack_config,
+                                        source_bundle=source_bundle,
+                                        vendor=vendor, target=target),
+                            fail_fast=fail_fast, keep_going=keep_going,
+                            resume=resume, dry_run=dry_run, shard=shard)
+
 
 @task(aliases=["update"], iterable=["define"],
       klass=CMakeBuildTask, option_names=SPECIAL_OPTION_NAMES,
@@ -511,12 +672,43 @@ def clean(ctx, project="all", build_config=None, config=None,
     cmake_projects = make_cmake_projects(ctx, project,
                                          build_config=build_config,
                                          strict=True)   # MAYBE: strict=strict
+    max_workers = cleanup_max_workers(ctx.config)
+    if max_workers > 1 and len(cmake_projects) > 1:
+        clean_cmake_projects_concurrently(cmake_projects, max_workers,
+                                          args=cmake_args,
+                                          options=cmake_options, config=config)
+        return
+
     for cmake_project in cmake_projects:
         cmake_project.clean(args=cmake_args, options=cmake_options, config=config)
         # LATER: config=config)
         # MAYBE: dry_run=dry_run)
 
 
+def clean_cmake_projects_concurrently(cmake_projects, max_workers, **kwargs):
+    """Clean cmake projects concurrently (with a bounded number of workers).
+    The output of each cmake project is shown after it is finished.
+    The first failure is raised after all cmake projects are cleaned.
+    """
+    def make_clean_function(cmake_project):
+        def clean_cmake_project():
+            # -- HINT: Commands of worker threads use the direct process runner
+            # (with the build_dir as cwd of the process; no process-wide "cd").
+            options = list(kwargs.get("options") or [])
+            cmake_project.clean(args=kwargs.get("args"), options=options,
+                                config=kwargs.get("config"))
+        return clean_cmake_project
+
+    functions = [make_clean_function(p) for p in cmake_projects]
+    first_error = None
+    for output, error in execute_concurrently(functions, max_workers=max_workers):
+        sys.stdout.write(output)
+        if error is not None and first_error is None:
+            first_error = error
+    if first_error is not None:
+        raise first_error
+
+
 @task(iterable=["arg", "option"], klass=CMakeBuildTask)
 def clean_and_ignore_failures(ctx, project="all", build_config=None, config=None,
                               arg=None, option=None, dry_run=False):
@@ -548,7 +740,7 @@ def reinit(ctx, project="all", build_config=None, config=None, generator=None,
     cmake_projects = make_cmake_projects(ctx, project,
                                          build_config=build_config,
                                          init_args=cmake_init_args)
-    cmake_runner = CMakeBuildRunner(cmake_projects)
+    cmake_runner = make_cmake_build_runner(cmake_projects)
     if generator:
         # -- OVERRIDE: cmake_generator for all cmake_projects
         cmake_runner.set_cmake_generator(generator)
@@ -576,7 +768,7 @@ def rebuild(ctx, project="all", build_config=None, config=None, generator=None,
 
     cmake_projects = make_cmake_projects(ctx, project,
                                          build_config=build_config)
-    cmake_runner = CMakeBuildRunner(cmake_projects)
+    cmake_runner = make_cmake_build_runner(cmake_projects)
     if generator:
         # -- OVERRIDE: cmake_generator for all cmake_projects
         cmake_runner.set_cmake_generator(generator)
@@ -596,9 +788,17 @@ def rebuild(ctx, project="all", build_config=None, config=None, generator=None,
         "init-arg": TASK_HELP4PARAM_CMAKE_INIT_ARG,
         "test-arg": TASK_HELP4PARAM_CTEST_ARG,
         "use-test": "Perform CMake test step (optional)",
+        "fail-fast": TASK_HELP4PARAM_FAIL_FAST,
+        "keep-going": TASK_HELP4PARAM_KEEP_GOING,
+        "resume": TASK_HELP4PARAM_RESUME,
+        "dry-run": TASK_HELP4PARAM_DRY_RUN,
+        "shard": TASK_HELP4PARAM_SHARD,
 })
 def redo(ctx, project="all", build_config=None, config=None, generator=None,
-         arg=None, init_arg=None, test_arg=None, use_test=False):
+         arg=None, init_arg=None, test_arg=None, use_test=False,
+         fail_fast=False, keep_going=False, resume=False,
+         dry_run=False, shard=None):
+    # pylint: disable=too-many-arguments
     """Build cycle for cmake project(s) (performs: reinit, build, ...).
 
     Steps:
@@ -616,13 +816,98 @@ def redo(ctx, project="all", build_config=None, config=None, generator=None,
                                          build_config=build_config,
                                          generator=generator,
                                          init_args=cmake_init_args)
-    for cmake_project in cmake_projects:
+    def redo_cmake_project(cmake_project):
         cmake_project.reinit(args=cmake_init_args, config=config)
         cmake_project.build(args=cmake_build_args, config=config)
                             # MAYBE: options=cmake_options)
         if use_test:
             cmake_project.test(args=ctest_args, config=config)
 
+    run_cmake_project_units(ctx, cmake_projects, redo_cmake_project, "redo",
+                            inputs=dict(args=cmake_build_args, init_args=cmake_init_args,
+                                        test_args=ctest_args, use_test=use_test,
+                                        config=config),
+                            fail_fast=fail_fast, keep_going=keep_going,
+                            resume=resume, dry_run=dry_run, shard=shard)
+
+
+@task(iterable=["stage", "arg", "init_arg", "test_arg"],
+      klass=CMakeBuildTask,
+      help={
+        "project": TASK_HELP4PARAM_PROJECT,
+        "build-config": TASK_HELP4PARAM_BUILD_CONFIG,
+        "config": TASK_HELP4PARAM_CMAKE_CONFIG,
+        "generator": TASK_HELP4PARAM_CMAKE_GENERATOR,
+        "stage": "Stage to run: init, build, test, install, pack (many)",
+        "arg": TASK_HELP4PARAM_CMAKE_BUILD_ARG,
+        "init-arg": TASK_HELP4PARAM_CMAKE_INIT_ARG,
+        "test-arg": TASK_HELP4PARAM_CTEST_ARG,
+        "prefix": "CMAKE_INSTALL_PREFIX to use (for install stage)",
+        "format": "cpack.generator to use (for pack stage)",
+        "fail-fast": TASK_HELP4PARAM_FAIL_FAST,
+        "keep-going": TASK_HELP4PARAM_KEEP_GOING,
+        "resume": TASK_HELP4PARAM_RESUME,
+        "dry-run": TASK_HELP4PARAM_DRY_RUN,
+        "shard": TASK_HELP4PARAM_SHARD,
+})
+def pipeline(ctx, project="all", build_config=None, config=None, generator=None,
+             stage=None, arg=None, init_arg=None, test_arg=None,
+             prefix=None, format=None,
+             fail_fast=False, keep_going=False, resume=False, dry_run=False,
+             shard=None):
+    # pylint: disable=too-many-arguments, too-many-locals
+    """Run the stages of cmake project(s) pipelined (init, build, test, ...).
+    Each project moves through its stages on its own (overlapping others).
+    """
+    from .journal import make_journaled_units
+    from .pipeline import parse_stages, run_pipelines
+    from .shard import parse_shard, select_shard_pipelines, get_shard_results
+    try:
+        stages = parse_stages(stage or ctx.config.get("pipeline_stages"))
+        shard = parse_shard(shard or ctx.config.get("shard"))
+    except ValueError as e:
+        raise Exit(str(e))
+    cmake_build_args = arg or []
+    cmake_init_args = init_arg or []
+    ctest_args = test_arg or []
+
+    cmake_projects = make_cmake_projects(ctx, project,
+                                         build_config=build_config,
+                                         generator=generator,
+                                         init_args=cmake_init_args)
+    stage_functions = {
+        "init": lambda p: p.init(args=cmake_init_args, config=config),
+        "build": lambda p: p.build(args=cmake_build_args, config=config),
+        "test": lambda p: p.test(args=ctest_args, config=config),
+        "install": lambda p: p.install(prefix=prefix, config=config),
+        "pack": lambda p: p.pack(format=format),
+    }
+    stage_inputs = {
+        "init": dict(init_args=cmake_init_args, config=config),
+        "build": dict(args=cmake_build_args, config=config),
+        "test": dict(args=ctest_args, config=config),
+        "install": dict(prefix=prefix, config=config),
+        "pack": dict(format=format),
+    }
+    stage_units = [make_journaled_units(ctx.config, cmake_projects, name,
+                                        stage_functions[name],
+                                        inputs=stage_inputs[name], resume=resume)
+                   for name in stages]
+    if keep_going or fail_fast:
+        policy = bool(keep_going)
+    else:
+        policy = None   # -- USE: config-param keep_going
+
+    pipelines = list(zip(*stage_units))
+    on_results = None
+    if shard:
+        pipelines = select_shard_pipelines(ctx.config, pipelines, shard)
+        shard_results = get_shard_results(ctx.config, shard)
+        if shard_results is not None and not dry_run:
+            on_results = shard_results.record
+    run_pipelines(ctx.config, pipelines, keep_going=policy, dry_run=dry_run,
+                  on_results=on_results)
+
 
 def cmake_build_show_projects(projects):
     print("PROJECTS[%d]:" % len(projects))
@@ -640,12 +925,86 @@ def cmake_build_show_build_configs(build_configs):
         print("  - {build_config}".format(build_config=build_config))
 
 
+@task(klass=CMakeBuildTask,
+      help={
+        "project": TASK_HELP4PARAM_PROJECT,
+        "build-config": "Build config(s) to keep (pinned; default: current)",
+        "quota": "Build directory quota, like: 20G (default: build_dir_quota)",
+        "dry-run": "Show what would be removed (and the reclaimed space)",
+})
+def gc(ctx, project="all", build_config=None, quota=None, dry_run=False):
+    """Remove stale build dirs and evict least-recently-used build dirs
+    if the build_dir_quota is exceeded.
+    """
+    from .quota import gc_build_dirs, parse_size
+    try:
+        quota = parse_size(quota or ctx.config.get("build_dir_quota"))
+    except ValueError as e:
+        raise Exit(str(e))
+
+    dry_run = dry_run or ctx.config.run.dry or False
+    evicted = gc_build_dirs(ctx, project, build_config=build_config,
+                            quota=quota, dry_run=dry_run)
+    if not evicted:
+        print("BUILD-DIR-GC: Nothing to remove.")
+
+
+@task(help={
+        "project": TASK_HELP4PARAM_PROJECT,
+        "build-config": "Build config(s) to use (default: all)",
+        "size": "Compute unknown build directory sizes, too",
+})
+def status(ctx, project="all", build_config=None, size=False):
+    """Show the status of cmake project(s) (without running cmake)."""
+    # -- HINT: No CMakeBuildTask: The build_config is not remembered
+    # (would be used by the next tasks) and not inherited.
+    from .status import collect_status, print_status_table
+    build_config = build_config or "all"
+    cmake_projects = make_cmake_projects(ctx, project, build_config=build_config,
+                                         strict=False)
+    print_status_table(collect_status(ctx, cmake_projects, with_size=size))
+
+
+@task(iterable=["results", "junit"],
+      help={
+        "results": "Shard results file(s) to merge (many, glob patterns)",
+        "output": "Merged results file (default: .cmake_build.results.json)",
+        "junit": "JUnit test report file(s) to merge (many, glob patterns)",
+        "junit-output": "Merged JUnit test report (default: ctest-junit.xml)",
+})
+def merge_results(ctx, results=None, output=None, junit=None, junit_output=None):
+    """Merge the results of CI shards (and their JUnit test reports)."""
+    from .shard import MERGED_RESULTS_BASENAME, SHARD_RESULTS_SCHEMA, \
+        expand_filenames, merge_shard_results, merge_junit_reports
+    config_dir = ctx.config.get("config_dir")
+    if not isinstance(config_dir, str):
+        config_dir = "."
+    if not results:
+        results = [os.path.join(config_dir, SHARD_RESULTS_SCHEMA.format(
+            SHARD="*", SHARDS="*"))]
+    filenames = expand_filenames(results)
+    if not filenames:
+        raise Exit("MERGE-RESULTS: No shard results found ({0})".format(
+            ", ".join(results)))
+
+    merged = merge_shard_results(filenames)
+    if junit:
+        junit_filenames = expand_filenames(junit)
+        merge_junit_reports(junit_filenames, junit_output or "ctest-junit.xml",
+                            problems=merged.problems)
+    merged.save(output or os.path.join(config_dir, MERGED_RESULTS_BASENAME))
+    merged.print_report()
+    if merged.failed:
+        raise Exit("MERGE-RESULTS: FAILED", code=1)
+
+
 @task
 def config(ctx):
     """Show cmake-build configuration details."""
+    from pprint import pprint
     # config = ctx.config
     if not ctx.config.build_configs_map:
-        build_configs_map = make_build_configs_map(ctx.config.build_configs)
+        build_configs_map = make_build_configs_map4config(ctx.config)
         ctx.config.build_configs_map = build_configs_map
 
     print("cmake_generator: %s" % ctx.config.cmake_generator)
@@ -659,7 +1018,8 @@ def config(ctx):
 # -----------------------------------------------------------------------------
 # TASK CONFIGURATION:
 # -----------------------------------------------------------------------------
-namespace = Collection(redo, init, test, clean, reinit, rebuild, config)
+namespace = Collection(redo, init, test, clean, reinit, rebuild, config, gc,
+                       status, merge_results, pipeline)
 namespace.add_task(build, default=True)
 namespace.add_task(install)
 namespace.add_task(pack)
@@ -673,6 +1033,35 @@ TASKS_CONFIG_DEFAULTS = {
     "cmake_install_prefix": None,
     "cmake_defines": None,
     "build_dir_schema": "build.{BUILD_CONFIG}",
+    "build_dir_quota": None,    # HINT: Disk quota for build_dirs, like: 20G
+    "workspace_store": None,    # HINT: Use workspace database (true or filename)
+    "build_dir_lock": "no",     # HINT: Build dir lock mode: no, wait, fail
+    "build_dir_lock_timeout": None, # HINT: In seconds (default: wait forever)
+    "process_runner": "shell",  # HINT: Run commands via: shell, direct (no shell)
+    "process_runner_pty": False,    # HINT: Direct runner uses pty (or pipe)
+    "build_log": None,          # HINT: Log file per unit: true or log directory
+    "build_log_compress": False,
+    "build_log_console": "all", # HINT: Console output: all, errors, none
+    "build_log_tail": 100,      # HINT: Number of last lines kept (error report)
+    "progress_dashboard": False,    # HINT: Show progress per unit (uses build logs)
+    "concurrent_units": 1,      # HINT: Number of projects/build_configs at once
+    "keep_going": False,        # HINT: Failure policy: fail-fast or keep-going
+    "cancel_grace_period": 5,   # HINT: In seconds (between SIGTERM and SIGKILL)
+    "run_journal": False,       # HINT: Record done units (or journal filename)
+    "resume": False,            # HINT: Skip units already done in last run
+    "sources_fingerprint": False,   # HINT: Record sources fingerprint per build
+    "shard": None,              # HINT: Run shard K of N of the units, like: 1/4
+    "shard_results": ".cmake_build.shard-{SHARD}-of-{SHARDS}.json",
+    "shard_timings": None,      # HINT: Merged results file (weights of units)
+    "pipeline_stages": None,    # HINT: Default: init, build, test
+    "pipeline_stage_limits": {},    # HINT: Units per stage at once, like: build: 1
+    "phase_timeouts": {},       # HINT: Per phase, like: build: {total: 2h, idle: 15m}
+    "phase_timeout_stack_samples": False,   # HINT: Diagnostics with stack samples
+    "cpu_placement": "none",    # HINT: CPU sets per unit: none, partition, numa
+    "cpu_set": None,            # HINT: CPUs to use, like: 0-15 (default: all)
+    "unit_priority": "normal",  # HINT: Priority of units: normal, background, idle
+    "unit_nice": None,          # HINT: nice value (override of unit_priority)
+    "unit_ionice": None,        # HINT: I/O class, like: idle, best-effort:7
     "build_config": BUILD_CONFIG_DEFAULT,
     "build_configs": [],
     "build_config_aliases": {}, # HINT: Map string -> sequence<string> (or string/callable)
@@ -692,3 +1081,6 @@ cleanup_tasks.configure(namespace.configuration({}))
 # -- REGISTER DEFAULT CLEANUP_DIRS (if configfile is not provided):
 # HINT: build_dir_schema: build.{BUILD_CONFIG}
 config_add_cleanup_dirs(["build.*"])
+
+# -- REMOVE CLEANUP DIRS: Via trash directory (if enabled by environment).
+config_use_directory_remover(remove_tree)
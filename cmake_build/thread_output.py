@@ -0,0 +1,144 @@
+# -*- coding: UTF-8 -*-
+"""
+Collects the output of worker threads (one output buffer per thread).
+The output of a worker is shown when it is finished (not interleaved).
+
+* :class:`ThreadOutputRouter` is used as ``sys.stdout``/``sys.stderr``
+  while the workers run (see: :func:`routed_thread_output()`).
+* Commands run with ``ctx.run()`` write their output from the IO threads
+  of `invoke`_. Therefore, these output streams are passed explicitly
+  (see: :func:`thread_output_streams()`, :func:`make_thread_output_config()`).
+
+Used by the cleanup tasklet, the scheduler and the pipeline.
+
+HINT: Only uses the python standard library (keep startup time small).
+
+.. _invoke: https://pyinvoke.org/
+"""
+
+from __future__ import absolute_import
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import StringIO
+import sys
+import threading
+
+
+# -----------------------------------------------------------------------------
+# THREAD OUTPUT ROUTER:
+# -----------------------------------------------------------------------------
+class ThreadOutputRouter(object):
+    """Routes the output of a worker thread into its output buffer
+    (used as ``sys.stdout``/``sys.stderr`` while workers run).
+    The output of other threads is written to the original stream.
+    """
+    _local = threading.local()
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    @classmethod
+    def capture(cls, buffer):
+        cls._local.buffer = buffer
+
+    @classmethod
+    def release(cls):
+        cls._local.buffer = None
+
+    @classmethod
+    def captured_buffer(cls):
+        """Output buffer of the current thread (or None, if not captured)."""
+        return getattr(cls._local, "buffer", None)
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is not None:
+            return buffer.write(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        if getattr(self._local, "buffer", None) is None:
+            self.stream.flush()
+
+    @property
+    def buffer(self):
+        """Binary stream (or None, if the output of this thread is captured)."""
+        if getattr(self._local, "buffer", None) is not None:
+            return None     # -- HINT: Use text output (into the output buffer).
+        return self.stream.buffer
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+@contextmanager
+def routed_thread_output():
+    """Installs :class:`ThreadOutputRouter` objects as stdout/stderr."""
+    if isinstance(sys.stdout, ThreadOutputRouter):
+        # -- CASE: Nested usage (already installed).
+        yield
+        return
+
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = ThreadOutputRouter(stdout)
+    sys.stderr = ThreadOutputRouter(stderr)
+    try:
+        yield
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+
+
+def thread_output_streams():
+    """Output streams for ``ctx.run()`` in the current thread.
+
+    :return: Dict with out_stream/err_stream (if the output is captured).
+    """
+    buffer = ThreadOutputRouter.captured_buffer()
+    if buffer is None:
+        return {}
+    return dict(out_stream=buffer, err_stream=buffer)
+
+
+def make_thread_output_config(config):
+    """Makes a config for the tasks of the current (worker) thread.
+    Its ``ctx.run()`` commands write their output into the output buffer
+    of this thread (if it is captured).
+
+    :param config:  Config object to use (invoke Config).
+    :return: Cloned config (or the config, if the output is not captured).
+    """
+    streams = thread_output_streams()
+    if not streams:
+        return config
+
+    config = config.clone()
+    for name, stream in streams.items():
+        config.run[name] = stream
+    # -- HINT: Concurrent tasks should not compete for the terminal input.
+    config.run["in_stream"] = False
+    return config
+
+
+def execute_concurrently(functions, max_workers):
+    """Calls functions (without params) concurrently by using worker threads.
+    The output of each function is collected (stdout and stderr).
+
+    :param functions:   Functions to call (as list).
+    :param max_workers: Maximum number of worker threads.
+    :return: List of (output, error) tuples (in order of the functions).
+    """
+    def call_function(function):
+        buffer = StringIO()
+        ThreadOutputRouter.capture(buffer)
+        try:
+            function()
+            error = None
+        except Exception as e:  # pylint: disable=broad-except
+            error = e
+        finally:
+            ThreadOutputRouter.release()
+        return buffer.getvalue(), error
+
+    with routed_thread_output():
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(call_function, functions))
@@ -0,0 +1,397 @@
+# -*- coding: UTF-8 -*-
+"""
+Removes (large) build directories by "rename then delete":
+
+1. The directory is renamed into a trash directory on the same filesystem.
+   This is an atomic, fast operation. The directory path can be reused at once
+   (like: by the cmake-init step that follows).
+2. The trash is deleted by a bounded pool of worker threads,
+   either in the background or deferred (at the end of the cmake-build run).
+
+The trash directory is selected per filesystem (device of the directory):
+
+* ``trash/`` in the cache directory (if it is on the same filesystem),
+* ``.cmake_build.trash/`` in the workspace root directory (config_dir),
+* ``.cmake_build.trash/`` in the mount point of the directory.
+
+If no trash directory can be used, the directory is removed directly
+(a message is printed once).
+
+Trash that was left behind (like: aborted run) is removed in the next run
+(when the cmake-build program starts or the trash directory is used again).
+
+ENVIRONMENT VARIABLES:
+
+* ``CMAKE_BUILD_TRASH=no``:         Remove directories directly (default).
+* ``CMAKE_BUILD_TRASH=background``: Delete the trash in the background.
+* ``CMAKE_BUILD_TRASH=deferred``:   Delete the trash at the end of the run.
+* ``CMAKE_BUILD_TRASH_WORKERS=N``:  Number of worker threads (default: 4).
+* ``CMAKE_BUILD_CACHE_DIR=...``:    Cache directory (contains the trash directory).
+
+HINT: Only uses the python standard library (keep startup time small).
+"""
+
+from __future__ import absolute_import, print_function
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import itertools
+import os
+import shutil
+import threading
+from .cache import user_cache_dir
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+TRASH_DIRNAME = "trash"
+WORKSPACE_TRASH_DIRNAME = ".cmake_build.trash"
+TRASH_MODES = ("background", "deferred")
+TRASH_MODE_ALIASES = {"yes": "background", "on": "background", "true": "background"}
+TRASH_WORKERS_DEFAULT = 4
+
+
+# ---------------------------------------------------------------------------
+# UTILITY FUNCTIONS:
+# ---------------------------------------------------------------------------
+def trash_mode_from_environment():
+    """Trash mode from environment variable ``CMAKE_BUILD_TRASH``.
+
+    :return: Trash mode (as string) or None (if disabled).
+    """
+    mode = os.environ.get("CMAKE_BUILD_TRASH", "no").strip().lower()
+    mode = TRASH_MODE_ALIASES.get(mode, mode)
+    if mode not in TRASH_MODES:
+        return None
+    return mode
+
+
+def trash_workers_from_environment():
+    try:
+        max_workers = int(os.environ.get("CMAKE_BUILD_TRASH_WORKERS", "0"))
+    except ValueError:
+        max_workers = 0
+    return max_workers or TRASH_WORKERS_DEFAULT
+
+
+def process_exists(pid):
+    """Checks if a process is still running (used for orphaned trash)."""
+    if pid == os.getpid():
+        return True
+    elif os.name == "nt":
+        # -- SIMPLIFIED: Assume that the other process has finished.
+        return False
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # -- CASE: PermissionError (process of another user exists).
+        return True
+    return True
+
+
+def path_device(path):
+    """Device of a path (or of its nearest existing parent directory).
+
+    :return: Device number (st_dev) or None (on failure).
+    """
+    path = os.path.abspath(str(path))
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+
+def find_mount_point(path):
+    """Mount point of the filesystem that contains this path."""
+    path = os.path.abspath(str(path))
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def _remove_path(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# TRASH BIN:
+# ---------------------------------------------------------------------------
+class TrashBin(object):
+    """Moves directories into a trash directory and deletes them later
+    (by using a pool of worker threads).
+
+    .. code-block:: python
+
+        trash_bin = TrashBin(mode="background")
+        trash_bin.remove_tree("build.debug")    # -- RETURNS: At once.
+        ...
+        trash_bin.flush()                       # -- WAIT: Until deleted.
+    """
+
+    def __init__(self, mode="background", max_workers=None, trash_dir=None,
+                 root_dir=None):
+        assert mode in TRASH_MODES, "mode=%s" % mode
+        self.mode = mode
+        self.trash_dir = str(trash_dir or os.path.join(user_cache_dir(),
+                                                       TRASH_DIRNAME))
+        self.root_dir = None
+        if root_dir:
+            self.root_dir = os.path.abspath(str(root_dir))
+        self.fallback_reported = False
+        self.max_workers = max_workers or TRASH_WORKERS_DEFAULT
+        self.executor = None
+        self.pending = []
+        self.futures = []
+        self.trash_dirs = set()
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def make_trash_name(self, directory):
+        basename = os.path.basename(os.path.abspath(str(directory)))
+        return "{0}.{1}.{2}".format(basename, os.getpid(), next(self._counter))
+
+    @staticmethod
+    def parse_trash_name(name):
+        """Parses the process-id from a trash entry name (or None)."""
+        parts = name.rsplit(".", 2)
+        if len(parts) == 3 and parts[1].isdigit():
+            return int(parts[1])
+        return None
+
+    def make_trash_dirs(self):
+        """Trash directory candidates (in order of preference)."""
+        trash_dirs = [self.trash_dir]
+        if self.root_dir:
+            trash_dirs.append(os.path.join(self.root_dir,
+                                           WORKSPACE_TRASH_DIRNAME))
+        return trash_dirs
+
+    def select_trash_dirs(self, directory):
+        """Selects the trash directories on the filesystem of a directory.
+
+        :param directory:   Directory to move into the trash.
+        :return: List of trash directories (on the same filesystem).
+        """
+        parent_dir = os.path.dirname(os.path.abspath(str(directory)))
+        device = path_device(parent_dir)
+        if device is None:
+            return []
+
+        mount_trash_dir = os.path.join(find_mount_point(parent_dir),
+                                       WORKSPACE_TRASH_DIRNAME)
+        selected = []
+        for trash_dir in self.make_trash_dirs() + [mount_trash_dir]:
+            if trash_dir not in selected and path_device(trash_dir) == device:
+                selected.append(trash_dir)
+        return selected
+
+    def move_to_trash(self, directory):
+        """Moves the directory into the trash (by using rename).
+
+        :return: Path of the directory in the trash (or None, on failure).
+        """
+        directory = str(directory)
+        if not os.path.isdir(directory) or os.path.islink(directory):
+            return None
+
+        trash_name = self.make_trash_name(directory)
+        for trash_dir in self.select_trash_dirs(directory):
+            trashed_directory = os.path.join(trash_dir, trash_name)
+            try:
+                if not os.path.isdir(trash_dir):
+                    os.makedirs(trash_dir, exist_ok=True)
+                os.rename(directory, trashed_directory)
+            except OSError:
+                # -- CASE: Permissions, ... (try the next trash directory).
+                continue
+
+            self.recover_orphans(trash_dir)
+            return trashed_directory
+        return None
+
+    def remove_tree(self, directory):
+        """Removes a directory tree (via the trash, if possible).
+
+        :return: True, if the directory was moved into the trash.
+        """
+        trashed_directory = self.move_to_trash(directory)
+        if trashed_directory is None:
+            # -- FALLBACK: Remove it directly.
+            if os.path.isdir(str(directory)):
+                if not self.fallback_reported:
+                    self.fallback_reported = True
+                    print("TRASH: No trash directory on the filesystem of %s "
+                          "(removed directly)" % directory)
+                shutil.rmtree(str(directory))
+            return False
+
+        self.schedule(trashed_directory)
+        return True
+
+    def recover_orphans(self, trash_dir=None):
+        """Schedules the trash of finished processes for deletion
+        (only once per trash directory for this trash bin).
+
+        :param trash_dir:   Trash directory to use (default: all known ones).
+        """
+        if trash_dir is None:
+            orphans = []
+            for trash_dir in self.make_trash_dirs():
+                orphans.extend(self.recover_orphans(trash_dir))
+            return orphans
+
+        if trash_dir in self.trash_dirs:
+            return []
+
+        self.trash_dirs.add(trash_dir)
+        try:
+            names = os.listdir(trash_dir)
+        except OSError:
+            return []
+
+        orphans = []
+        for name in names:
+            pid = self.parse_trash_name(name)
+            if pid is None or not process_exists(pid):
+                orphan = os.path.join(trash_dir, name)
+                orphans.append(orphan)
+                self.schedule(orphan)
+        return orphans
+
+    def schedule(self, trashed_path):
+        if self.mode == "background":
+            self._submit(trashed_path)
+        else:
+            self.pending.append(trashed_path)
+
+    def _submit(self, trashed_path):
+        """Deletes a trashed directory tree in parallel:
+        Its top-level entries are deleted by the workers (concurrently).
+        """
+        with self._lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        try:
+            entries = [os.path.join(trashed_path, name)
+                       for name in os.listdir(trashed_path)]
+        except OSError:
+            entries = []
+        if not os.path.isdir(trashed_path) or os.path.islink(trashed_path):
+            entries = []
+
+        remaining = [len(entries)]
+
+        def on_entry_removed(_future):
+            with self._lock:
+                remaining[0] -= 1
+                is_last = remaining[0] == 0
+            if is_last:
+                _remove_path(trashed_path)
+
+        if not entries:
+            self.futures.append(self.executor.submit(_remove_path, trashed_path))
+            return
+
+        for entry in entries:
+            future = self.executor.submit(_remove_path, entry)
+            future.add_done_callback(on_entry_removed)
+            self.futures.append(future)
+
+    def flush(self, wait=True):
+        """Deletes the pending trash (deferred mode) and
+        waits until the trash is deleted (if wait is true).
+        """
+        pending, self.pending = self.pending, []
+        for trashed_path in pending:
+            self._submit(trashed_path)
+
+        if wait and self.executor is not None:
+            futures, self.futures = self.futures, []
+            for future in futures:
+                future.result()
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            self._remove_empty_trash_dirs()
+
+    def _remove_empty_trash_dirs(self):
+        for trash_dir in self.trash_dirs:
+            try:
+                os.rmdir(trash_dir)
+            except OSError:
+                pass    # -- CASE: Not empty (used by other process, ...)
+
+    def shutdown(self):
+        """Called at process exit: Deletes any remaining trash."""
+        pending, self.pending = self.pending, []
+        for trashed_path in pending:
+            # -- HINT: No new threads can be used at interpreter shutdown.
+            _remove_path(trashed_path)
+        self._remove_empty_trash_dirs()
+
+
+# ---------------------------------------------------------------------------
+# SHARED TRASH BIN:
+# ---------------------------------------------------------------------------
+_trash_bin = None
+
+
+def get_trash_bin(root_dir=None):
+    """Provides the shared :class:`TrashBin` (or None, if disabled).
+
+    :param root_dir:    Workspace root directory (config_dir), if known.
+    """
+    global _trash_bin   # pylint: disable=global-statement
+    if _trash_bin is None:
+        mode = trash_mode_from_environment()
+        if mode is None:
+            return None
+        _trash_bin = TrashBin(mode, max_workers=trash_workers_from_environment(),
+                              root_dir=root_dir)
+        atexit.register(_trash_bin.shutdown)
+    elif root_dir and _trash_bin.root_dir is None:
+        _trash_bin.root_dir = os.path.abspath(str(root_dir))
+    return _trash_bin
+
+
+def remove_tree(directory):
+    """Removes a directory tree: via the trash (if enabled) or directly."""
+    trash_bin = get_trash_bin()
+    if trash_bin is not None:
+        trash_bin.remove_tree(directory)
+    elif os.path.isdir(str(directory)):
+        shutil.rmtree(str(directory))
+
+
+def recover_trash_orphans(root_dir=None):
+    """Schedules the trash of aborted runs for deletion (if the trash is used).
+    Called when the cmake-build program starts.
+
+    :param root_dir:    Workspace root directory (config_dir), if known.
+    """
+    trash_bin = get_trash_bin(root_dir)
+    if trash_bin is None:
+        return []
+    return trash_bin.recover_orphans()
+
+
+def flush_trash(wait=True):
+    """Deletes the trash of this process (if the trash is used)."""
+    if _trash_bin is not None:
+        _trash_bin.flush(wait=wait)
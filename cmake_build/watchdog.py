@@ -0,0 +1,487 @@
+# -*- coding: UTF-8 -*-
+"""
+Hang detection: Per-phase timeouts for the commands of a unit
+(project and build_config), watched while the command runs.
+
+* total timeout: The phase of a unit does not finish in time
+  (measured from the first command of this phase in the unit).
+* idle timeout:  The command does not produce output for some time
+  (like: a hanging test or a deadlocked compiler/linker).
+
+Before the process tree is killed, diagnostics are collected:
+the process tree (with command-lines), the last output lines and
+optional stack samples (with ``eu-stack`` or ``gdb``, if installed)
+of the leaf processes (limited in time, see: ``STACK_SAMPLES_TIMEOUT``).
+The diagnostics are shown and stored in ``{build_dir}/cmake_build.timeout.log``.
+The unit is marked as "timeout" (like a failed unit for the failure policy).
+
+.. code-block:: yaml
+
+    # -- FILE: cmake_build.yaml
+    phase_timeouts:
+      default: {idle: 30m}          # For all phases (without own entry)
+      init: 10m                     # Total time (same as: {total: 10m})
+      build: {total: 2h, idle: 15m}
+      test: {total: 30m, idle: 5m}
+      build_configs:                # Overrides per build_config
+        debug:
+          test: {total: 1h}
+    phase_timeout_stack_samples: false
+
+Durations are seconds (as number) or strings, like: 90s, 15m, 1.5h.
+The phases "conan" and "configure" use the entry of the "init" phase
+(if they have no own entry).
+
+HINT: Timeouts use the direct process runner (see: :mod:`cmake_build.process_runner`).
+"""
+
+from __future__ import absolute_import, print_function
+from contextlib import contextmanager
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from .process_runner import GRACE_PERIOD, terminate_process_group
+from .progress import format_duration
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+PHASE_ALIASES = {"conan": "init", "configure": "init"}
+DIAGNOSTICS_BASENAME = "cmake_build.timeout.log"
+DURATION_PATTERN = re.compile(r"^(?P<value>\d+(\.\d*)?)\s*(?P<unit>[smhd]?)$")
+DURATION_UNITS = dict(s=1, m=60, h=3600, d=86400)
+TAIL_LINES = 20
+TAIL_SIZE = 16 * 1024       # -- LIMIT: Output tail (in bytes).
+POLL_INTERVAL = 0.5         # in seconds.
+STACK_SAMPLE_TIMEOUT = 20   # in seconds (per process).
+STACK_SAMPLES_TIMEOUT = 30  # in seconds (for all processes).
+STACK_SAMPLE_TOOLS = [
+    ("eu-stack", ["eu-stack", "-p", "{pid}"]),
+    ("gdb", ["gdb", "-p", "{pid}", "-batch", "-ex", "thread apply all bt"]),
+]
+TRUE_VALUES = ("y", "yes", "true", "on", "1")
+
+
+# ---------------------------------------------------------------------------
+# UTILITY FUNCTIONS:
+# ---------------------------------------------------------------------------
+def parse_duration(value):
+    """Parses a duration, like: 600, "90s", "15m", "1.5h".
+
+    :return: Duration in seconds (or None, if value is empty or zero).
+    :raises ValueError: If the duration is invalid.
+    """
+    if value is None or value is False:
+        return None
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        text = str(value).strip().lower()
+        if not text:
+            return None
+        match = DURATION_PATTERN.match(text)
+        if not match:
+            raise ValueError("BAD-TIMEOUT: {0} (expected: 600, 90s, 15m, 1.5h)".format(
+                text))
+        seconds = float(match.group("value")) * \
+            DURATION_UNITS.get(match.group("unit") or "s")
+    if seconds < 0:
+        raise ValueError("BAD-TIMEOUT: {0} (negative)".format(value))
+    return seconds or None
+
+
+class PhaseTimeout(object):
+    """Timeouts of a phase (in seconds; None: no timeout).
+
+    :param total:   Maximal duration of a command.
+    :param idle:    Maximal duration without output.
+    """
+
+    def __init__(self, total=None, idle=None):
+        self.total = total
+        self.idle = idle
+
+    @classmethod
+    def parse(cls, value):
+        """Parses a timeout entry: duration (total) or dict (total, idle)."""
+        if hasattr(value, "get"):
+            return cls(total=parse_duration(value.get("total")),
+                       idle=parse_duration(value.get("idle")))
+        return cls(total=parse_duration(value))
+
+    @property
+    def enabled(self):
+        return bool(self.total or self.idle)
+
+    def merge(self, other):
+        """Timeouts of other override these timeouts (if provided)."""
+        return PhaseTimeout(total=other.total or self.total,
+                            idle=other.idle or self.idle)
+
+    def __repr__(self):
+        return "<PhaseTimeout: total={0}, idle={1}>".format(self.total, self.idle)
+
+
+def phase_timeouts_enabled(config):
+    data = config.get("phase_timeouts")
+    return hasattr(data, "get") and bool(data)
+
+
+def make_phase_timeout(config, phase, build_config=None):
+    """Timeouts of a phase (and build_config) from config-param ``phase_timeouts``.
+
+    :return: :class:`PhaseTimeout` object (or None, if no timeout is used).
+    :raises ValueError: If a timeout is invalid.
+    """
+    data = config.get("phase_timeouts")
+    if not hasattr(data, "get"):
+        return None
+    sections = [data]
+    build_configs = data.get("build_configs")
+    if build_config and hasattr(build_configs, "get"):
+        sections.append(build_configs.get(build_config) or {})
+
+    # -- HINT: default < init (for: conan, configure) < phase (per section).
+    names = ["default", PHASE_ALIASES.get(phase), phase]
+    timeout = PhaseTimeout()
+    for section in sections:
+        for name in names:
+            if name and name in section:
+                timeout = timeout.merge(PhaseTimeout.parse(section[name]))
+    return timeout if timeout.enabled else None
+
+
+def stack_samples_enabled(config):
+    value = config.get("phase_timeout_stack_samples")
+    return value is True or str(value).strip().lower() in TRUE_VALUES
+
+
+# ---------------------------------------------------------------------------
+# DIAGNOSTICS:
+# ---------------------------------------------------------------------------
+def _read_proc_processes(proc_dir="/proc"):
+    processes = {}
+    for name in os.listdir(proc_dir):
+        if not name.isdigit():
+            continue
+        try:
+            with open(os.path.join(proc_dir, name, "stat"), "rb") as f:
+                stat = f.read().decode("UTF-8", "replace")
+            with open(os.path.join(proc_dir, name, "cmdline"), "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode("UTF-8", "replace")
+        except (IOError, OSError):
+            continue    # -- CASE: Process is already finished.
+        # -- HINT: Command name may contain spaces/parens: "pid (comm) state ppid ..."
+        comm_end = stat.rfind(")")
+        ppid = int(stat[comm_end+2:].split()[1])
+        if not cmdline.strip():
+            cmdline = "[{0}]".format(stat[stat.find("(")+1:comm_end])
+        processes[int(name)] = (ppid, cmdline.strip())
+    return processes
+
+
+def _read_ps_processes():
+    output = subprocess.check_output(["ps", "-A", "-o", "pid=", "-o", "ppid=",
+                                      "-o", "args="])
+    processes = {}
+    for line in output.decode("UTF-8", "replace").splitlines():
+        parts = line.split(None, 2)
+        if len(parts) >= 2:
+            processes[int(parts[0])] = (int(parts[1]),
+                                        parts[2] if len(parts) > 2 else "")
+    return processes
+
+
+def collect_process_tree(pid):
+    """Collects the process tree of a process (the process and its children).
+
+    :return: List of (pid, depth, cmdline) tuples (in tree order).
+    """
+    try:
+        if os.path.isdir("/proc/self"):
+            processes = _read_proc_processes()
+        else:
+            processes = _read_ps_processes()
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return []
+    children = {}
+    for child_pid, (ppid, _) in processes.items():
+        children.setdefault(ppid, []).append(child_pid)
+
+    tree = []
+    pending = [(pid, 0)] if pid in processes else []
+    while pending:
+        current, depth = pending.pop()
+        tree.append((current, depth, processes[current][1]))
+        for child_pid in sorted(children.get(current, []), reverse=True):
+            pending.append((child_pid, depth + 1))
+    return tree
+
+
+def select_leaf_processes(process_tree):
+    """Selects the leaf processes (without children) of a process tree.
+
+    :param process_tree: List of (pid, depth, cmdline) tuples (in tree order).
+    :return: List of (pid, depth, cmdline) tuples.
+    """
+    leaves = []
+    for index, entry in enumerate(process_tree):
+        following = process_tree[index+1:index+2]
+        if not following or following[0][1] <= entry[1]:
+            leaves.append(entry)
+    return leaves
+
+
+def collect_stack_sample(pid, timeout=STACK_SAMPLE_TIMEOUT):
+    """Collects the stack traces of a process (with eu-stack or gdb).
+
+    :param timeout: Timeout for the stack sample tool (in seconds).
+    :return: Stack sample (as text) or None (if no tool is installed).
+    """
+    for tool, argv in STACK_SAMPLE_TOOLS:
+        if not shutil.which(tool):
+            continue
+        argv = [arg.format(pid=pid) for arg in argv]
+        try:
+            output = subprocess.run(argv, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT,
+                                    timeout=timeout).stdout
+        except (OSError, subprocess.SubprocessError) as e:
+            return "{0}: {1}".format(tool, e)
+        return output.decode("UTF-8", "replace").rstrip()
+    return None
+
+
+# ---------------------------------------------------------------------------
+# PHASE TIMER:
+# ---------------------------------------------------------------------------
+_phase_timer = threading.local()
+
+
+@contextmanager
+def use_phase_timer():
+    """Measures the total timeout per phase of a unit (instead of per command).
+    The first command of a phase starts its timer (used by the scheduler
+    while a unit is run in the current thread).
+    """
+    previous = getattr(_phase_timer, "start_times", None)
+    _phase_timer.start_times = {}
+    try:
+        yield
+    finally:
+        _phase_timer.start_times = previous
+
+
+def get_phase_start_time(phase, now=None):
+    """Start time of a phase of the current unit (or None, without timer)."""
+    start_times = getattr(_phase_timer, "start_times", None)
+    if start_times is None:
+        return None
+    return start_times.setdefault(phase, now or time.time())
+
+
+# ---------------------------------------------------------------------------
+# WATCHDOG:
+# ---------------------------------------------------------------------------
+class Watchdog(object):
+    """Watches a running command (of a unit) for its phase timeouts.
+    If a timeout expires, the diagnostics are collected and
+    the process group of the command is terminated.
+
+    .. code-block:: python
+
+        watchdog = Watchdog(PhaseTimeout(total=3600, idle=600), name="p1/debug")
+        runner = ProcessRunner()
+        runner.run(["cmake", "--build", "."], cwd="build.debug", watchdog=watchdog)
+
+    :param timeout:     Timeouts to use (as :class:`PhaseTimeout`).
+    :param name:        Unit name and phase (for diagnostics).
+    :param diagnostics_file: File for the diagnostics (optional).
+    :param stack_samples: If true, the diagnostics contain stack samples.
+    :param grace_period:  Time between SIGTERM and SIGKILL (in seconds).
+    :param phase_start_time: Start time of the phase (for the total timeout;
+                        default: when the command is started).
+    """
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, timeout, name=None, diagnostics_file=None,
+                 stack_samples=False, grace_period=GRACE_PERIOD,
+                 phase_start_time=None):
+        # pylint: disable=too-many-arguments
+        self.timeout = timeout
+        self.phase_start_time = phase_start_time
+        self.name = name
+        self.diagnostics_file = diagnostics_file and str(diagnostics_file)
+        self.stack_samples = stack_samples
+        self.grace_period = grace_period
+        self.reason = None
+        self.diagnostics = None
+        self.process = None
+        self.start_time = None
+        self.last_output_time = None
+        self._tail = b""
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def timed_out(self):
+        return self.reason is not None
+
+    def wrap_writer(self, write):
+        """Provides an output writer that also notes the output."""
+        def write_and_touch(data):
+            self.touch(data)
+            write(data)
+        return write_and_touch
+
+    def touch(self, data=b""):
+        """Notes output of the command (resets the idle timeout)."""
+        self.last_output_time = time.time()
+        if data:
+            self._tail = (self._tail + data)[-TAIL_SIZE:]
+
+    def start(self, process):
+        """Starts watching the process (in a background thread)."""
+        self.process = process
+        self.start_time = self.last_output_time = time.time()
+        if self.phase_start_time is not None:
+            self.start_time = min(self.phase_start_time, self.start_time)
+        self.reason = self.diagnostics = None
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch,
+                                        name="watchdog-{0}".format(process.pid))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops watching (and waits until diagnostics/termination are done)."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def remaining_total(self, now=None):
+        """Remaining time of the total timeout (in seconds; or None)."""
+        if not self.timeout.total:
+            return None
+        start_time = self.phase_start_time or now or time.time()
+        return max(self.timeout.total - ((now or time.time()) - start_time), 0)
+
+    def check(self, now=None):
+        """Checks the timeouts.
+
+        :return: Reason (as string) if a timeout expired (otherwise: None).
+        """
+        now = now or time.time()
+        total = self.timeout.total
+        idle = self.timeout.idle
+        if total and now - self.start_time >= total:
+            return "TIMEOUT after {0} (total timeout)".format(format_duration(total))
+        elif idle and now - self.last_output_time >= idle:
+            return "HANG: no output for {0} (idle timeout)".format(
+                format_duration(idle))
+        return None
+
+    def _watch(self):
+        while not self._stopped.wait(POLL_INTERVAL):
+            reason = self.check()
+            if reason is None:
+                continue
+            self.reason = reason
+            self.diagnostics = self.make_diagnostics()
+            terminate_process_group(self.process, self.grace_period)
+            return
+
+    @property
+    def tail_lines(self):
+        text = self._tail.decode("UTF-8", "replace")
+        return text.splitlines()[-TAIL_LINES:]
+
+    def make_diagnostics(self):
+        """Collects the diagnostics of the running command (as text)."""
+        lines = ["CMAKE-BUILD: {0} -- {1}".format(self.name or "command", self.reason),
+                 "PROCESS TREE:"]
+        process_tree = collect_process_tree(self.process.pid)
+        for pid, depth, cmdline in process_tree:
+            lines.append("  {0}{1:>7}  {2}".format("  " * depth, pid, cmdline))
+        if not process_tree:
+            lines.append("  (not available)")
+        lines.append("LAST OUTPUT LINES:")
+        lines.extend("  {0}".format(line) for line in self.tail_lines)
+        if not self.tail_lines:
+            lines.append("  (no output)")
+        if self.stack_samples:
+            lines.extend(self.make_stack_samples(process_tree))
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def make_stack_samples(process_tree, timeout=STACK_SAMPLES_TIMEOUT):
+        """Collects stack samples of the leaf processes (within the timeout).
+
+        :return: Lines of the stack samples.
+        """
+        lines = []
+        deadline = time.time() + timeout
+        for pid, _, cmdline in select_leaf_processes(process_tree):
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                lines.append("STACK SAMPLES: stopped (after {0})".format(
+                    format_duration(timeout)))
+                break
+            sample = collect_stack_sample(pid, min(STACK_SAMPLE_TIMEOUT,
+                                                   remaining))
+            if sample is None:
+                lines.append("STACK SAMPLES: not available "
+                             "(requires: eu-stack or gdb)")
+                break
+            lines.append("STACK SAMPLE: {0} {1}".format(pid, cmdline))
+            lines.extend("  {0}".format(line) for line in sample.splitlines())
+        return lines
+
+    def report(self, stream=None):
+        """Shows the diagnostics (and stores them in the diagnostics file)."""
+        if not self.diagnostics:
+            return
+        stream = stream or sys.stdout
+        stream.write(self.diagnostics)
+        stream.flush()
+        if self.diagnostics_file:
+            try:
+                with open(self.diagnostics_file, "w") as f:
+                    f.write(self.diagnostics)
+                print("CMAKE-BUILD: Diagnostics in {0}".format(self.diagnostics_file),
+                      file=stream)
+            except (IOError, OSError):
+                pass    # -- CASE: Build directory does not exist (yet).
+
+
+# ---------------------------------------------------------------------------
+# WATCHDOG FACTORY:
+# ---------------------------------------------------------------------------
+def make_watchdog(config, phase, build_config=None, build_dir=None, name=None):
+    """Creates the :class:`Watchdog` for a command (or None, if no timeout is used).
+
+    :param phase:       Phase of the command, like: build.
+    :param build_config: Build config name (for overrides; optional).
+    :param build_dir:   Directory for the diagnostics file (optional).
+    """
+    timeout = make_phase_timeout(config, phase, build_config)
+    if timeout is None:
+        return None
+    grace_period = config.get("cancel_grace_period")
+    if grace_period in (None, ""):
+        grace_period = GRACE_PERIOD
+    diagnostics_file = None
+    if build_dir is not None:
+        diagnostics_file = os.path.join(str(build_dir), DIAGNOSTICS_BASENAME)
+    if name and phase:
+        name = "{0} ({1})".format(name, phase)
+    return Watchdog(timeout, name=name, diagnostics_file=diagnostics_file,
+                    stack_samples=stack_samples_enabled(config),
+                    grace_period=float(grace_period),
+                    phase_start_time=get_phase_start_time(phase))
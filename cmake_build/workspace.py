@@ -0,0 +1,215 @@
+# -*- coding: UTF-8 -*-
+"""
+Headless API: Use the CMake model without invoke tasks (and invoke Context).
+
+The model layer (:mod:`cmake_build.model`, :mod:`cmake_build.model_builder`)
+depends only on this context protocol:
+
+* ``config``:   Settings object (attribute access and ``config.get(name)``).
+* ``run(cmdline)``, ``sudo(cmdline)``:  Executor for shell command-lines.
+
+An invoke ``Context`` is one adapter (used by the tasks).
+A :class:`Workspace` is a lightweight one (no invoke Config per call):
+
+.. code-block:: python
+
+    from cmake_build.workspace import Workspace
+
+    workspace = Workspace(projects=["lib", "app"], build_configs=["debug"],
+                          cmake_generator="ninja")
+    for cmake_project in workspace.make_cmake_projects("all"):
+        cmake_project.build()
+
+HINT: The commands are passed to the executor (if one is provided).
+Otherwise, the workspace uses the direct process runner
+(see: :mod:`cmake_build.process_runner`). Build logs, phase timeouts,
+placements and concurrent units always need the direct process runner.
+"""
+
+from __future__ import absolute_import, print_function
+import copy
+import subprocess
+import sys
+from invoke.exceptions import UnexpectedExit
+from invoke.runners import Result
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+# -- HINT: Settings that the model layer uses as attributes (see: tasks).
+SETTINGS_DEFAULTS = {
+    "build_config": None,
+    "build_configs": [],
+    "build_configs_map": {},
+    "build_config_aliases": {},
+    "build_dir_schema": "build.{BUILD_CONFIG}",
+    "cmake_generator": None,
+    "cmake_toolchain": None,
+    "cmake_install_prefix": None,
+    "cmake_defines": None,
+    "projects": [],
+    "config_file": None,
+    "config_dir": ".",
+    "process_runner": None,     # HINT: shell (with executor), direct.
+    "run": {"echo": True},
+}
+
+
+# ---------------------------------------------------------------------------
+# SETTINGS:
+# ---------------------------------------------------------------------------
+class Settings(object):
+    """Lightweight settings (instead of an invoke Config).
+    Provides attribute access and the dict-like API that the model uses.
+    Unknown settings are None (like: config-params without default).
+
+    :param data:    Settings data (as dict; optional).
+    """
+
+    def __init__(self, data=None, **kwargs):
+        # -- HINT: Deep copy of defaults (lists/dicts are modified by model).
+        settings = copy.deepcopy(SETTINGS_DEFAULTS)
+        settings.update(data or {})
+        settings.update(kwargs)
+        object.__setattr__(self, "data", settings)
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates settings from a config object (like: invoke Config)."""
+        return cls(dict((name, config.get(name)) for name in config))
+
+    def get(self, name, default=None):
+        return self.data.get(name, default)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self.data.get(name)
+
+    def __setattr__(self, name, value):
+        self.data[name] = value
+
+    def __getitem__(self, name):
+        return self.data[name]
+
+    def __setitem__(self, name, value):
+        self.data[name] = value
+
+    def __contains__(self, name):
+        return name in self.data
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def keys(self):
+        return self.data.keys()
+
+    def items(self):
+        return self.data.items()
+
+    def update(self, data=None, **kwargs):
+        self.data.update(data or {}, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# EXECUTOR:
+# ---------------------------------------------------------------------------
+class ShellExecutor(object):
+    """Executor for shell command-lines (without invoke Context).
+
+    :param echo:    If true, print the command-line before it is executed.
+    :param stream:  Output stream for the echo (default: sys.stdout).
+    """
+
+    def __init__(self, echo=True, stream=None):
+        self.echo = echo
+        self.stream = stream
+
+    def run(self, command, warn=False, **kwargs):
+        """Runs a shell command-line (output is not captured).
+
+        :return: Result object.
+        :raises invoke.exceptions.UnexpectedExit: If the command fails.
+        """
+        if self.echo:
+            stream = self.stream or sys.stdout
+            print("\033[1;37m{0}\033[0m".format(command), file=stream)
+            stream.flush()
+        exit_code = subprocess.call(command, shell=True)
+        result = Result(command=command, exited=exit_code, hide=tuple())
+        if exit_code != 0 and not warn:
+            raise UnexpectedExit(result)
+        return result
+
+    def sudo(self, command, **kwargs):
+        return self.run("sudo {0}".format(command), **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# WORKSPACE:
+# ---------------------------------------------------------------------------
+class Workspace(object):
+    """Context for the CMake model without invoke (headless API).
+
+    :param settings:    Settings object or dict (optional).
+    :param executor:    Executor with ``run()`` and ``sudo()`` (optional).
+                        If provided, the commands are run by the executor.
+    :param kwargs:      Settings to use (override).
+    """
+
+    def __init__(self, settings=None, executor=None, **kwargs):
+        if not isinstance(settings, Settings):
+            settings = Settings(settings)
+        settings.update(kwargs)
+        if settings.get("process_runner") is None:
+            # -- HINT: A caller-supplied executor runs the commands.
+            settings.process_runner = "shell" if executor else "direct"
+        self.config = settings
+        self.executor = executor or ShellExecutor(
+            echo=(settings.get("run") or {}).get("echo", True))
+        self._cmake_projects_cache = None
+
+    @property
+    def settings(self):
+        return self.config
+
+    @property
+    def cmake_projects_cache(self):
+        """Cache of the CMake projects (reused by later calls)."""
+        if self._cmake_projects_cache is None:
+            # pylint: disable=import-outside-toplevel
+            from .model_builder import CMakeProjectCache
+            self._cmake_projects_cache = CMakeProjectCache()
+        return self._cmake_projects_cache
+
+    def run(self, command, **kwargs):
+        return self.executor.run(command, **kwargs)
+
+    def sudo(self, command, **kwargs):
+        return self.executor.sudo(command, **kwargs)
+
+    def make_cmake_project(self, project_dir, build_config=None, **kwargs):
+        """Creates the CMake project for a project directory and build_config.
+
+        :return: CMake project object.
+        """
+        # pylint: disable=import-outside-toplevel
+        from .model_builder import make_cmake_project
+        return make_cmake_project(self, project_dir, build_config=build_config,
+                                  cache=self.cmake_projects_cache, **kwargs)
+
+    def make_cmake_projects(self, projects="all", build_config=None, **kwargs):
+        """Creates the CMake projects (project and build_config combinations).
+
+        :param projects:    Project directories or "all" (setting: projects).
+        :param build_config: Build config or alias, like: "all" (optional).
+        :return: List of CMake project objects.
+        """
+        # pylint: disable=import-outside-toplevel
+        from .model_builder import make_cmake_projects
+        return make_cmake_projects(self, projects, build_config=build_config,
+                                   cache=self.cmake_projects_cache, **kwargs)
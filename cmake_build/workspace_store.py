@@ -0,0 +1,395 @@
+# -*- coding: UTF-8 -*-
+"""
+Optional workspace state database (SQLite in WAL mode).
+
+Holds the state of all build directories of a workspace in one file:
+
+* stored configs (the per-build-dir JSON files are still written as export)
+* build directory usage (build_config, last use, last computed size)
+* last results and timings (per build directory and step)
+* fingerprints (per build directory)
+
+Changes are collected during one cmake-build run and written at its end
+in one atomic transaction (see: :meth:`WorkspaceStore.commit()`).
+The status and gc tasks read the state of many build directories with
+a few queries (instead of the usage data-file of each build directory).
+Concurrent cmake-build processes can share the database (WAL mode).
+
+.. code-block:: yaml
+
+    # -- FILE: cmake_build.yaml
+    workspace_store: true   # OR: path/to/workspace.db
+
+HINT: Use ``CMAKE_BUILD_WORKSPACE_STORE=yes`` to enable it.
+"""
+
+from __future__ import absolute_import, print_function
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+WORKSPACE_STORE_BASENAME = ".cmake_build.workspace.db"
+TRUE_VALUES = ("y", "yes", "true", "on", "1")
+FALSE_VALUES = ("n", "no", "false", "off", "0")
+BUSY_TIMEOUT = 30.0     # in seconds (wait for other processes).
+
+SCHEMA_VERSION = 1
+SCHEMA = """\
+CREATE TABLE IF NOT EXISTS stored_configs (
+    build_dir    TEXT PRIMARY KEY,
+    project_dir  TEXT,
+    build_config TEXT,
+    data         TEXT NOT NULL,
+    file_stamp   TEXT,
+    updated      REAL
+);
+CREATE TABLE IF NOT EXISTS build_dir_usage (
+    build_dir    TEXT PRIMARY KEY,
+    build_config TEXT,
+    last_used    REAL,
+    size         INTEGER
+);
+CREATE TABLE IF NOT EXISTS results (
+    build_dir    TEXT NOT NULL,
+    step         TEXT NOT NULL,
+    status       TEXT NOT NULL,
+    finished     REAL,
+    duration     REAL,
+    PRIMARY KEY (build_dir, step)
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    build_dir    TEXT NOT NULL,
+    name         TEXT NOT NULL,
+    value        TEXT,
+    PRIMARY KEY (build_dir, name)
+);
+"""
+BUILD_DIR_TABLES = ("stored_configs", "build_dir_usage", "results", "fingerprints")
+
+
+# ---------------------------------------------------------------------------
+# UTILITY FUNCTIONS:
+# ---------------------------------------------------------------------------
+def make_file_stamp(filename):
+    """Stamp of a file (mtime, size) to detect changes (or None if missing)."""
+    try:
+        file_stat = os.stat(str(filename))
+    except OSError:
+        return None
+    return "{0}:{1}".format(file_stat.st_mtime_ns, file_stat.st_size)
+
+
+def workspace_store_filename(config):
+    """Database filename from the config-param ``workspace_store``.
+
+    :param config:  Config object (normally: ctx.config).
+    :return: Database filename (as string) or None (if disabled).
+    """
+    value = config.get("workspace_store")
+    if not value:
+        return None
+    elif isinstance(value, bool) or str(value).lower() in TRUE_VALUES:
+        config_dir = config.get("config_dir") or "."
+        return os.path.join(config_dir, WORKSPACE_STORE_BASENAME)
+    elif str(value).lower() in FALSE_VALUES:
+        return None
+    return str(value)
+
+
+# ---------------------------------------------------------------------------
+# WORKSPACE STORE:
+# ---------------------------------------------------------------------------
+class WorkspaceStore(object):
+    """Workspace state database (SQLite in WAL mode).
+
+    Write operations are queued and written by :meth:`commit()`
+    in one transaction (batched per cmake-build run).
+    Read operations see the queued changes, too.
+    """
+
+    def __init__(self, filename):
+        self.filename = os.path.abspath(str(filename))
+        self._connection = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._queued_stored_configs = {}
+        self._queued_usage = {}
+        self._queued_results = {}
+        self._queued_fingerprints = {}
+        self._forgotten = set()
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = self.connect(self.filename)
+        return self._connection
+
+    @staticmethod
+    def connect(filename):
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(filename, timeout=BUSY_TIMEOUT,
+                                     isolation_level=None,
+                                     check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        user_version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if user_version != SCHEMA_VERSION:
+            connection.executescript(SCHEMA)
+            connection.execute("PRAGMA user_version=%d" % SCHEMA_VERSION)
+        return connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    @property
+    def has_pending(self):
+        return bool(self._pending)
+
+    def _queue(self, statement, params):
+        with self._lock:
+            self._pending.append((statement, params))
+
+    def commit(self):
+        """Writes all queued changes in one transaction.
+
+        :return: Number of written changes.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._queued_stored_configs = {}
+            self._queued_usage = {}
+            self._queued_results = {}
+            self._queued_fingerprints = {}
+            self._forgotten = set()
+        if not pending:
+            return 0
+
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for statement, params in pending:
+                connection.execute(statement, params)
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return len(pending)
+
+    # -- STORED CONFIGS:
+    def put_stored_config(self, build_dir, stored_config, build_config=None,
+                          project_dir=None, file_stamp=None):
+        """Queues the stored config of a build directory.
+
+        :param stored_config:   Stored config (as CMakeProjectPersistConfig).
+        :param file_stamp:      Stamp of the exported JSON file (optional).
+        """
+        # pylint: disable=too-many-arguments
+        build_dir = os.path.abspath(str(build_dir))
+        data = stored_config.make_data()
+        text = json.dumps(data, sort_keys=True)
+        self._queued_stored_configs[build_dir] = (text, file_stamp)
+        self._queue("INSERT OR REPLACE INTO stored_configs "
+                    "(build_dir, project_dir, build_config, data,"
+                    " file_stamp, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                    (build_dir, project_dir and os.path.abspath(str(project_dir)),
+                     build_config, text, file_stamp, time.time()))
+
+    def get_stored_configs(self, build_dirs):
+        """Provides the stored config data of many build directories
+        (in one query).
+
+        :return: Dict: build_dir -> (data, file_stamp)
+        """
+        build_dirs = [os.path.abspath(str(d)) for d in build_dirs]
+        rows = {}
+        for build_dir, text, file_stamp in self._select_stored(
+                "SELECT build_dir, data, file_stamp FROM stored_configs "
+                "WHERE build_dir IN (%s)", build_dirs):
+            rows[build_dir] = (text, file_stamp)
+        for build_dir in build_dirs:
+            queued = self._queued_stored_configs.get(build_dir)
+            if queued is not None:
+                rows[build_dir] = queued
+        return dict((build_dir, (json.loads(text), file_stamp))
+                    for build_dir, (text, file_stamp) in rows.items())
+
+    def _select_many(self, query, values, chunk_size=500):
+        # -- HINT: SQLite limits the number of query parameters.
+        for index in range(0, len(values), chunk_size):
+            chunk = values[index:index + chunk_size]
+            placeholders = ", ".join("?" * len(chunk))
+            for row in self.connection.execute(query % placeholders, chunk):
+                yield row
+
+    def _select_stored(self, query, build_dirs):
+        """Selects the rows of build directories that are not forgotten
+        (by a queued change).
+        """
+        if not os.path.exists(self.filename):
+            return
+        build_dirs = [d for d in build_dirs if d not in self._forgotten]
+        for row in self._select_many(query, build_dirs):
+            yield row
+
+    # -- USAGE, RESULTS, FINGERPRINTS:
+    def mark_used(self, build_dir, build_config, now=None, size_changed=True):
+        """Queues the use of a build directory (now).
+        Its last size is kept, unless this use changed it.
+        """
+        build_dir = os.path.abspath(str(build_dir))
+        now = now or time.time()
+        size = None
+        if not size_changed:
+            size = self.get_usage([build_dir]).get(build_dir, {}).get("size")
+        with self._lock:
+            self._queued_usage[build_dir] = dict(build_config=build_config,
+                                                 last_used=now, size=size)
+        if size_changed:
+            self._queue("INSERT OR REPLACE INTO build_dir_usage "
+                        "(build_dir, build_config, last_used, size) "
+                        "VALUES (?, ?, ?, NULL)", (build_dir, build_config, now))
+        else:
+            self._queue("INSERT OR REPLACE INTO build_dir_usage "
+                        "(build_dir, build_config, last_used, size) "
+                        "VALUES (?, ?, ?, (SELECT size FROM build_dir_usage "
+                        "WHERE build_dir = ?))",
+                        (build_dir, build_config, now, build_dir))
+
+    def update_size(self, build_dir, size, build_config=None, last_used=None):
+        """Queues the (computed) size of a build directory.
+
+        :param build_config:    Owning build_config (if not stored yet).
+        :param last_used:       Time of its last use (if not stored yet).
+        """
+        build_dir = os.path.abspath(str(build_dir))
+        usage = self.get_usage([build_dir]).get(build_dir) or {}
+        usage["build_config"] = usage.get("build_config") or build_config
+        usage["last_used"] = usage.get("last_used") or last_used
+        usage["size"] = size
+        with self._lock:
+            self._queued_usage[build_dir] = usage
+        self._queue("INSERT OR REPLACE INTO build_dir_usage "
+                    "(build_dir, build_config, last_used, size) VALUES (?, "
+                    "COALESCE((SELECT build_config FROM build_dir_usage "
+                    "WHERE build_dir = ?), ?), "
+                    "COALESCE((SELECT last_used FROM build_dir_usage "
+                    "WHERE build_dir = ?), ?), ?)",
+                    (build_dir, build_dir, build_config, build_dir, last_used,
+                     size))
+
+    def record_result(self, build_dir, step, status, duration=None, now=None):
+        """Queues the result of a step, like: build (status: passed, failed)."""
+        # pylint: disable=too-many-arguments
+        build_dir = os.path.abspath(str(build_dir))
+        finished = now or time.time()
+        with self._lock:
+            self._queued_results.setdefault(build_dir, {})[step] = \
+                (status, finished, duration)
+        self._queue("INSERT OR REPLACE INTO results "
+                    "(build_dir, step, status, finished, duration) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (build_dir, step, status, finished, duration))
+
+    def put_fingerprint(self, build_dir, name, value):
+        build_dir = os.path.abspath(str(build_dir))
+        with self._lock:
+            self._queued_fingerprints.setdefault(build_dir, {})[name] = value
+        self._queue("INSERT OR REPLACE INTO fingerprints "
+                    "(build_dir, name, value) VALUES (?, ?, ?)",
+                    (build_dir, name, value))
+
+    def forget(self, build_dir):
+        """Queues the removal of all data of a build directory."""
+        build_dir = os.path.abspath(str(build_dir))
+        with self._lock:
+            self._queued_stored_configs.pop(build_dir, None)
+            self._queued_usage.pop(build_dir, None)
+            self._queued_results.pop(build_dir, None)
+            self._queued_fingerprints.pop(build_dir, None)
+            self._forgotten.add(build_dir)
+        for table in BUILD_DIR_TABLES:
+            self._queue("DELETE FROM %s WHERE build_dir = ?" % table, (build_dir,))
+
+    def get_usage(self, build_dirs):
+        """:return: Dict: build_dir -> {build_config, last_used, size}"""
+        build_dirs = [os.path.abspath(str(d)) for d in build_dirs]
+        usages = {}
+        for build_dir, build_config, last_used, size in self._select_stored(
+                "SELECT build_dir, build_config, last_used, size "
+                "FROM build_dir_usage WHERE build_dir IN (%s)", build_dirs):
+            usages[build_dir] = dict(build_config=build_config,
+                                     last_used=last_used, size=size)
+        for build_dir in build_dirs:
+            queued = self._queued_usage.get(build_dir)
+            if queued is not None:
+                usages[build_dir] = dict(queued)
+        return usages
+
+    def get_results(self, build_dirs):
+        """:return: Dict: build_dir -> {step: (status, finished, duration)}"""
+        build_dirs = [os.path.abspath(str(d)) for d in build_dirs]
+        results = {}
+        for build_dir, step, status, finished, duration in self._select_stored(
+                "SELECT build_dir, step, status, finished, duration FROM results "
+                "WHERE build_dir IN (%s)", build_dirs):
+            results.setdefault(build_dir, {})[step] = (status, finished, duration)
+        for build_dir in build_dirs:
+            queued = self._queued_results.get(build_dir)
+            if queued:
+                results.setdefault(build_dir, {}).update(queued)
+        return results
+
+    def get_fingerprints(self, build_dirs):
+        """:return: Dict: build_dir -> {name: value}"""
+        build_dirs = [os.path.abspath(str(d)) for d in build_dirs]
+        fingerprints = {}
+        for build_dir, name, value in self._select_stored(
+                "SELECT build_dir, name, value FROM fingerprints "
+                "WHERE build_dir IN (%s)", build_dirs):
+            fingerprints.setdefault(build_dir, {})[name] = value
+        for build_dir in build_dirs:
+            queued = self._queued_fingerprints.get(build_dir)
+            if queued:
+                fingerprints.setdefault(build_dir, {}).update(queued)
+        return fingerprints
+
+
+# ---------------------------------------------------------------------------
+# SHARED WORKSPACE STORE:
+# ---------------------------------------------------------------------------
+_workspace_stores = {}
+
+
+def get_workspace_store(config):
+    """Provides the shared :class:`WorkspaceStore` for a config
+    (or None, if the workspace store is disabled).
+    """
+    filename = workspace_store_filename(config)
+    if not filename:
+        return None
+
+    filename = os.path.abspath(filename)
+    workspace_store = _workspace_stores.get(filename)
+    if workspace_store is None:
+        if not _workspace_stores:
+            atexit.register(commit_workspace_stores)
+        workspace_store = WorkspaceStore(filename)
+        _workspace_stores[filename] = workspace_store
+    return workspace_store
+
+
+def commit_workspace_stores():
+    """Writes the queued changes of all used workspace stores."""
+    for workspace_store in list(_workspace_stores.values()):
+        workspace_store.commit()
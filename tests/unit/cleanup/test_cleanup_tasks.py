@@ -0,0 +1,97 @@
+"""
+Unit tests for executing cleanup tasks (sequentially and concurrently).
+"""
+
+from __future__ import print_function
+import threading
+from cmake_build.tasklet.cleanup import \
+    execute_cleanup_tasks, cleanup_max_workers
+from invoke import task, Collection, Config, Context
+from invoke.exceptions import Exit
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT
+# ---------------------------------------------------------------------------
+def make_cleanup_tasks(barrier=None):
+    @task
+    def clean_one(ctx):
+        if barrier:
+            barrier.wait(timeout=5)
+        print("CLEAN_ONE")
+
+    @task
+    def clean_two(ctx):
+        if barrier:
+            barrier.wait(timeout=5)
+        print("CLEAN_TWO")
+        raise Exit("OOPS")
+
+    cleanup_tasks = Collection("cleanup_tasks")
+    cleanup_tasks.add_task(clean_one)
+    cleanup_tasks.add_task(clean_two)
+    return cleanup_tasks
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE
+# ---------------------------------------------------------------------------
+class TestExecuteCleanupTasks(object):
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_failures_are_gracefully_ignored(self, max_workers, capsys):
+        ctx = Context(Config())
+        execute_cleanup_tasks(ctx, make_cleanup_tasks(), max_workers=max_workers)
+        captured = capsys.readouterr()
+        expected = """\
+CLEANUP TASK: clean-one
+CLEAN_ONE
+CLEANUP TASK: clean-two
+CLEAN_TWO
+OOPS
+FAILURE in CLEANUP TASK: clean-two (GRACEFULLY-IGNORED)
+CLEANUP TASKS: 1 failure(s) occured
+"""
+        assert captured.out == expected
+
+    def test_with_many_workers_runs_tasks_concurrently(self, capsys):
+        # -- HINT: Barrier would time out (BrokenBarrierError) if sequential.
+        barrier = threading.Barrier(2)
+        ctx = Context(Config())
+        execute_cleanup_tasks(ctx, make_cleanup_tasks(barrier), max_workers=2)
+        captured = capsys.readouterr()
+        assert "CLEAN_ONE\n" in captured.out
+        assert "BrokenBarrierError" not in captured.out
+
+    def test_with_many_workers_collects_command_output(self, capsys):
+        @task
+        def clean_one(ctx):
+            ctx.run("sleep 0.5; echo CMD_ONE")
+
+        @task
+        def clean_two(ctx):
+            ctx.run("echo CMD_TWO")
+
+        cleanup_tasks = Collection("cleanup_tasks")
+        cleanup_tasks.add_task(clean_one)
+        cleanup_tasks.add_task(clean_two)
+        ctx = Context(Config())
+        execute_cleanup_tasks(ctx, cleanup_tasks, max_workers=2)
+        captured = capsys.readouterr()
+        assert captured.out == """\
+CLEANUP TASK: clean-one
+CMD_ONE
+CLEANUP TASK: clean-two
+CMD_TWO
+"""
+
+
+@pytest.mark.parametrize("data, expected", [
+    ({}, 1),
+    ({"cleanup": {"max_workers": 4}}, 4),
+    ({"cleanup": {"max_workers": 0}}, 1),
+    ({"cleanup": {"max_workers": "BAD"}}, 1),
+])
+def test_cleanup_max_workers(data, expected):
+    assert cleanup_max_workers(Config(overrides=data)) == expected
@@ -0,0 +1,133 @@
+"""
+Unit tests for the cleanup walker in :mod:`cmake_build.tasklet.cleanup` module.
+"""
+
+from cmake_build.tasklet.cleanup import \
+    CleanupPathMatcher, select_cleanup_paths, cleanup_paths
+import os
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT
+# ---------------------------------------------------------------------------
+def make_files(basedir, filenames):
+    for filename in filenames:
+        path = basedir/filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(u"__CONTENTS__")
+
+
+def as_relpaths(paths, basedir):
+    return [os.path.relpath(str(p), str(basedir)).replace(os.sep, "/")
+            for p in paths]
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE
+# ---------------------------------------------------------------------------
+class TestCleanupPathMatcher(object):
+
+    @pytest.mark.parametrize("pattern, relpath", [
+        ("**/*.log", "one.log"),
+        ("**/*.log", "a/b/one.log"),
+        ("build.*", "build.debug"),
+        ("**/build.*", "sub/build.release"),
+        ("**/tmp/", "a/tmp"),
+        (".venv*", ".venv_py3"),
+        ("build/docs", "build/docs"),
+        ("*.[ch]", "hello.c"),
+        ("**/*$py.class", "a/Foo$py.class"),
+    ])
+    def test_match__returns_true(self, pattern, relpath):
+        matcher = CleanupPathMatcher([pattern])
+        assert matcher.match(relpath)
+
+    @pytest.mark.parametrize("pattern, relpath", [
+        ("build.*", "sub/build.debug"),
+        ("*.log", "a/one.log"),
+        ("**/*.log", "one.log.txt"),
+        ("build/docs", "build/docs/more"),
+        ("*.[ch]", "hello.o"),
+    ])
+    def test_match__returns_false(self, pattern, relpath):
+        matcher = CleanupPathMatcher([pattern])
+        assert not matcher.match(relpath)
+
+    def test_match__with_many_patterns(self):
+        matcher = CleanupPathMatcher(["**/*.bak", "**/*.log"])
+        assert matcher.match("a/one.bak")
+        assert matcher.match("b/two.log")
+        assert not matcher.match("c/three.txt")
+
+    def test_without_patterns_matches_nothing(self):
+        matcher = CleanupPathMatcher([])
+        assert not matcher
+        assert not matcher.match("anything")
+
+
+class TestSelectCleanupPaths(object):
+
+    def test_selects_directories_and_files_in_one_walk(self, tmp_path):
+        make_files(tmp_path, [
+            "build.debug/CMakeCache.txt", "build.debug/one.log",
+            "sub/build.release/two.log", "sub/three.log", "sub/keep.txt",
+        ])
+        selection = select_cleanup_paths(["**/build.*"], ["**/*.log"],
+                                         workdir=str(tmp_path))
+        assert as_relpaths(selection.directories, tmp_path) == [
+            "build.debug", "sub/build.release"
+        ]
+        # -- HINT: Files in selected directories are not selected (again).
+        assert as_relpaths(selection.files, tmp_path) == ["sub/three.log"]
+
+    def test_does_not_traverse_excluded_directories(self, tmp_path):
+        make_files(tmp_path, [".git/one.log", ".git/build.x/file.txt", "two.log"])
+        excluded = [str(tmp_path/".git")]
+        selection = select_cleanup_paths(["**/build.*"], ["**/*.log"],
+                                         workdir=str(tmp_path), excluded=excluded)
+        assert selection.directories == []
+        assert as_relpaths(selection.files, tmp_path) == ["two.log"]
+
+    def test_computes_size_of_selected_paths(self, tmp_path):
+        make_files(tmp_path, ["build.debug/a.txt", "one.log"])
+        selection = select_cleanup_paths(["build.*"], ["*.log"],
+                                         workdir=str(tmp_path), with_size=True)
+        assert selection.size == 2 * len("__CONTENTS__")
+
+    def test_uses_relative_paths_to_workdir(self, tmp_path, monkeypatch):
+        make_files(tmp_path, ["build.debug/a.txt"])
+        monkeypatch.chdir(str(tmp_path))
+        selection = select_cleanup_paths(["build.*"], workdir=".")
+        assert [str(p) for p in selection.directories] == ["build.debug"]
+
+
+class TestCleanupPaths(object):
+
+    def test_removes_selected_directories_and_files(self, tmp_path, capsys):
+        make_files(tmp_path, ["build.debug/a.txt", "one.log", "keep.txt"])
+        cleanup_paths(["build.*"], ["*.log"], workdir=str(tmp_path))
+        assert not (tmp_path/"build.debug").exists()
+        assert not (tmp_path/"one.log").exists()
+        assert (tmp_path/"keep.txt").exists()
+        captured = capsys.readouterr()
+        assert "RMTREE: " in captured.out
+        assert "REMOVE: " in captured.out
+
+    def test_with_dry_run_shows_reclaimed_size(self, tmp_path, capsys):
+        make_files(tmp_path, ["build.debug/a.txt", "one.log"])
+        cleanup_paths(["build.*"], ["*.log"], workdir=str(tmp_path), dry_run=True)
+        assert (tmp_path/"build.debug").exists()
+        assert (tmp_path/"one.log").exists()
+        captured = capsys.readouterr()
+        assert "CLEANUP: 1 directories, 1 files (dry-run: 24 bytes would be reclaimed)" \
+               in captured.out
+
+    def test_uses_configured_directory_remover(self, tmp_path, monkeypatch):
+        from cmake_build.tasklet import cleanup
+        removed = []
+        monkeypatch.setattr(cleanup, "_directory_remover", removed.append)
+        make_files(tmp_path, ["build.debug/a.txt"])
+        cleanup_paths(["build.*"], workdir=str(tmp_path))
+        assert as_relpaths(removed, tmp_path) == ["build.debug"]
+        assert (tmp_path/"build.debug").exists()
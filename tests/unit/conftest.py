@@ -0,0 +1,36 @@
+# -*- coding: UTF-8 -*-
+"""
+Fixtures for the unit tests.
+"""
+
+from __future__ import absolute_import, print_function
+from cmake_build.config import CMakeProjectConfig
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+class FakeContext(object):
+    def __init__(self, config=None):
+        self.config = config or {}
+
+
+class FakeCMakeProject(object):
+    """CMake project with the attributes that units and journal use."""
+
+    def __init__(self, project_dir, build_config="debug", config=None):
+        self.ctx = FakeContext(config)
+        self.project_dir = project_dir
+        self.project_build_dir = project_dir/"build.{0}".format(build_config)
+        self.config = CMakeProjectConfig(name=build_config)
+        self.unit_name = "{0}/{1}".format(project_dir.name, build_config)
+
+
+# ---------------------------------------------------------------------------
+# FIXTURES:
+# ---------------------------------------------------------------------------
+@pytest.fixture
+def make_fake_cmake_project():
+    """Factory for fake CMake projects: ``(project_dir, build_config="debug")``"""
+    return FakeCMakeProject
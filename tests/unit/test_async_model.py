@@ -0,0 +1,172 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.async_model`.
+"""
+
+from __future__ import absolute_import, print_function
+import asyncio
+import sys
+import threading
+import time
+from cmake_build.async_model import AsyncCMakeBuildRunner, AsyncCMakeProject, \
+    AsyncProcessRunner
+from cmake_build.process_runner import make_process_runner
+from invoke import Config, Context
+from invoke.exceptions import UnexpectedExit
+import pytest
+
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="POSIX only")
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+def python_argv(code):
+    return [sys.executable, "-c", code]
+
+
+class FakeCMakeProject(object):
+    """Runs its commands like the CMakeProject (via: make_process_runner)."""
+
+    def __init__(self, name, code="print('BUILD')", counter=None, ctx=None):
+        self.unit_name = name
+        self.ctx = ctx
+        self.code = code
+        self.counter = counter
+        self.threads = []
+
+    def build(self, **kwargs):
+        self.threads.append(threading.current_thread())
+        if self.counter is not None:
+            self.counter.enter()
+        try:
+            runner = make_process_runner({})
+            return runner.run(python_argv(self.code))
+        finally:
+            if self.counter is not None:
+                self.counter.leave()
+
+
+class ConcurrencyCounter(object):
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def leave(self):
+        with self._lock:
+            self.active -= 1
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestAsyncProcessRunner(object):
+
+    def test_run__streams_output_lines(self):
+        lines = []
+        runner = AsyncProcessRunner(echo=False, on_line=lines.append,
+                                    show_output=False)
+        result = asyncio.run(runner.run(python_argv("print('Hello'); print('Alice')")))
+        assert result.exited == 0
+        assert lines == ["Hello", "Alice"]
+
+    def test_run__with_failed_command_raises_error(self):
+        runner = AsyncProcessRunner(echo=False, show_output=False)
+        with pytest.raises(UnexpectedExit) as exc_info:
+            asyncio.run(runner.run(python_argv("import sys; sys.exit(3)")))
+        assert exc_info.value.result.exited == 3
+
+    def test_run__with_timeout_terminates_command(self):
+        runner = AsyncProcessRunner(echo=False, grace_period=1.0)
+        start_time = time.time()
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(runner.run(python_argv("import time; time.sleep(30)"),
+                                   timeout=0.5))
+        assert time.time() - start_time < 10
+
+
+class TestAsyncCMakeProject(object):
+
+    def test_build__runs_commands_on_event_loop(self):
+        lines = []
+        cmake_project = FakeCMakeProject("p1/debug")
+        project = AsyncCMakeProject(cmake_project, on_line=lines.append,
+                                    show_output=False, echo=False)
+        result = asyncio.run(project.build())
+        assert result.exited == 0
+        assert lines == ["BUILD"]
+        assert cmake_project.threads[0] is not threading.main_thread()
+
+    def test_build__with_dry_run_does_not_start_process(self, tmp_path, capsys):
+        marker = tmp_path/"marker.txt"
+        ctx = Context(Config(overrides={"run": dict(dry=True)}))
+        cmake_project = FakeCMakeProject("p1/debug",
+                                         "open({0!r}, 'w')".format(str(marker)),
+                                         ctx=ctx)
+        project = AsyncCMakeProject(cmake_project, echo=False)
+        result = asyncio.run(project.build())
+        assert result.exited == 0
+        assert not marker.exists()
+        assert "marker.txt" in capsys.readouterr().out
+
+    def test_build__with_timeout_cancels_running_command(self):
+        cmake_project = FakeCMakeProject("p1/debug", "import time; time.sleep(30)")
+        project = AsyncCMakeProject(cmake_project, echo=False)
+        start_time = time.time()
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(project.build(timeout=0.5))
+        assert time.time() - start_time < 10
+
+
+class TestAsyncCMakeBuildRunner(object):
+
+    def test_run_matrix__limits_concurrency(self):
+        counter = ConcurrencyCounter()
+        cmake_projects = [FakeCMakeProject("p{0}/debug".format(index),
+                                           "import time; time.sleep(0.1)",
+                                           counter=counter)
+                          for index in range(3)]
+        runner = AsyncCMakeBuildRunner(cmake_projects, max_concurrent=2, echo=False)
+        results = asyncio.run(runner.build())
+        assert [r.status for r in results] == ["passed"] * 3
+        assert counter.max_active == 2
+
+    def test_run_matrix__uses_own_thread_pool(self):
+        cmake_projects = [FakeCMakeProject("p{0}/debug".format(index))
+                          for index in range(3)]
+        runner = AsyncCMakeBuildRunner(cmake_projects, max_concurrent=2,
+                                       show_output=False, echo=False)
+        asyncio.run(runner.build())
+        thread_names = set(thread.name for cmake_project in cmake_projects
+                           for thread in cmake_project.threads)
+        assert all(name.startswith("cmake_build.async") for name in thread_names)
+        assert len(thread_names) <= 2
+
+    def test_run_matrix__fail_fast_cancels_other_projects(self):
+        cmake_projects = [FakeCMakeProject("slow/debug", "import time; time.sleep(30)"),
+                          FakeCMakeProject("bad/debug", "import sys; sys.exit(1)"),
+                          FakeCMakeProject("queued/debug")]
+        runner = AsyncCMakeBuildRunner(cmake_projects, max_concurrent=2,
+                                       show_output=False, echo=False)
+        start_time = time.time()
+        results = asyncio.run(runner.run_matrix("build"))
+        assert time.time() - start_time < 10
+        assert [r.status for r in results] == ["cancelled", "failed", "skipped"]
+
+    def test_run_matrix__keep_going_runs_all_projects(self):
+        lines = []
+        cmake_projects = [FakeCMakeProject("bad/debug", "import sys; sys.exit(1)"),
+                          FakeCMakeProject("p2/debug")]
+        runner = AsyncCMakeBuildRunner(cmake_projects, max_concurrent=1,
+                                       on_line=lambda *args: lines.append(args),
+                                       show_output=False, echo=False)
+        results = asyncio.run(runner.run_matrix("build", keep_going=True))
+        assert [r.status for r in results] == ["failed", "passed"]
+        assert lines == [("p2/debug", "BUILD")]
@@ -0,0 +1,106 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.build_log`.
+"""
+
+from __future__ import absolute_import, print_function
+import gzip
+import io
+import sys
+from cmake_build.build_log import BuildLog, make_build_log, make_build_log_filename
+from cmake_build.process_runner import ProcessRunner
+from invoke import Config
+from invoke.exceptions import UnexpectedExit
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+class BinaryOutputStream(io.TextIOWrapper):
+    def __init__(self):
+        super(BinaryOutputStream, self).__init__(io.BytesIO(), encoding="UTF-8")
+
+    @property
+    def text(self):
+        self.flush()
+        return self.buffer.getvalue().decode("UTF-8")
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestBuildLog(object):
+
+    def test_write__streams_output_into_log_file(self, tmp_path):
+        stream = BinaryOutputStream()
+        build_log = BuildLog(tmp_path/"build.log", stream=stream)
+        build_log.write(b"line 1\nline")
+        build_log.write(b" 2\n")
+        build_log.close()
+        assert (tmp_path/"build.log").read_bytes() == b"line 1\nline 2\n"
+        assert stream.text == "line 1\nline 2\n"
+
+    def test_keeps_only_bounded_tail_in_memory(self, tmp_path):
+        build_log = BuildLog(tmp_path/"build.log", console="none", tail_lines=3)
+        for index in range(1000):
+            build_log.write(b"line %d\n" % index)
+        build_log.close()
+        assert build_log.tail_text == "line 997\nline 998\nline 999"
+        assert build_log.size == len((tmp_path/"build.log").read_bytes())
+
+    def test_console_errors__shows_only_error_lines(self):
+        stream = BinaryOutputStream()
+        build_log = BuildLog(console="errors", stream=stream)
+        build_log.write(b"[ 50%] Building hello.o\nhello.c:1: error: OOPS\n")
+        build_log.write(b"[100%] Linking hello\n")
+        build_log.close()
+        assert stream.text == "hello.c:1: error: OOPS\n"
+
+    def test_compress__appends_gzip_members(self, tmp_path):
+        filename = tmp_path/"build.log.gz"
+        for append, data in [(False, b"first\n"), (True, b"second\n")]:
+            build_log = BuildLog(filename, compress=True, console="none",
+                                 append=append)
+            build_log.write(data)
+            build_log.close()
+        with gzip.open(str(filename)) as f:
+            assert f.read() == b"first\nsecond\n"
+
+
+class TestProcessRunnerWithBuildLog(object):
+
+    def test_run__failure_reports_tail_of_output(self, tmp_path):
+        stream = BinaryOutputStream()
+        build_log = BuildLog(tmp_path/"build.log", console="none", stream=stream)
+        runner = ProcessRunner(echo=False, stream=stream)
+        code = "print('building'); print('error: OOPS'); raise SystemExit(2)"
+        with pytest.raises(UnexpectedExit) as exc_info:
+            runner.run([sys.executable, "-c", code], build_log=build_log)
+        assert exc_info.value.result.stdout == "building\nerror: OOPS"
+        assert "Last 2 lines of output" in stream.text
+        assert (tmp_path/"build.log").read_text().startswith("$ ")
+
+
+@pytest.mark.parametrize("build_log, compress, expected", [
+    (None, False, None),
+    ("no", False, None),
+    (True, False, "WORKSPACE/p1/build.debug/cmake_build.log"),
+    ("yes", True, "WORKSPACE/p1/build.debug/cmake_build.log.gz"),
+    ("logs", False, "WORKSPACE/logs/p1.debug.log"),
+])
+def test_make_build_log_filename(build_log, compress, expected):
+    config = Config(overrides=dict(build_log=build_log, config_dir="WORKSPACE",
+                                   build_log_compress=compress))
+    filename = make_build_log_filename(config, "WORKSPACE/p1",
+                                       "WORKSPACE/p1/build.debug", "debug")
+    assert filename == expected
+
+
+def test_make_build_log__first_command_rewrites_log_file(tmp_path):
+    config = Config(overrides=dict(build_log=True))
+    build_dir = tmp_path/"build.debug"
+    build_log1 = make_build_log(config, tmp_path, build_dir)
+    build_log2 = make_build_log(config, tmp_path, build_dir)
+    assert not build_log1.append
+    assert build_log2.append
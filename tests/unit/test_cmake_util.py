@@ -2,6 +2,8 @@
 
 import cmake_build.cmake_util
 from cmake_build.cmake_util import *
+import subprocess
+import sys
 import pytest
 import six
 
@@ -256,3 +258,63 @@ def test_cmake_cmdline__with_args_and_defines(args, defines):
 
 def test_cmake_cmdline__with_all():
     _ = NotImplemented
+
+
+# ---------------------------------------------------------------------------
+# TESTS FOR: cmake_cmdline_argv(), cmake_cmdline_join(), cmake_cmdline_split()
+# ---------------------------------------------------------------------------
+def test_cmake_cmdline_argv__with_generator_of_many_words_is_one_arg():
+    argv = cmake_cmdline_argv(generator="make", config="Debug")
+    assert argv == ["-G", "Unix Makefiles", "--config", "Debug",
+                    "-DCMAKE_BUILD_TYPE=Debug"]
+
+
+def test_cmake_cmdline_argv__with_args_as_string_are_split():
+    argv = cmake_cmdline_argv(args='--trace -DNAME="one two"',
+                              defines=[("one", "VALUE_1")])
+    assert argv == ["-Done=VALUE_1", "--trace", "-DNAME=one two"]
+
+
+@pytest.mark.parametrize("argv, expected", [
+    (["cmake", "--build", "."], "cmake --build ."),
+    (["cmake", "-G", "Unix Makefiles", ".."], 'cmake -G "Unix Makefiles" ..'),
+    (["cmake", "--build", "my project/build.debug"],
+     'cmake --build "my project/build.debug"'),
+    (["echo", 'say "hello"'], "echo 'say \"hello\"'"),
+    (["echo", ""], 'echo ""'),
+])
+def test_cmake_cmdline_join(argv, expected):
+    assert cmake_cmdline_join(argv) == expected
+
+
+@pytest.mark.parametrize("args, expected", [
+    (None, []),
+    ("", []),
+    ("--parallel 4", ["--parallel", "4"]),
+    (["--config Debug", "--verbose"], ["--config", "Debug", "--verbose"]),
+])
+def test_cmake_cmdline_split(args, expected):
+    assert cmake_cmdline_split(args) == expected
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="Requires: POSIX shell")
+def test_cmake_cmdline_join__keeps_shell_text_of_user_args():
+    argv = cmake_cmdline_split("""$HOME "$HOME/a b" '$HOME' c\\ d""")
+    assert argv == ["$HOME", "$HOME/a b", "$HOME", "c d"]
+    assert cmake_cmdline_join(["echo"] + argv) == \
+        """echo $HOME "$HOME/a b" '$HOME' c\\ d"""
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="Requires: POSIX shell")
+def test_cmake_cmdline_join__shell_expands_environment_variables(monkeypatch):
+    monkeypatch.setenv("CMAKE_BUILD_TEST_VAR", "VALUE")
+    argv = ["echo"] + cmake_cmdline_split('$CMAKE_BUILD_TEST_VAR "x  $CMAKE_BUILD_TEST_VAR"')
+    output = subprocess.check_output(cmake_cmdline_join(argv), shell=True)
+    assert output.decode("UTF-8") == "VALUE x  VALUE\n"
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="Requires: POSIX shell")
+def test_cmake_cmdline_join__expands_environment_variables_in_defines():
+    argv = cmake_cmdline_define_argv([("ONE", "$HOME/a b"), ("TWO", 'say "hi"')])
+    assert argv == ["-DONE=$HOME/a b", '-DTWO=say "hi"']
+    assert cmake_cmdline_join(argv) == """"-DONE=$HOME/a b" '-DTWO=say "hi"'"""
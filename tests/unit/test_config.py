@@ -6,10 +6,12 @@ Unit tests for :mod:`cmake_build.config`.
 
 from collections import OrderedDict
 from copy import deepcopy
+import json
 import pytest
 from path import Path
 from cmake_build.config import CMAKE_CONFIG_DEFAULTS, \
-    CMakeProjectConfig, CMakeProjectPersistConfig, BuildConfig
+    CMakeProjectConfig, CMakeProjectPersistConfig, BuildConfig, \
+    FrozenCMakeProjectConfig
 
 
 # ---------------------------------------------------------------------------
@@ -374,6 +376,89 @@ class TestCMakeProjectPersistConfig(object):
         with pytest.raises(ValueError):
             CMakeProjectPersistConfig.load(bad_contents_filename)
 
+    def test_load__ignores_config_hash_of_older_versions(self, tmp_path):
+        filename = Path(str(tmp_path / CMakeProjectPersistConfig.FILE_BASENAME))
+        project_data1 = CMakeProjectPersistConfig(filename, cmake_generator="ninja")
+        project_data1.save()
+        assert "config_hash" not in json.loads(filename.read_text())
+
+        data = project_data1.make_data().copy()
+        data["config_hash"] = "0123456789abcdef"
+        with open(filename, "w") as f:
+            json.dump(data, f)
+        project_data2 = CMakeProjectPersistConfig.load(filename)
+        assert "config_hash" not in project_data2.data
+        assert project_data2 == project_data1
+
+
+# ---------------------------------------------------------------------------
+# TESTS FOR: FrozenCMakeProjectConfig
+# ---------------------------------------------------------------------------
+class TestFrozenCMakeProjectConfig(object):
+
+    def test_freeze__provides_dict_like_api(self):
+        config = CMakeProjectConfig(dict(cmake_generator="ninja",
+                                         cmake_build_type="Debug"))
+        frozen = config.freeze()
+        assert frozen["cmake_generator"] == "ninja"
+        assert frozen.get("cmake_build_type") == "Debug"
+        assert frozen.cmake_build_type == "Debug"
+        assert "cmake_defines" in frozen
+        assert sorted(frozen.keys()) == sorted(config.keys())
+
+    def test_frozen_config_is_immutable(self):
+        frozen = CMakeProjectConfig(dict(cmake_init_args=["--trace"])).freeze()
+        with pytest.raises(AttributeError):
+            frozen.name = "OTHER"
+        with pytest.raises(TypeError):
+            frozen.cmake_defines["CMAKE_BUILD_TYPE"] = "Release"
+        assert frozen["cmake_init_args"] == ("--trace",)
+
+    def test_frozen_config_is_independent_of_original_config(self):
+        config = CMakeProjectConfig(dict(cmake_build_type="Debug"))
+        frozen = config.freeze()
+        config.cmake_build_type = "Release"
+        assert frozen.cmake_build_type == "Debug"
+        assert frozen != config
+
+    def test_equals__with_same_data_and_other_ordering(self):
+        config1 = CMakeProjectConfig(dict(cmake_defines=[("A", 1), ("B", 2)]))
+        config2 = CMakeProjectConfig(dict(cmake_defines=[("B", 2), ("A", 1)]))
+        assert config1.freeze() == config2.freeze()
+        assert config1.freeze() == config2
+        assert hash(config1.freeze()) == hash(config2.freeze())
+
+    def test_same_as__with_excluded(self):
+        frozen1 = CMakeProjectConfig(dict(cmake_generator="ninja")).freeze()
+        frozen2 = CMakeProjectConfig(dict(cmake_generator="make")).freeze()
+        assert frozen1 != frozen2
+        assert frozen1.same_as(frozen2, excluded=["cmake_generator"])
+
+    def test_same_as__with_mutable_config_does_not_hash_it(self, monkeypatch):
+        config = CMakeProjectConfig(dict(cmake_init_args=["--trace"],
+                                         cmake_generator="ninja"))
+        frozen = config.freeze()
+        calls = []
+        monkeypatch.setattr("cmake_build.config.make_config_hash",
+                            lambda *args: calls.append(args))
+        assert config.same_as(frozen)
+        assert frozen.same_as(config)
+        assert frozen == config
+        config.cmake_generator = "make"
+        assert config.same_as(frozen, excluded=["cmake_generator"])
+        assert not config.same_as(frozen)
+        assert calls == []
+
+    def test_thaw__returns_mutable_copy(self):
+        config = CMakeProjectPersistConfig(cmake_generator="ninja",
+                                           cmake_toolchain="t1.cmake")
+        config2 = config.freeze().thaw(CMakeProjectPersistConfig)
+        assert isinstance(config2, CMakeProjectPersistConfig)
+        assert config2 == config
+        config2.cmake_toolchain = "OTHER.cmake"
+        assert config2 != config
+        assert list(config2.cmake_defines.keys()) == ["CMAKE_TOOLCHAIN_FILE"]
+
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,94 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.config_cache`.
+"""
+
+from __future__ import absolute_import, print_function
+import json
+from cmake_build.config_cache import ConfigFileCache
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+class CountingParser(object):
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, filename):
+        self.calls += 1
+        with open(str(filename)) as f:
+            return json.load(f)
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    config_file = tmp_path/"cmake_build.json"
+    config_file.write_text(json.dumps({"build_configs": ["debug", "Linux"]}))
+    return config_file
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestConfigFileCache(object):
+
+    def test_load__parses_config_file_only_once(self, config_file, tmp_path):
+        parser = CountingParser()
+        cache = ConfigFileCache(cache_dir=str(tmp_path/"cache"), use_cache=True)
+        data1 = cache.load(config_file, parser)
+        data2 = cache.load(config_file, parser)
+        assert data1 == {"build_configs": ["debug", "Linux"]}
+        assert data2 == data1
+        assert parser.calls == 1
+
+    def test_load__uses_stored_snapshot_in_next_run(self, config_file, tmp_path):
+        parser = CountingParser()
+        cache_dir = str(tmp_path/"cache")
+        ConfigFileCache(cache_dir=cache_dir, use_cache=True).load(config_file, parser)
+
+        cache = ConfigFileCache(cache_dir=cache_dir, use_cache=True)
+        data = cache.load(config_file, parser)
+        assert data == {"build_configs": ["debug", "Linux"]}
+        assert parser.calls == 1
+
+    def test_load__parses_again_if_config_file_changes(self, config_file, tmp_path):
+        parser = CountingParser()
+        cache_dir = str(tmp_path/"cache")
+        ConfigFileCache(cache_dir=cache_dir, use_cache=True).load(config_file, parser)
+        config_file.write_text(json.dumps({"build_configs": ["release"]}))
+
+        cache = ConfigFileCache(cache_dir=cache_dir, use_cache=True)
+        data = cache.load(config_file, parser)
+        assert data == {"build_configs": ["release"]}
+        assert parser.calls == 2
+
+    def test_load__parses_again_if_environment_changes(self, config_file, tmp_path,
+                                                       monkeypatch):
+        parser = CountingParser()
+        cache_dir = str(tmp_path/"cache")
+        ConfigFileCache(cache_dir=cache_dir, use_cache=True).load(config_file, parser)
+        monkeypatch.setenv("CMAKE_BUILD_CONFIG", "release")
+
+        ConfigFileCache(cache_dir=cache_dir, use_cache=True).load(config_file, parser)
+        assert parser.calls == 2
+
+    def test_load__with_missing_config_file_raises_os_error(self, tmp_path):
+        cache = ConfigFileCache(use_cache=False)
+        with pytest.raises(OSError):
+            cache.load(tmp_path/"MISSING.yaml", CountingParser())
+
+    def test_load__does_not_store_data_that_json_would_change(self, tmp_path):
+        config_file = tmp_path/"cmake_build.yaml"
+        config_file.write_text(u"# -- YAML")
+        data = {"cmake_defines": [("A", 1)], "jobs": {4: "four"}}
+        calls = []
+
+        def parse_func(filename):
+            calls.append(filename)
+            return data
+        for _ in range(2):
+            cache = ConfigFileCache(cache_dir=str(tmp_path/"snapshots"))
+            assert cache.load(config_file, parse_func) == data
+        assert len(calls) == 2
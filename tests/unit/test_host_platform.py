@@ -0,0 +1,142 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.host_platform`.
+"""
+
+from __future__ import absolute_import, print_function
+import json
+import time
+from cmake_build import host_platform
+from cmake_build.host_platform import HostPlatform, make_build_config_name
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+class CountingResolver(object):
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+@pytest.fixture
+def fake_resolvers(monkeypatch):
+    resolvers = {
+        "SYSTEM": CountingResolver("Linux"),
+        "CPU": CountingResolver("x86_64"),
+        "PROCESSOR": CountingResolver("x86_64"),
+        "LIBC": CountingResolver("glibc2.35"),
+        "TRIPLET": CountingResolver("x86_64-linux-gnu"),
+    }
+    monkeypatch.setattr(HostPlatform, "FACT_RESOLVERS", resolvers)
+    monkeypatch.setattr(host_platform, "host_identity", lambda: "host1:boot1")
+    monkeypatch.setattr(host_platform, "compiler_identity", lambda: "cc:/usr/bin/cc:1")
+    return resolvers
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestHostPlatform(object):
+
+    def test_get__resolves_only_requested_fact(self, fake_resolvers):
+        platform = HostPlatform(use_cache=False)
+        assert platform.get("SYSTEM") == "Linux"
+        assert fake_resolvers["SYSTEM"].calls == 1
+        assert fake_resolvers["PROCESSOR"].calls == 0
+        assert fake_resolvers["TRIPLET"].calls == 0
+
+    def test_get__resolves_fact_only_once(self, fake_resolvers):
+        platform = HostPlatform(use_cache=False)
+        platform.get("CPU")
+        platform.get("CPU")
+        assert fake_resolvers["CPU"].calls == 1
+
+    def test_get__with_unknown_fact_raises_key_error(self, fake_resolvers):
+        platform = HostPlatform(use_cache=False)
+        with pytest.raises(KeyError):
+            platform.get("UNKNOWN")
+
+    def test_get__stores_facts_in_cache_file(self, fake_resolvers, tmp_path):
+        cache_file = str(tmp_path/"host_platform.json")
+        platform = HostPlatform(cache_file=cache_file, use_cache=True)
+        platform.get("SYSTEM")
+
+        with open(cache_file) as f:
+            data = json.load(f)
+        assert data["host"] == "host1:boot1"
+        assert data["compiler"] == "cc:/usr/bin/cc:1"
+        assert data["facts"] == {"SYSTEM": "Linux"}
+
+    def test_get__uses_facts_from_cache_file(self, fake_resolvers, tmp_path):
+        cache_file = str(tmp_path/"host_platform.json")
+        HostPlatform(cache_file=cache_file, use_cache=True).get("CPU")
+
+        platform = HostPlatform(cache_file=cache_file, use_cache=True)
+        assert platform.get("CPU") == "x86_64"
+        assert fake_resolvers["CPU"].calls == 1
+
+    def test_get__ignores_cache_file_of_other_host(self, fake_resolvers, tmp_path):
+        cache_file = tmp_path/"host_platform.json"
+        data = {"host": "host1:OTHER_BOOT", "facts": {"CPU": "arm64"}}
+        cache_file.write_text(json.dumps(data))
+
+        platform = HostPlatform(cache_file=str(cache_file), use_cache=True)
+        assert platform.get("CPU") == "x86_64"
+        assert fake_resolvers["CPU"].calls == 1
+
+    def test_get__ignores_compiler_facts_of_other_compiler(self, fake_resolvers,
+                                                           tmp_path, monkeypatch):
+        cache_file = str(tmp_path/"host_platform.json")
+        HostPlatform(cache_file=cache_file, use_cache=True).get("TRIPLET")
+        HostPlatform(cache_file=cache_file, use_cache=True).get("CPU")
+        monkeypatch.setattr(host_platform, "compiler_identity",
+                            lambda: "clang:/usr/bin/clang:2")
+
+        platform = HostPlatform(cache_file=cache_file, use_cache=True)
+        platform.get("TRIPLET")
+        platform.get("CPU")
+        assert fake_resolvers["TRIPLET"].calls == 2
+        assert fake_resolvers["CPU"].calls == 1
+
+    def test_get__without_boot_id_expires_cache_file(self, fake_resolvers,
+                                                     tmp_path, monkeypatch):
+        monkeypatch.setattr(host_platform, "host_identity", lambda: "host1:")
+        cache_file = tmp_path/"host_platform.json"
+        data = {"host": "host1:", "compiler": "cc:/usr/bin/cc:1",
+                "created": time.time() - host_platform.CACHE_TTL - 1,
+                "facts": {"CPU": "arm64"}}
+        cache_file.write_text(json.dumps(data))
+
+        platform = HostPlatform(cache_file=str(cache_file), use_cache=True)
+        assert platform.get("CPU") == "x86_64"
+        assert fake_resolvers["CPU"].calls == 1
+
+
+class TestMakeBuildConfigName(object):
+
+    @pytest.fixture(autouse=True)
+    def host_platform_without_cache(self, monkeypatch, fake_resolvers):
+        monkeypatch.setattr(host_platform, "_host_platform",
+                            HostPlatform(use_cache=False))
+
+    def test_with_default_schema(self, fake_resolvers):
+        name = make_build_config_name(build_type="release")
+        assert name == "Linux_x86_64_release"
+        assert fake_resolvers["PROCESSOR"].calls == 0
+
+    def test_with_schema_using_triplet(self, fake_resolvers):
+        name = make_build_config_name(build_type="debug",
+                                      schema="{TRIPLET}_{BUILD_TYPE}")
+        assert name == "x86_64-linux-gnu_debug"
+        assert fake_resolvers["SYSTEM"].calls == 0
+
+    def test_with_overridden_placeholder(self, fake_resolvers):
+        name = make_build_config_name(build_type="debug", SYSTEM="Windows")
+        assert name == "Windows_x86_64_debug"
+        assert fake_resolvers["SYSTEM"].calls == 0
@@ -0,0 +1,147 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.journal`.
+"""
+
+from __future__ import absolute_import, print_function
+from cmake_build import journal as journal_module
+from cmake_build.journal import RunJournal, JournaledUnit, get_run_journal, \
+    make_run_journal_filename, reset_run_journal
+from cmake_build.scheduler import UnitScheduler
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+@pytest.fixture
+def cmake_project(tmp_path, make_fake_cmake_project):
+    project_dir = tmp_path/"p1"
+    project_dir.mkdir()
+    (project_dir/"CMakeLists.txt").write_text(u"project(p1)\n")
+    cmake_project = make_fake_cmake_project(project_dir)
+    cmake_project.project_build_dir.mkdir()
+    return cmake_project
+
+
+@pytest.fixture(autouse=True)
+def clean_run_journal(monkeypatch):
+    monkeypatch.setattr(journal_module, "_run_journal", None)
+
+
+def run_unit(journal, cmake_project, calls, phase="build", inputs=None):
+    unit = JournaledUnit(journal, cmake_project, phase,
+                         lambda p: calls.append(p.unit_name), inputs=inputs)
+    return UnitScheduler().run([unit])[0]
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestRunJournal(object):
+
+    def test_record__saves_entry(self, tmp_path):
+        filename = tmp_path/".cmake_build.journal.json"
+        journal = RunJournal(filename)
+        journal.record("p1/debug", "build", "passed", "FP1", duration=1.5)
+        journal2 = RunJournal.load(filename)
+        assert journal2.run_id == journal.run_id
+        assert journal2.is_done("p1/debug", "build", "FP1")
+        assert not journal2.is_done("p1/debug", "build", "OTHER")
+        assert not journal2.is_done("p1/debug", "test", "FP1")
+
+    def test_is_done__is_false_for_failed_entry(self, tmp_path):
+        journal = RunJournal(tmp_path/"journal.json")
+        journal.record("p1/debug", "build", "failed", "FP1")
+        assert not journal.is_done("p1/debug", "build", "FP1")
+
+
+class TestJournaledUnit(object):
+
+    def test_resume__skips_passed_unit_with_unchanged_inputs(self, cmake_project):
+        journal = RunJournal(cmake_project.project_dir/".cmake_build.journal.json")
+        calls = []
+        assert run_unit(journal, cmake_project, calls).status == "passed"
+        journal.resume = True
+        assert run_unit(journal, cmake_project, calls).status == "resumed"
+        assert calls == ["p1/debug"]
+
+    def test_resume__runs_unit_with_changed_sources(self, cmake_project):
+        journal = RunJournal(cmake_project.project_dir/".cmake_build.journal.json")
+        calls = []
+        run_unit(journal, cmake_project, calls)
+        (cmake_project.project_dir/"hello.c").write_text(u"int main() {}\n")
+        journal_module._sources_fingerprints.clear()
+        journal.resume = True
+        assert run_unit(journal, cmake_project, calls).status == "passed"
+        assert len(calls) == 2
+
+    def test_resume__runs_unit_with_changed_task_params(self, cmake_project):
+        journal = RunJournal(cmake_project.project_dir/".cmake_build.journal.json")
+        calls = []
+        run_unit(journal, cmake_project, calls, inputs=dict(target="all"))
+        journal.resume = True
+        result = run_unit(journal, cmake_project, calls, inputs=dict(target="hello"))
+        assert result.status == "passed"
+        assert len(calls) == 2
+
+    def test_resume__runs_unit_without_build_dir(self, cmake_project):
+        journal = RunJournal(cmake_project.project_dir/".cmake_build.journal.json")
+        calls = []
+        run_unit(journal, cmake_project, calls)
+        cmake_project.project_build_dir.rmdir()
+        journal.resume = True
+        assert run_unit(journal, cmake_project, calls).status == "passed"
+
+
+class TestGetRunJournal(object):
+
+    def test_new_run__discards_previous_entries(self, tmp_path):
+        config = dict(config_dir=str(tmp_path), run_journal=True)
+        journal = get_run_journal(config)
+        journal.record("p1/debug", "build", "passed", "FP1")
+        journal_module._run_journal = None
+        journal2 = get_run_journal(config)
+        assert journal2.run_id != journal.run_id
+        assert not journal2.entries
+
+    def test_resume__keeps_previous_run(self, tmp_path):
+        config = dict(config_dir=str(tmp_path), run_journal=True)
+        journal = get_run_journal(config)
+        journal.record("p1/debug", "build", "passed", "FP1")
+        journal_module._run_journal = None
+        journal2 = get_run_journal(config, resume=True)
+        assert journal2.run_id == journal.run_id
+        assert journal2.resume
+        # -- LATER TASKS: Use the resumed journal, too.
+        assert get_run_journal(config) is journal2
+        assert journal2.resume
+
+    def test_without_run_journal_is_disabled(self, tmp_path, capsys):
+        config = dict(config_dir=str(tmp_path))
+        assert get_run_journal(config) is None
+        assert get_run_journal(config, resume=True) is None
+        assert "--resume needs the run journal" in capsys.readouterr().out
+
+    def test_new_run__forgets_sources_fingerprints(self, tmp_path):
+        config = dict(config_dir=str(tmp_path), run_journal=True)
+        get_run_journal(config)
+        journal_module._sources_fingerprints["p1"] = "FP1"
+        assert get_run_journal(config) is not None
+        assert journal_module._sources_fingerprints == {"p1": "FP1"}
+        reset_run_journal()
+        assert journal_module._run_journal is None
+        assert get_run_journal(config) is not None
+        assert journal_module._sources_fingerprints == {}
+
+    @pytest.mark.parametrize("value, expected", [
+        (None, None),
+        (True, "CONFIG_DIR/.cmake_build.journal.json"),
+        ("yes", "CONFIG_DIR/.cmake_build.journal.json"),
+        ("build.journal.json", "CONFIG_DIR/build.journal.json"),
+        (False, None),
+        ("no", None),
+    ])
+    def test_make_run_journal_filename(self, value, expected):
+        config = dict(config_dir="CONFIG_DIR", run_journal=value)
+        assert make_run_journal_filename(config) == expected
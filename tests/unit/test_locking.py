@@ -0,0 +1,166 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.locking`.
+"""
+
+from __future__ import absolute_import, print_function
+import json
+import os
+import socket
+from cmake_build.exceptions import BuildDirLocked
+from cmake_build.locking import \
+    BuildDirLock, FileLock, build_dir_lock_mode, fcntl, make_lock_filename
+from invoke import Config
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+requires_flock = pytest.mark.skipif(fcntl is None, reason="Requires: flock()")
+DEAD_PID = 2**22 + 1    # -- HINT: Larger than pid_max (default).
+
+
+@pytest.fixture
+def lock_filename(tmp_path):
+    return make_lock_filename(tmp_path/"build.debug")
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+def test_make_lock_filename__is_next_to_build_dir(tmp_path):
+    lock_filename = make_lock_filename(tmp_path/"build.debug")
+    assert lock_filename == str(tmp_path/".cmake_build.locks"/"build.debug.lock")
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("no", None),
+    (True, "wait"),
+    ("yes", "wait"),
+    ("wait", "wait"),
+    ("FAIL", "fail"),
+])
+def test_build_dir_lock_mode(value, expected):
+    assert build_dir_lock_mode(Config(overrides={"build_dir_lock": value})) == expected
+
+
+@requires_flock
+class TestFileLockWithFlock(object):
+    # -- HINT: Each FileLock has its own file descriptor (like: other process).
+
+    def test_exclusive_lock_excludes_others(self, lock_filename):
+        lock1 = FileLock(lock_filename)
+        lock2 = FileLock(lock_filename)
+        assert lock1.try_acquire(exclusive=True)
+        assert not lock2.try_acquire(exclusive=False)
+        assert lock1.read_holder()["pid"] == os.getpid()
+        lock1.release()
+        assert lock2.try_acquire(exclusive=True)
+        lock2.release()
+
+    def test_shared_locks_can_be_held_at_once(self, lock_filename):
+        lock1 = FileLock(lock_filename)
+        lock2 = FileLock(lock_filename)
+        assert lock1.try_acquire(exclusive=False)
+        assert lock2.try_acquire(exclusive=False)
+        assert not FileLock(lock_filename).try_acquire(exclusive=True)
+        lock1.release()
+        lock2.release()
+
+    def test_failed_upgrade_keeps_shared_lock(self, lock_filename):
+        lock1 = FileLock(lock_filename)
+        lock2 = FileLock(lock_filename)
+        assert lock1.try_acquire(exclusive=False)
+        assert lock2.try_acquire(exclusive=False)
+        assert not lock1.try_acquire(exclusive=True)
+        assert lock1.locked and not lock1.exclusive
+        assert not FileLock(lock_filename).try_acquire(exclusive=True)
+        lock1.release()
+        lock2.release()
+
+    def test_failed_upgrade_without_shared_lock_does_not_block(self, lock_filename,
+                                                               monkeypatch):
+        # -- CASE: Shared lock is dropped by the failed upgrade (and is taken).
+        lock1 = FileLock(lock_filename)
+        assert lock1.try_acquire(exclusive=False)
+        def flock(fd, operation):
+            if not operation & fcntl.LOCK_NB:
+                raise AssertionError("OOPS: Blocking flock() is used")
+            raise BlockingIOError()
+        monkeypatch.setattr(fcntl, "flock", flock)
+        assert not lock1.try_acquire(exclusive=True)
+        assert not lock1.locked
+
+    def test_upgrade_uses_timeout(self, tmp_path):
+        other_lock = FileLock(make_lock_filename(tmp_path/"build.debug"))
+        build_dir_lock = BuildDirLock(tmp_path/"build.debug", mode="wait",
+                                      timeout=0.1, poll_interval=0.02)
+        with build_dir_lock.locked(exclusive=False):
+            assert other_lock.try_acquire(exclusive=False)
+            with pytest.raises(BuildDirLocked) as exc_info:
+                build_dir_lock.acquire(exclusive=True)
+            other_lock.release()
+        assert "timeout after 0.1s" in str(exc_info.value)
+
+
+class TestFileLockWithLockFile(object):
+
+    def test_lock_file_excludes_others(self, lock_filename):
+        lock1 = FileLock(lock_filename, use_flock=False)
+        lock2 = FileLock(lock_filename, use_flock=False)
+        assert lock1.try_acquire()
+        assert not lock2.try_acquire()
+        lock1.release()
+        assert not os.path.exists(lock_filename)
+        assert lock2.try_acquire()
+        lock2.release()
+
+    def test_breaks_stale_lock_of_dead_process(self, lock_filename, capsys):
+        os.makedirs(os.path.dirname(lock_filename))
+        with open(lock_filename, "w") as f:
+            f.write(json.dumps(dict(pid=DEAD_PID, host=socket.gethostname(),
+                                    exclusive=True, since=0)))
+        file_lock = FileLock(lock_filename, use_flock=False)
+        assert file_lock.try_acquire()
+        assert "Break stale lock" in capsys.readouterr().out
+        file_lock.release()
+
+    def test_keeps_lock_of_process_on_other_host(self, lock_filename):
+        os.makedirs(os.path.dirname(lock_filename))
+        with open(lock_filename, "w") as f:
+            f.write(json.dumps(dict(pid=DEAD_PID, host="other.host",
+                                    exclusive=True, since=0)))
+        assert not FileLock(lock_filename, use_flock=False).try_acquire()
+
+
+class TestBuildDirLock(object):
+
+    def test_is_reentrant(self, tmp_path):
+        build_dir_lock = BuildDirLock(tmp_path/"build.debug", mode="fail")
+        with build_dir_lock.locked():
+            with build_dir_lock.locked(exclusive=False):
+                assert build_dir_lock.file_lock.exclusive
+            assert build_dir_lock.file_lock.locked
+        assert not build_dir_lock.file_lock.locked
+
+    def test_fail_mode_raises_if_locked(self, tmp_path):
+        other_lock = BuildDirLock(tmp_path/"build.debug")
+        build_dir_lock = BuildDirLock(tmp_path/"build.debug", mode="fail")
+        with other_lock.locked():
+            with pytest.raises(BuildDirLocked):
+                build_dir_lock.acquire()
+            assert not build_dir_lock.try_acquire()
+        assert build_dir_lock.try_acquire()
+        build_dir_lock.release()
+
+    def test_wait_mode_raises_after_timeout(self, tmp_path, capsys):
+        other_lock = BuildDirLock(tmp_path/"build.debug")
+        build_dir_lock = BuildDirLock(tmp_path/"build.debug", mode="wait",
+                                      timeout=0.1, poll_interval=0.02)
+        with other_lock.locked():
+            with pytest.raises(BuildDirLocked) as exc_info:
+                build_dir_lock.acquire()
+        assert "timeout after 0.1s" in str(exc_info.value)
+        assert "Waiting for lock" in capsys.readouterr().out
@@ -2,6 +2,9 @@
 
 from __future__ import absolute_import, print_function
 from collections import OrderedDict
+from contextlib import contextmanager
+import os
+import threading
 from cmake_build.model import CMakeProject
 from cmake_build.config import CMakeProjectPersistConfig, BuildConfig
 from path import Path
@@ -121,6 +124,53 @@ class TestCMakeProject(object):
             assert ctx.last_command is None
             assert_cmake_project_skipped_reinit_using_captured(cmake_project1, captured)
 
+    def test_init__twice_reuses_verified_init_state(self, tmpdir, capsys):
+        ctx = MockContext()
+        project_dir = Path(str(tmpdir))
+        project_build_dir = project_dir/"build"
+        build_config = BuildConfig(cmake_generator="NINJA")
+        cmake_project = CMakeProject(ctx, project_dir, project_build_dir, build_config)
+        assert not cmake_project.init_verified
+
+        with cd(project_dir):
+            cmake_project.init()
+            assert cmake_project.init_verified
+            capsys.readouterr()
+
+            # -- STEP 2: Same CMake project (in a later task) => SKIPPED
+            ctx.clear()
+            cmake_project.init()
+            captured = capsys.readouterr()
+            assert ctx.last_command is None
+            assert_cmake_project_skipped_reinit_using_captured(cmake_project, captured)
+
+    def test_init_verified__is_reset_if_stored_config_file_is_removed(self, tmpdir):
+        ctx = MockContext()
+        project_dir = Path(str(tmpdir))
+        project_build_dir = project_dir/"build"
+        build_config = BuildConfig(cmake_generator="NINJA")
+        cmake_project = CMakeProject(ctx, project_dir, project_build_dir, build_config)
+        with cd(project_dir):
+            cmake_project.init()
+            assert cmake_project.init_verified
+
+            project_build_dir.rmtree_p()
+            assert not cmake_project.init_verified
+            ctx.clear()
+            cmake_project.init()
+            assert ctx.last_command == "cmake -G NINJA .."
+
+    def test_init_verified__is_reset_if_config_changes(self, tmpdir):
+        ctx = MockContext()
+        project_dir = Path(str(tmpdir))
+        project_build_dir = project_dir/"build"
+        build_config = BuildConfig(cmake_generator="NINJA")
+        cmake_project = CMakeProject(ctx, project_dir, project_build_dir, build_config)
+        with cd(project_dir):
+            cmake_project.init()
+            cmake_project.config.add_cmake_defines([("FOO", "bar")])
+            assert not cmake_project.init_verified
+
     def test_init__performs_reinit_with_other_cmake_generator(self, tmpdir, capsys):
         ctx = MockContext()
         project_dir = Path(str(tmpdir)).abspath()
@@ -354,3 +404,84 @@ class TestCMakeProject(object):
             captured = capsys.readouterr()
             assert_cmake_project_needed_update_using_captured(cmake_project2, captured,
                                                             cmake_generator="ninja")
+
+    def test_run_command__in_worker_thread_does_not_change_cwd(self, tmpdir):
+        class SudoContext(MockContext):
+            def __init__(self):
+                MockContext.__init__(self)
+                self.cwds = []
+
+            @contextmanager
+            def cd(self, path):
+                self.cwds.append(path)
+                yield
+
+            def sudo(self, cmdline, **kwargs):
+                self.runlog.append((os.getcwd(), cmdline))
+
+        ctx = SudoContext()
+        project_dir = Path(str(tmpdir))
+        project_build_dir = project_dir/"build"
+        build_config = BuildConfig(cmake_generator="ninja")
+        cmake_project = CMakeProject(ctx, project_dir, project_build_dir, build_config)
+        cwd = os.getcwd()
+        thread = threading.Thread(target=lambda: cmake_project.run_command(
+            ["cmake", "--install", "."], cwd=project_build_dir, use_sudo=True))
+        thread.start()
+        thread.join()
+        assert ctx.cwds == [str(project_build_dir)]
+        assert ctx.runlog == [(cwd, "cmake --install .")]
+
+    def test_steps__record_their_results_in_usage_file(self, tmpdir):
+        from cmake_build.quota import BuildDirUsage
+        ctx = MockContext()
+        project_dir = Path(str(tmpdir))
+        project_build_dir = project_dir/"build"
+        build_config = BuildConfig(cmake_generator="ninja")
+        cmake_project = CMakeProject(ctx, project_dir, project_build_dir, build_config)
+        with cd(project_dir):
+            cmake_project.init()
+            cmake_project.test()
+
+        usage = BuildDirUsage.load(BuildDirUsage.make_filename(project_build_dir))
+        for step in ("init", "test"):
+            result = usage.get_result(step)
+            assert result["status"] == "passed"
+            assert result["duration"] >= 0
+        assert usage.get_result("build") is None
+
+    def test_run_command__uses_last_phase_duration_as_expected_duration(
+            self, tmpdir, monkeypatch):
+        import sys
+        from invoke import Config
+        from cmake_build import model
+        from cmake_build.quota import BuildDirUsage
+
+        class RecordingDashboard(object):
+            def __init__(self):
+                self.started = []
+
+            def start_unit(self, name, phase, expected_duration=None):
+                self.started.append((phase, expected_duration))
+
+            def finish_unit(self, name, status):
+                pass
+
+        dashboard = RecordingDashboard()
+        monkeypatch.setattr(model, "get_progress_dashboard", lambda config: dashboard)
+        ctx = MockContext(Config(dict(progress_dashboard=True)))
+        project_dir = Path(str(tmpdir))
+        project_build_dir = project_dir/"build"
+        project_build_dir.makedirs_p()
+        usage = BuildDirUsage(BuildDirUsage.make_filename(project_build_dir))
+        usage.set_result("init", "passed", duration=3.0)
+        usage.set_result("build", "passed", duration=60.0)
+        usage.set_result("test", "failed", duration=5.0)
+        usage.save()
+        cmake_project = CMakeProject(ctx, project_dir, project_build_dir,
+                                     BuildConfig(cmake_generator="ninja"))
+        for phase in ("init", "build", "test"):
+            cmake_project.run_command([sys.executable, "-c", "pass"],
+                                      cwd=project_build_dir, phase=phase)
+        assert dashboard.started == [("init", 3.0), ("build", 60.0),
+                                     ("test", None)]
@@ -0,0 +1,135 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.model_builder`.
+"""
+
+from __future__ import absolute_import, print_function
+from cmake_build import model_builder
+from cmake_build.model_builder import BuildConfigResolver, CMakeProjectCache, \
+    make_cmake_projects, require_build_config_is_valid
+from behave4cmake_build.cmake_build_util import MockConfig
+from path import Path
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+class MockContext(object):
+    def __init__(self, config=None):
+        self.config = config or MockConfig()
+        self.config.build_config_aliases = {}
+
+
+@pytest.fixture
+def cmake_project_dirs(tmp_path):
+    project_dirs = []
+    for name in ("project_a", "project_b"):
+        project_dir = Path(str(tmp_path))/name
+        project_dir.makedirs_p()
+        (project_dir/"CMakeLists.txt").write_text("# -- CMAKE PROJECT\n")
+        project_dirs.append(project_dir)
+    return project_dirs
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestBuildConfigResolver(object):
+
+    def test_resolve__returns_same_build_config_object(self):
+        resolver = BuildConfigResolver(MockContext())
+        build_config1 = resolver.resolve("debug")
+        build_config2 = resolver.resolve("debug")
+        assert build_config1.name == "debug"
+        assert build_config2 is build_config1
+
+    def test_resolve__with_other_name_returns_other_build_config(self):
+        resolver = BuildConfigResolver(MockContext())
+        assert resolver.resolve("release") is not resolver.resolve("debug")
+
+
+class TestRequireBuildConfigIsValid(object):
+
+    def test_with_unknown_name_does_not_probe_host_platform(self, monkeypatch):
+        def probe_host():
+            raise AssertionError("host platform was probed")
+        monkeypatch.setattr(model_builder, "make_build_config_host_map", probe_host)
+        ctx = MockContext()
+        assert require_build_config_is_valid(ctx, "debug")
+        assert not require_build_config_is_valid(ctx, "relase", strict=False)
+
+
+class TestMakeCMakeProjects(object):
+
+    def test_projects_share_build_config_object(self, cmake_project_dirs):
+        ctx = MockContext()
+        cmake_projects = make_cmake_projects(ctx, cmake_project_dirs, "debug")
+        assert len(cmake_projects) == 2
+        build_config1 = cmake_projects[0]._build_config
+        assert cmake_projects[1]._build_config is build_config1
+
+    def test_project_config_changes_do_not_leak_into_other_projects(self, cmake_project_dirs):
+        ctx = MockContext()
+        cmake_project1, cmake_project2 = make_cmake_projects(ctx,
+                                                cmake_project_dirs, "debug")
+        cmake_project1.config.cmake_defines["FOO"] = "bar"
+        assert "FOO" not in cmake_project2.config.cmake_defines
+        assert "FOO" not in cmake_project1._build_config.cmake_defines
+
+    def test_uses_preloaded_stored_config(self, cmake_project_dirs):
+        ctx = MockContext()
+        cmake_project = make_cmake_projects(ctx, cmake_project_dirs[:1], "debug")[0]
+        cmake_project.config.cmake_generator = "make"
+        cmake_project.store_config()
+
+        cmake_project = make_cmake_projects(ctx, cmake_project_dirs[:1], "debug")[0]
+        assert cmake_project._stored_config.cmake_generator == "make"
+        assert cmake_project.config.cmake_generator == "make"
+
+
+class TestCMakeProjectCache(object):
+
+    def test_make_cmake_projects__reuses_cached_projects(self, cmake_project_dirs):
+        ctx = MockContext()
+        cache = CMakeProjectCache()
+        cmake_projects1 = make_cmake_projects(ctx, cmake_project_dirs, "debug",
+                                              cache=cache)
+        cmake_projects2 = make_cmake_projects(ctx, cmake_project_dirs, "debug",
+                                              cache=cache)
+        assert len(cache) == 2
+        for cmake_project1, cmake_project2 in zip(cmake_projects1, cmake_projects2):
+            assert cmake_project2 is cmake_project1
+
+    def test_make_cmake_projects__with_other_build_config_or_generator(self, cmake_project_dirs):
+        ctx = MockContext()
+        cache = CMakeProjectCache()
+        cmake_project1 = make_cmake_projects(ctx, cmake_project_dirs[:1], "debug",
+                                             cache=cache)[0]
+        cmake_project2 = make_cmake_projects(ctx, cmake_project_dirs[:1], "release",
+                                             cache=cache)[0]
+        cmake_project3 = make_cmake_projects(ctx, cmake_project_dirs[:1], "debug",
+                                             generator="make", cache=cache)[0]
+        assert cmake_project2 is not cmake_project1
+        assert cmake_project3 is not cmake_project1
+        assert cmake_project3.config.cmake_generator == "make"
+        assert len(cache) == 3
+
+    def test_make_cmake_projects__with_other_kwargs(self, cmake_project_dirs):
+        ctx = MockContext()
+        cache = CMakeProjectCache()
+        cmake_project1 = make_cmake_projects(ctx, cmake_project_dirs[:1], "debug",
+                                             cache=cache)[0]
+        cmake_project2 = make_cmake_projects(ctx, cmake_project_dirs[:1], "debug",
+                                             toolchain="t1.cmake", cache=cache)[0]
+        cmake_project3 = make_cmake_projects(ctx, cmake_project_dirs[:1], "debug",
+                                             toolchain="t1.cmake", cache=cache)[0]
+        assert cmake_project2 is not cmake_project1
+        assert cmake_project3 is cmake_project2
+        assert len(cache) == 2
+
+    def test_make_cmake_projects__without_cache_creates_new_projects(self, cmake_project_dirs):
+        ctx = MockContext()
+        cmake_project1 = make_cmake_projects(ctx, cmake_project_dirs[:1], "debug")[0]
+        cmake_project2 = make_cmake_projects(ctx, cmake_project_dirs[:1], "debug")[0]
+        assert cmake_project2 is not cmake_project1
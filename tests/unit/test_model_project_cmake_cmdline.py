@@ -149,7 +149,7 @@ class AbstractTestCMakeProject_WithoutParams(AbstractCMakeProjectTest):
         with cd(cmake_project.project_dir):
             cmake_project.install()
 
-        expected = "cmake --build .  --target install"
+        expected = "cmake --build . --target install"
         assert cmake_project.ctx.last_command == expected
 
     @pytest.mark.parametrize("config", CONFIGURATIONS)
@@ -173,7 +173,7 @@ class AbstractTestCMakeProject_WithoutParams(AbstractCMakeProjectTest):
         with cd(cmake_project.project_dir):
             cmake_project.clean()
 
-        expected = "cmake --build .  -- clean"
+        expected = "cmake --build . -- clean"
         assert cmake_project.ctx.last_command == expected
 
     @pytest.mark.parametrize("config", CONFIGURATIONS)
@@ -186,7 +186,7 @@ class AbstractTestCMakeProject_WithoutParams(AbstractCMakeProjectTest):
             cmake_project.rebuild()
 
         expected = [
-            "cmake --build .  -- clean",
+            "cmake --build . -- clean",
             "cmake --build ."
         ]
         assert cmake_project.ctx.commands == expected
@@ -202,7 +202,7 @@ class AbstractTestCMakeProject_WithoutParams(AbstractCMakeProjectTest):
 
         expected = [
             "cmake -G Ninja -DCMAKE_BUILD_TYPE={0} ..".format(config),
-            "cmake --build .  -- clean",
+            "cmake --build . -- clean",
             "cmake --build .",
         ]
         assert cmake_project.ctx.commands == expected
@@ -0,0 +1,54 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.persist`.
+"""
+
+from __future__ import absolute_import, print_function
+import os
+from cmake_build.config import CMakeProjectPersistConfig
+from path import Path
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestPersistentData(object):
+
+    def test_load_many__loads_all_files(self, tmp_path):
+        filenames = []
+        for index in range(4):
+            filename = Path(str(tmp_path))/"config_{0}.json".format(index)
+            config = CMakeProjectPersistConfig(filename, cmake_generator="ninja")
+            config.cmake_build_type = "Debug_{0}".format(index)
+            config.save()
+            filenames.append(filename)
+
+        stored_configs = CMakeProjectPersistConfig.load_many(filenames)
+        assert sorted(stored_configs.keys()) == sorted(filenames)
+        for index, filename in enumerate(filenames):
+            stored_config = stored_configs[filename]
+            assert stored_config.cmake_build_type == "Debug_{0}".format(index)
+
+    def test_load_many__with_missing_file_returns_empty_object(self, tmp_path):
+        filename = Path(str(tmp_path))/"MISSING.json"
+        stored_configs = CMakeProjectPersistConfig.load_many([filename])
+        assert filename in stored_configs
+        assert not filename.exists()
+
+    def test_load_many__skips_file_with_parse_error(self, tmp_path):
+        good_filename = Path(str(tmp_path))/"good.json"
+        bad_filename = Path(str(tmp_path))/"bad.json"
+        CMakeProjectPersistConfig(good_filename).save()
+        bad_filename.write_text("{ NOT-JSON")
+
+        stored_configs = CMakeProjectPersistConfig.load_many([good_filename,
+                                                              bad_filename])
+        assert good_filename in stored_configs
+        assert bad_filename not in stored_configs
+
+    def test_save__replaces_file_without_leaving_temporary_files(self, tmp_path):
+        filename = Path(str(tmp_path/"build.debug"/"stored.json"))
+        CMakeProjectPersistConfig(filename, cmake_generator="make").save()
+        CMakeProjectPersistConfig(filename, cmake_generator="ninja").save()
+        assert CMakeProjectPersistConfig.load(filename).cmake_generator == "ninja"
+        assert os.listdir(str(filename.dirname())) == ["stored.json"]
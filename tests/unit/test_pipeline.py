@@ -0,0 +1,152 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.pipeline`.
+"""
+
+from __future__ import absolute_import, print_function
+import threading
+import time
+from cmake_build.exceptions import NiceFailure
+from cmake_build.pipeline import PipelineScheduler, make_stage_limits, \
+    parse_stages, run_pipelines
+from cmake_build.scheduler import Unit
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+class Timeline(object):
+    def __init__(self):
+        self.events = []
+        self.active = {}
+        self.max_active = {}
+        self._lock = threading.Lock()
+
+    def make_unit(self, name, stage, delay=0.05, error=None):
+        def function():
+            with self._lock:
+                self.events.append(("start", name, stage))
+                self.active[stage] = self.active.get(stage, 0) + 1
+                self.max_active[stage] = max(self.max_active.get(stage, 0),
+                                             self.active[stage])
+            time.sleep(delay)
+            with self._lock:
+                self.active[stage] -= 1
+                self.events.append(("end", name, stage))
+            if error:
+                raise NiceFailure(reason=error)
+
+        unit = Unit(name, function)
+        unit.phase = stage
+        return unit
+
+    def index(self, event, name, stage):
+        return self.events.index((event, name, stage))
+
+
+def make_pipelines(timeline, names, stages=("init", "build", "test"), **kwargs):
+    return [[timeline.make_unit(name, stage, **kwargs) for stage in stages]
+            for name in names]
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestPipelineScheduler(object):
+
+    def test_run__overlaps_stages_of_units(self):
+        timeline = Timeline()
+        pipelines = make_pipelines(timeline, ["p1/debug", "p2/debug"])
+        scheduler = PipelineScheduler(max_workers=2, capture_output=False,
+                                      stage_limits=dict(init=2, build=1, test=2))
+        results = scheduler.run_pipelines(pipelines)
+        assert [r.status for r in sum(results, [])] == ["passed"] * 6
+        assert timeline.max_active["build"] == 1
+        # -- PIPELINED: One unit tests while the other unit builds.
+        first, second = sorted(["p1/debug", "p2/debug"],
+                               key=lambda name: timeline.index("start", name, "build"))
+        assert timeline.index("start", first, "test") < \
+            timeline.index("end", second, "build")
+
+    def test_run__failed_stage_skips_remaining_stages(self):
+        timeline = Timeline()
+        pipelines = [[timeline.make_unit("p1/debug", "init"),
+                      timeline.make_unit("p1/debug", "build", error="OOPS"),
+                      timeline.make_unit("p1/debug", "test")],
+                     make_pipelines(timeline, ["p2/debug"])[0]]
+        scheduler = PipelineScheduler(max_workers=1, keep_going=True)
+        results = scheduler.run_pipelines(pipelines)
+        assert [r.status for r in results[0]] == ["passed", "failed", "skipped"]
+        assert [r.status for r in results[1]] == ["passed"] * 3
+        assert results[0][1].name == "p1/debug (build)"
+
+    def test_run__fail_fast_skips_other_pipelines(self):
+        timeline = Timeline()
+        pipelines = [[timeline.make_unit("p1/debug", "init", error="OOPS")],
+                     make_pipelines(timeline, ["p2/debug"], stages=("init",))[0]]
+        scheduler = PipelineScheduler(max_workers=1)
+        results = scheduler.run_pipelines(pipelines)
+        assert [r.status for r in sum(results, [])] == ["failed", "skipped"]
+
+
+class TestRunPipelines(object):
+
+    def test_run_pipelines__returns_results_in_pipeline_order(self):
+        timeline = Timeline()
+        pipelines = make_pipelines(timeline, ["p1/debug", "p2/debug"],
+                                   stages=("build", "test"), delay=0)
+        results = run_pipelines(dict(concurrent_units=2), pipelines)
+        assert [r.name for r in results] == [
+            "p1/debug (build)", "p1/debug (test)",
+            "p2/debug (build)", "p2/debug (test)"]
+
+    def test_run_pipelines__calls_on_results_with_all_stage_units(self):
+        timeline = Timeline()
+        pipelines = make_pipelines(timeline, ["p1/debug", "p2/debug"],
+                                   stages=("build", "test"), delay=0)
+        recorded = []
+        run_pipelines(dict(concurrent_units=2), pipelines,
+                      on_results=lambda units, results: recorded.extend(
+                          (unit.name, unit.phase, result.status)
+                          for unit, result in zip(units, results)))
+        assert recorded == [("p1/debug", "build", "passed"),
+                            ("p1/debug", "test", "passed"),
+                            ("p2/debug", "build", "passed"),
+                            ("p2/debug", "test", "passed")]
+
+    def test_run_pipelines__raises_failure(self, capsys):
+        timeline = Timeline()
+        pipelines = [[timeline.make_unit("p1/debug", "build", error="OOPS"),
+                      timeline.make_unit("p1/debug", "test")]]
+        with pytest.raises(NiceFailure):
+            run_pipelines({}, pipelines)
+        assert "p1/debug (test): SKIPPED" in capsys.readouterr().out
+
+    def test_dry_run__shows_pipelines(self, capsys):
+        timeline = Timeline()
+        pipelines = make_pipelines(timeline, ["p1/debug"])
+        assert run_pipelines({}, pipelines, dry_run=True) == []
+        assert timeline.events == []
+        captured = capsys.readouterr()
+        assert "stage limits: init=2, build=1, test=2" in captured.out
+        assert "p1/debug: init (0:00) -> build (0:00) -> test (0:00)" in captured.out
+
+
+class TestStages(object):
+
+    @pytest.mark.parametrize("value, expected", [
+        (None, ["init", "build", "test"]),
+        ("test,build", ["build", "test"]),
+        (["pack", "init,build"], ["init", "build", "pack"]),
+    ])
+    def test_parse_stages(self, value, expected):
+        assert parse_stages(value) == expected
+
+    def test_parse_stages__with_unknown_stage_raises_error(self):
+        with pytest.raises(ValueError):
+            parse_stages("build,deploy")
+
+    def test_make_stage_limits__uses_config(self):
+        config = dict(pipeline_stage_limits=dict(build=3, test="bad"))
+        assert make_stage_limits(config, ["build", "test"]) == dict(build=3, test=2)
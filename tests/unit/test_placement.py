@@ -0,0 +1,162 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.placement`.
+"""
+
+from __future__ import absolute_import, print_function
+import io
+import os
+import sys
+from cmake_build.placement import Placement, PlacementPool, available_cpus, \
+    format_cpu_list, make_placement_pool, make_unit_priority, parse_cpu_list, \
+    parse_ionice, partition_cpus
+from cmake_build.process_runner import ProcessRunner, make_process_runner, \
+    use_placement
+from cmake_build.scheduler import Unit, UnitScheduler
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestCpuList(object):
+
+    @pytest.mark.parametrize("text, expected", [
+        ("0-3,8", [0, 1, 2, 3, 8]), ("5", [5]), (" 2-3, 0 ", [0, 2, 3]),
+    ])
+    def test_parse_cpu_list(self, text, expected):
+        assert parse_cpu_list(text) == expected
+        assert parse_cpu_list(format_cpu_list(expected)) == expected
+
+    def test_format_cpu_list(self):
+        assert format_cpu_list([8, 0, 1, 2, 3, 10, 11]) == "0-3,8,10-11"
+
+    @pytest.mark.parametrize("text", ["0-", "a", "1-2-3"])
+    def test_parse_cpu_list__with_bad_value_raises_error(self, text):
+        with pytest.raises(ValueError):
+            parse_cpu_list(text)
+
+
+class TestPartitionCpus(object):
+
+    def test_partition__splits_cpus_among_slots(self):
+        partitions = partition_cpus(range(8), 3)
+        assert partitions == [([0, 1], None), ([2, 3, 4], None),
+                              ([5, 6, 7], None)]
+
+    def test_partition__with_numa_nodes_keeps_slots_on_one_node(self):
+        nodes = {0: list(range(0, 4)), 1: list(range(4, 8))}
+        partitions = partition_cpus(range(8), 4, nodes)
+        assert partitions == [([0, 1], 0), ([4, 5], 1), ([2, 3], 0), ([6, 7], 1)]
+
+    def test_partition__with_more_slots_than_cpus_shares_cpus(self):
+        assert partition_cpus([0, 1], 3) == [([0], None), ([1], None), ([0], None)]
+
+
+class TestPlacementConfig(object):
+
+    @pytest.mark.parametrize("config, expected", [
+        (dict(), (None, None)),
+        (dict(unit_priority="background"), (10, "best-effort:7")),
+        (dict(unit_priority="idle", unit_nice=5), (5, "idle")),
+        (dict(unit_ionice="best-effort:3"), (None, "best-effort:3")),
+    ])
+    def test_make_unit_priority(self, config, expected):
+        assert make_unit_priority(config) == expected
+
+    @pytest.mark.parametrize("config", [
+        dict(unit_priority="urgent"), dict(unit_ionice="realtime"),
+    ])
+    def test_make_unit_priority__with_bad_value_raises_error(self, config):
+        with pytest.raises(ValueError):
+            make_unit_priority(config)
+
+    def test_parse_ionice(self):
+        assert parse_ionice("idle") == ["-c", "3"]
+        assert parse_ionice("best-effort:7") == ["-c", "2", "-n", "7"]
+        assert parse_ionice(None) is None
+
+    def test_make_placement_pool(self):
+        assert make_placement_pool(dict(), 4) is None
+        pool = make_placement_pool(dict(cpu_placement="partition"), 2)
+        assert len(pool.partitions) == 2
+        assert make_process_runner(dict(unit_priority="idle")) is not None
+
+    def test_pool__provides_free_slots(self):
+        pool = PlacementPool([([0], None), ([1], None)], nice=10)
+        placement1 = pool.acquire("p1/debug")
+        placement2 = pool.acquire("p2/debug")
+        assert (placement1.cpus, placement2.cpus) == ([0], [1])
+        pool.release(placement1)
+        assert pool.acquire("p3/debug").slot == 0
+
+
+class TestPlacement(object):
+
+    def test_run__applies_placement_to_process(self, capsys):
+        cpu = available_cpus()[0]
+        code = "import os; print('NICE=%d' % os.nice(0))"
+        placement = Placement([cpu], nice=os.nice(0) + 5)
+        placement.name = "p1/debug"
+        stream = io.StringIO()
+        with use_placement(placement):
+            ProcessRunner(echo=False, stream=stream).run([sys.executable, "-c", code])
+        assert stream.getvalue().strip() == "NICE=%d" % placement.nice
+        captured = capsys.readouterr()
+        assert "CMAKE-BUILD: Placement of p1/debug: cpus={0}".format(cpu) in captured.out
+
+    @pytest.mark.skipif(not hasattr(os, "sched_getaffinity"),
+                        reason="Requires: os.sched_getaffinity()")
+    def test_run__applies_placement_to_grandchild_process(self):
+        cpu = available_cpus()[-1]
+        grandchild = "import os; print(sorted(os.sched_getaffinity(0)), os.nice(0))"
+        code = ("import subprocess, sys; "
+                "subprocess.check_call([sys.executable, '-c', {0!r}])".format(grandchild))
+        placement = Placement([cpu], nice=os.nice(0) + 3)
+        stream = io.StringIO()
+        with use_placement(placement):
+            ProcessRunner(echo=False, stream=stream).run([sys.executable, "-c", code])
+        assert stream.getvalue().strip() == "[{0}] {1}".format(cpu, placement.nice)
+
+    def test_make_argv__uses_placement_commands(self, monkeypatch):
+        from cmake_build import placement as placement_module
+        monkeypatch.setattr(placement_module.shutil, "which",
+                            lambda name: "/usr/bin/" + name)
+        monkeypatch.setattr(placement_module, "current_nice", lambda: 2)
+        placement = Placement([0, 1, 2, 3], nice=10, ionice="idle")
+        assert placement.make_argv(["cmake", "--build", "."]) == [
+            "/usr/bin/taskset", "-c", "0-3", "/usr/bin/nice", "-n", "8",
+            "/usr/bin/ionice", "-t", "-c", "3", "cmake", "--build", "."]
+        assert Placement(nice=2).make_argv(["cmake"]) == ["cmake"]
+        assert Placement().make_argv(["cmake"]) == ["cmake"]
+
+    @pytest.mark.skipif(not hasattr(os, "sched_setaffinity"),
+                        reason="Requires: os.sched_setaffinity()")
+    def test_run__without_commands_applies_placement_after_start(
+            self, monkeypatch, capsys):
+        from cmake_build import placement as placement_module
+        monkeypatch.setattr(placement_module.shutil, "which", lambda name: None)
+        cpu = available_cpus()[0]
+        code = "import time; time.sleep(0.5)"
+        placement = Placement([cpu], nice=os.nice(0) + 2, ionice="idle")
+        placement.name = "p1/debug"
+        with use_placement(placement):
+            ProcessRunner(echo=False, stream=io.StringIO()).run(
+                [sys.executable, "-c", code])
+        captured = capsys.readouterr()
+        assert "-- BEST-EFFORT: cpus, nice applied after start" in captured.out
+        assert "-- UNAVAILABLE: ionice: not installed" in captured.out
+
+    def test_scheduler__uses_placement_per_unit(self):
+        pool = PlacementPool([([0], None)], nice=10)
+        placements = []
+
+        def record():
+            # pylint: disable=import-outside-toplevel
+            from cmake_build.process_runner import _thread_state
+            placements.append(_thread_state.placement)
+        scheduler = UnitScheduler(placement_pool=pool)
+        scheduler.run([Unit("p1/debug", record), Unit("p2/debug", record)])
+        assert [placement.name for placement in placements] == ["p1/debug",
+                                                                "p2/debug"]
+        assert pool.acquire().slot == 0
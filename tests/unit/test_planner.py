@@ -0,0 +1,151 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.planner`.
+"""
+
+from __future__ import absolute_import, print_function
+from cmake_build.journal import RunJournal
+from cmake_build.planner import count_ninja_edges, count_source_files, \
+    make_unit_plan
+from cmake_build.scheduler import ProjectUnit, run_units
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+class HistoryUnit(ProjectUnit):
+    def __init__(self, cmake_project, phase, function, journal):
+        super(HistoryUnit, self).__init__(cmake_project, phase, function)
+        self.journal = journal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return RunJournal(tmp_path/".cmake_build.journal.json")
+
+
+@pytest.fixture
+def make_units(tmp_path, journal, make_fake_cmake_project):
+    def make_units(durations, calls=None, phase="build"):
+        units = []
+        for name, duration in durations:
+            project_dir = tmp_path/name
+            project_dir.mkdir()
+            cmake_project = make_fake_cmake_project(project_dir)
+            if duration is not None:
+                journal.durations[journal.make_key(cmake_project.unit_name,
+                                                   phase)] = duration
+            function = lambda p: calls.append(p.unit_name) if calls is not None else None
+            units.append(HistoryUnit(cmake_project, phase, function, journal))
+        return units
+    return make_units
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestMakeUnitPlan(object):
+
+    def test_plan__orders_units_longest_first(self, make_units):
+        units = make_units([("p1", 10), ("p2", 60), ("p3", 30), ("p4", 20)])
+        plan = make_unit_plan(units, max_workers=2)
+        assert [unit.name for unit in plan.units] == [
+            "p2/debug", "p3/debug", "p4/debug", "p1/debug"]
+        assert [estimate.basis for estimate in plan.estimates] == ["history"] * 4
+        # -- WORKERS: p2 (0..60) on worker 1, p3+p4+p1 (0..60) on worker 2.
+        assert [(e.worker, e.start) for e in plan.estimates] == [
+            (0, 0), (1, 0), (1, 30), (1, 50)]
+        assert plan.wall_time == 60
+
+    def test_plan__keeps_order_of_sequential_units(self, make_units):
+        units = make_units([("p1", 10), ("p2", 60)])
+        plan = make_unit_plan(units, max_workers=1)
+        assert [unit.name for unit in plan.units] == ["p1/debug", "p2/debug"]
+        assert plan.wall_time == 70
+
+    def test_plan__uses_heuristics_without_history(self, tmp_path, make_units):
+        units = make_units([("p1", None)])
+        (tmp_path/"p1"/"hello.c").write_text(u"int main() {}\n")
+        (tmp_path/"p1"/"util.cpp").write_text(u"\n")
+        plan = make_unit_plan(units, max_workers=2)
+        assert plan.estimates[0].basis == "source files"
+        assert plan.estimates[0].duration == 2.0
+
+    def test_plan__uses_last_run_of_phase_steps(self, tmp_path, make_units):
+        from cmake_build.quota import BuildDirUsage
+        units = make_units([("p1", None)], phase="test")
+        units += make_units([("p2", None)], phase="redo")
+        for name in ("p1", "p2"):
+            build_dir = tmp_path/name/"build.debug"
+            build_dir.mkdir()
+            (build_dir/"build.ninja").write_text(u"build a.o: cc a.c\n")
+            usage = BuildDirUsage(BuildDirUsage.make_filename(build_dir))
+            usage.set_result("init", "passed", duration=5.0)
+            usage.set_result("build", "passed", duration=20.0)
+            usage.set_result("test", "passed", duration=12.0)
+            usage.save()
+        plan = make_unit_plan(units, max_workers=2)
+        estimates = dict((e.unit.name, e) for e in plan.estimates)
+        assert estimates["p1/debug"].duration == 12.0
+        assert estimates["p2/debug"].duration == 25.0
+        assert estimates["p1/debug"].basis == "last run"
+
+    def test_plan__without_history_uses_ninja_edges_only_for_build(
+            self, tmp_path, make_units):
+        units = make_units([("p1", None)], phase="test")
+        build_dir = tmp_path/"p1"/"build.debug"
+        build_dir.mkdir()
+        (build_dir/"build.ninja").write_text(u"build a.o: cc a.c\n")
+        plan = make_unit_plan(units, max_workers=2)
+        assert plan.estimates[0].basis == "source files"
+
+    def test_print_plan(self, make_units, capsys):
+        units = make_units([("p1", 10), ("p2", 60)])
+        make_unit_plan(units, max_workers=2).print_plan()
+        captured = capsys.readouterr()
+        assert "Plan for 2 units on 2 workers (estimated wall time: 1:00)" \
+            in captured.out
+        assert "WORKER  UNIT      PHASE  START  ESTIMATE  BASIS" in captured.out
+
+
+class TestHeuristics(object):
+
+    def test_count_ninja_edges(self, tmp_path):
+        (tmp_path/"build.ninja").write_text(
+            u"rule cc\n  command = cc $in\nbuild a.o: cc a.c\nbuild b.o: cc b.c\n")
+        assert count_ninja_edges(tmp_path) == 2
+        assert count_ninja_edges(tmp_path/"missing") is None
+
+    def test_count_source_files__skips_hidden_and_build_dirs(self, tmp_path):
+        import re
+        for name in ("src/a.c", "src/b.CPP", "README.md",
+                     ".git/x.c", "build.debug/gen.c"):
+            path = tmp_path/name
+            path.parent.mkdir(exist_ok=True)
+            path.write_text(u"\n")
+        assert count_source_files(tmp_path, re.compile(r"build\..*")) == 2
+
+
+class TestRunUnits(object):
+
+    def test_dry_run__shows_plan_without_running_units(self, make_units, capsys):
+        calls = []
+        units = make_units([("p1", 10)], calls=calls)
+        assert run_units(dict(concurrent_units=1), units, dry_run=True) == []
+        assert calls == []
+        assert "Plan for 1 units on 1 workers" in capsys.readouterr().out
+
+    def test_concurrent_run__returns_results_in_order_of_units(self, make_units):
+        calls = []
+        units = make_units([("p1", 10), ("p2", 60), ("p3", 30)], calls=calls)
+        results = run_units(dict(concurrent_units=2), units)
+        assert [result.name for result in results] == [
+            "p1/debug", "p2/debug", "p3/debug"]
+        assert calls[0] == "p2/debug"
+
+    def test_journal__keeps_durations_of_previous_runs(self, journal):
+        journal.record("p1/debug", "build", "passed", "FP1", duration=42.0)
+        journal.start_run()
+        assert not journal.entries
+        assert journal.get_duration("p1/debug", "build") == 42.0
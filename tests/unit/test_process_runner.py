@@ -0,0 +1,143 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.process_runner`.
+"""
+
+from __future__ import absolute_import, print_function
+import io
+import os
+import sys
+from cmake_build.process_runner import ProcessRunner, make_process_runner, pty
+from invoke import Config
+from invoke.exceptions import UnexpectedExit
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+class BinaryOutputStream(io.TextIOWrapper):
+    def __init__(self):
+        super(BinaryOutputStream, self).__init__(io.BytesIO(), encoding="UTF-8")
+
+    @property
+    def text(self):
+        self.flush()
+        return self.buffer.getvalue().decode("UTF-8")
+
+
+def python_argv(code):
+    return [sys.executable, "-c", code]
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestProcessRunner(object):
+
+    def test_run__forwards_output_without_shell(self):
+        stream = BinaryOutputStream()
+        runner = ProcessRunner(echo=False, stream=stream)
+        result = runner.run(python_argv("print('$HOME is not expanded')"))
+        assert result.exited == 0
+        assert stream.text == "$HOME is not expanded\n"
+
+    def test_run__uses_cwd_without_changing_current_directory(self, tmp_path):
+        stream = BinaryOutputStream()
+        runner = ProcessRunner(echo=False, stream=stream)
+        cwd = os.getcwd()
+        runner.run(python_argv("import os; print(os.getcwd())"), cwd=tmp_path)
+        assert stream.text.strip() == os.path.realpath(str(tmp_path))
+        assert os.getcwd() == cwd
+
+    def test_run__echoes_command(self):
+        stream = BinaryOutputStream()
+        runner = ProcessRunner(echo=True, stream=stream)
+        runner.echo_format = "ECHO: {command}"
+        runner.run(["python", "-c", "pass"])
+        assert stream.text.startswith('ECHO: python -c pass\n')
+
+    def test_run__with_failing_command_raises_unexpected_exit(self):
+        runner = ProcessRunner(echo=False, stream=BinaryOutputStream())
+        with pytest.raises(UnexpectedExit) as exc_info:
+            runner.run(python_argv("import sys; sys.exit(3)"))
+        assert exc_info.value.result.exited == 3
+
+    def test_run__with_failing_command_and_warn(self):
+        runner = ProcessRunner(echo=False, stream=BinaryOutputStream())
+        result = runner.run(python_argv("import sys; sys.exit(3)"), warn=True)
+        assert result.exited == 3
+
+    def test_run__with_dry_run_does_not_start_process(self, tmp_path):
+        stream = BinaryOutputStream()
+        marker = tmp_path/"marker.txt"
+        runner = ProcessRunner(echo=False, stream=stream, dry=True)
+        runner.echo_format = "DRY: {command}"
+        result = runner.run(python_argv("open('marker.txt', 'w')"), cwd=tmp_path)
+        assert result.exited == 0
+        assert stream.text.startswith("DRY: ")
+        assert not marker.exists()
+
+    def test_run__with_hide_captures_output(self):
+        stream = BinaryOutputStream()
+        runner = ProcessRunner(echo=False, stream=stream, hide=True)
+        result = runner.run(python_argv("print('HIDDEN')"))
+        assert stream.text == ""
+        assert result.stdout == "HIDDEN\n"
+
+    def test_run__with_warn_of_runner(self):
+        runner = ProcessRunner(echo=False, stream=BinaryOutputStream(), warn=True)
+        result = runner.run(python_argv("import sys; sys.exit(3)"))
+        assert result.exited == 3
+        with pytest.raises(UnexpectedExit):
+            runner.run(python_argv("import sys; sys.exit(3)"), warn=False)
+
+    def test_run__with_env_extends_environment(self, monkeypatch):
+        monkeypatch.setenv("CMAKE_BUILD_TEST_OUTER", "outer")
+        stream = BinaryOutputStream()
+        runner = ProcessRunner(echo=False, stream=stream)
+        code = ("import os; print(os.environ['CMAKE_BUILD_TEST_OUTER'], "
+                "os.environ['CMAKE_BUILD_TEST_INNER'])")
+        runner.run(python_argv(code), env=dict(CMAKE_BUILD_TEST_INNER="inner"))
+        assert stream.text == "outer inner\n"
+
+    @pytest.mark.skipif(pty is None, reason="Requires: pty")
+    def test_run__with_pty_uses_terminal(self):
+        stream = BinaryOutputStream()
+        runner = ProcessRunner(use_pty=True, echo=False, stream=stream)
+        runner.run(python_argv("import sys; print(sys.stdout.isatty())"))
+        assert stream.text.strip() == "True"
+
+
+@pytest.mark.parametrize("data, expected", [
+    ({}, None),
+    ({"process_runner": "shell"}, None),
+    ({"process_runner": "direct"}, ProcessRunner),
+])
+def test_make_process_runner(data, expected):
+    runner = make_process_runner(Config(overrides=data))
+    if expected is None:
+        assert runner is None
+    else:
+        assert isinstance(runner, expected)
+        assert not runner.pty
+
+
+def test_make_process_runner__in_worker_thread_uses_direct_runner():
+    from concurrent.futures import ThreadPoolExecutor
+    config = Config(overrides={"process_runner": "shell"})
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        runner = executor.submit(make_process_runner, config).result()
+    assert isinstance(runner, ProcessRunner)
+
+
+def test_make_process_runner__uses_run_config(monkeypatch):
+    monkeypatch.setenv("CMAKE_BUILD_TEST_OUTER", "outer")
+    config = Config(overrides={"process_runner": "direct", "run": dict(
+        dry=True, hide="out", warn=True, env=dict(CMAKE_BUILD_TEST_INNER="inner"))})
+    runner = make_process_runner(config)
+    assert runner.dry is True
+    assert runner.hide == ("stdout",)
+    assert runner.warn is True
+    assert runner.env["CMAKE_BUILD_TEST_INNER"] == "inner"
+    assert runner.env["CMAKE_BUILD_TEST_OUTER"] == "outer"
@@ -0,0 +1,126 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.program` (startup behaviour).
+"""
+
+from __future__ import absolute_import, print_function
+import os
+import subprocess
+import sys
+import pytest
+
+# ---------------------------------------------------------------------------
+# CONSTANTS:
+# ---------------------------------------------------------------------------
+HERE = os.path.dirname(__file__)
+TOP = os.path.abspath(os.path.join(HERE, "..", ".."))
+
+# -- IMPORT-TIME BUDGET: cmake_build.program (without invoke), in microseconds.
+# HINT: Generous on purpose (slow CI machines), catches eager task loading.
+IMPORT_TIME_BUDGET_USEC = 150000
+LAZY_MODULES = [
+    "cmake_build.tasks",
+    "cmake_build.tasklet.cleanup",
+    "cmake_build.model",
+    "cmake_build.model_builder",
+    "cmake_build.config",
+    "cmake_build.persist",
+    "cmake_build.cmake_util",
+]
+MODEL_MODULES = [
+    "cmake_build.model",
+    "cmake_build.model_builder",
+    "cmake_build.config",
+    "cmake_build.persist",
+    "cmake_build.cmake_util",
+]
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+def run_python(code, *options):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([TOP, env.get("PYTHONPATH", "")])
+    command = [sys.executable] + list(options) + ["-c", code]
+    process = subprocess.run(command, cwd=TOP, env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True, check=True)
+    return process
+
+
+def parse_importtime(text):
+    """Parse ``python -X importtime`` output into: module -> self_time."""
+    import_times = {}
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if not parts[0].strip().isdigit():
+            continue    # -- SKIP: Header line.
+        module_name = parts[2].strip()
+        import_times[module_name] = int(parts[0])
+    return import_times
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestProgramStartup(object):
+
+    def test_import_program__does_not_load_tasks(self):
+        process = run_python("import cmake_build.program", "-X", "importtime")
+        import_times = parse_importtime(process.stderr)
+        assert "cmake_build.program" in import_times
+        for module_name in LAZY_MODULES:
+            assert module_name not in import_times
+
+    def test_import_program__is_within_budget(self):
+        process = run_python("import cmake_build.program", "-X", "importtime")
+        import_times = parse_importtime(process.stderr)
+        own_import_time = sum(value for name, value in import_times.items()
+                              if name.startswith("cmake_build"))
+        assert own_import_time < IMPORT_TIME_BUDGET_USEC
+
+    def test_make_namespace__does_not_load_model_layer(self):
+        code = "\n".join([
+            "import sys",
+            "from cmake_build.program import make_namespace",
+            "make_namespace()",
+            "print(' '.join(sorted(sys.modules)))",
+        ])
+        process = run_python(code)
+        loaded_modules = process.stdout.split()
+        assert "cmake_build.tasks" in loaded_modules
+        for module_name in MODEL_MODULES:
+            assert module_name not in loaded_modules
+
+    @pytest.mark.parametrize("option", ["--version", "-V"])
+    def test_program_version__does_not_load_namespace(self, option, capsys):
+        from cmake_build.program import CMakeBuildProgram, CMakeBuildProgramConfig
+        def namespace_factory():
+            raise AssertionError("OOPS: namespace is loaded")
+
+        program = CMakeBuildProgram(version="1.2.3", name="cmake-build",
+                                    namespace_factory=namespace_factory,
+                                    config_class=CMakeBuildProgramConfig)
+        program.run(["cmake-build", option], exit=False)
+        captured = capsys.readouterr()
+        assert "cmake-build 1.2.3" in captured.out
+        assert not program.namespace_loaded
+
+    def test_program_execute__clears_task_settings(self, monkeypatch):
+        from invoke import Program
+        from cmake_build.program import CMakeBuildProgram, CMakeBuildProgramConfig
+        from cmake_build.tasks import CMakeBuildTask
+        monkeypatch.setattr(Program, "execute", lambda self: None)
+        task_settings = CMakeBuildTask.task_settings
+        task_settings.build_config = "release"
+        cache = task_settings.cmake_projects_cache
+        cache.add(object(), "p1", "release")
+
+        program = CMakeBuildProgram(version="1.2.3", name="cmake-build",
+                                    config_class=CMakeBuildProgramConfig)
+        program.execute()
+        assert task_settings.build_config is None
+        assert len(task_settings.cmake_projects_cache) == 0
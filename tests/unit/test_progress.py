@@ -0,0 +1,144 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.progress`.
+"""
+
+from __future__ import absolute_import, print_function
+import io
+import sys
+import time
+from cmake_build.build_log import BuildLog, make_build_log
+from cmake_build.progress import ProgressDashboard, UnitProgress, \
+    format_duration, parse_progress, progress_dashboard_enabled
+from invoke import Config
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestParseProgress(object):
+
+    @pytest.mark.parametrize("line, expected", [
+        (b"[12/345] Building CXX object hello.o", (12, 345)),
+        (b"[ 42%] Building CXX object hello.o", (42, 100)),
+        (b"[100%] Built target hello", (100, 100)),
+        (b"-- Configuring done", None),
+        (b"[ERROR] something", None),
+    ])
+    def test_parse_progress(self, line, expected):
+        assert parse_progress(line) == expected
+
+    @pytest.mark.parametrize("seconds, expected", [
+        (None, "-"), (5.7, "0:05"), (125, "2:05"), (3725, "1:02:05"),
+    ])
+    def test_format_duration(self, seconds, expected):
+        assert format_duration(seconds) == expected
+
+
+class TestUnitProgress(object):
+
+    def test_eta__uses_expected_duration(self):
+        unit = UnitProgress("p1/debug")
+        unit.start("build", expected_duration=100, now=1000)
+        assert unit.eta(now=1030) == 70
+        assert unit.eta(now=1200) == 0
+
+    def test_eta__uses_progress_ratio_without_history(self):
+        unit = UnitProgress("p1/debug")
+        unit.start("build", now=1000)
+        assert unit.eta(now=1010) is None
+        unit.done, unit.total = (25, 100)
+        assert unit.eta(now=1010) == pytest.approx(30)
+
+    def test_eta__is_none_when_finished(self):
+        unit = UnitProgress("p1/debug")
+        unit.start("build", expected_duration=100, now=1000)
+        unit.finish("passed", now=1050)
+        assert unit.eta(now=1060) is None
+        assert unit.elapsed(now=1060) == 50
+
+
+class TestProgressDashboard(object):
+
+    def test_non_tty__prints_one_line_summaries(self):
+        stream = io.StringIO()
+        dashboard = ProgressDashboard(stream=stream, tty=False, interval=3600)
+        on_line = dashboard.start_unit("p1/debug", "build")
+        on_line(b"[1/4] Building CXX object a.o")
+        on_line(b"[2/4] Building CXX object b.o")     # -- RATE-LIMITED.
+        dashboard.finish_unit("p1/debug", "passed")
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 2
+        assert lines[0].startswith("PROGRESS: 0/1 units finished | p1/debug build running")
+        assert lines[1].startswith("PROGRESS: 1/1 units finished")
+        assert "\033[" not in stream.getvalue()
+
+    def test_tty__redraws_rows_and_restores_stdout(self):
+        stream = io.StringIO()
+        saved_stdout = sys.stdout
+        dashboard = ProgressDashboard(stream=stream, tty=True, interval=0)
+        try:
+            on_line = dashboard.start_unit("p1/debug", "build", expected_duration=60)
+            dashboard.start_unit("p2/debug", "configure")
+            on_line(b"[3/10] Building CXX object c.o")
+            print("other output")
+        finally:
+            dashboard.close()
+        assert sys.stdout is saved_stdout
+        output = stream.getvalue()
+        assert "\033[2F\033[J" in output
+        assert "other output" in output
+        final_rows = output.split("other output\n")[-1].splitlines()
+        assert final_rows[0].startswith("p1/debug  build      running  [3/10]")
+        assert "ETA" in final_rows[0]
+        assert final_rows[1].startswith("p2/debug  configure  running")
+
+    def test_tty__redraws_rows_after_other_output(self):
+        stream = io.StringIO()
+        dashboard = ProgressDashboard(stream=stream, tty=True, interval=3600)
+        try:
+            dashboard.start_unit("p1/debug", "build")
+            sys.stdout.write("partial ")
+            assert stream.getvalue().endswith("partial ")
+            print("line")
+            output = stream.getvalue()
+        finally:
+            dashboard.close()
+        rows = output.split("partial line\n")[-1].splitlines()
+        assert len(rows) == 1
+        assert rows[0].startswith("p1/debug  build  running")
+
+    def test_non_tty__prints_summaries_periodically(self):
+        stream = io.StringIO()
+        dashboard = ProgressDashboard(stream=stream, tty=False, interval=0.1)
+        dashboard.start_unit("p1/debug", "build")
+        time.sleep(1.5)     # -- NO OUTPUT: Summaries are printed anyway.
+        dashboard.finish_unit("p1/debug", "passed")
+        dashboard.close()
+        lines = stream.getvalue().splitlines()
+        assert len(lines) >= 3
+        assert lines[1].startswith("PROGRESS: 0/1 units finished | p1/debug build running")
+
+
+class TestBuildLogWithProgress(object):
+
+    def test_build_log__calls_on_line_for_each_line(self):
+        lines = []
+        build_log = BuildLog(console="none", on_line=lines.append)
+        build_log.write(b"[1/2] a\n[2/")
+        build_log.write(b"2] b\n")
+        build_log.close()
+        assert lines == [b"[1/2] a", b"[2/2] b"]
+
+    def test_make_build_log__is_implied_by_progress_dashboard(self, tmp_path):
+        config = Config(dict(progress_dashboard=True, build_log_console="all"))
+        assert progress_dashboard_enabled(config)
+        build_log = make_build_log(config, tmp_path, tmp_path/"build.debug")
+        assert build_log.filename == str(tmp_path/"build.debug"/"cmake_build.log")
+        assert build_log.console == "none"
+
+    @pytest.mark.parametrize("value", [None, False, "no"])
+    def test_make_build_log__disabled_without_progress_dashboard(self, value, tmp_path):
+        config = Config(dict(progress_dashboard=value))
+        assert make_build_log(config, tmp_path, tmp_path/"build.debug") is None
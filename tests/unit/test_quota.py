@@ -0,0 +1,192 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.quota`.
+"""
+
+from __future__ import absolute_import, print_function
+from cmake_build.config import CMakeProjectPersistConfig
+from cmake_build.quota import \
+    BuildDirInfo, BuildDirUsage, collect_garbage, discover_build_dirs, \
+    enforce_build_dir_quota, parse_size, select_evictions
+from invoke import Config, Context
+from invoke.exceptions import Exit
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+def make_build_dir_info(name, last_used, size=100, stale=False, pinned=False):
+    build_dir = BuildDirInfo(name, build_config=name, last_used=last_used,
+                             size=size)
+    build_dir.stale = stale
+    build_dir.pinned = pinned
+    return build_dir
+
+
+def make_build_dir(project_dir, build_config, last_used=None, size=100):
+    build_dir = project_dir/("build.%s" % build_config)
+    build_dir.mkdir(parents=True)
+    (build_dir/"CMakeCache.txt").write_text(u"x" * size)
+    CMakeProjectPersistConfig(build_dir/CMakeProjectPersistConfig.FILE_BASENAME).save()
+    if last_used:
+        usage = BuildDirUsage(BuildDirUsage.make_filename(build_dir))
+        usage.mark_used(build_config, now=last_used)
+    return build_dir
+
+
+def make_context():
+    return Context(Config(overrides={"build_dir_schema": "build.{BUILD_CONFIG}"}))
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+@pytest.mark.parametrize("text, expected", [
+    ("2000", 2000),
+    ("10K", 10 * 1024),
+    ("500M", 500 * 1024**2),
+    ("20G", 20 * 1024**3),
+    ("1.5GiB", int(1.5 * 1024**3)),
+    (None, None),
+])
+def test_parse_size(text, expected):
+    assert parse_size(text) == expected
+
+
+def test_parse_size__with_invalid_size_raises_value_error():
+    with pytest.raises(ValueError):
+        parse_size("20 apples")
+
+
+class TestSelectEvictions(object):
+
+    def test_evicts_stale_first_and_then_least_recently_used(self):
+        build_dirs = [
+            make_build_dir_info("new", last_used=300),
+            make_build_dir_info("old", last_used=100),
+            make_build_dir_info("gone", last_used=400, stale=True),
+            make_build_dir_info("middle", last_used=200),
+        ]
+        evictions = select_evictions(build_dirs, quota=150)
+        assert [b.build_config for b, _ in evictions] == ["gone", "old", "middle"]
+        assert evictions[0][1].startswith("STALE:")
+        assert evictions[1][1].startswith("LRU:")
+
+    def test_never_evicts_pinned_build_dirs(self):
+        build_dirs = [
+            make_build_dir_info("current", last_used=100, pinned=True),
+            make_build_dir_info("other", last_used=200),
+        ]
+        evictions = select_evictions(build_dirs, quota=0)
+        assert [b.build_config for b, _ in evictions] == ["other"]
+
+    def test_below_quota_evicts_nothing(self):
+        build_dirs = [
+            make_build_dir_info("gone", last_used=100, stale=True),
+            make_build_dir_info("other", last_used=200),
+        ]
+        assert select_evictions(build_dirs, quota=1000) == []
+
+    def test_with_remove_stale_evicts_stale_without_quota(self):
+        build_dirs = [
+            make_build_dir_info("gone", last_used=100, stale=True),
+            make_build_dir_info("other", last_used=200),
+        ]
+        evictions = select_evictions(build_dirs, remove_stale=True)
+        assert [b.build_config for b, _ in evictions] == ["gone"]
+
+
+class TestCollectGarbage(object):
+
+    def test_removes_stale_and_lru_build_dirs(self, tmp_path, capsys):
+        project_dir = tmp_path/"project"
+        make_build_dir(project_dir, "debug", last_used=100)
+        make_build_dir(project_dir, "release", last_used=200)
+        make_build_dir(project_dir, "Linux", last_used=300)
+        make_build_dir(project_dir, "obsolete")     # -- HINT: No usage data.
+
+        evicted = collect_garbage(make_context(), [project_dir],
+                                  known_build_configs=set(["debug", "release", "Linux"]),
+                                  pinned_build_configs=["debug"], quota=900)
+        assert [b.build_config for b in evicted] == ["obsolete", "release"]
+        assert sorted(p.name for p in project_dir.iterdir()) == \
+               ["build.Linux", "build.debug"]
+        captured = capsys.readouterr()
+        assert "BUILD-DIR-GC: 2 build directories" in captured.out
+
+    def test_with_dry_run_shows_reclaimed_space(self, tmp_path, capsys):
+        project_dir = tmp_path/"project"
+        make_build_dir(project_dir, "obsolete", last_used=100)
+        evicted = collect_garbage(make_context(), [project_dir],
+                                  known_build_configs=set(["debug"]),
+                                  dry_run=True)
+        assert len(evicted) == 1
+        assert (project_dir/"build.obsolete").exists()
+        captured = capsys.readouterr()
+        assert "BUILD-DIR-GC: " in captured.out
+        assert "(STALE: build_config=obsolete; dry-run: " in captured.out
+        assert "would be reclaimed)" in captured.out
+
+    def test_remembers_computed_size_until_next_use(self, tmp_path):
+        project_dir = tmp_path/"project"
+        build_dir = make_build_dir(project_dir, "debug", last_used=100)
+        collect_garbage(make_context(), [project_dir],
+                        known_build_configs=set(["debug"]), quota=10**9)
+        usage = BuildDirUsage.load(BuildDirUsage.make_filename(build_dir))
+        assert usage.size > 100
+
+        usage.mark_used("debug")
+        assert BuildDirUsage.load(usage.filename).size == usage.size
+        usage.mark_used("debug", size_changed=True)
+        assert BuildDirUsage.load(usage.filename).size is None
+
+    def test_with_dry_run_writes_no_usage_data(self, tmp_path):
+        project_dir = tmp_path/"project"
+        build_dir = make_build_dir(project_dir, "debug", last_used=100)
+        collect_garbage(make_context(), [project_dir],
+                        known_build_configs=set(["debug"]), quota=10**9,
+                        dry_run=True)
+        usage = BuildDirUsage.load(BuildDirUsage.make_filename(build_dir))
+        assert usage.size is None
+
+
+    def test_with_workspace_store_reads_no_usage_files(self, tmp_path,
+                                                      monkeypatch):
+        from cmake_build import workspace_store as workspace_store_module
+        project_dir = tmp_path/"project"
+        build_dir = make_build_dir(project_dir, "debug", last_used=100)
+        ctx = Context(Config(overrides={
+            "build_dir_schema": "build.{BUILD_CONFIG}",
+            "workspace_store": str(tmp_path/"workspace.db")}))
+        monkeypatch.setattr(workspace_store_module, "_workspace_stores", {})
+        collect_garbage(ctx, [project_dir], known_build_configs=set(["debug"]),
+                        quota=10**9)
+        workspace_store_module.commit_workspace_stores()
+        size = BuildDirUsage.load(BuildDirUsage.make_filename(build_dir)).size
+
+        def load_usage(filename):
+            raise AssertionError("LOADED: %s" % filename)
+        monkeypatch.setattr(BuildDirUsage, "load", load_usage)
+        build_dirs = discover_build_dirs(ctx, [project_dir])
+        assert [(b.build_config, b.last_used, b.size) for b in build_dirs] == [
+            ("debug", 100, size)]
+
+
+class TestBuildDirUsage(object):
+
+    def test_is_same_result__with_passed_build_of_same_sources(self, tmp_path):
+        usage = BuildDirUsage(BuildDirUsage.make_filename(tmp_path))
+        assert not usage.is_same_result("build", "passed", "FP1")
+        usage.set_result("build", "passed", sources_fingerprint="FP1")
+        assert usage.is_same_result("build", "passed", "FP1")
+        assert not usage.is_same_result("build", "passed", "FP2")
+        assert not usage.is_same_result("build", "passed", None)
+        assert not usage.is_same_result("build", "failed", "FP1")
+
+
+def test_enforce_build_dir_quota__with_invalid_quota_raises_exit():
+    ctx = Context(Config(overrides={"build_dir_quota": "20X"}))
+    with pytest.raises(Exit) as exc_info:
+        enforce_build_dir_quota(ctx)
+    assert "INVALID SIZE: 20X" in str(exc_info.value)
@@ -0,0 +1,122 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.scheduler`.
+"""
+
+from __future__ import absolute_import, print_function
+import sys
+import time
+from cmake_build.exceptions import NiceFailure, UnitsFailed
+from cmake_build.process_runner import ProcessRunner, running_processes
+from cmake_build.scheduler import Unit, UnitScheduler, concurrent_units, \
+    make_unit_scheduler
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+def make_unit(name, calls, error=None, delay=0):
+    def function():
+        calls.append(name)
+        if delay:
+            time.sleep(delay)
+        if error:
+            raise NiceFailure(reason=error)
+    return Unit(name, function)
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestUnitScheduler(object):
+
+    def test_run__fail_fast_skips_queued_units(self, capsys):
+        calls = []
+        units = [make_unit("p1/debug", calls),
+                 make_unit("p2/debug", calls, error="OOPS"),
+                 make_unit("p3/debug", calls)]
+        scheduler = UnitScheduler(max_workers=1)
+        results = scheduler.run(units)
+        assert calls == ["p1/debug", "p2/debug"]
+        assert [r.status for r in results] == ["passed", "failed", "skipped"]
+        with pytest.raises(NiceFailure) as exc_info:
+            scheduler.raise_failures(results)
+        assert exc_info.value.reason == "OOPS"
+        captured = capsys.readouterr()
+        assert "CMAKE-BUILD: 3 units: 1 passed, 1 failed, 1 skipped" in captured.out
+        assert "p2/debug: FAILED -- OOPS" in captured.out
+
+    def test_run__keep_going_runs_all_units(self, capsys):
+        calls = []
+        units = [make_unit("p1/debug", calls, error="OOPS1"),
+                 make_unit("p2/debug", calls),
+                 make_unit("p3/debug", calls, error="OOPS3")]
+        scheduler = UnitScheduler(max_workers=1, keep_going=True)
+        results = scheduler.run(units)
+        assert calls == ["p1/debug", "p2/debug", "p3/debug"]
+        with pytest.raises(UnitsFailed) as exc_info:
+            scheduler.raise_failures(results)
+        assert exc_info.value.reason == "2 of 3 units (p1/debug, p3/debug)"
+        captured = capsys.readouterr()
+        assert "p1/debug: FAILED -- OOPS1" in captured.out
+        assert "p3/debug: FAILED -- OOPS3" in captured.out
+
+    def test_run__single_unit_raises_its_error_without_report(self, capsys):
+        scheduler = UnitScheduler(max_workers=4)
+        results = scheduler.run([make_unit("p1/debug", [], error="OOPS")])
+        with pytest.raises(NiceFailure):
+            scheduler.raise_failures(results)
+        assert "units:" not in capsys.readouterr().out
+
+    def test_run__concurrent_units_capture_their_output(self, capsys):
+        def make_printing_unit(name):
+            return Unit(name, lambda: print("OUTPUT OF: {0}".format(name)))
+
+        scheduler = UnitScheduler(max_workers=2)
+        results = scheduler.run([make_printing_unit("p1/debug"),
+                                 make_printing_unit("p2/debug")])
+        assert [r.output for r in results] == ["OUTPUT OF: p1/debug\n",
+                                               "OUTPUT OF: p2/debug\n"]
+        captured = capsys.readouterr()
+        assert "OUTPUT OF: p1/debug" in captured.out
+        assert "OUTPUT OF: p2/debug" in captured.out
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="POSIX only")
+    def test_run__fail_fast_terminates_running_commands(self):
+        runner = ProcessRunner(echo=False)
+
+        def run_slow_command():
+            runner.run([sys.executable, "-c", "import time; time.sleep(30)"])
+
+        calls = []
+        units = [Unit("slow/debug", run_slow_command),
+                 make_unit("bad/debug", calls, error="OOPS", delay=0.5),
+                 make_unit("queued/debug", calls)]
+        scheduler = UnitScheduler(max_workers=2, grace_period=1.0)
+        start_time = time.time()
+        results = scheduler.run(units)
+        assert time.time() - start_time < 10
+        assert [r.status for r in results] == ["cancelled", "failed", "skipped"]
+        assert calls == ["bad/debug"]
+        assert not running_processes.cancelled
+
+
+class TestMakeUnitScheduler(object):
+
+    @pytest.mark.parametrize("value, expected", [
+        (None, 1), (0, 1), (4, 4), ("3", 3), ("many", 1),
+    ])
+    def test_concurrent_units(self, value, expected):
+        assert concurrent_units(dict(concurrent_units=value)) == expected
+
+    def test_make_unit_scheduler__uses_config(self):
+        config = dict(concurrent_units=3, keep_going="yes", cancel_grace_period=2)
+        scheduler = make_unit_scheduler(config)
+        assert scheduler.max_workers == 3
+        assert scheduler.keep_going is True
+        assert scheduler.grace_period == 2.0
+
+    def test_make_unit_scheduler__task_option_overrides_config(self):
+        scheduler = make_unit_scheduler(dict(keep_going=True), keep_going=False)
+        assert scheduler.keep_going is False
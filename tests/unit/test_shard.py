@@ -0,0 +1,181 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.shard`.
+"""
+
+from __future__ import absolute_import, print_function
+from xml.etree import ElementTree
+from cmake_build import shard as shard_module
+from cmake_build.scheduler import Unit, UnitResult
+from cmake_build.shard import ShardResults, get_shard_results, \
+    merge_junit_reports, merge_shard_results, parse_shard, partition_units, \
+    select_shard_pipelines, select_shard_units
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+def make_units(names, phase="build"):
+    units = []
+    for name in names:
+        unit = Unit(name, lambda: None)
+        unit.phase = phase
+        units.append(unit)
+    return units
+
+
+def unit_names(shards):
+    return [[unit.name for unit in units] for units in shards]
+
+
+@pytest.fixture(autouse=True)
+def clean_shard_results(monkeypatch):
+    monkeypatch.setattr(shard_module, "_shard_results", None)
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestParseShard(object):
+
+    @pytest.mark.parametrize("value, expected", [
+        (None, None), ("", None), ("1/4", (1, 4)), (" 4/4 ", (4, 4)),
+    ])
+    def test_parse_shard(self, value, expected):
+        assert parse_shard(value) == expected
+
+    @pytest.mark.parametrize("value", ["0/4", "5/4", "1", "1/x", "1/2/3"])
+    def test_parse_shard__with_bad_value_raises_error(self, value):
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+class TestPartitionUnits(object):
+
+    def test_partition__covers_all_units_once(self):
+        names = ["p{0}/debug".format(index) for index in range(7)]
+        shards = partition_units(make_units(names), 3)
+        assert sorted(sum(unit_names(shards), [])) == sorted(names)
+        assert [len(units) for units in shards] == [3, 2, 2]
+
+    def test_partition__is_independent_of_unit_order(self):
+        names = ["a/debug", "b/debug", "c/debug", "d/debug", "e/debug"]
+        shards1 = partition_units(make_units(names), 2)
+        shards2 = partition_units(make_units(list(reversed(names))), 2)
+        assert [sorted(units) for units in unit_names(shards1)] == \
+               [sorted(units) for units in unit_names(shards2)]
+
+    def test_partition__balances_by_timings(self):
+        names = ["a/debug", "b/debug", "c/debug", "d/debug"]
+        timings = {"a/debug:build": 100, "b/debug:build": 10,
+                   "c/debug:build": 60, "d/debug:build": 50}
+        shards = partition_units(make_units(names), 2, timings)
+        assert unit_names(shards) == [["a/debug", "b/debug"],
+                                      ["c/debug", "d/debug"]]
+
+    def test_partition__units_without_timings_use_average(self):
+        names = ["a/debug", "b/debug", "new/debug"]
+        timings = {"a/debug:build": 30, "b/debug:build": 10}
+        shards = partition_units(make_units(names), 2, timings)
+        # -- WEIGHTS: a=30, new=20 (average), b=10
+        assert unit_names(shards) == [["a/debug"], ["b/debug", "new/debug"]]
+
+    def test_partition__keeps_phases_of_a_unit_on_same_shard(self):
+        names = ["a/debug", "b/debug", "c/debug", "d/debug"]
+        # -- PER PHASE: build would pair (a, d), test would pair (a, b).
+        timings = {"a/debug:build": 100, "b/debug:build": 70,
+                   "c/debug:build": 60, "d/debug:build": 10,
+                   "a/debug:test": 5, "b/debug:test": 90,
+                   "c/debug:test": 80, "d/debug:test": 10}
+        build_shards = partition_units(make_units(names, "build"), 2, timings)
+        test_shards = partition_units(make_units(names, "test"), 2, timings)
+        assert unit_names(build_shards) == unit_names(test_shards)
+        # -- WEIGHTS (sum of phases): a=105, b=160, c=140, d=20
+        assert unit_names(build_shards) == [["b/debug", "d/debug"],
+                                            ["a/debug", "c/debug"]]
+
+    def test_partition__with_many_phases_of_a_unit(self):
+        units = make_units(["a/debug", "b/debug"], "build") + \
+                make_units(["a/debug", "b/debug"], "test")
+        shards = partition_units(units, 2)
+        assert unit_names(shards) == [["a/debug", "a/debug"],
+                                      ["b/debug", "b/debug"]]
+        assert [unit.phase for unit in shards[0]] == ["build", "test"]
+
+
+    def test_select_shard_pipelines__uses_partition_of_units(self, capsys):
+        names = ["a/debug", "b/debug", "c/debug"]
+        pipelines = [make_units([name], "init") + make_units([name], "build")
+                     for name in names]
+        for shard in [(1, 2), (2, 2)]:
+            selected = select_shard_pipelines({}, pipelines, shard)
+            units = select_shard_units({}, make_units(names), shard)
+            assert [units[0].name for units in selected] == \
+                   [unit.name for unit in units]
+            assert all(len(units) == 2 for units in selected)
+        assert "CMAKE-BUILD: Shard 1/2: 2 of 3 units" in capsys.readouterr().out
+
+
+class TestShardResults(object):
+
+    def test_merge__combines_shards_and_timings(self, tmp_path, capsys):
+        config = dict(config_dir=str(tmp_path))
+        for shard, name, status in [((1, 2), "p1/debug", "passed"),
+                                    ((2, 2), "p2/debug", "failed")]:
+            shard_module._shard_results = None
+            shard_results = get_shard_results(config, shard)
+            error = Exception("OOPS") if status == "failed" else None
+            shard_results.record(make_units([name]),
+                                 [UnitResult(name, status, error=error,
+                                             duration=2.0)])
+
+        filenames = sorted(str(path) for path in tmp_path.glob(".cmake_build.shard-*"))
+        assert len(filenames) == 2
+        merged = merge_shard_results(filenames)
+        assert merged.durations == {"p1/debug:build": 2.0}
+        assert [entry["shard"] for entry in merged.units] == ["1/2", "2/2"]
+        assert merged.failed
+        assert not merged.problems
+        merged.print_report()
+        captured = capsys.readouterr()
+        assert "CMAKE-BUILD: 2 units: 1 passed, 1 failed" in captured.out
+        assert "p2/debug (build): FAILED -- OOPS" in captured.out
+
+    def test_merge__reports_missing_shard(self, tmp_path):
+        filename = tmp_path/"shard1.json"
+        shard_results = ShardResults(filename, data=dict(shard="1/3"))
+        shard_results.record(make_units(["p1/debug"]),
+                             [UnitResult("p1/debug", "passed", duration=1.0)])
+        merged = merge_shard_results([str(filename)])
+        assert merged.problems == ["MISSING-SHARD: 2/3", "MISSING-SHARD: 3/3"]
+        assert merged.failed
+
+    def test_merge_junit_reports(self, tmp_path):
+        report1 = tmp_path/"junit1.xml"
+        report1.write_text(u'<testsuite name="p1" tests="2" failures="1">'
+                           u'<testcase name="t1"/></testsuite>')
+        report2 = tmp_path/"junit2.xml"
+        report2.write_text(u'<testsuites><testsuite name="p2" tests="3"/>'
+                           u'</testsuites>')
+        output = tmp_path/"merged.xml"
+        assert merge_junit_reports([str(report1), str(report2)], str(output)) == 2
+        root = ElementTree.parse(str(output)).getroot()
+        assert root.tag == "testsuites"
+        assert root.get("tests") == "5"
+        assert root.get("failures") == "1"
+        assert [suite.get("name") for suite in root] == ["p1", "p2"]
+
+    def test_merge_junit_reports__reports_missing_and_bad_files(self, tmp_path):
+        report1 = tmp_path/"junit1.xml"
+        report1.write_text(u'<testsuite name="p1" tests="2"/>')
+        report2 = tmp_path/"junit2.xml"
+        report2.write_text(u'<testsuite name="p2"')
+        missing = tmp_path/"missing.xml"
+        output = tmp_path/"merged.xml"
+        problems = []
+        assert merge_junit_reports([str(report1), str(report2), str(missing)],
+                                   str(output), problems=problems) == 1
+        assert problems == ["BAD-FILE: {0}".format(report2),
+                            "MISSING-FILE: {0}".format(missing)]
+        assert ElementTree.parse(str(output)).getroot().get("tests") == "2"
@@ -0,0 +1,147 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.status` and :mod:`cmake_build.fingerprint`.
+"""
+
+from __future__ import absolute_import, print_function
+import os
+from cmake_build.fingerprint import make_sources_fingerprint, \
+    sources_fingerprint_enabled
+from cmake_build.quota import BuildDirUsage, make_build_dir_pattern
+from cmake_build.status import CMakeProjectStatus
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+def make_project(project_dir):
+    (project_dir/"src").mkdir(parents=True)
+    (project_dir/"CMakeLists.txt").write_text(u"project(example)")
+    (project_dir/"src"/"hello.cpp").write_text(u"int main() {}")
+    (project_dir/"build.debug").mkdir()
+    (project_dir/"build.debug"/"CMakeCache.txt").write_text(u"")
+    return project_dir
+
+
+@pytest.fixture
+def build_dir_pattern():
+    return make_build_dir_pattern("build.{BUILD_CONFIG}")
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestSourcesFingerprint(object):
+
+    def test_is_stable_if_sources_are_unchanged(self, tmp_path, build_dir_pattern):
+        project_dir = make_project(tmp_path/"p1")
+        fingerprint1 = make_sources_fingerprint(project_dir, build_dir_pattern)
+        fingerprint2 = make_sources_fingerprint(project_dir, build_dir_pattern)
+        assert fingerprint1 == fingerprint2
+
+    def test_changes_if_source_file_changes(self, tmp_path, build_dir_pattern):
+        project_dir = make_project(tmp_path/"p1")
+        fingerprint1 = make_sources_fingerprint(project_dir, build_dir_pattern)
+        (project_dir/"src"/"hello.cpp").write_text(u"int main() { return 0; }")
+        fingerprint2 = make_sources_fingerprint(project_dir, build_dir_pattern)
+        assert fingerprint1 != fingerprint2
+
+    def test_changes_if_source_file_is_added(self, tmp_path, build_dir_pattern):
+        project_dir = make_project(tmp_path/"p1")
+        fingerprint1 = make_sources_fingerprint(project_dir, build_dir_pattern)
+        (project_dir/"src"/"other.cpp").write_text(u"")
+        fingerprint2 = make_sources_fingerprint(project_dir, build_dir_pattern)
+        assert fingerprint1 != fingerprint2
+
+    @pytest.mark.parametrize("value, expected", [
+        (None, False), (False, False), ("no", False),
+        (True, True), ("yes", True), ("1", True),
+    ])
+    def test_sources_fingerprint_enabled(self, value, expected):
+        assert sources_fingerprint_enabled(dict(sources_fingerprint=value)) == expected
+
+    def test_ignores_build_dirs_and_hidden_dirs(self, tmp_path, build_dir_pattern):
+        project_dir = make_project(tmp_path/"p1")
+        (project_dir/".git").mkdir()
+        fingerprint1 = make_sources_fingerprint(project_dir, build_dir_pattern)
+        (project_dir/"build.debug"/"hello.o").write_text(u"OBJ")
+        (project_dir/".git"/"index").write_text(u"INDEX")
+        fingerprint2 = make_sources_fingerprint(project_dir, build_dir_pattern)
+        assert fingerprint1 == fingerprint2
+
+
+class TestBuildDirUsageResults(object):
+
+    def test_set_result__is_stored_in_usage_file(self, tmp_path):
+        filename = BuildDirUsage.make_filename(tmp_path)
+        usage = BuildDirUsage(filename)
+        usage.set_result("build", "passed", duration=2.5, now=1000,
+                         sources_fingerprint="1234")
+        usage.mark_used("debug", now=1000)
+
+        usage2 = BuildDirUsage.load(filename)
+        assert usage2.get_result("build") == dict(status="passed",
+                                                  finished=1000, duration=2.5)
+        assert usage2.sources_fingerprint == "1234"
+        assert usage2.get_result("test") is None
+
+    def test_set_result__failed_build_keeps_sources_fingerprint(self, tmp_path):
+        usage = BuildDirUsage(BuildDirUsage.make_filename(tmp_path))
+        usage.set_result("build", "passed", sources_fingerprint="1234")
+        usage.set_result("build", "failed")
+        assert usage.get_result("build")["status"] == "failed"
+        assert usage.sources_fingerprint == "1234"
+
+
+class TestStoredBuildDirStates(object):
+
+    def test_load__provides_usage_results_and_fingerprints(self, tmp_path):
+        from cmake_build.status import load_stored_build_dir_states
+        from cmake_build.workspace_store import WorkspaceStore
+        workspace_store = WorkspaceStore(tmp_path/"workspace.db")
+        build_dir = tmp_path/"build.debug"
+        workspace_store.mark_used(build_dir, "debug", now=1000)
+        workspace_store.update_size(build_dir, 2048)
+        workspace_store.record_result(build_dir, "build", "passed",
+                                      duration=2.5, now=1000)
+        workspace_store.put_fingerprint(build_dir, "sources", "1234")
+        workspace_store.commit()
+
+        states = load_stored_build_dir_states(workspace_store,
+                                              [build_dir, tmp_path/"build.other"])
+        assert list(states) == [str(build_dir)]
+        state = states[str(build_dir)]
+        assert state.size == 2048
+        assert state.get_result("build") == dict(status="passed", finished=1000,
+                                                 duration=2.5)
+        assert state.get_result("test") is None
+        assert state.sources_fingerprint == "1234"
+        workspace_store.close()
+
+
+class TestCMakeProjectStatus(object):
+
+    def test_as_row__with_uninitialized_project(self):
+        status = CMakeProjectStatus("p1", "debug")
+        assert status.as_row() == ("p1", "debug", "no", "-", "-", "-", "-", "-")
+
+    def test_as_row__with_built_project(self):
+        last_build = dict(status="passed", finished=0, duration=1.25)
+        status = CMakeProjectStatus("p1", "debug", initialized=True,
+                                    cmake_generator="ninja", config_state="ok",
+                                    last_build=last_build, size=2048,
+                                    sources_changed=True)
+        row = status.as_row()
+        assert row[:5] == ("p1", "debug", "yes", "ninja", "ok")
+        assert row[5].startswith("passed ") and row[5].endswith("(1.2s)")
+        assert row[6:] == ("2.0 KiB", "changed")
+        assert len(row) == len(CMakeProjectStatus.COLUMNS)
+
+
+def test_status_task__does_not_remember_its_build_config():
+    from cmake_build.tasks import CMakeBuildTask, status
+    assert not isinstance(status, CMakeBuildTask)
+    arguments = dict((argument.name, argument)
+                     for argument in status.get_arguments())
+    assert arguments["build_config"].default is None
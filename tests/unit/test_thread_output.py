@@ -0,0 +1,60 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.thread_output`.
+"""
+
+from __future__ import absolute_import, print_function
+import sys
+from cmake_build.thread_output import execute_concurrently, \
+    make_thread_output_config
+from invoke import Config, Context
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestExecuteConcurrently(object):
+
+    def test_collects_output_per_function(self, capsys):
+        def make_function(text):
+            def function():
+                print(text)
+                sys.stderr.write("ERR:%s\n" % text)
+            return function
+
+        functions = [make_function("one"), make_function("two")]
+        results = execute_concurrently(functions, max_workers=2)
+        # -- HINT: stdout/stderr are forwarded by two IO threads (any order).
+        outputs = [sorted(output.splitlines()) for output, _ in results]
+        assert outputs == [["ERR:one", "one"], ["ERR:two", "two"]]
+        assert [error for _, error in results] == [None, None]
+        assert capsys.readouterr().out == ""
+
+    def test_collects_command_output_per_function(self, capsys):
+        def make_function(text):
+            def function():
+                config = make_thread_output_config(Config())
+                Context(config).run("echo %s; echo ERR:%s >&2" % (text, text))
+            return function
+
+        functions = [make_function("one"), make_function("two")]
+        results = execute_concurrently(functions, max_workers=2)
+        # -- HINT: stdout/stderr are forwarded by two IO threads (any order).
+        outputs = [sorted(output.splitlines()) for output, _ in results]
+        assert outputs == [["ERR:one", "one"], ["ERR:two", "two"]]
+        assert [error for _, error in results] == [None, None]
+        assert capsys.readouterr().out == ""
+
+    def test_returns_error_of_function(self):
+        def fail():
+            raise ValueError("OOPS")
+
+        [(output, error)] = execute_concurrently([fail], max_workers=2)
+        assert isinstance(error, ValueError)
+
+
+class TestMakeThreadOutputConfig(object):
+
+    def test_without_captured_output_returns_same_config(self):
+        config = Config()
+        assert make_thread_output_config(config) is config
@@ -0,0 +1,177 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.trash`.
+"""
+
+from __future__ import absolute_import, print_function
+import os
+from cmake_build import trash
+from cmake_build.trash import TrashBin, TRASH_DIRNAME, WORKSPACE_TRASH_DIRNAME
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+def make_build_dir(directory, files=5):
+    for index in range(files):
+        subdir = directory/("sub_%d" % index)
+        subdir.mkdir(parents=True)
+        (subdir/"file.o").write_text(u"OBJECT")
+    (directory/"CMakeCache.txt").write_text(u"CACHE")
+    return directory
+
+
+def use_other_device_for(monkeypatch, other_dir):
+    """Simulates that other_dir (and its contents) is on another filesystem."""
+    path_device = trash.path_device
+
+    def fake_path_device(path):
+        if os.path.abspath(str(path)).startswith(str(other_dir)):
+            return -1
+        return path_device(path)
+    monkeypatch.setattr(trash, "path_device", fake_path_device)
+
+
+@pytest.fixture
+def trash_dir(tmp_path):
+    return tmp_path/"cache"/TRASH_DIRNAME
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestTrashBin(object):
+
+    @pytest.mark.parametrize("mode", ["background", "deferred"])
+    def test_remove_tree__frees_directory_path_at_once(self, tmp_path, trash_dir,
+                                                       mode):
+        build_dir = make_build_dir(tmp_path/"build.debug")
+        trash_bin = TrashBin(mode, trash_dir=trash_dir)
+        assert trash_bin.remove_tree(build_dir) is True
+        assert not build_dir.exists()
+
+        trash_bin.flush()
+        assert not trash_dir.exists()
+
+    def test_remove_tree__deferred_mode_deletes_trash_on_flush(self, tmp_path,
+                                                               trash_dir):
+        build_dir = make_build_dir(tmp_path/"build.debug")
+        trash_bin = TrashBin("deferred", trash_dir=trash_dir)
+        trash_bin.remove_tree(build_dir)
+        assert len(os.listdir(str(trash_dir))) == 1
+
+        trash_bin.flush()
+        assert not trash_dir.exists()
+
+    def test_remove_tree__with_missing_directory(self, tmp_path, trash_dir):
+        trash_bin = TrashBin("background", trash_dir=trash_dir)
+        assert trash_bin.remove_tree(tmp_path/"MISSING") is False
+        trash_bin.flush()
+
+    def test_remove_tree__removes_orphans_of_finished_process(self, tmp_path,
+                                                              trash_dir,
+                                                              monkeypatch):
+        orphan = make_build_dir(trash_dir/"build.debug.999999.1")
+        monkeypatch.setattr(trash, "process_exists", lambda pid: False)
+        trash_bin = TrashBin("background", trash_dir=trash_dir)
+        trash_bin.remove_tree(make_build_dir(tmp_path/"build.release"))
+        trash_bin.flush()
+        assert not orphan.exists()
+        assert not trash_dir.exists()
+
+    def test_remove_tree__keeps_trash_of_running_process(self, tmp_path,
+                                                         trash_dir,
+                                                         monkeypatch):
+        other = make_build_dir(trash_dir/"build.debug.999999.1")
+        monkeypatch.setattr(trash, "process_exists", lambda pid: True)
+        trash_bin = TrashBin("background", trash_dir=trash_dir)
+        trash_bin.remove_tree(make_build_dir(tmp_path/"build.release"))
+        trash_bin.flush()
+        assert other.exists()
+        assert os.listdir(str(trash_dir)) == [other.name]
+
+    def test_remove_tree__never_creates_trash_in_project_dir(self, tmp_path,
+                                                             trash_dir):
+        project_dir = tmp_path/"project"
+        build_dir = make_build_dir(project_dir/"build.debug")
+        trash_bin = TrashBin("deferred", trash_dir=trash_dir)
+        trash_bin.remove_tree(build_dir)
+        assert os.listdir(str(project_dir)) == []
+        assert len(os.listdir(str(trash_dir))) == 1
+        trash_bin.flush()
+
+    def test_remove_tree__uses_workspace_trash_on_other_filesystem(
+            self, tmp_path, trash_dir, monkeypatch):
+        use_other_device_for(monkeypatch, trash_dir.parent)
+        workspace_dir = tmp_path/"workspace"
+        build_dir = make_build_dir(workspace_dir/"project"/"build.debug")
+        trash_bin = TrashBin("deferred", trash_dir=trash_dir,
+                             root_dir=workspace_dir)
+        assert trash_bin.remove_tree(build_dir) is True
+        workspace_trash_dir = workspace_dir/WORKSPACE_TRASH_DIRNAME
+        assert len(os.listdir(str(workspace_trash_dir))) == 1
+        assert not trash_dir.exists()
+        trash_bin.flush()
+        assert not workspace_trash_dir.exists()
+
+    def test_remove_tree__uses_mount_point_trash(self, tmp_path, trash_dir,
+                                                 monkeypatch):
+        use_other_device_for(monkeypatch, trash_dir.parent)
+        mount_dir = tmp_path/"volume"
+        monkeypatch.setattr(trash, "find_mount_point", lambda path: str(mount_dir))
+        build_dir = make_build_dir(mount_dir/"project"/"build.debug")
+        trash_bin = TrashBin("deferred", trash_dir=trash_dir)
+        assert trash_bin.remove_tree(build_dir) is True
+        assert len(os.listdir(str(mount_dir/WORKSPACE_TRASH_DIRNAME))) == 1
+        trash_bin.flush()
+
+    def test_remove_tree__without_trash_on_filesystem_reports_once(
+            self, tmp_path, trash_dir, monkeypatch, capsys):
+        volume_dir = tmp_path/"volume"
+        use_other_device_for(monkeypatch, volume_dir)
+        monkeypatch.setattr(trash, "find_mount_point", lambda path: "/")
+        build_dir1 = make_build_dir(volume_dir/"build.debug")
+        build_dir2 = make_build_dir(volume_dir/"build.release")
+        trash_bin = TrashBin("background", trash_dir=trash_dir)
+        assert trash_bin.remove_tree(build_dir1) is False
+        assert trash_bin.remove_tree(build_dir2) is False
+        assert not build_dir1.exists() and not build_dir2.exists()
+        output = capsys.readouterr().out
+        assert output.count("TRASH: No trash directory") == 1
+        trash_bin.flush()
+
+    def test_recover_trash_orphans__at_program_start(self, trash_dir,
+                                                     monkeypatch):
+        orphan = make_build_dir(trash_dir/"build.debug.999999.1")
+        monkeypatch.setattr(trash, "process_exists", lambda pid: False)
+        monkeypatch.setenv("CMAKE_BUILD_TRASH", "deferred")
+        monkeypatch.setenv("CMAKE_BUILD_CACHE_DIR", str(trash_dir.parent))
+        monkeypatch.setattr(trash, "_trash_bin", None)
+        assert trash.recover_trash_orphans() == [str(orphan)]
+        trash.flush_trash()
+        assert not trash_dir.exists()
+
+    def test_parse_trash_name(self):
+        assert TrashBin.parse_trash_name("build.debug.1234.5") == 1234
+        assert TrashBin.parse_trash_name("build") is None
+
+
+class TestRemoveTree(object):
+
+    def test_without_trash_removes_directory(self, tmp_path, trash_dir,
+                                             monkeypatch):
+        monkeypatch.setattr(trash, "_trash_bin", None)
+        monkeypatch.delenv("CMAKE_BUILD_TRASH", raising=False)
+        build_dir = make_build_dir(tmp_path/"build.debug")
+        trash.remove_tree(build_dir)
+        assert not build_dir.exists()
+        assert not trash_dir.exists()
+
+    @pytest.mark.parametrize("value, expected", [
+        ("no", None), ("yes", "background"),
+        ("background", "background"), ("deferred", "deferred"),
+    ])
+    def test_trash_mode_from_environment(self, value, expected, monkeypatch):
+        monkeypatch.setenv("CMAKE_BUILD_TRASH", value)
+        assert trash.trash_mode_from_environment() == expected
@@ -0,0 +1,167 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.watchdog`.
+"""
+
+from __future__ import absolute_import, print_function
+import io
+import sys
+import time
+from cmake_build.exceptions import UnitTimedOut
+from cmake_build.process_runner import ProcessRunner, make_process_runner
+from cmake_build.scheduler import Unit, UnitScheduler
+from cmake_build import watchdog as watchdog_module
+from cmake_build.watchdog import PhaseTimeout, Watchdog, \
+    collect_process_tree, make_phase_timeout, make_watchdog, parse_duration, \
+    select_leaf_processes, use_phase_timer
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+def python_argv(code):
+    return [sys.executable, "-c", code]
+
+
+def run_watched(code, timeout, diagnostics_file=None):
+    stream = io.StringIO()
+    watchdog = Watchdog(timeout, name="p1/debug (test)",
+                        diagnostics_file=diagnostics_file, grace_period=1.0)
+    runner = ProcessRunner(echo=False, stream=stream)
+    runner.run(python_argv(code), watchdog=watchdog)
+    return stream
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestPhaseTimeout(object):
+
+    @pytest.mark.parametrize("value, expected", [
+        (None, None), ("", None), (0, None), (90, 90.0), ("90s", 90.0),
+        ("15m", 900.0), ("1.5h", 5400.0), (" 2 ", 2.0),
+    ])
+    def test_parse_duration(self, value, expected):
+        assert parse_duration(value) == expected
+
+    @pytest.mark.parametrize("value", ["forever", "10x", "-5"])
+    def test_parse_duration__with_bad_value_raises_error(self, value):
+        with pytest.raises(ValueError):
+            parse_duration(value)
+
+    def test_make_phase_timeout__merges_default_phase_and_build_config(self):
+        config = dict(phase_timeouts=dict(
+            default=dict(idle="30m"),
+            test=dict(total="30m", idle="5m"),
+            build_configs=dict(debug=dict(test="1h"))))
+        timeout = make_phase_timeout(config, "test", "debug")
+        assert (timeout.total, timeout.idle) == (3600.0, 300.0)
+        timeout = make_phase_timeout(config, "test", "release")
+        assert (timeout.total, timeout.idle) == (1800.0, 300.0)
+        timeout = make_phase_timeout(config, "build", "debug")
+        assert (timeout.total, timeout.idle) == (None, 1800.0)
+
+    def test_make_phase_timeout__configure_uses_init_entry(self):
+        config = dict(phase_timeouts=dict(init="10m"))
+        assert make_phase_timeout(config, "configure").total == 600.0
+        assert make_phase_timeout(config, "build") is None
+        assert make_phase_timeout(dict(phase_timeouts=None), "build") is None
+
+    def test_make_process_runner__with_phase_timeouts_uses_direct_runner(self):
+        config = dict(process_runner="shell", phase_timeouts=dict(build="1h"))
+        assert isinstance(make_process_runner(config), ProcessRunner)
+
+
+class TestWatchdog(object):
+
+    def test_check__detects_idle_and_total_timeout(self):
+        watchdog = Watchdog(PhaseTimeout(total=100, idle=10))
+        watchdog.start_time = watchdog.last_output_time = 1000.0
+        assert watchdog.check(now=1005.0) is None
+        assert "idle timeout" in watchdog.check(now=1010.0)
+        watchdog.last_output_time = 1095.0
+        assert "total timeout" in watchdog.check(now=1100.0)
+
+    def test_run__with_hanging_command_collects_diagnostics(self, tmp_path):
+        diagnostics_file = tmp_path/"cmake_build.timeout.log"
+        code = "import time; print('LAST LINE', flush=True); time.sleep(30)"
+        start_time = time.time()
+        with pytest.raises(UnitTimedOut) as exc_info:
+            run_watched(code, PhaseTimeout(idle=1), str(diagnostics_file))
+        assert time.time() - start_time < 10
+        assert "idle timeout" in str(exc_info.value)
+        diagnostics = diagnostics_file.read_text()
+        assert "p1/debug (test) -- HANG: no output for 0:01" in diagnostics
+        assert "PROCESS TREE:" in diagnostics
+        assert "time.sleep(30)" in diagnostics
+        assert "  LAST LINE" in diagnostics
+
+    def test_run__with_output_is_not_idle(self):
+        code = "import time\nfor i in range(4): print(i, flush=True); time.sleep(0.5)"
+        stream = run_watched(code, PhaseTimeout(total=20, idle=1.5))
+        assert stream.getvalue().split() == ["0", "1", "2", "3"]
+
+    def test_collect_process_tree__contains_children(self):
+        code = ("import subprocess, sys, time; "
+                "p = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)']); "
+                "print('STARTED', flush=True); time.sleep(30)")
+        watchdog = Watchdog(PhaseTimeout(idle=1), grace_period=1.0)
+        with pytest.raises(UnitTimedOut):
+            ProcessRunner(echo=False, stream=io.StringIO()).run(
+                python_argv(code), watchdog=watchdog)
+        lines = watchdog.diagnostics.splitlines()
+        process_lines = lines[lines.index("PROCESS TREE:")+1:
+                              lines.index("LAST OUTPUT LINES:")]
+        assert len(process_lines) == 2
+        assert process_lines[1].endswith("-c import time; time.sleep(30)")
+
+    def test_phase_timer__measures_total_timeout_per_phase_of_unit(self):
+        config = dict(phase_timeouts=dict(build="2s"), cancel_grace_period=1.0)
+        runner = ProcessRunner(echo=False, stream=io.StringIO())
+        code = "import time; time.sleep(1.2)"
+        with use_phase_timer():
+            watchdog1 = make_watchdog(config, "build")
+            runner.run(python_argv(code), watchdog=watchdog1)
+            watchdog2 = make_watchdog(config, "build")
+            assert watchdog2.phase_start_time == watchdog1.phase_start_time
+            assert make_watchdog(config, "test") is None
+            with pytest.raises(UnitTimedOut) as exc_info:
+                runner.run(python_argv(code), watchdog=watchdog2)
+        assert "total timeout" in str(exc_info.value)
+        assert make_watchdog(config, "build").phase_start_time is None
+
+    def test_select_leaf_processes(self):
+        process_tree = [(1, 0, "make"), (2, 1, "cc"), (3, 2, "cc1"),
+                        (4, 1, "ld")]
+        assert [pid for pid, _, _ in select_leaf_processes(process_tree)] == [3, 4]
+
+    def test_make_stack_samples__samples_leaves_within_timeout(self, monkeypatch):
+        sampled = []
+
+        def collect_stack_sample(pid, timeout):
+            sampled.append(pid)
+            return "#0 main()"
+        monkeypatch.setattr(watchdog_module, "collect_stack_sample",
+                            collect_stack_sample)
+        process_tree = [(1, 0, "make"), (2, 1, "cc"), (4, 0, "ld")]
+        lines = Watchdog.make_stack_samples(process_tree)
+        assert sampled == [2, 4]
+        assert lines[:2] == ["STACK SAMPLE: 2 cc", "  #0 main()"]
+        lines = Watchdog.make_stack_samples(process_tree, timeout=0)
+        assert lines == ["STACK SAMPLES: stopped (after 0:00)"]
+        assert sampled == [2, 4]
+
+    def test_collect_process_tree__with_unknown_pid(self):
+        assert collect_process_tree(-1) == []
+
+    def test_scheduler__marks_unit_as_timeout(self):
+        def hang():
+            raise UnitTimedOut(reason="sleep 30 (HANG: no output for 0:01)")
+        scheduler = UnitScheduler(max_workers=1, keep_going=True)
+        results = scheduler.run([Unit("p1/debug", hang),
+                                 Unit("p2/debug", lambda: None)])
+        assert [result.status for result in results] == ["timeout", "passed"]
+        assert results[0].failed
+        with pytest.raises(UnitTimedOut):
+            scheduler.raise_failures(results)
@@ -0,0 +1,107 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.workspace`.
+"""
+
+from __future__ import absolute_import, print_function
+from cmake_build.model import CMakeProject
+from cmake_build.workspace import Settings, ShellExecutor, Workspace
+from invoke.exceptions import UnexpectedExit
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    for name in ("p1", "p2"):
+        project_dir = tmp_path/name
+        project_dir.mkdir()
+        (project_dir/"CMakeLists.txt").write_text(u"project({0})\n".format(name))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+class RecordingExecutor(object):
+    def __init__(self):
+        self.commands = []
+
+    def run(self, command, **kwargs):
+        self.commands.append(command)
+
+    def sudo(self, command, **kwargs):
+        self.commands.append("sudo " + command)
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestSettings(object):
+
+    def test_settings__provide_attributes_and_get(self):
+        settings = Settings(dict(cmake_generator="make"), build_configs=["debug"])
+        assert settings.cmake_generator == "make"
+        assert settings.get("build_configs") == ["debug"]
+        assert settings.build_dir_schema == "build.{BUILD_CONFIG}"
+        assert settings.unknown_param is None
+        assert settings.get("unknown_param", 42) == 42
+
+    def test_settings__do_not_share_mutable_defaults(self):
+        settings1 = Settings()
+        settings1.build_configs_map["debug"] = {}
+        assert Settings().build_configs_map == {}
+
+    def test_from_config__copies_values(self):
+        settings = Settings.from_config(dict(cmake_generator="ninja", shard="1/2"))
+        assert settings.cmake_generator == "ninja"
+        assert settings.shard == "1/2"
+
+
+class TestWorkspace(object):
+
+    def test_make_cmake_projects__without_invoke_context(self, workdir):
+        workspace = Workspace(projects=["p1", "p2"], build_configs=["debug", "release"])
+        cmake_projects = workspace.make_cmake_projects("all", build_config="all")
+        assert [p.unit_name for p in cmake_projects] == [
+            "p1/debug", "p2/debug", "p1/release", "p2/release"]
+        assert all(isinstance(p, CMakeProject) for p in cmake_projects)
+        assert cmake_projects[0].ctx is workspace
+
+    def test_make_cmake_project__reuses_cached_project(self, workdir):
+        workspace = Workspace()
+        cmake_project = workspace.make_cmake_project("p1", "debug")
+        assert workspace.make_cmake_project("p1", "debug") is cmake_project
+        assert str(cmake_project.project_build_dir) == str(workdir/"p1"/"build.debug")
+
+    def test_run__delegates_to_executor(self):
+        executor = RecordingExecutor()
+        workspace = Workspace(executor=executor)
+        workspace.run("cmake --version")
+        workspace.sudo("cmake --install .")
+        assert executor.commands == ["cmake --version", "sudo cmake --install ."]
+
+    def test_build__runs_commands_with_executor(self, workdir):
+        executor = RecordingExecutor()
+        workspace = Workspace(projects=["p1"], build_configs=["debug"],
+                              executor=executor)
+        cmake_project = workspace.make_cmake_project("p1", "debug")
+        cmake_project.build()
+        assert workspace.config.process_runner == "shell"
+        assert any(command.startswith("cmake -G") for command in executor.commands)
+        assert "cmake --build ." in executor.commands
+
+    def test_process_runner__without_executor_is_direct(self):
+        assert Workspace().config.process_runner == "direct"
+        workspace = Workspace(executor=RecordingExecutor(), process_runner="direct")
+        assert workspace.config.process_runner == "direct"
+
+
+class TestShellExecutor(object):
+
+    def test_run__with_failed_command_raises_error(self):
+        executor = ShellExecutor(echo=False)
+        assert executor.run("true").exited == 0
+        with pytest.raises(UnexpectedExit):
+            executor.run("exit 3")
+        assert executor.run("exit 3", warn=True).exited == 3
@@ -0,0 +1,163 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`cmake_build.workspace_store`.
+"""
+
+from __future__ import absolute_import, print_function
+from cmake_build.config import CMakeProjectPersistConfig
+from cmake_build.model_builder import load_stored_configs_from_workspace_store
+from cmake_build.workspace_store import \
+    WorkspaceStore, make_file_stamp, workspace_store_filename
+from invoke import Config
+from path import Path
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT:
+# ---------------------------------------------------------------------------
+def make_stored_config(build_dir, cmake_generator="ninja"):
+    filename = Path(str(build_dir))/CMakeProjectPersistConfig.FILE_BASENAME
+    stored_config = CMakeProjectPersistConfig(filename,
+                                              cmake_generator=cmake_generator)
+    stored_config.save()
+    return stored_config
+
+
+@pytest.fixture
+def workspace_store(tmp_path):
+    store = WorkspaceStore(tmp_path/"workspace.db")
+    yield store
+    store.close()
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE:
+# ---------------------------------------------------------------------------
+class TestWorkspaceStore(object):
+
+    def test_uses_wal_mode(self, workspace_store):
+        journal_mode = workspace_store.connection.execute(
+            "PRAGMA journal_mode").fetchone()[0]
+        assert journal_mode == "wal"
+
+    def test_commit__writes_queued_changes_in_one_batch(self, workspace_store,
+                                                        tmp_path):
+        build_dir = tmp_path/"build.debug"
+        stored_config = make_stored_config(build_dir)
+        workspace_store.put_stored_config(build_dir, stored_config, "debug")
+        workspace_store.mark_used(build_dir, "debug")
+        workspace_store.record_result(build_dir, "build", "passed", duration=1.5)
+        assert workspace_store.has_pending
+        assert workspace_store.commit() == 3
+        assert workspace_store.commit() == 0
+
+        other_store = WorkspaceStore(workspace_store.filename)
+        data, _ = other_store.get_stored_configs([build_dir])[str(build_dir)]
+        assert data["cmake_generator"] == "ninja"
+        status, _, duration = other_store.get_results([build_dir])[str(build_dir)]["build"]
+        assert (status, duration) == ("passed", 1.5)
+        other_store.close()
+
+    def test_get_stored_configs__sees_queued_changes(self, workspace_store, tmp_path):
+        build_dir = tmp_path/"build.debug"
+        stored_config = make_stored_config(build_dir, cmake_generator="make")
+        workspace_store.put_stored_config(build_dir, stored_config, file_stamp="S1")
+        data, file_stamp = workspace_store.get_stored_configs([build_dir])[str(build_dir)]
+        assert data["cmake_generator"] == "make"
+        assert file_stamp == "S1"
+
+    def test_forget__removes_all_data_of_build_dir(self, workspace_store, tmp_path):
+        build_dir = tmp_path/"build.debug"
+        workspace_store.put_stored_config(build_dir, make_stored_config(build_dir))
+        workspace_store.put_fingerprint(build_dir, "sources", "1234")
+        workspace_store.commit()
+        workspace_store.forget(build_dir)
+        workspace_store.commit()
+        assert workspace_store.get_stored_configs([build_dir]) == {}
+        assert workspace_store.get_fingerprints([build_dir]) == {}
+
+    def test_getters__see_queued_changes(self, workspace_store, tmp_path):
+        build_dir = tmp_path/"build.debug"
+        workspace_store.record_result(build_dir, "test", "passed")
+        workspace_store.commit()
+        workspace_store.mark_used(build_dir, "debug", now=1000)
+        workspace_store.record_result(build_dir, "build", "failed", duration=2.0)
+        workspace_store.put_fingerprint(build_dir, "sources", "1234")
+        results = workspace_store.get_results([build_dir])[str(build_dir)]
+        assert sorted(results) == ["build", "test"]
+        assert results["build"][0] == "failed"
+        assert workspace_store.get_fingerprints([build_dir]) == {
+            str(build_dir): {"sources": "1234"}}
+        usage = workspace_store.get_usage([build_dir])[str(build_dir)]
+        assert (usage["build_config"], usage["last_used"]) == ("debug", 1000)
+
+        workspace_store.forget(build_dir)
+        assert workspace_store.get_results([build_dir]) == {}
+        assert workspace_store.get_usage([build_dir]) == {}
+
+    def test_mark_used__keeps_size_unless_changed(self, workspace_store, tmp_path):
+        build_dir = tmp_path/"build.debug"
+        workspace_store.mark_used(build_dir, "debug")
+        workspace_store.update_size(build_dir, 4096)
+        workspace_store.commit()
+        workspace_store.mark_used(build_dir, "debug", size_changed=False)
+        assert workspace_store.get_usage([build_dir])[str(build_dir)]["size"] == 4096
+        workspace_store.commit()
+        assert workspace_store.get_usage([build_dir])[str(build_dir)]["size"] == 4096
+        workspace_store.mark_used(build_dir, "debug")
+        workspace_store.commit()
+        assert workspace_store.get_usage([build_dir])[str(build_dir)]["size"] is None
+
+    def test_many_stores_share_one_database(self, tmp_path):
+        filename = tmp_path/"workspace.db"
+        store1 = WorkspaceStore(filename)
+        store2 = WorkspaceStore(filename)
+        store1.record_result(tmp_path/"build.one", "build", "passed")
+        store2.record_result(tmp_path/"build.two", "build", "failed")
+        store1.commit()
+        store2.commit()
+        results = store1.get_results([tmp_path/"build.one", tmp_path/"build.two"])
+        assert len(results) == 2
+        store1.close()
+        store2.close()
+
+
+class TestLoadStoredConfigsFromWorkspaceStore(object):
+
+    def test_uses_stored_config_if_json_file_is_unchanged(self, workspace_store,
+                                                          tmp_path):
+        build_dir = tmp_path/"build.debug"
+        stored_config = make_stored_config(build_dir, cmake_generator="make")
+        stored_config.cmake_generator = "ninja"     # -- ONLY IN: workspace store.
+        workspace_store.put_stored_config(build_dir, stored_config,
+                                          file_stamp=make_file_stamp(stored_config.filename))
+
+        stored_configs = load_stored_configs_from_workspace_store(
+            workspace_store, [stored_config.filename])
+        assert stored_configs[stored_config.filename].cmake_generator == "ninja"
+
+    def test_loads_json_file_if_changed(self, workspace_store, tmp_path):
+        build_dir = tmp_path/"build.debug"
+        stored_config = make_stored_config(build_dir, cmake_generator="make")
+        workspace_store.put_stored_config(build_dir, stored_config,
+                                          file_stamp="OTHER")
+
+        stored_configs = load_stored_configs_from_workspace_store(
+            workspace_store, [stored_config.filename])
+        assert stored_configs[stored_config.filename].cmake_generator == "make"
+        _, file_stamp = workspace_store.get_stored_configs([build_dir])[str(build_dir)]
+        assert file_stamp == make_file_stamp(stored_config.filename)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    (False, None),
+    ("no", None),
+    (True, "CONFIG_DIR/.cmake_build.workspace.db"),
+    ("yes", "CONFIG_DIR/.cmake_build.workspace.db"),
+    ("other.db", "other.db"),
+])
+def test_workspace_store_filename(value, expected):
+    config = Config(overrides={"workspace_store": value, "config_dir": "CONFIG_DIR"})
+    assert workspace_store_filename(config) == expected